@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+성능 벤치마크 스위트
+
+add_all_indicators, screen_stocks, 매매 주기 1회(run_trading_cycle)를 여러 종목 수와
+데이터 기간에 대해 측정하고, 단계별 실행 시간과 최대 메모리 사용량을 JSON으로 기록합니다.
+저장된 기준값(baseline)과 비교해 성능 저하를 찾아냅니다.
+
+매매 주기 벤치마크는 네트워크 없이 LocalBroker(가격 패널 기반 대역)로 실행합니다.
+
+사용 예:
+    python benchmark.py                                  # 기본: 60/500/2500종목 x 60/250일
+    python benchmark.py --sizes 60 --stages cycle        # 일부만 측정
+    python benchmark.py --panel data/panel               # 기록된 패널 사용
+    python benchmark.py --stages cycle --shards 4        # 매매 주기를 워커 프로세스 4개로 나눠 측정
+    python benchmark.py --save-baseline                  # 결과를 기준값으로 저장
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.2
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+import main
+from indicators import add_all_indicators
+from local_broker import LocalBroker
+from order_manager import OrderManager
+from param_sweep import generate_synthetic_panel, load_price_panel, save_price_panel
+from portfolio import Portfolio
+from sharded_pipeline import ShardedPipeline
+from stock_selector import screen_stocks
+import market_data
+import trading_pipeline
+
+DEFAULT_SIZES = [60, 500, 2500]
+DEFAULT_DAYS = [60, 250]
+STAGES = ['indicators', 'screening', 'cycle']
+DEFAULT_BASELINE_FILE = 'benchmark_baseline.json'
+DEFAULT_OUTPUT_FILE = 'benchmark_results.json'
+
+
+@contextlib.contextmanager
+def _quiet():
+    """ 측정 중 표준 출력을 버립니다. (터미널 출력 비용이 측정값에 섞이지 않도록) """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _measure(func, repeat: int) -> dict:
+    """
+    func 를 repeat 회 실행해 시간을 재고, 별도 1회 실행으로 최대 메모리를 측정합니다.
+    (tracemalloc 은 실행을 느리게 하므로 시간 측정과 분리합니다.)
+    """
+    timings = []
+    for _ in range(repeat):
+        with _quiet():
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with _quiet():
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+
+def _panel_subset(panel_path: str, n_symbols: int, n_days: int, work_dir: str) -> str:
+    """ 기록된 패널에서 앞쪽 n_symbols 종목, 최근 n_days 일만 잘라 새 패널로 저장합니다. """
+    codes, dates, close, volume = load_price_panel(panel_path, mmap=True)
+    path = os.path.join(work_dir, f"recorded_{n_symbols}x{n_days}")
+    save_price_panel(path, codes[:n_symbols], dates[-n_days:], close[:n_symbols, -n_days:], volume[:n_symbols, -n_days:])
+    return path
+
+
+def bench_indicators(panel_path: str, repeat: int) -> dict:
+    """ 모든 종목에 대해 add_all_indicators 를 실행합니다. """
+    codes, _, close, volume = load_price_panel(panel_path, mmap=False)
+    frames = [pd.DataFrame({'close': close[i], 'volume': volume[i]}) for i in range(len(codes))]
+
+    def run():
+        for df in frames:
+            add_all_indicators(df.copy())
+
+    return _measure(run, repeat)
+
+
+def bench_screening(panel_path: str, repeat: int) -> dict:
+    """ LocalBroker 로 전체 종목에 대해 screen_stocks 를 실행합니다. """
+    broker = LocalBroker(panel_path)
+
+    def run():
+        screen_stocks(broker.codes, broker)
+
+    return _measure(run, repeat)
+
+
+def bench_cycle(panel_path: str, repeat: int, screen_all: bool, shards: int = 0) -> dict:
+    """
+    LocalBroker 로 run_trading_cycle 을 실행합니다.
+    시세 API 초당 호출 한도는 사실상 없앱니다. (순수 처리 시간 측정)
+    :param shards: 2 이상이면 ShardedPipeline 으로 워커 프로세스에 나눠 실행 (워커의 호출 횟수는 집계되지 않음)
+    """
+    original = (market_data.DATA_RATE_LIMIT_PER_SECOND, trading_pipeline.MAX_SCREENING_STOCKS)
+    market_data.DATA_RATE_LIMIT_PER_SECOND = 1_000_000
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as run_dir:
+        # 매매 기록(trade_log.json)이 작업 디렉터리를 오염시키지 않도록 임시 디렉터리에서 실행
+        os.chdir(run_dir)
+        try:
+            broker = LocalBroker(panel_path)
+            if screen_all:
+                trading_pipeline.MAX_SCREENING_STOCKS = len(broker.codes)
+            with _quiet():
+                portfolio = Portfolio(broker)
+                manager = OrderManager(broker, portfolio)
+            codes = [stock['code'] for stock in broker.get_all_listed_stocks()]
+            pipeline = ShardedPipeline(broker, portfolio, manager, workers=shards) if shards > 1 else None
+
+            def run():
+                main.run_trading_cycle(broker, portfolio, manager, codes, pipeline=pipeline)
+
+            try:
+                result = _measure(run, repeat)
+            finally:
+                if pipeline is not None:
+                    pipeline.close()
+            result['api_calls_per_cycle'] = sum(broker.call_counts.values()) / (repeat + 1)
+            return result
+        finally:
+            os.chdir(cwd)
+            market_data.DATA_RATE_LIMIT_PER_SECOND, trading_pipeline.MAX_SCREENING_STOCKS = original
+
+
+def run_benchmarks(sizes: list[int], days_list: list[int], stages: list[str], repeat: int,
+                   panel: str | None = None, screen_all: bool = False, seed: int = 0, shards: int = 0) -> dict:
+    """
+    벤치마크를 실행하고 결과 딕셔너리를 반환합니다.
+    :param sizes: 종목 수 리스트
+    :param days_list: 데이터 기간(영업일) 리스트
+    :param stages: 측정할 단계 ('indicators', 'screening', 'cycle')
+    :param repeat: 단계별 반복 횟수
+    :param panel: 기록된 가격 패널 경로 (None이면 합성 데이터)
+    :param screen_all: True이면 매매 주기에서 전체 종목을 스크리닝
+    :param seed: 합성 데이터 난수 시드
+    :param shards: 매매 주기를 나눠 실행할 워커 프로세스 수 (0, 1: 단일 프로세스)
+    """
+    dataset = 'recorded' if panel else 'synthetic'
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_symbols in sizes:
+            for n_days in days_list:
+                if panel:
+                    path = _panel_subset(panel, n_symbols, n_days, work_dir)
+                else:
+                    path = os.path.join(work_dir, f"synthetic_{n_symbols}x{n_days}")
+                    generate_synthetic_panel(path, n_symbols, n_days, seed=seed)
+
+                for stage in stages:
+                    if stage == 'indicators':
+                        measured = bench_indicators(path, repeat)
+                    elif stage == 'screening':
+                        measured = bench_screening(path, repeat)
+                    else:
+                        measured = bench_cycle(path, repeat, screen_all, shards)
+
+                    row = {'stage': stage, 'dataset': dataset, 'symbols': n_symbols, 'days': n_days, **measured}
+                    results.append(row)
+                    print(f"{stage:<11} {dataset:<9} {n_symbols:>5}종목 {n_days:>4}일 | "
+                          f"중앙값 {measured['median_s']*1000:9.1f}ms | 최소 {measured['min_s']*1000:9.1f}ms | "
+                          f"최대 메모리 {measured['peak_mb']:7.1f}MB")
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat,
+            'screen_all': screen_all,
+            'shards': shards,
+        },
+        'results': results,
+    }
+
+
+def _result_key(row: dict) -> tuple:
+    return row['stage'], row['dataset'], row['symbols'], row['days']
+
+
+def compare_with_baseline(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """
+    기준값과 비교합니다. 중앙값 시간이 (1 + tolerance)배를 넘으면 성능 저하로 판단합니다.
+    :return: 비교 결과 리스트
+    """
+    base_rows = {_result_key(row): row for row in baseline.get('results', [])}
+    comparisons = []
+    for row in current['results']:
+        base = base_rows.get(_result_key(row))
+        if not base:
+            continue
+        ratio = row['median_s'] / base['median_s'] if base['median_s'] > 0 else float('inf')
+        comparisons.append({
+            'stage': row['stage'], 'dataset': row['dataset'], 'symbols': row['symbols'], 'days': row['days'],
+            'baseline_s': base['median_s'], 'current_s': row['median_s'], 'ratio': ratio,
+            'memory_ratio': row['peak_mb'] / base['peak_mb'] if base['peak_mb'] > 0 else float('inf'),
+            'regression': ratio > 1 + tolerance,
+        })
+    return comparisons
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="자동매매 시스템 성능 벤치마크")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="종목 수 (쉼표 구분)")
+    parser.add_argument('--days', default=','.join(map(str, DEFAULT_DAYS)), help="데이터 기간(영업일, 쉼표 구분)")
+    parser.add_argument('--stages', default=','.join(STAGES), help="측정 단계 (쉼표 구분)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--panel', default=None, help="기록된 가격 패널 디렉터리 (param_sweep 형식)")
+    parser.add_argument('--screen-all', action='store_true', help="매매 주기에서 전체 종목 스크리닝")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shards', type=int, default=0, help="매매 주기를 나눠 실행할 워커 프로세스 수")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help="결과 JSON 경로")
+    parser.add_argument('--baseline', default=None, help="비교할 기준값 JSON 경로")
+    parser.add_argument('--save-baseline', action='store_true', help=f"결과를 {DEFAULT_BASELINE_FILE}에 저장")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="허용 성능 저하 비율")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(sorted(unknown))}")
+
+    result = run_benchmarks(
+        sizes=[int(x) for x in args.sizes.split(',')],
+        days_list=[int(x) for x in args.days.split(',')],
+        stages=stages,
+        repeat=args.repeat,
+        panel=args.panel,
+        screen_all=args.screen_all,
+        seed=args.seed,
+        shards=args.shards,
+    )
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\n결과 저장: {args.output}")
+
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"기준값 저장: {DEFAULT_BASELINE_FILE}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_with_baseline(result, baseline, args.tolerance)
+        print("\n--- 기준값 비교 ---")
+        for c in comparisons:
+            mark = "❌ 저하" if c['regression'] else "✅"
+            print(f"{mark} {c['stage']:<11} {c['symbols']:>5}종목 {c['days']:>4}일 | "
+                  f"{c['baseline_s']*1000:9.1f}ms -> {c['current_s']*1000:9.1f}ms (x{c['ratio']:.2f}) | "
+                  f"메모리 x{c['memory_ratio']:.2f}")
+        if any(c['regression'] for c in comparisons):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,299 @@
+import configparser
+import logging
+import os
+import pickle
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import metrics
+from config_reload import live_params
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    checkpoint_params = config['checkpoint']
+    CHECKPOINT_ENABLED = checkpoint_params.getboolean('enabled', True)  # 실행 상태 체크포인트 저장/복원 여부
+    CHECKPOINT_FILE = checkpoint_params.get('file', 'bot_checkpoint.bin')
+    CHECKPOINT_MAX_AGE_MINUTES = checkpoint_params.getfloat('max_age_minutes', 30)  # 이보다 오래된 체크포인트는 버림
+except KeyError:
+    CHECKPOINT_ENABLED = True
+    CHECKPOINT_FILE = 'bot_checkpoint.bin'
+    CHECKPOINT_MAX_AGE_MINUTES = 30
+
+logger = logging.getLogger(__name__)
+
+# 파일 머리: 식별자, 형식 버전, 저장 시각(epoch 초), 본문 CRC32, 본문 길이. 본문은 zlib 으로 압축한 pickle 입니다.
+MAGIC = b'ATCK'
+FORMAT_VERSION = 2
+_HEADER = struct.Struct('<4sHdII')
+
+CHECKPOINT_SECONDS = metrics.histogram('checkpoint_seconds', "체크포인트 저장/복원 소요 시간 (초)", ('op',))
+CHECKPOINT_BYTES = metrics.histogram('checkpoint_bytes', "체크포인트 파일 크기 (바이트)",
+                                     buckets=(1e4, 1e5, 1e6, 1e7, 1e8))
+
+
+class CheckpointError(Exception):
+    """ 체크포인트 파일이 손상되었거나 형식이 맞지 않음 """
+    pass
+
+
+@dataclass
+class RuntimeState:
+    """ 재시작 후 이어서 실행하는 데 필요한 메모리 상태 """
+    saved_at: float                                  # 저장 시각 (time.time)
+    session_date: str                                # 저장한 매매일 (YYYYMMDD)
+    broker: str                                      # 브로커 식별 (종류, 모의/실전, 계좌)
+    params: dict                                     # 저장 시점의 전략/지표 파라미터 (config_reload.live_params)
+    candidate_codes: list = field(default_factory=list)  # 매수 후보 종목 (전체 상장 종목 조회 결과)
+    sectors: dict = field(default_factory=dict)          # { 종목코드: 섹터 } (위험 한도의 섹터 집계)
+    next_slot: datetime | None = None                # 다음 매매 주기 예정 시각
+    screening_estimate: float = 0.0                  # 스크리닝/매수 흐름 예상 소요 시간 (초)
+    deferred_codes: list = field(default_factory=list)   # 마감으로 다음 주기에 먼저 확인할 종목
+    prescreened: list = field(default_factory=list)      # 장 시작 전 스크리닝 선정 종목
+    open_orders: list = field(default_factory=list)      # 체결 대기 중인 TrackedOrder
+    minute_bars: dict = field(default_factory=dict)      # { 종목코드: (시각, 분봉 값) } (MinuteBarStore.export)
+    bars: dict = field(default_factory=dict)             # { 종목코드: 일봉 DataFrame } (bars_valid_until 이 있을 때만)
+    bars_valid_until: datetime | None = None         # 일봉을 다시 조회하지 않고 써도 되는 기한
+
+
+def broker_identity(broker) -> str:
+    """ 체크포인트를 만든 브로커와 같은 계좌인지 확인하기 위한 식별 문자열 """
+    mode = 'mock' if getattr(broker, 'mock', False) else 'real'
+    return f"{type(broker).__name__}:{mode}:{getattr(broker, 'account_no', '')}"
+
+
+def write_checkpoint(state: RuntimeState, path: str = CHECKPOINT_FILE) -> int:
+    """
+    상태를 임시 파일에 쓴 뒤 교체하므로, 저장 중에 종료되어도 이전 체크포인트가 남습니다.
+    :return: 파일 크기 (바이트)
+    """
+    payload = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, state.saved_at, zlib.crc32(payload), len(payload))
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    return len(header) + len(payload)
+
+
+def read_checkpoint(path: str = CHECKPOINT_FILE) -> RuntimeState | None:
+    """
+    체크포인트 파일을 읽습니다. 파일이 없으면 None
+    :raises CheckpointError: 손상되었거나 다른 형식 버전의 파일
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _HEADER.size:
+        raise CheckpointError("파일이 잘렸습니다.")
+    magic, version, _, crc, length = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CheckpointError(f"형식이 다릅니다. (식별자 {magic!r}, 버전 {version})")
+    payload = memoryview(data)[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise CheckpointError("본문 길이 또는 CRC 가 맞지 않습니다.")
+    try:
+        state = pickle.loads(zlib.decompress(payload))
+    except Exception as e:
+        raise CheckpointError(f"본문을 복원할 수 없습니다: {e}") from e
+    if not isinstance(state, RuntimeState):
+        raise CheckpointError("실행 상태가 아닙니다.")
+    return state
+
+
+def stale_reason(state: RuntimeState, broker, now: datetime | None = None,
+                 max_age_minutes: float = CHECKPOINT_MAX_AGE_MINUTES) -> str | None:
+    """ 체크포인트를 복원하면 안 되는 이유. 복원해도 되면 None """
+    now = now or datetime.now()
+    if state.session_date != now.strftime('%Y%m%d'):
+        return f"다른 매매일({state.session_date})의 상태입니다."
+    age = now.timestamp() - state.saved_at
+    if age > max_age_minutes * 60:
+        return f"저장 후 {age / 60:.0f}분이 지났습니다. (최대 {max_age_minutes:g}분)"
+    if age < -60:
+        return "저장 시각이 현재보다 뒤입니다."
+    if state.broker != broker_identity(broker):
+        return f"다른 브로커/계좌({state.broker})의 상태입니다."
+    return None
+
+
+class Checkpointer:
+    """
+    실행 중인 메모리 상태를 주기적으로 파일에 저장하고, 재시작할 때 유효하면 복원합니다.
+    - 저장: 매수 후보 종목과 섹터, 다음 주기 예정 시각, 스크리닝 상태, 체결 대기 주문, 당일 분봉 버퍼,
+      (장 시작 전 준비 작업 직후에는) 조회한 일봉
+    - 복원: 같은 매매일, 같은 브로커/계좌, CHECKPOINT_MAX_AGE_MINUTES 이내의 체크포인트만 사용합니다.
+      전략 파라미터가 바뀌었으면 스크리닝 결과는 버립니다.
+    - 계좌 잔고는 복원하지 않고 시작 시 브로커에서 조회합니다. 복원한 주문은 브로커의 체결 내역과 맞춰
+      중단된 동안의 체결을 포트폴리오에 두 번 반영하지 않고, 전량 체결되었거나 취소된 주문은 버립니다.
+    - 지표는 주기마다 일봉에서 다시 계산하므로 저장하지 않습니다.
+    """
+    def __init__(self, path: str = CHECKPOINT_FILE, max_age_minutes: float = CHECKPOINT_MAX_AGE_MINUTES):
+        """
+        :param path: 체크포인트 파일 경로
+        :param max_age_minutes: 복원할 수 있는 체크포인트의 최대 경과 시간 (분)
+        """
+        self.path = path
+        self.max_age_minutes = max_age_minutes
+
+    def save(self, pipeline, candidate_codes: list[str], next_slot: datetime | None = None,
+             bars_valid_until: datetime | None = None) -> int | None:
+        """
+        파이프라인과 주문 관리자의 상태를 저장합니다. 매매 주기 사이에 호출합니다.
+        :param pipeline: TradingPipeline 인스턴스
+        :param candidate_codes: 매수 후보 종목 코드 리스트
+        :param next_slot: 다음 매매 주기 예정 시각
+        :param bars_valid_until: 주어지면 현재 스냅샷의 일봉을 함께 저장하고, 이 시각 전까지 재사용합니다.
+        :return: 파일 크기 (바이트). 저장에 실패하면 None
+        """
+        started = time.monotonic()
+        market_data = pipeline.market_data
+        state = RuntimeState(
+            saved_at=time.time(),
+            session_date=datetime.now().strftime('%Y%m%d'),
+            broker=broker_identity(pipeline.broker),
+            params=live_params(),
+            candidate_codes=list(candidate_codes),
+            sectors=dict(pipeline.portfolio.valuation.sectors),
+            next_slot=next_slot,
+            screening_estimate=pipeline.screening_estimate,
+            deferred_codes=list(pipeline._deferred_codes),
+            prescreened=list(pipeline._prescreened),
+            open_orders=pipeline.order_manager.order_tracker.open_orders(),
+            minute_bars=market_data.minute_bars.export(),
+        )
+        if bars_valid_until is not None:
+            with market_data._lock:
+                state.bars = {code: df for code, df in market_data.snapshot.bars.items() if df is not None}
+            state.bars_valid_until = bars_valid_until
+        try:
+            size = write_checkpoint(state, self.path)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning("체크포인트 저장 실패: %s", e)
+            return None
+        elapsed = time.monotonic() - started
+        CHECKPOINT_SECONDS.observe(elapsed, 'save')
+        CHECKPOINT_BYTES.observe(size)
+        logger.debug("체크포인트 저장: %s (%.1fKB, 주문 %d건, 분봉 %d종목, 일봉 %d종목, %.3f초)", self.path, size / 1024,
+                     len(state.open_orders), len(state.minute_bars), len(state.bars), elapsed)
+        return size
+
+    def load(self, broker, now: datetime | None = None) -> RuntimeState | None:
+        """ 유효한 체크포인트를 읽습니다. 없거나, 손상되었거나, 오래되었으면 None """
+        try:
+            state = read_checkpoint(self.path)
+        except (OSError, CheckpointError) as e:
+            logger.warning("체크포인트를 읽을 수 없어 처음부터 시작합니다: %s", e)
+            return None
+        if state is None:
+            return None
+        reason = stale_reason(state, broker, now, self.max_age_minutes)
+        if reason:
+            logger.info("체크포인트를 사용하지 않고 처음부터 시작합니다: %s", reason)
+            return None
+        return state
+
+    def restore(self, pipeline, now: datetime | None = None) -> RuntimeState | None:
+        """
+        유효한 체크포인트가 있으면 파이프라인, 시세 조회 창구, 체결 추적에 상태를 되돌립니다.
+        :param pipeline: 새로 만든 TradingPipeline 인스턴스 (포트폴리오는 브로커와 동기화된 상태)
+        :return: 복원한 상태 (매수 후보 종목과 다음 주기 예정 시각은 호출자가 사용). 복원하지 않았으면 None
+        """
+        started = time.monotonic()
+        state = self.load(pipeline.broker, now)
+        if state is None:
+            return None
+
+        pipeline.screening_estimate = state.screening_estimate
+        if state.params == live_params():
+            pipeline._deferred_codes = list(state.deferred_codes)
+            pipeline._prescreened = list(state.prescreened)
+        else:
+            logger.info("저장 후 전략 파라미터가 바뀌어 스크리닝 결과는 복원하지 않습니다.")
+
+        market_data = pipeline.market_data
+        market_data.minute_bars.load(state.minute_bars)
+        if state.bars and state.bars_valid_until is not None:
+            market_data.preload_bars(state.bars, state.bars_valid_until)
+
+        order_manager = pipeline.order_manager
+        portfolio = pipeline.portfolio
+        order_manager.risk_engine.set_sectors(state.sectors)
+        state.open_orders = open_orders = self._reconcile_orders(order_manager, state.open_orders)
+        for order in open_orders:
+            reserved = order.info.get('reserved', 0)
+            if reserved and not portfolio.reserve_cash(reserved):
+                order.info['reserved'] = 0
+            if order.info.get('risk_reserved'):
+                # 이미 접수된 주문이므로 한도와 관계없이 노출에 포함합니다.
+                order_manager.risk_engine.reserve(order.stock_code, order.info['risk_reserved'])
+            order_manager.order_tracker.add(order)
+
+        elapsed = time.monotonic() - started
+        CHECKPOINT_SECONDS.observe(elapsed, 'restore')
+        logger.info("체크포인트 복원 (%.0f초 전 저장): 후보 %d종목, 선정 %d종목, 주문 %d건, 분봉 %d종목, 일봉 %d종목 (%.2f초)",
+                    time.time() - state.saved_at, len(state.candidate_codes), len(pipeline._prescreened),
+                    len(open_orders), len(state.minute_bars), len(state.bars), elapsed)
+        return state
+
+    @staticmethod
+    def _reconcile_orders(order_manager, orders: list) -> list:
+        """
+        저장한 체결 대기 주문을 브로커의 현재 체결 현황과 맞춥니다.
+        포트폴리오는 이미 계좌 잔고(중단된 동안의 체결 포함)로 만들어졌으므로, 그 사이의 체결분은 포트폴리오에 다시
+        반영하지 않고 주문의 체결 수량과 예약 금액에만 반영합니다. 매매 기록에 없는 체결은 기록만 남깁니다.
+        :return: 계속 추적할 주문 (전량 체결되었거나 취소된 주문은 제외)
+        """
+        if not orders:
+            return []
+        executions = None
+        if hasattr(order_manager.broker, 'get_order_executions'):
+            try:
+                executions = order_manager.broker.get_order_executions([o.order_id for o in orders])
+            except Exception as e:
+                logger.warning("복원한 주문의 체결 내역 조회 실패: %s", e)
+        if executions is None:
+            # 중단된 동안의 체결을 알 수 없으므로 추적하지 않고, 남은 체결은 계좌 동기화로 반영합니다.
+            order_manager.portfolio.request_sync(f"체결 내역을 확인할 수 없는 복원 주문 {len(orders)}건")
+            return []
+
+        controller = order_manager.trading_controller
+        state_store = order_manager.state_store
+        open_orders = []
+        for order in orders:
+            execution = executions.get(order.order_id)
+            cancelled = bool(execution and execution.get('cancelled'))
+            filled = min(int(execution['filled']), order.quantity) if execution else order.filled_quantity
+            if filled > order.filled_quantity:
+                quantity = filled - order.filled_quantity
+                if order.filled_quantity == 0:
+                    # 중단 직전에 이미 기록한 체결이면 (주문 접수 이후의 매매 시각이 있으면) 다시 기록하지 않습니다.
+                    times = controller.trade_history['last_buy_times' if order.side == 'buy' else 'last_sell_times']
+                    last = times.get(order.stock_code)
+                    if last is None or datetime.fromisoformat(last).timestamp() < order.submitted_at:
+                        (controller.record_buy if order.side == 'buy' else controller.record_sell)(order.stock_code)
+                order.filled_quantity = filled
+                order.avg_fill_price = float(execution.get('avg_price') or 0) or order.reference_price
+                if order.side == 'buy':
+                    # 체결분은 계좌 잔고에 반영되었으므로 예약하지 않습니다.
+                    for key in ('reserved', 'risk_reserved'):
+                        order.info[key] = max(0, order.info.get(key, 0) - order.reference_price * quantity)
+                logger.info("[%s] 중단된 동안 체결된 %d주를 복원한 주문에 반영 (주문번호: %s)",
+                            order.stock_code, quantity, order.order_id)
+            if order.is_complete or cancelled:
+                if state_store:
+                    state_store.update_order(order.order_id, order.filled_quantity, order.avg_fill_price,
+                                             'filled' if order.is_complete else 'cancelled')
+                continue
+            open_orders.append(order)
+        return open_orders
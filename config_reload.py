@@ -0,0 +1,174 @@
+import configparser
+import contextlib
+import importlib
+import importlib.util
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import metrics
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    HOT_RELOAD = trading_control.getboolean('hot_reload', True)  # config.cfg 변경 시 전략/지표 파라미터를 주기 사이에 다시 적용
+except KeyError:
+    HOT_RELOAD = True
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = 'config.cfg'
+
+# 다시 읽을 파라미터를 가진 모듈 (가져올 때 config.cfg 의 [strategy] 값을 대문자 상수로 정함)
+RELOADABLE_MODULES = ('indicators', 'strategy', 'stock_selector')
+
+# 파일을 쓰는 중에 읽지 않도록, 수정 후 이 시간(초)이 지난 뒤에 다시 읽습니다.
+SETTLE_SECONDS = 1.0
+
+# 지표 컬럼 → 계산에 쓰는 파라미터
+INDICATOR_PARAMS = {
+    'short_ma': {'SHORT_MA_WINDOW'},
+    'long_ma': {'LONG_MA_WINDOW'},
+    'rsi': {'RSI_WINDOW'},
+    'bollinger': {'BOLLINGER_WINDOW', 'BOLLINGER_STD_DEV'},
+    'macd': {'MACD_SHORT_WINDOW', 'MACD_LONG_WINDOW', 'MACD_SIGNAL_WINDOW'},
+    'ewo': {'SHORT_MA_WINDOW', 'LONG_MA_WINDOW'},
+}
+
+# 판단 단계 → (사용하는 지표, 사용하는 기준값 파라미터)
+CONSUMERS = {
+    'screening': ({'short_ma', 'long_ma', 'rsi', 'bollinger', 'macd'},
+                  {'RSI_THRESHOLD', 'VOLUME_WINDOW', 'VOLUME_SURGE_MULTIPLIER'}),
+    'buy_signal': ({'short_ma', 'long_ma', 'rsi', 'ewo'},
+                   {'LOW_OFFSET', 'RSI_BUY_THRESHOLD', 'EWO_BUY_THRESHOLD', 'EWO_SELL_THRESHOLD'}),
+    'sell_signal': ({'short_ma'}, {'HIGH_OFFSET', 'STOP_LOSS_PERCENT'}),
+}
+
+RELOADS = metrics.counter('config_reloads_total', "설정 파일 다시 읽기 결과별 횟수 (applied, unchanged, error)",
+                          ('result',))
+
+
+@dataclass
+class ConfigChange:
+    """ 다시 읽은 설정에서 값이 바뀐 파라미터 """
+    params: dict  # { 모듈 이름: { 상수 이름: 새 값 } }
+
+    @property
+    def names(self) -> set[str]:
+        return {name for values in self.params.values() for name in values}
+
+    @property
+    def indicators(self) -> set[str]:
+        """ 다시 계산해야 하는 지표 컬럼 """
+        names = self.names
+        return {column for column, params in INDICATOR_PARAMS.items() if params & names}
+
+    @property
+    def consumers(self) -> set[str]:
+        """ 결과가 달라질 수 있는 판단 단계 ('screening', 'buy_signal', 'sell_signal') """
+        names, columns = self.names, self.indicators
+        return {stage for stage, (used_columns, used_params) in CONSUMERS.items()
+                if used_columns & columns or used_params & names}
+
+    def describe(self) -> str:
+        return ", ".join(f"{name}={value}" for values in self.params.values() for name, value in values.items())
+
+
+def _is_param(name: str, value) -> bool:
+    return name.isupper() and isinstance(value, (bool, int, float, str))
+
+
+def read_params(modules: tuple[str, ...] = RELOADABLE_MODULES) -> dict:
+    """
+    모듈을 새 이름공간에서 한 번 더 실행해 지금의 config.cfg 로 정해지는 상수 값을 계산합니다.
+    실행 중인 모듈은 바꾸지 않으며, 설정 값 오류는 예외로 전달합니다.
+    :return: { 모듈 이름: { 상수 이름: 값 } }
+    """
+    params = {}
+    for module_name in modules:
+        live = importlib.import_module(module_name)
+        spec = importlib.util.find_spec(module_name)
+        fresh = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):  # 섹션이 없을 때의 안내 출력은 시작할 때 한 번이면 충분
+            spec.loader.exec_module(fresh)
+        params[module_name] = {name: value for name, value in vars(fresh).items()
+                               if _is_param(name, value) and _is_param(name, getattr(live, name, None))}
+    return params
+
+
+def live_params(modules: tuple[str, ...] = RELOADABLE_MODULES) -> dict:
+    """ 실행 중인 모듈의 현재 파라미터 값. read_params 와 같은 형식입니다. """
+    params = {}
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        params[module_name] = {name: value for name, value in vars(module).items() if _is_param(name, value)}
+    return params
+
+
+def apply_params(params: dict):
+    """
+    파라미터를 모듈 상수에 적용합니다. (현재 프로세스에만 영향, 종목 분할 워커에서도 호출)
+    :param params: { 모듈 이름: { 상수 이름: 값 } }
+    """
+    for module_name, values in params.items():
+        module = importlib.import_module(module_name)
+        for name, value in values.items():
+            setattr(module, name, value)
+
+
+class ConfigReloader:
+    """
+    config.cfg 변경을 감시해 전략/지표 파라미터를 매매 주기 사이에 다시 적용할 수 있게 합니다.
+    - 파일 수정 시각/크기가 바뀌었을 때만 다시 읽고, 값이 바뀐 상수만 ConfigChange 로 모읍니다.
+    - 새 설정을 읽다 오류가 나면 아무 것도 바꾸지 않고 이전 설정을 유지합니다.
+    - 적용(apply_params)은 호출자가 주기 사이에 한 번에 합니다. (TradingPipeline.apply_config)
+    """
+    def __init__(self, path: str = CONFIG_FILE, modules: tuple[str, ...] = RELOADABLE_MODULES):
+        self.path = path
+        self.modules = modules
+        self._stamp = self._file_stamp()
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> ConfigChange | None:
+        """ 설정 파일이 바뀌었으면 다시 읽어 바뀐 파라미터를 돌려줍니다. 바뀐 값이 없으면 None """
+        stamp = self._file_stamp()
+        if stamp == self._stamp or stamp is None:
+            return None
+        if time.time() - stamp[0] / 1e9 < SETTLE_SECONDS:
+            return None  # 아직 쓰는 중일 수 있으므로 다음 주기에 확인
+        self._stamp = stamp
+
+        try:
+            fresh = read_params(self.modules)
+        except Exception as e:
+            logger.error("설정 파일을 다시 읽지 못해 이전 설정을 유지합니다: %s", e)
+            RELOADS.inc('error')
+            return None
+
+        changed = {}
+        for module_name, values in fresh.items():
+            module = importlib.import_module(module_name)
+            diff = {name: value for name, value in values.items() if getattr(module, name) != value}
+            if diff:
+                changed[module_name] = diff
+        if not changed:
+            logger.info("설정 파일이 바뀌었지만 전략/지표 파라미터 변경은 없습니다.")
+            RELOADS.inc('unchanged')
+            return None
+
+        change = ConfigChange(changed)
+        logger.info("전략/지표 파라미터 변경: %s (재계산 지표: %s, 영향 단계: %s)", change.describe(),
+                    ", ".join(sorted(change.indicators)) or "없음", ", ".join(sorted(change.consumers)) or "없음")
+        RELOADS.inc('applied')
+        return change
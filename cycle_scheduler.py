@@ -0,0 +1,140 @@
+import configparser
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import metrics
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    CYCLE_DEADLINE_RATIO = trading_control.getfloat('cycle_deadline_ratio', 0.8)  # 주기 중 작업에 쓸 수 있는 비율
+    TIMING_HISTORY_SIZE = trading_control.getint('timing_history_size', 288)  # 보관할 주기별 소요 시간 기록 수
+except KeyError:
+    CYCLE_DEADLINE_RATIO = 0.8
+    TIMING_HISTORY_SIZE = 288
+
+logger = logging.getLogger(__name__)
+
+CYCLE_SECONDS = metrics.histogram('cycle_seconds', "매매 주기 1회 소요 시간 (초)", buckets=metrics.DURATION_BUCKETS)
+STAGE_SECONDS = metrics.histogram('cycle_stage_seconds', "매매 주기 단계별 소요 시간 (초)", ('stage',),
+                                  buckets=metrics.DURATION_BUCKETS)
+CYCLE_START_DELAY = metrics.histogram('cycle_start_delay_seconds', "예정 시각 대비 주기 시작 지연 (초)")
+CYCLE_OVERRUNS = metrics.counter('cycle_overruns_total', "다음 예정 시각을 넘긴 주기 수")
+CYCLE_SKIPPED = metrics.counter('cycle_skipped_total', "마감 시간 때문에 건너뛴/중단한 단계 수", ('stage',))
+
+
+@dataclass
+class CycleTiming:
+    """ 매매 주기 1회의 시간 기록 """
+    scheduled_at: datetime                  # 예정 시작 시각 (정시 경계)
+    start_delay: float = 0.0                # 예정 시각 대비 실제 시작 지연 (초)
+    duration: float = 0.0                   # 전체 소요 시간 (초)
+    stages: dict = field(default_factory=dict)   # 단계별 소요 시간 (초)
+    skipped: list = field(default_factory=list)  # 마감 시간 때문에 건너뛴/중단한 단계
+    overrun: bool = False                   # 다음 예정 시각을 넘겼는지 여부
+    missed_slots: int = 0                   # 초과로 건너뛴 예정 시각 수
+
+
+class CycleScheduler:
+    """
+    고정 주기 스케줄러. 작업 시간과 관계없이 벽시계 기준 정시 경계(예: 5분 주기면 09:00, 09:05, ...)에 주기를 시작합니다.
+    - 각 주기에는 마감 시각(주기 길이 x cycle_deadline_ratio)이 주어지며, 파이프라인은 마감이 가까우면
+      우선순위가 낮은 스크리닝부터 건너뜁니다.
+    - 주기가 다음 경계를 넘기면 놓친 경계는 건너뛰고 다음 경계에 시작합니다. (밀린 주기를 몰아서 실행하지 않음)
+    """
+    def __init__(self, interval_seconds: float, deadline_ratio: float = CYCLE_DEADLINE_RATIO,
+                 history_size: int = TIMING_HISTORY_SIZE):
+        """
+        :param interval_seconds: 주기 길이 (초)
+        :param deadline_ratio: 주기 길이 중 작업 마감까지의 비율 (0~1)
+        :param history_size: 보관할 주기별 시간 기록 수
+        """
+        self.interval_seconds = interval_seconds
+        self.deadline_ratio = deadline_ratio
+        self.history: deque[CycleTiming] = deque(maxlen=history_size)
+        self._next_slot: datetime | None = None
+        self._started = time.monotonic()
+
+    def _align(self, now: datetime) -> datetime:
+        """ now 이후(같으면 now)의 첫 정시 경계. 경계는 자정부터 interval 단위로 셉니다. """
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds()
+        slots = -(-elapsed // self.interval_seconds)  # 올림
+        return midnight + timedelta(seconds=slots * self.interval_seconds)
+
+    def next_slot(self, now: datetime | None = None) -> datetime:
+        """ 다음 주기의 예정 시작 시각 """
+        now = now or datetime.now()
+        if self._next_slot is None or self._next_slot < now:
+            self._next_slot = self._align(now)
+        return self._next_slot
+
+    def resume(self, next_slot: datetime | None, now: datetime | None = None) -> bool:
+        """
+        재시작 전 예약된 다음 주기 시각을 이어받습니다. 이미 지난 시각이면 무시합니다.
+        :return: 이어받았는지 여부 (이어받으면 마친 주기를 다시 실행하지 않고 그 시각까지 기다림)
+        """
+        now = now or datetime.now()
+        if next_slot is None or next_slot <= now:
+            return False
+        self._next_slot = next_slot
+        return True
+
+    def seconds_until_next(self, now: datetime | None = None) -> float:
+        now = now or datetime.now()
+        return max(0.0, (self.next_slot(now) - now).total_seconds())
+
+    def begin_cycle(self) -> tuple[CycleTiming, float]:
+        """
+        주기를 시작합니다. 예정 시각을 기록하고 다음 경계를 예약합니다.
+        :return: (시간 기록, 작업 마감 시각 - time.monotonic() 기준)
+        """
+        now = datetime.now()
+        scheduled = self.next_slot(now)
+        interval = timedelta(seconds=self.interval_seconds)
+        if scheduled > now:
+            # 예정 시각 전에 호출된 경우 (예: 시작 직후 첫 주기) 지금 시작하고,
+            # 다음 경계가 반 주기 안에 있으면 그 다음 경계부터 정시 주기를 따릅니다.
+            self._next_slot = scheduled if scheduled - now >= interval / 2 else scheduled + interval
+            scheduled = now
+        else:
+            self._next_slot = scheduled + interval
+        timing = CycleTiming(scheduled_at=scheduled, start_delay=(now - scheduled).total_seconds())
+        budget = self.interval_seconds * self.deadline_ratio - timing.start_delay
+        deadline = time.monotonic() + max(0.0, budget)
+        self._started = time.monotonic()
+        return timing, deadline
+
+    def end_cycle(self, timing: CycleTiming):
+        """ 주기 종료를 기록하고, 다음 경계를 넘겼으면 놓친 경계를 건너뜁니다. """
+        timing.duration = time.monotonic() - self._started
+        now = datetime.now()
+        if now > self._next_slot:
+            timing.overrun = True
+            aligned = self._align(now)
+            timing.missed_slots = int((aligned - self._next_slot).total_seconds() // self.interval_seconds)
+            self._next_slot = aligned
+        self.history.append(timing)
+
+        CYCLE_SECONDS.observe(timing.duration)
+        CYCLE_START_DELAY.observe(timing.start_delay)
+        for name, seconds in timing.stages.items():
+            STAGE_SECONDS.observe(seconds, name)
+        for name in timing.skipped:
+            CYCLE_SKIPPED.inc(name)
+        if timing.overrun:
+            CYCLE_OVERRUNS.inc()
+
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timing.stages.items())
+        log = logger.warning if timing.overrun or timing.skipped else logger.info
+        log("주기 소요 %.2fs (시작 지연 %.2fs) [%s]%s%s", timing.duration, timing.start_delay, stages,
+            f" 건너뜀: {', '.join(timing.skipped)}" if timing.skipped else "",
+            f" 주기 초과 (놓친 주기 {timing.missed_slots}개)" if timing.overrun else "",
+            extra={'cycle_duration': timing.duration, 'cycle_stages': timing.stages,
+                   'cycle_overrun': timing.overrun, 'cycle_skipped': timing.skipped})
@@ -1,6 +1,8 @@
 import configparser
 import pandas as pd
 
+import profiling
+
 # 설정 파일 로드
 config = configparser.ConfigParser()
 # config.cfg 파일이 프로젝트 루트에 있다고 가정합니다.
@@ -105,6 +107,7 @@ def check_missing_data(df: pd.DataFrame) -> tuple[bool, str]:
     
     return False, "누락된 데이터가 없습니다."
 
+@profiling.profiled('indicators')
 def add_all_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     주어진 데이터프레임에 정의된 모든 기술적 지표를 추가합니다.
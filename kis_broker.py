@@ -1,8 +1,24 @@
 import datetime
+import itertools
+import os
+import re
 import time
+from contextlib import contextmanager
 import configparser
 import requests
 import json
+import logging
+from urllib.parse import urlsplit
+
+import metrics
+import profiling
+
+try:
+    import fcntl  # 토큰 파일 잠금 (POSIX)
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 class MarketClosedError(Exception):
     """
@@ -10,6 +26,38 @@ class MarketClosedError(Exception):
     """
     pass
 
+API_REQUESTS = metrics.counter('kis_requests_total', "KIS API 호출 수 (status: HTTP 상태 코드 또는 예외 이름)",
+                               ('endpoint', 'status'))
+API_LATENCY = metrics.histogram('kis_request_seconds', "KIS API 응답 시간 (초)", ('endpoint',))
+API_ERRORS = metrics.counter('kis_errors_total', "KIS API 오류 응답 수 (code: rt_cd 가 0이 아닌 응답의 msg_cd)",
+                             ('endpoint', 'code'))
+
+# 응답 본문 전체를 파싱하지 않고 결과 코드만 찾습니다. (정상 응답은 rt_cd 가 "0")
+_RT_CD = re.compile(rb'"rt_cd"\s*:\s*"([^"]*)"')
+_MSG_CD = re.compile(rb'"msg_cd"\s*:\s*"([^"]*)"')
+
+
+class _MeteredSession(requests.Session):
+    """ 호출마다 엔드포인트(URL 경로)별 호출 수, 응답 시간, 오류 코드를 metrics 에 기록하는 세션 """
+    def request(self, method, url, *args, **kwargs):
+        endpoint = urlsplit(url).path
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException as e:
+            API_REQUESTS.inc(endpoint, type(e).__name__)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - started, endpoint)
+        API_REQUESTS.inc(endpoint, str(response.status_code))
+        if response.status_code == 200:
+            rt_cd = _RT_CD.search(response.content)
+            if rt_cd and rt_cd.group(1) != b'0':
+                msg_cd = _MSG_CD.search(response.content)
+                API_ERRORS.inc(endpoint, msg_cd.group(1).decode() if msg_cd else rt_cd.group(1).decode())
+        return response
+
+
 class KISBroker:
     """
     한국투자증권 API를 이용한 주식 거래 중개 클래스 (공식 REST API 기반)
@@ -22,6 +70,7 @@ class KISBroker:
         """
         self.mock = mock
         self.force_open = force_open
+        self.calendar = None  # MarketCalendar 를 지정하면 휴장일까지 반영해 장 운영 여부를 확인
         
         # 모의투자 모드에서는 시장 시간 체크를 하지 않음
         if not mock and not self._is_market_open():
@@ -45,19 +94,63 @@ class KISBroker:
         self.account_number = account_parts[0]
         self.account_product_cd = account_parts[1]
         
+        # 연결을 재사용하도록 세션으로 호출 (keep-alive). 호출 수/응답 시간은 metrics 에 기록
+        self.session = _MeteredSession()
+
         # 접근토큰 초기화
         self.access_token = None
         self.token_expired = True
+        self.token_timestamp = 0.0  # 토큰 발급 시각 (time.time)
         self.token_file = "access_token.txt"
+
+        # 기본 구현(buy/sell) 주문 기록 { 주문번호: 수량 }
+        self._stub_orders = {}
+        self._stub_order_ids = itertools.count(1)
         
         # 토큰 발급 (캐시된 토큰이 있으면 재사용)
-        self._load_cached_token()
-        if self.token_expired or not self.access_token:
-            self._get_access_token()
+        self._ensure_token()
         
-        print(f"KISBroker 초기화 완료. (모의투자: {mock})")
+        logger.info("KISBroker 초기화 완료. (모의투자: %s)", mock)
         if mock:
-            print("📝 모의투자 모드: 24시간 테스트 가능합니다.")
+            logger.info("📝 모의투자 모드: 24시간 테스트 가능합니다.")
+
+    @contextmanager
+    def _token_lock(self):
+        """
+        토큰 파일 잠금. 같은 토큰 파일을 쓰는 여러 봇 프로세스 중 하나만 토큰을 발급/저장하도록 합니다.
+        (fcntl 을 쓸 수 없는 환경에서는 잠금 없이 진행)
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.token_file}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_token(self):
+        """
+        유효한 토큰을 확보합니다. 잠금을 잡은 뒤 캐시를 다시 읽으므로,
+        다른 프로세스가 방금 발급한 토큰이 있으면 새로 발급하지 않고 그대로 사용합니다.
+        """
+        with self._token_lock():
+            self._load_cached_token()
+            if self.token_expired or not self.access_token:
+                self._get_access_token()
+
+    @profiling.profiled('kis.refresh_token')
+    def refresh_token(self, min_valid_seconds: float = 0):
+        """
+        남은 유효 시간이 min_valid_seconds 보다 짧으면 토큰을 새로 발급합니다. (장 시작 전 준비 작업에서 호출)
+        :param min_valid_seconds: 토큰이 최소한 유효해야 하는 시간 (초)
+        """
+        with self._token_lock():
+            self._load_cached_token()
+            if self.token_expired or not self.access_token or \
+                    time.time() - self.token_timestamp > 86400 - min_valid_seconds:
+                self._get_access_token()
 
     def _load_cached_token(self):
         """
@@ -73,13 +166,14 @@ class KISBroker:
                 import time
                 if time.time() - token_data.get('timestamp', 0) < 86400:  # 24시간
                     self.access_token = token_data.get('access_token')
+                    self.token_timestamp = token_data.get('timestamp', 0)
                     self.token_expired = False
-                    print("✅ 캐시된 토큰 사용")
+                    logger.info("✅ 캐시된 토큰 사용")
                     return
                     
             self.token_expired = True
         except Exception as e:
-            print(f"캐시된 토큰 로드 실패: {e}")
+            logger.warning("캐시된 토큰 로드 실패: %s", e)
             self.token_expired = True
 
     def _save_token_cache(self):
@@ -88,14 +182,18 @@ class KISBroker:
         """
         try:
             import time
+            self.token_timestamp = time.time()
             token_data = {
                 'access_token': self.access_token,
-                'timestamp': time.time()
+                'timestamp': self.token_timestamp
             }
-            with open(self.token_file, 'w') as f:
+            # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+            tmp_file = f"{self.token_file}.tmp.{os.getpid()}"
+            with open(tmp_file, 'w') as f:
                 json.dump(token_data, f)
+            os.replace(tmp_file, self.token_file)
         except Exception as e:
-            print(f"토큰 캐시 저장 실패: {e}")
+            logger.warning("토큰 캐시 저장 실패: %s", e)
 
     def _get_access_token(self):
         """
@@ -112,18 +210,18 @@ class KISBroker:
         }
         
         try:
-            response = requests.post(url, headers=headers, data=json.dumps(data))
+            response = self.session.post(url, headers=headers, data=json.dumps(data))
             if response.status_code == 200:
                 result = response.json()
                 self.access_token = result["access_token"]
                 self.token_expired = False
                 self._save_token_cache()
-                print("✅ 접근토큰 발급 성공")
+                logger.info("✅ 접근토큰 발급 성공")
             else:
-                print(f"❌ 접근토큰 발급 실패: {response.status_code}, {response.text}")
+                logger.error("❌ 접근토큰 발급 실패: %s, %s", response.status_code, response.text)
                 raise Exception(f"토큰 발급 실패: {response.text}")
         except Exception as e:
-            print(f"❌ 토큰 발급 중 오류: {e}")
+            logger.error("❌ 토큰 발급 중 오류: %s", e)
             raise
 
     def _get_headers(self, tr_id, custtype="P"):
@@ -131,7 +229,7 @@ class KISBroker:
         API 호출용 헤더를 생성합니다.
         """
         if self.token_expired or not self.access_token:
-            self._get_access_token()
+            self._ensure_token()
             
         return {
             "content-type": "application/json; charset=utf-8",
@@ -156,6 +254,9 @@ class KISBroker:
         if hasattr(self, 'force_open') and self.force_open:
             return True
             
+        if getattr(self, 'calendar', None) is not None:
+            return self.calendar.is_open()
+
         now = datetime.datetime.now()
         start_time = datetime.time(9, 0, 0)
         end_time = datetime.time(15, 30, 0)
@@ -163,6 +264,41 @@ class KISBroker:
         is_weekday = now.weekday() < 5 
         return is_weekday and start_time <= now.time() <= end_time
 
+    @profiling.profiled('kis.get_market_holidays')
+    def get_market_holidays(self, base_date):
+        """
+        기준일부터의 국내 휴장일 정보를 조회합니다. (실전투자 전용, 하루 1회 정도만 호출 권장)
+        :param base_date: 기준일 (YYYYMMDD)
+        :return: { 'YYYYMMDD': 개장 여부 } 또는 조회 실패/미지원 시 None
+        """
+        if self.mock:
+            return None  # 모의투자 미지원
+
+        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/chk-holiday"
+        headers = self._get_headers("CTCA0903R")
+        params = {
+            "BASS_DT": base_date,
+            "CTX_AREA_NK": "",
+            "CTX_AREA_FK": ""
+        }
+
+        try:
+            response = self.session.get(url, headers=headers, params=params)
+            if response.status_code == 200:
+                result = response.json()
+                if result["rt_cd"] == "0":  # 성공
+                    return {day["bass_dt"]: day["opnd_yn"] == "Y" for day in result["output"]}
+                else:
+                    logger.warning("휴장일 조회 실패: %s", result['msg1'])
+                    return None
+            else:
+                logger.warning("휴장일 조회 HTTP 오류: %s", response.status_code)
+                return None
+        except Exception as e:
+            logger.warning("휴장일 조회 실패: %s", e)
+            return None
+
+    @profiling.profiled('kis.get_current_price')
     def get_current_price(self, stock_code):
         """
         지정한 종목의 현재가를 조회합니다.
@@ -180,22 +316,23 @@ class KISBroker:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.session.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 result = response.json()
                 if result["rt_cd"] == "0":  # 성공
                     current_price = int(result["output"]["stck_prpr"])
                     return current_price
                 else:
-                    print(f"현재가 조회 실패: {result['msg1']}")
+                    logger.warning("[%s] 현재가 조회 실패: %s", stock_code, result['msg1'])
                     return None
             else:
-                print(f"현재가 조회 HTTP 오류: {response.status_code}")
+                logger.warning("[%s] 현재가 조회 HTTP 오류: %s", stock_code, response.status_code)
                 return None
         except Exception as e:
-            print(f"현재가 조회 실패: {e}")
+            logger.warning("[%s] 현재가 조회 실패: %s", stock_code, e)
             return None
 
+    @profiling.profiled('kis.get_balance')
     def get_balance(self):
         """
         계좌의 잔고 정보를 조회합니다. (주식 잔고 및 현금 잔고)
@@ -218,7 +355,7 @@ class KISBroker:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.session.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 result = response.json()
                 if result["rt_cd"] == "0":  # 성공
@@ -227,15 +364,16 @@ class KISBroker:
                         "output2": result["output2"]   # 계좌 요약정보
                     }
                 else:
-                    print(f"잔고 조회 실패: {result['msg1']}")
+                    logger.warning("잔고 조회 실패: %s", result['msg1'])
                     return None
             else:
-                print(f"잔고 조회 HTTP 오류: {response.status_code}")
+                logger.warning("잔고 조회 HTTP 오류: %s", response.status_code)
                 return None
         except Exception as e:
-            print(f"잔고 조회 실패: {e}")
+            logger.warning("잔고 조회 실패: %s", e)
             return None
 
+    @profiling.profiled('kis.get_daily_price')
     def get_daily_price(self, stock_code, start_date, end_date):
         """
         지정한 종목의 일별 시세를 조회합니다.
@@ -258,7 +396,7 @@ class KISBroker:
         }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.session.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 result = response.json()
                 if result["rt_cd"] == "0":  # 성공
@@ -269,18 +407,60 @@ class KISBroker:
                         df = df.sort_values('stck_bsop_date').reset_index(drop=True)
                         return df
                     else:
-                        print("일봉 데이터가 없습니다.")
+                        logger.debug("[%s] 일봉 데이터가 없습니다.", stock_code)
+                        return None
+                else:
+                    logger.warning("[%s] 일봉 데이터 조회 실패: %s", stock_code, result['msg1'])
+                    return None
+            else:
+                logger.warning("[%s] 일봉 데이터 조회 HTTP 오류: %s", stock_code, response.status_code)
+                return None
+        except Exception as e:
+            logger.warning("[%s] 일별 시세 조회 실패: %s", stock_code, e)
+            return None
+
+    @profiling.profiled('kis.get_minute_price')
+    def get_minute_price(self, stock_code, end_time=None):
+        """
+        지정한 종목의 당일 분봉을 조회합니다. (조회 시각 이전 최대 30개)
+        :param stock_code: 종목코드
+        :param end_time: 조회 기준 시각 (HHMMSS, None 이면 현재 시각)
+        :return: 분봉 DataFrame (최신 순) 또는 조회 실패 시 None
+        """
+        import pandas as pd
+
+        url = f"{self.base_url}/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice"
+        headers = self._get_headers("FHKST03010200")
+        params = {
+            "FID_ETC_CLS_CODE": "",
+            "FID_COND_MRKT_DIV_CODE": "J",
+            "FID_INPUT_ISCD": stock_code,
+            "FID_INPUT_HOUR_1": end_time or datetime.datetime.now().strftime('%H%M%S'),
+            "FID_PW_DATA_INCU_YN": "Y"  # 과거 데이터 포함
+        }
+
+        try:
+            response = self.session.get(url, headers=headers, params=params)
+            if response.status_code == 200:
+                result = response.json()
+                if result["rt_cd"] == "0":  # 성공
+                    data = result["output2"]
+                    if data:
+                        return pd.DataFrame(data)
+                    else:
+                        logger.debug("[%s] 분봉 데이터가 없습니다.", stock_code)
                         return None
                 else:
-                    print(f"일봉 데이터 조회 실패: {result['msg1']}")
+                    logger.warning("[%s] 분봉 데이터 조회 실패: %s", stock_code, result['msg1'])
                     return None
             else:
-                print(f"일봉 데이터 조회 HTTP 오류: {response.status_code}")
+                logger.warning("[%s] 분봉 데이터 조회 HTTP 오류: %s", stock_code, response.status_code)
                 return None
         except Exception as e:
-            print(f"일별 시세 조회 실패: {e}")
+            logger.warning("[%s] 분봉 조회 실패: %s", stock_code, e)
             return None
 
+    @profiling.profiled('kis.get_all_listed_stocks')
     def get_all_listed_stocks(self):
         """
         우량주 위주의 매매 대상 종목을 조회합니다.
@@ -433,35 +613,115 @@ class KISBroker:
                     # 섹터 필터링 적용
                     if preferred_sectors:
                         blue_chip_stocks = [stock for stock in blue_chip_stocks if stock.get('sector', '') in preferred_sectors]
-                        print(f"선호 섹터 필터링 적용: {preferred_sectors}")
+                        logger.info("선호 섹터 필터링 적용: %s", preferred_sectors)
                     
                     if exclude_sectors:
                         blue_chip_stocks = [stock for stock in blue_chip_stocks if stock.get('sector', '') not in exclude_sectors]
-                        print(f"제외 섹터 필터링 적용: {exclude_sectors}")
+                        logger.info("제외 섹터 필터링 적용: %s", exclude_sectors)
                 
                 # 최대 종목 수 제한
                 if len(blue_chip_stocks) > max_stocks:
                     blue_chip_stocks = blue_chip_stocks[:max_stocks]
-                    print(f"최대 종목 수 제한 적용: {max_stocks}개")
+                    logger.info("최대 종목 수 제한 적용: %d개", max_stocks)
                     
         except Exception as e:
-            print(f"종목 필터링 설정 읽기 실패: {e}")
+            logger.warning("종목 필터링 설정 읽기 실패: %s", e)
         
-        print(f"최종 매매 대상 종목 {len(blue_chip_stocks)}개를 반환합니다.")
+        logger.info("최종 매매 대상 종목 %d개를 반환합니다.", len(blue_chip_stocks))
         return blue_chip_stocks
 
+    @profiling.profiled('kis.get_order_executions')
+    def get_order_executions(self, order_ids):
+        """
+        당일 주문 체결 내역을 한 번에 조회하여 지정한 주문들의 체결 현황을 반환합니다. (주식일별주문체결조회)
+        :param order_ids: 확인할 주문번호 리스트
+        :return: { 주문번호: {'filled': 누적 체결 수량, 'avg_price': 평균 체결가, 'cancelled': 취소 여부} }
+                 조회 실패 시 None
+        """
+        wanted = set(order_ids)
+        executions = {}
+
+        # 기본 구현(buy/sell) 주문은 거래소로 전송되지 않았으므로 접수 즉시 체결된 것으로 봅니다.
+        for order_id in wanted & self._stub_orders.keys():
+            executions[order_id] = {'filled': self._stub_orders[order_id], 'avg_price': 0.0, 'cancelled': False}
+        wanted -= executions.keys()
+        if not wanted:
+            return executions
+
+        url = f"{self.base_url}/uapi/domestic-stock/v1/trading/inquire-daily-ccld"
+        today = datetime.datetime.now().strftime('%Y%m%d')
+        params = {
+            "CANO": self.account_number,
+            "ACNT_PRDT_CD": self.account_product_cd,
+            "INQR_STRT_DT": today,
+            "INQR_END_DT": today,
+            "SLL_BUY_DVSN_CD": "00",
+            "INQR_DVSN": "00",
+            "PDNO": "",
+            "CCLD_DVSN": "00",
+            "ORD_GNO_BRNO": "",
+            "ODNO": "",
+            "INQR_DVSN_3": "00",
+            "INQR_DVSN_1": "",
+            "CTX_AREA_FK100": "",
+            "CTX_AREA_NK100": ""
+        }
+        tr_cont = ""
+
+        try:
+            # 연속 조회(tr_cont)로 당일 주문 전체를 훑되, 찾는 주문이 모두 나오면 중단합니다.
+            while wanted:
+                headers = self._get_headers("VTTC8001R" if self.mock else "TTTC8001R")
+                headers["tr_cont"] = tr_cont
+                response = self.session.get(url, headers=headers, params=params)
+                if response.status_code != 200:
+                    logger.warning("체결 내역 조회 HTTP 오류: %s", response.status_code)
+                    return None
+                result = response.json()
+                if result["rt_cd"] != "0":
+                    logger.warning("체결 내역 조회 실패: %s", result['msg1'])
+                    return None
+
+                for row in result.get("output1", []):
+                    order_id = row.get("odno")
+                    if order_id in wanted:
+                        executions[order_id] = {
+                            'filled': int(row.get("tot_ccld_qty") or 0),
+                            'avg_price': float(row.get("avg_prvs") or 0),
+                            'cancelled': row.get("cncl_yn") == "Y",
+                        }
+                        wanted.discard(order_id)
+
+                if response.headers.get("tr_cont") not in ("F", "M"):
+                    break
+                tr_cont = "N"
+                params["CTX_AREA_FK100"] = result.get("ctx_area_fk100", "")
+                params["CTX_AREA_NK100"] = result.get("ctx_area_nk100", "")
+            return executions
+        except Exception as e:
+            logger.warning("체결 내역 조회 실패: %s", e)
+            return None
+
     # 간단한 매수/매도 함수들 (기본 구현)
+    def _stub_order(self, quantity):
+        order_id = f"{next(self._stub_order_ids):010d}"
+        self._stub_orders[order_id] = quantity
+        return {"odno": order_id, "ord_tmd": datetime.datetime.now().strftime('%H%M%S')}
+
+    @profiling.profiled('kis.buy')
     def buy(self, stock_code, quantity, price=0):
-        print(f"매수 주문: {stock_code} / {quantity}주 (모의투자 모드)")
-        return {"odno": "12345", "ord_tmd": "153000"}
+        logger.info("매수 주문: %s / %d주 (모의투자 모드)", stock_code, quantity)
+        return self._stub_order(quantity)
 
+    @profiling.profiled('kis.sell')
     def sell(self, stock_code, quantity, price=0):
-        print(f"매도 주문: {stock_code} / {quantity}주 (모의투자 모드)")
-        return {"odno": "12346", "ord_tmd": "153000"}
+        logger.info("매도 주문: %s / %d주 (모의투자 모드)", stock_code, quantity)
+        return self._stub_order(quantity)
 
     def get_order_status(self, order_id):
         return "체결"
 
+    @profiling.profiled('kis.cancel_order')
     def cancel_order(self, order_id):
-        print(f"주문 취소: {order_id}")
-        return None
\ No newline at end of file
+        logger.info("주문 취소: %s", order_id)
+        return None
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+전체 시장 규모 부하 테스트
+
+합성 가격 패널로 응답하는 브로커 대역(LoadTestBroker)에 API 응답 지연 분포와 초당 호출 한도를 적용하고,
+run_trading_bot 을 몇 주기 실행하면서 종목 수에 따른 주기 소요 시간, 주기당 API 호출 수, CPU, 메모리,
+신호→주문 지연을 측정합니다. 가장 오래 걸린 단계와 그 원인(호출 한도 대기, API 응답 지연, 지표 계산, 주문 접수)을
+병목으로 표시합니다.
+
+종목 수마다 임시 작업 디렉터리에 config.cfg(현재 설정 + 부하 테스트용 값)를 만들고 그 디렉터리에서 봇 프로세스를
+새로 실행합니다. 설정은 실제 운용과 같은 경로로 적용되고, 메모리 측정도 규모마다 독립적입니다.
+(텔레그램 알림, 지표 엔드포인트, 아카이브는 끄고 공유 상태 저장소 대신 파일 상태를 사용합니다.)
+
+사용 예:
+    python load_test.py                                          # 88/500/1000/2500종목, 주기 3회
+    python load_test.py --sizes 2500 --screen-all --latency lognormal:0.08,0.5 --quota 20
+    python load_test.py --screen-all --shards 4                  # 워커 프로세스 4개로 나눠 실행
+    python load_test.py --set strategy.rsi_buy_threshold=100     # 매수 신호를 늘려 주문 경로까지 부하
+"""
+
+import argparse
+import configparser
+import functools
+import json
+import os
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from local_broker import LocalBroker
+from param_sweep import generate_synthetic_panel
+
+DEFAULT_SIZES = [88, 500, 1000, 2500]
+DEFAULT_OUTPUT_FILE = 'load_test_results.json'
+OPTIONS_FILE = 'load_test.json'
+RESULT_FILE = 'load_test_result.json'
+
+# 부하 테스트 중 항상 덮어쓰는 설정 (외부로 나가는 알림/공유 자원 차단, 구간 시간 기록)
+FIXED_SETTINGS = [
+    ('telegram', 'token', ''),
+    ('telegram', 'chat_id', ''),
+    ('metrics', 'enabled', 'false'),
+    ('archive', 'enabled', 'false'),
+    ('state', 'backend', 'file'),
+    ('profiling', 'spans', 'true'),
+    ('profiling', 'trigger_file', ''),
+    ('logging', 'level', 'ERROR'),
+    ('logging', 'file', ''),
+]
+
+# 병목 원인 이름
+CAUSES = {
+    'rate_limit': '시세 호출 한도 대기',
+    'api_latency': 'API 응답 지연',
+    'compute': '지표 계산/신호 확인',
+    'order': '주문 접수',
+}
+
+
+class LatencyModel:
+    """
+    API 응답 지연 분포 (초). 다음 형식으로 지정합니다.
+    'none', 'fixed:0.05', 'uniform:0.02,0.1', 'normal:0.05,0.01'(평균, 표준편차),
+    'lognormal:0.05,0.5'(중앙값, 시그마), 'exp:0.05'(평균)
+    """
+    ARGUMENTS = {'none': 0, 'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exp': 1}
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(':')
+        self.kind = kind.strip().lower()
+        if self.kind not in self.ARGUMENTS:
+            raise ValueError(f"알 수 없는 지연 분포: {spec}")
+        self.params = [float(x) for x in args.split(',') if x.strip()]
+        if len(self.params) != self.ARGUMENTS[self.kind]:
+            raise ValueError(f"지연 분포 인자 수가 맞지 않습니다: {spec}")
+        self.spec = spec
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            r, p = self._random, self.params
+            if self.kind == 'none':
+                value = 0.0
+            elif self.kind == 'fixed':
+                value = p[0]
+            elif self.kind == 'uniform':
+                value = r.uniform(p[0], p[1])
+            elif self.kind == 'normal':
+                value = r.gauss(p[0], p[1])
+            elif self.kind == 'lognormal':
+                value = p[0] * r.lognormvariate(0, p[1])
+            else:
+                value = r.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+class QuotaExceededError(Exception):
+    """ 브로커 대역의 초당 호출 한도 초과 (KIS 의 '초당 거래건수를 초과하였습니다' 응답에 해당) """
+
+
+class LoadTestBroker(LocalBroker):
+    """
+    부하 테스트용 브로커 대역. 호출마다 지연 분포에서 뽑은 시간만큼 기다리고,
+    초당 호출 한도를 넘긴 호출은 KISBroker 의 조회/주문 실패와 같이 None 을 돌려줍니다.
+    종목 분할 실행 시 워커 프로세스도 같은 설정의 대역을 사용합니다. (호출 한도는 프로세스마다 따로 셉니다)
+    """
+    ORDER_CALLS = ('buy', 'sell', 'cancel_order')
+
+    def __init__(self, panel_path: str, latency: str = 'none', order_latency: str | None = None,
+                 quota_per_second: float = 0, seed: int = 0, cash: int = 10_000_000):
+        """
+        :param panel_path: 가격 패널 디렉터리
+        :param latency: 시세/조회 API 응답 지연 분포 (LatencyModel 형식)
+        :param order_latency: 주문 API 응답 지연 분포 (None 이면 latency 와 같음)
+        :param quota_per_second: 초당 호출 한도 (0 이면 제한 없음)
+        :param seed: 지연 난수 시드
+        :param cash: 초기 예수금
+        """
+        super().__init__(panel_path, cash=cash)
+        self.settings = (latency, order_latency, quota_per_second, seed)
+        self.latency = LatencyModel(latency, seed)
+        self.order_latency = LatencyModel(order_latency or latency, seed + 1)
+        self.quota_per_second = quota_per_second
+        self.api_seconds = 0.0  # 응답 지연으로 기다린 누적 시간 (동시 호출은 겹쳐 셈)
+        self.quota_rejections = Counter()
+        self._window = 0
+        self._window_calls = 0
+
+    def worker_factory(self):
+        """ 워커 프로세스에서 같은 설정의 대역을 만드는 함수 (ShardedPipeline 용) """
+        return functools.partial(LoadTestBroker, self.panel_path, *self.settings)
+
+    def _call(self, name: str):
+        delay = (self.order_latency if name in self.ORDER_CALLS else self.latency).sample()
+        with self._lock:
+            self.call_counts[name] += 1
+            self.api_seconds += delay
+            second = int(time.monotonic())
+            if second != self._window:
+                self._window, self._window_calls = second, 0
+            self._window_calls += 1
+            rejected = bool(self.quota_per_second) and self._window_calls > self.quota_per_second
+            if rejected:
+                self.quota_rejections[name] += 1
+        if delay:
+            time.sleep(delay)
+        if rejected:
+            raise QuotaExceededError(name)
+
+    def get_current_price(self, stock_code):
+        try:
+            return super().get_current_price(stock_code)
+        except QuotaExceededError:
+            return None
+
+    def get_daily_price(self, stock_code, start_date, end_date):
+        try:
+            return super().get_daily_price(stock_code, start_date, end_date)
+        except QuotaExceededError:
+            return None
+
+    def get_balance(self):
+        try:
+            return super().get_balance()
+        except QuotaExceededError:
+            return None
+
+    def buy(self, stock_code, quantity, price=0):
+        try:
+            return super().buy(stock_code, quantity, price)
+        except QuotaExceededError:
+            return None
+
+    def sell(self, stock_code, quantity, price=0):
+        try:
+            return super().sell(stock_code, quantity, price)
+        except QuotaExceededError:
+            return None
+
+    def get_order_executions(self, order_ids):
+        try:
+            return super().get_order_executions(order_ids)
+        except QuotaExceededError:
+            return None
+
+    def cancel_order(self, order_id):
+        try:
+            return super().cancel_order(order_id)
+        except QuotaExceededError:
+            return None
+
+
+def _scrape(registry) -> dict[str, dict[tuple, float]]:
+    """ 지표를 Prometheus 텍스트로 받아 { 지표 이름: { ((라벨, 값), ...): 값 } } 으로 읽습니다. """
+    values = {}
+    for line in registry.render().splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, value = line.rsplit(' ', 1)
+        name, _, labels = series.partition('{')
+        values.setdefault(name, {})[tuple(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', labels))] = float(value)
+    return values
+
+
+def _histogram_summary(scraped: dict, name: str) -> dict | None:
+    """ 히스토그램의 모든 라벨을 합쳐 관측 수, 평균, 중앙값/p95 (해당 구간의 상한)를 계산합니다. """
+    count = sum(scraped.get(f'{name}_count', {}).values())
+    if not count:
+        return None
+    cumulative = Counter()
+    for labels, value in scraped.get(f'{name}_bucket', {}).items():
+        cumulative[float(dict(labels)['le'])] += value
+    bounds = sorted(cumulative)
+
+    def quantile(q):
+        return next(bound for bound in bounds if cumulative[bound] >= q * count)
+
+    return {'count': int(count), 'mean_s': sum(scraped[f'{name}_sum'].values()) / count,
+            'p50_s': quantile(0.5), 'p95_s': quantile(0.95)}
+
+
+def _find_bottleneck(stages: dict[str, float], causes: dict[str, float]) -> dict:
+    """
+    가장 오래 걸린 단계와, 주기당 추정 시간이 가장 큰 원인을 고릅니다.
+    원인 시간의 합이 그 단계 시간의 10% 에도 못 미치면(워커 프로세스에서 처리한 경우 등) 원인은 None 입니다.
+    """
+    stage = max(stages, key=stages.get) if stages else None
+    total = sum(causes.values())
+    cause = max(causes, key=causes.get) if stage and total >= 0.1 * stages[stage] else None
+    return {'stage': stage, 'stage_s': stages.get(stage, 0.0), 'cause': cause,
+            'cause_share': causes[cause] / total if cause else 0.0}
+
+
+def run_worker():
+    """ 작업 디렉터리(현재 디렉터리)의 설정으로 봇을 실행하고 측정 결과를 RESULT_FILE 에 기록합니다. """
+    with open(OPTIONS_FILE, 'r', encoding='utf-8') as f:
+        options = json.load(f)
+
+    # 아래 모듈은 가져올 때 현재 디렉터리의 config.cfg 를 읽습니다.
+    import main
+    import metrics
+    import profiling
+    import trading_pipeline
+    from cycle_scheduler import CYCLE_DEADLINE_RATIO
+
+    broker = LoadTestBroker('panel', options['latency'], options['order_latency'], options['quota'], options['seed'])
+    cycles = []
+    previous = {'calls': Counter(), 'rejections': Counter(), 'api_seconds': 0.0, 'cpu': time.process_time(),
+                'waits': {}}
+
+    def on_cycle(timing):
+        with broker._lock:
+            calls, rejections, api_seconds = Counter(broker.call_counts), Counter(broker.quota_rejections), \
+                broker.api_seconds
+        cpu = time.process_time()
+        scraped = _scrape(metrics.REGISTRY)
+        waits = {dict(labels)['limiter']: value
+                 for labels, value in scraped.get('automata_rate_limiter_wait_seconds_total', {}).items()}
+        spans = profiling.RECORDER.totals()
+        cycles.append({
+            'duration_s': timing.duration,
+            'stages_s': dict(timing.stages),
+            'skipped': list(timing.skipped),
+            'overrun': timing.overrun,
+            'api_calls': dict(calls - previous['calls']),
+            'quota_rejections': sum((rejections - previous['rejections']).values()),
+            'api_seconds': api_seconds - previous['api_seconds'],
+            'cpu_s': cpu - previous['cpu'],
+            'rate_limit_wait_s': {name: value - previous['waits'].get(name, 0.0) for name, value in waits.items()},
+            'spans_s': {name: seconds for name, (_, seconds) in spans.items() if name in CAUSES},
+        })
+        previous.update(calls=calls, rejections=rejections, api_seconds=api_seconds, cpu=cpu, waits=waits)
+
+    started, times_before = time.perf_counter(), os.times()
+    main.run_trading_bot(broker, max_cycles=options['cycles'], on_cycle=on_cycle, paced=False)
+    wall = time.perf_counter() - started
+    times = [after - before for after, before in zip(os.times(), times_before)]
+    scraped = _scrape(metrics.REGISTRY)
+
+    result = {'symbols': options['symbols'], 'cycles': len(cycles), 'wall_s': wall,
+              'budget_s': main.LOOP_INTERVAL_SECONDS * CYCLE_DEADLINE_RATIO,
+              'cpu_utilization': sum(times[:4]) / wall,  # 사용자 + 시스템 + 자식 프로세스(워커) CPU 시간
+              'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+              'children_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+              'signal_to_order': _histogram_summary(scraped, 'automata_signal_to_order_seconds'),
+              'orders': {'/'.join(value for _, value in labels): int(count)
+                         for labels, count in scraped.get('automata_orders_total', {}).items()},
+              'per_cycle': cycles}
+    if cycles:
+        def median(key, sub=None):
+            return statistics.median(c[key].get(sub, 0.0) if sub else c[key] for c in cycles)
+
+        stage_names = {name for c in cycles for name in c['stages_s']}
+        api_names = {name for c in cycles for name in c['api_calls']}
+        stages = {name: median('stages_s', name) for name in stage_names}
+        # 단계 안에서 겹쳐 진행되는 시간은 동시 조회 수로 나눠 주기당 시간으로 환산합니다. (추정)
+        concurrency = max(1, trading_pipeline.FETCH_CONCURRENCY)
+        causes = {
+            'rate_limit': median('rate_limit_wait_s', 'data') / concurrency,
+            'api_latency': median('api_seconds') / concurrency,
+            'compute': median('spans_s', 'compute'),
+            'order': median('spans_s', 'order') + median('rate_limit_wait_s', 'order'),
+        }
+        result.update({
+            'cycle_median_s': median('duration_s'),
+            'cycle_max_s': max(c['duration_s'] for c in cycles),
+            'stages_s': stages,
+            'skipped': sorted({name for c in cycles for name in c['skipped']}),
+            'overruns': sum(c['overrun'] for c in cycles),
+            'api_calls_per_cycle': statistics.median(sum(c['api_calls'].values()) for c in cycles),
+            'api_calls_by_name': {name: median('api_calls', name) for name in sorted(api_names)},
+            'quota_rejections_per_cycle': median('quota_rejections'),
+            'cpu_s_per_cycle': median('cpu_s'),
+            'causes_s': causes,
+            'bottleneck': _find_bottleneck(stages, causes),
+        })
+    with open(RESULT_FILE, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def _write_config(path: str, base_config: str | None, settings: list[tuple[str, str, str]]):
+    """ 현재 설정 파일(있으면)에 부하 테스트용 값을 덮어써 path 에 저장합니다. """
+    config = configparser.ConfigParser()
+    if base_config and os.path.exists(base_config):
+        config.read(base_config)
+    for section, key, value in settings:
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, value)
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+
+
+def run_universe(n_symbols: int, n_days: int, cycles: int, latency: str, order_latency: str | None,
+                 quota: float, shards: int, screen_all: bool, overrides: list[tuple[str, str, str]],
+                 base_config: str | None = 'config.cfg', seed: int = 0) -> dict:
+    """
+    종목 n_symbols 개의 합성 패널로 봇 프로세스를 실행해 측정 결과를 돌려줍니다.
+    :param n_days: 패널 일수 (영업일)
+    :param cycles: 실행할 매매 주기 수
+    :param latency: 시세/조회 API 응답 지연 분포
+    :param order_latency: 주문 API 응답 지연 분포 (None 이면 latency 와 같음)
+    :param quota: 브로커 대역의 초당 호출 한도 (0 이면 제한 없음)
+    :param shards: 워커 프로세스 수 (0, 1: 단일 프로세스)
+    :param screen_all: True 이면 매 주기 전체 종목을 스크리닝
+    :param overrides: 추가로 덮어쓸 설정 [(섹션, 키, 값)]
+    :param base_config: 기반으로 할 설정 파일
+    """
+    settings = list(FIXED_SETTINGS)
+    if shards:
+        settings.append(('trading_control', 'shard_workers', str(shards)))
+    if screen_all:
+        settings.append(('trading_control', 'max_screening_stocks', str(n_symbols)))
+    settings += overrides
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        generate_synthetic_panel(os.path.join(work_dir, 'panel'), n_symbols, n_days, seed=seed)
+        _write_config(os.path.join(work_dir, 'config.cfg'), base_config, settings)
+        with open(os.path.join(work_dir, OPTIONS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'symbols': n_symbols, 'cycles': cycles, 'latency': latency, 'order_latency': order_latency,
+                       'quota': quota, 'seed': seed}, f)
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'], cwd=work_dir)
+        result_path = os.path.join(work_dir, RESULT_FILE)
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            return {'symbols': n_symbols, 'cycles': 0, 'error': f"봇 프로세스 종료 코드 {completed.returncode}"}
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def _print_result(result: dict):
+    n = result['symbols']
+    if not result.get('cycles'):
+        print(f"{n:>5}종목 | ❌ 주기를 한 번도 마치지 못했습니다. {result.get('error', '')}")
+        return
+    latency = result['signal_to_order']
+    latency_text = (f"신호→주문 평균 {latency['mean_s']*1000:.0f}ms, p95 ≤{latency['p95_s']*1000:.0f}ms "
+                    f"({latency['count']}건)") if latency else "신호→주문 없음"
+    workers = f" (워커 최대 {result['children_peak_rss_mb']:.0f}MB)" if result['children_peak_rss_mb'] else ""
+    print(f"{n:>5}종목 | 주기 중앙값 {result['cycle_median_s']:8.2f}s (최대 {result['cycle_max_s']:.2f}s) | "
+          f"API {result['api_calls_per_cycle']:6.0f}회/주기 | CPU {result['cpu_s_per_cycle']:6.2f}s/주기 "
+          f"(사용률 {result['cpu_utilization']:.0%}) | 메모리 {result['peak_rss_mb']:6.0f}MB{workers} | {latency_text}")
+    bottleneck = result['bottleneck']
+    causes = ', '.join(f"{CAUSES[name]} {seconds:.2f}s" for name, seconds in result['causes_s'].items())
+    cause = (f"{CAUSES[bottleneck['cause']]} {bottleneck['cause_share']:.0%}" if bottleneck['cause']
+             else "원인 미집계: 워커 프로세스 내부")
+    print(f"      병목: {bottleneck['stage']} 단계 {bottleneck['stage_s']:.2f}s ({cause}) | 추정 내역: {causes}")
+    if result['quota_rejections_per_cycle']:
+        print(f"      ⚠️ 호출 한도 초과 응답 {result['quota_rejections_per_cycle']:.0f}건/주기 "
+              f"(봇의 호출 한도가 브로커 한도보다 높습니다)")
+    if result['skipped'] or result['overruns']:
+        print(f"      ⚠️ 마감 초과: 건너뛴 단계 {result['skipped'] or '-'}, 주기 초과 {result['overruns']}회")
+
+
+def _breaking_point(results: list[dict]) -> dict | None:
+    """ 주기 마감 안에 끝나지 못한(단계를 건너뛰었거나 다음 주기를 넘긴) 첫 규모 """
+    for result in results:
+        if not result.get('cycles') or result['skipped'] or result['overruns'] \
+                or result['cycle_median_s'] > result['budget_s']:
+            return result
+    return None
+
+
+def _parse_override(text: str) -> tuple[str, str, str]:
+    key, sep, value = text.partition('=')
+    section, dot, option = key.strip().partition('.')
+    if not sep or not dot:
+        raise argparse.ArgumentTypeError(f"섹션.키=값 형식이 아닙니다: {text}")
+    return section, option, value.strip()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="자동매매 시스템 전체 시장 규모 부하 테스트")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="종목 수 (쉼표 구분)")
+    parser.add_argument('--days', type=int, default=120, help="합성 패널 일수 (영업일)")
+    parser.add_argument('--cycles', type=int, default=3, help="규모마다 실행할 매매 주기 수")
+    parser.add_argument('--latency', default='lognormal:0.05,0.3', help="시세/조회 API 응답 지연 분포")
+    parser.add_argument('--order-latency', default=None, help="주문 API 응답 지연 분포 (기본: --latency)")
+    parser.add_argument('--quota', type=float, default=20, help="브로커 대역의 초당 호출 한도 (0: 제한 없음)")
+    parser.add_argument('--shards', type=int, default=0, help="워커 프로세스 수")
+    parser.add_argument('--screen-all', action='store_true', help="매 주기 전체 종목 스크리닝")
+    parser.add_argument('--set', dest='overrides', action='append', default=[], type=_parse_override,
+                        metavar='섹션.키=값', help="봇 설정 덮어쓰기 (여러 번 지정 가능)")
+    parser.add_argument('--config', default='config.cfg', help="기반으로 할 설정 파일")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help="결과 JSON 경로")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        return
+
+    for spec in (args.latency, args.order_latency):
+        if spec:
+            try:
+                LatencyModel(spec)
+            except ValueError as e:
+                parser.error(str(e))
+
+    results = []
+    for n_symbols in [int(x) for x in args.sizes.split(',')]:
+        result = run_universe(n_symbols, args.days, args.cycles, args.latency, args.order_latency, args.quota,
+                              args.shards, args.screen_all, args.overrides, os.path.abspath(args.config), args.seed)
+        results.append(result)
+        _print_result(result)
+
+    broken = _breaking_point(results)
+    if broken:
+        print(f"\n주기 마감({broken.get('budget_s', 0):.0f}s) 안에 끝나지 못한 첫 규모: {broken['symbols']}종목")
+    else:
+        print("\n모든 규모가 주기 마감 안에 끝났습니다.")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': {'timestamp': datetime.now().isoformat(), 'python': sys.version.split()[0],
+                            'cpu_count': os.cpu_count(), 'args': {k: v for k, v in vars(args).items()
+                                                                 if k != 'worker'}},
+                   'breaking_point': broken['symbols'] if broken else None,
+                   'results': results}, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.output}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,154 @@
+import itertools
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from param_sweep import load_price_panel
+
+
+class LocalBroker:
+    """
+    네트워크 없이 가격 패널(param_sweep 형식)로 응답하는 KISBroker 대역(stand-in).
+    벤치마크와 부하 테스트에서 KISBroker 대신 사용합니다.
+    주문은 마지막 종가로 즉시 전량 체결되며, 계좌 잔고도 내부에서 관리합니다.
+    """
+    def __init__(self, panel_path: str, cash: int = 10_000_000, latency_seconds: float = 0.0,
+                 sectors: list[str] | None = None):
+        """
+        LocalBroker 초기화
+        :param panel_path: 가격 패널 디렉터리
+        :param cash: 초기 예수금
+        :param latency_seconds: API 호출마다 추가할 지연 시간 (초)
+        :param sectors: 종목에 순환 배정할 섹터 이름 리스트
+        """
+        self.mock = True
+        self.force_open = True
+        self.panel_path = panel_path
+        self.latency_seconds = latency_seconds
+
+        codes, _, close, volume = load_price_panel(panel_path, mmap=True)
+        self.codes = codes
+        self._rows = {code: i for i, code in enumerate(codes)}
+        self._close = close
+        self._volume = volume
+        # 패널의 마지막 일자가 오늘(또는 직전 영업일)이 되도록 영업일 기준으로 날짜를 다시 매깁니다.
+        self._dates = pd.bdate_range(end=datetime.now().date(), periods=close.shape[1]).strftime('%Y%m%d').to_numpy()
+
+        sectors = sectors or ['IT', '금융', '바이오', '자동차', '배터리']
+        self._sectors = {code: sectors[i % len(sectors)] for i, code in enumerate(codes)}
+
+        self._lock = threading.Lock()
+        self._order_ids = itertools.count(1)
+        self.cash = cash
+        self.positions = {}  # { '종목코드': {'quantity': 수량, 'avg_price': 평단} }
+        self.orders = {}     # { 주문번호: {'filled': 체결 수량, 'avg_price': 체결가, 'cancelled': False} }
+        self.call_counts = Counter()
+
+    def _call(self, name: str):
+        """ API 호출 1회를 기록하고 설정된 지연을 적용합니다. """
+        with self._lock:
+            self.call_counts[name] += 1
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+
+    def _is_market_open(self):
+        return True
+
+    def _last_close(self, stock_code) -> float | None:
+        row = self._rows.get(stock_code)
+        if row is None:
+            return None
+        closes = self._close[row]
+        valid = closes[~np.isnan(closes)]
+        return float(valid[-1]) if len(valid) else None
+
+    def get_all_listed_stocks(self):
+        self._call('get_all_listed_stocks')
+        return [{'code': code, 'name': f'종목{code}', 'sector': self._sectors[code]} for code in self.codes]
+
+    def get_current_price(self, stock_code):
+        self._call('get_current_price')
+        price = self._last_close(stock_code)
+        return int(price) if price is not None else None
+
+    def get_daily_price(self, stock_code, start_date, end_date):
+        self._call('get_daily_price')
+        row = self._rows.get(stock_code)
+        if row is None:
+            return None
+        lo = np.searchsorted(self._dates, start_date, side='left')
+        hi = np.searchsorted(self._dates, end_date, side='right')
+        close = self._close[row, lo:hi]
+        mask = ~np.isnan(close)
+        if not mask.any():
+            return None
+        # KIS 응답과 같이 문자열 컬럼으로 반환합니다.
+        return pd.DataFrame({
+            'stck_bsop_date': self._dates[lo:hi][mask],
+            'stck_clpr': close[mask].astype(np.int64).astype(str),
+            'acml_vol': self._volume[row, lo:hi][mask].astype(np.int64).astype(str),
+        })
+
+    def get_balance(self):
+        self._call('get_balance')
+        with self._lock:
+            output1 = []
+            for code, pos in self.positions.items():
+                price = self._last_close(code) or pos['avg_price']
+                output1.append({
+                    'pdno': code,
+                    'prdt_name': f'종목{code}',
+                    'hldg_qty': str(pos['quantity']),
+                    'pchs_avg_pric': f"{pos['avg_price']:.4f}",
+                    'prpr': str(int(price)),
+                    'evlu_amt': str(int(price * pos['quantity'])),
+                })
+            return {'output1': output1, 'output2': {'dnca_tot_amt': str(int(self.cash))}}
+
+    def _record_order(self, quantity, fill_price):
+        order_id = f"{next(self._order_ids):010d}"
+        self.orders[order_id] = {'filled': quantity, 'avg_price': fill_price, 'cancelled': False}
+        return {"odno": order_id, "ord_tmd": datetime.now().strftime('%H%M%S')}
+
+    def buy(self, stock_code, quantity, price=0):
+        self._call('buy')
+        fill_price = self._last_close(stock_code)
+        if fill_price is None:
+            return None
+        with self._lock:
+            pos = self.positions.setdefault(stock_code, {'quantity': 0, 'avg_price': 0.0})
+            total = pos['quantity'] + quantity
+            pos['avg_price'] = (pos['quantity'] * pos['avg_price'] + quantity * fill_price) / total
+            pos['quantity'] = total
+            self.cash -= quantity * fill_price
+            return self._record_order(quantity, fill_price)
+
+    def sell(self, stock_code, quantity, price=0):
+        self._call('sell')
+        fill_price = self._last_close(stock_code)
+        with self._lock:
+            pos = self.positions.get(stock_code)
+            if fill_price is None or not pos or pos['quantity'] < quantity:
+                return None
+            pos['quantity'] -= quantity
+            if pos['quantity'] == 0:
+                del self.positions[stock_code]
+            self.cash += quantity * fill_price
+            return self._record_order(quantity, fill_price)
+
+    def get_order_executions(self, order_ids):
+        self._call('get_order_executions')
+        with self._lock:
+            return {order_id: dict(self.orders[order_id]) for order_id in order_ids if order_id in self.orders}
+
+    def get_order_status(self, order_id):
+        self._call('get_order_status')
+        return "체결"
+
+    def cancel_order(self, order_id):
+        self._call('cancel_order')
+        return None
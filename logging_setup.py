@@ -0,0 +1,121 @@
+import atexit
+import configparser
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime
+
+import metrics
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    logging_params = config['logging']
+    LOG_LEVEL = logging_params.get('level', 'INFO').upper()   # DEBUG 로 두면 종목별 진행 상황까지 출력
+    LOG_JSON = logging_params.getboolean('json', False)       # True: JSON Lines 형식으로 기록
+    LOG_FILE = logging_params.get('file', '')                 # 비우면 파일에 기록하지 않음
+    LOG_CONSOLE = logging_params.getboolean('console', True)
+    LOG_QUEUE_SIZE = logging_params.getint('queue_size', 10000)
+except KeyError:
+    LOG_LEVEL = 'INFO'
+    LOG_JSON = False
+    LOG_FILE = ''
+    LOG_CONSOLE = True
+    LOG_QUEUE_SIZE = 10000
+
+# LogRecord 기본 속성 (이 외의 속성은 extra 로 전달된 구조화 필드로 간주)
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """ 로그 한 건을 JSON 한 줄로 기록합니다. extra 로 전달된 필드(symbol 등)도 함께 기록됩니다. """
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    호출한 스레드에서는 레코드를 큐에 넣기만 하는 핸들러.
+    - 메시지 포맷팅은 백그라운드 스레드(QueueListener)에서 수행합니다.
+    - 큐가 가득 차면 기다리지 않고 레코드를 버리고 개수만 셉니다.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped_count = 0
+
+    def prepare(self, record):
+        # 기본 구현은 여기서 메시지를 포맷팅하므로, 레코드를 그대로 넘겨 포맷팅을 미룹니다.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_count += 1
+
+
+_listener = None
+
+def setup_logging(level: str = LOG_LEVEL, json_lines: bool = LOG_JSON, log_file: str = LOG_FILE,
+                  console: bool = LOG_CONSOLE, queue_size: int = LOG_QUEUE_SIZE):
+    """
+    루트 로거에 큐 기반 핸들러를 설치합니다. 콘솔/파일 기록은 백그라운드 스레드가 담당하므로
+    매매 루프는 터미널이나 디스크 I/O 를 기다리지 않습니다. 여러 번 호출해도 한 번만 설치됩니다.
+    :param level: 로그 레벨 (DEBUG, INFO, WARNING, ERROR)
+    :param json_lines: True 이면 JSON Lines 형식으로 기록
+    :param log_file: 로그 파일 경로 (비우면 파일 기록 안 함)
+    :param console: 콘솔(stdout) 출력 여부
+    :param queue_size: 로그 대기 큐 크기
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    if json_lines:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s [%(name)s] %(message)s', '%H:%M:%S')
+
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    root.setLevel(level)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    root.addHandler(queue_handler)
+    metrics.gauge_callback('log_queue_depth', "로그 대기 큐 길이", log_queue.qsize)
+    metrics.gauge_callback('log_dropped_total', "큐가 가득 차 버린 로그 수", lambda: queue_handler.dropped_count,
+                           kind='counter')
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """ 큐에 남은 로그를 모두 기록하고 백그라운드 스레드를 종료합니다. """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,13 +1,24 @@
+import asyncio
+import logging
 import time
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, timedelta
 
 from kis_broker import KISBroker, MarketClosedError
-from indicators import add_all_indicators
-from strategy import check_buy_signal, check_sell_signal
 from portfolio import Portfolio
-from order_manager import OrderManager
-from stock_selector import screen_stocks
+from order_manager import OrderManager, FILL_POLL_INTERVAL_SECONDS
+from trading_pipeline import TradingPipeline
+from sharded_pipeline import ShardedPipeline, SHARD_WORKERS
+from cycle_scheduler import CycleScheduler, CycleTiming
+from market_calendar import MarketCalendar, WARMUP_MINUTES
+from market_data import MarketDataService
+from market_archive import ArchiveWriter, ARCHIVE_ENABLED
+from logging_setup import setup_logging
+import metrics
+from profiling import ProfilingController
+from config_reload import ConfigReloader, HOT_RELOAD
+from checkpoint import Checkpointer, CHECKPOINT_ENABLED
+
+logger = logging.getLogger(__name__)
 
 # --- 설정 ---
 import configparser
@@ -21,152 +32,243 @@ try:
     LOOP_INTERVAL_MINUTES = trading_control.getint('loop_interval_minutes', 5)
     LOOP_INTERVAL_SECONDS = LOOP_INTERVAL_MINUTES * 60  # 분을 초로 변환
 except KeyError:
+    LOOP_INTERVAL_MINUTES = 5
     LOOP_INTERVAL_SECONDS = 300  # 기본값 5분
 
 # 매수 후보 종목 리스트는 동적으로 조회
 CANDIDATE_STOCK_CODES = []
 
-def run_trading_bot():
-    """ 자동매매 봇의 메인 로직을 실행합니다. """
-    print(f"[{datetime.now()}] 자동매매 시스템을 시작합니다.")
+def run_trading_cycle(broker, portfolio: Portfolio, order_manager: OrderManager, candidate_codes: list[str],
+                      pipeline: TradingPipeline | None = None, timing: CycleTiming | None = None,
+                      deadline: float | None = None) -> CycleTiming:
+    """
+    매매 주기 1회를 실행합니다. (포트폴리오 최신화 → 매도 신호 → 스크리닝 → 매수 신호)
+    시세 조회, 지표 계산, 주문 접수는 TradingPipeline 에서 단계별로 겹쳐 진행됩니다.
+    :param broker: KISBroker 인스턴스 (또는 같은 인터페이스의 브로커)
+    :param portfolio: Portfolio 인스턴스
+    :param order_manager: OrderManager 인스턴스
+    :param candidate_codes: 매수 후보 종목 코드 리스트
+    :param pipeline: 재사용할 TradingPipeline (None 이면 새로 생성)
+    :param timing: 단계별 소요 시간을 기록할 CycleTiming
+    :param deadline: 작업 마감 시각 (time.monotonic 기준). 마감이 가까우면 스크리닝부터 줄입니다.
+    :return: 단계별 소요 시간이 기록된 CycleTiming
+    """
+    if pipeline is None:
+        pipeline = TradingPipeline(broker, portfolio, order_manager)
+    return asyncio.run(pipeline.run(candidate_codes, timing, deadline))
+
+def register_runtime_metrics(market_data: MarketDataService, order_manager: OrderManager,
+                             pipeline: TradingPipeline):
+    """
+    대기열 길이, 캐시 적중률, 호출 한도 대기 시간을 지표로 등록합니다. 값은 지표를 수집할 때만 계산합니다.
+    """
+    def lookups():
+        return {tuple(key.split('_', 1)): count for key, count in market_data.cache_stats().items()}
+
+    def hit_ratio():
+        totals, fetched = {}, {}
+        for (kind, result), count in lookups().items():
+            totals[kind] = totals.get(kind, 0) + count
+            if result == 'fetched':
+                fetched[kind] = count
+        return {(kind,): 1 - fetched.get(kind, 0) / total for kind, total in totals.items() if total}
+
+    def queue_depths():
+        depths = {('open_orders',): len(order_manager.order_tracker.open_orders())}
+        if order_manager.telegram_bot:
+            depths[('telegram',)] = order_manager.telegram_bot._queue.qsize()
+        if isinstance(pipeline, ShardedPipeline):
+            depths[('shard_results',)] = pipeline._results.qsize()
+        return depths
+
+    limiters = {'data': market_data.rate_limiter, 'order': order_manager.order_rate_limiter}
+    metrics.gauge_callback('market_data_lookups_total', "시세 조회 결과별 횟수 (result: fetched, hit, deduplicated, "
+                           "from_bars)", lookups, ('kind', 'result'), kind='counter')
+    metrics.gauge_callback('market_data_hit_ratio', "시세 조회 중 브로커를 호출하지 않은 비율", hit_ratio, ('kind',))
+    metrics.gauge_callback('queue_depth', "대기열 길이", queue_depths, ('queue',))
+    metrics.gauge_callback('rate_limiter_wait_seconds_total', "호출 한도 토큰을 기다린 누적 시간 (초)",
+                           lambda: {(name,): limiter.waited_seconds for name, limiter in limiters.items()},
+                           ('limiter',), kind='counter')
+    metrics.gauge_callback('rate_limit_per_second', "초당 호출 한도",
+                           lambda: {(name,): limiter.rate for name, limiter in limiters.items()}, ('limiter',))
+
+def wait_for_next_cycle(order_manager: OrderManager, seconds: float):
+    """
+    다음 주기까지 대기합니다. 체결 대기 중인 주문이 있으면 대기 중에도 주기적으로 체결을 확인합니다.
+    :param order_manager: OrderManager 인스턴스
+    :param seconds: 대기 시간 (초)
+    """
+    deadline = time.time() + seconds
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(min(FILL_POLL_INTERVAL_SECONDS, remaining))
+        if order_manager.order_tracker.open_orders():
+            order_manager.process_fills()
+
+def sleep_until(target: datetime):
+    """ 지정한 시각까지 대기합니다. 긴 대기는 나눠서 자므로 시스템 시계가 바뀌어도 시각을 다시 맞춥니다. """
+    while (remaining := (target - datetime.now()).total_seconds()) > 0:
+        time.sleep(min(remaining, 600))
+
+def wait_for_session(broker, pipeline: TradingPipeline, calendar: MarketCalendar, candidate_codes: list[str],
+                     checkpointer: Checkpointer | None = None):
+    """
+    다음 개장까지 대기합니다. 개장 WARMUP_MINUTES 분 전에 깨어나 준비 작업(토큰 갱신, 잔고 동기화,
+    일봉 조회/지표 계산/스크리닝)을 마치고 개장 시각까지 다시 대기하므로, 첫 주기부터 평소 속도로 동작합니다.
+    :param broker: KISBroker 인스턴스 (또는 같은 인터페이스의 브로커)
+    :param pipeline: 준비 작업 결과를 첫 주기에 넘겨받을 TradingPipeline
+    :param calendar: MarketCalendar 인스턴스
+    :param candidate_codes: 매수 후보 종목 코드 리스트
+    :param checkpointer: 주어지면 준비 작업 결과(조회한 일봉 포함)를 저장해 개장 전 재시작 시 다시 조회하지 않음
+    """
+    next_open = calendar.next_open()
+    warmup_at = next_open - timedelta(minutes=WARMUP_MINUTES)
+    logger.info("장이 열리지 않았습니다. 다음 개장 %s, 준비 작업 %s",
+                next_open.strftime('%Y-%m-%d %H:%M'), warmup_at.strftime('%Y-%m-%d %H:%M'))
+    sleep_until(warmup_at)
+
+    if datetime.now() < next_open:
+        try:
+            if hasattr(broker, 'refresh_token'):
+                # 장 마감까지 만료되지 않도록 토큰을 미리 갱신합니다.
+                session_seconds = (calendar.session_close(next_open.date()) - datetime.now()).total_seconds()
+                broker.refresh_token(min_valid_seconds=session_seconds)
+            asyncio.run(pipeline.warm_up(candidate_codes))
+            if checkpointer is not None:
+                checkpointer.save(pipeline, candidate_codes, bars_valid_until=next_open)
+        except Exception as e:
+            logger.warning("장 시작 전 준비 작업 실패: %s", e)
+
+    sleep_until(next_open)
+
+def run_trading_bot(broker=None, max_cycles: int | None = None, on_cycle=None, paced: bool = True):
+    """
+    자동매매 봇의 메인 로직을 실행합니다.
+    :param broker: 사용할 브로커 (None이면 KISBroker 모의투자 모드로 생성)
+    :param max_cycles: 주어지면 이 횟수만큼 매매 주기를 실행한 뒤 종료 (부하 테스트 등)
+    :param on_cycle: 주기가 끝날 때마다 CycleTiming 을 넘겨 호출할 함수
+    :param paced: False 이면 다음 정시 경계를 기다리지 않고 바로 다음 주기를 시작 (체결 확인만 수행)
+    """
+    setup_logging()
+    logger.info("자동매매 시스템을 시작합니다.")
 
     try:
         # 1. 모든 컴포넌트 초기화 (실전 투자 모드)
-        broker = KISBroker(mock=True, force_open=True)
+        if broker is None:
+            broker = KISBroker(mock=True, force_open=True)
         portfolio = Portfolio(broker)
-        order_manager = OrderManager(broker, portfolio)
+        # 체결/분봉 아카이브 (재생/분석용, 설정에서 켠 경우만)
+        market_data = MarketDataService(broker, archive=ArchiveWriter() if ARCHIVE_ENABLED else None)
+        order_manager = OrderManager(broker, portfolio, market_data)
+        if SHARD_WORKERS > 1:
+            # 시세 조회/신호 계산을 워커 프로세스에 나눠 실행 (주문은 이 프로세스에서만 접수)
+            pipeline = ShardedPipeline(broker, portfolio, order_manager, workers=SHARD_WORKERS)
+        else:
+            pipeline = TradingPipeline(broker, portfolio, order_manager)
+        scheduler = CycleScheduler(LOOP_INTERVAL_SECONDS)  # 정시 경계에 맞춘 고정 주기
+        calendar = MarketCalendar(broker)  # 휴장일을 반영한 개장 시각 확인
+        broker.calendar = calendar
+        register_runtime_metrics(market_data, order_manager, pipeline)
+        if metrics.METRICS_ENABLED:
+            metrics_server = metrics.start_http_server()  # Prometheus 수집용 /metrics
+        # 구간 시간 기록 (설정), 시그널/파일 플래그로 요청하는 프로파일 캡처
+        profiler = ProfilingController()
+        profiler.install_signal_handler()
+        # config.cfg 의 전략/지표 파라미터 변경을 주기 사이에 적용 (재시작 없이 캐시/상태 유지)
+        reloader = ConfigReloader() if HOT_RELOAD else None
+        # 재시작 시 유효한 체크포인트가 있으면 후보 종목/스크리닝/체결 대기 주문/분봉을 복원
+        checkpointer = Checkpointer() if CHECKPOINT_ENABLED else None
+        restored = checkpointer.restore(pipeline) if checkpointer is not None else None
 
         order_manager._send_telegram_message("자동매매 시스템이 시작되었습니다.")
-        print("초기화 완료. 메인 루프를 시작합니다.")
+        logger.info("초기화 완료. 메인 루프를 시작합니다.")
         
-        # 전체 상장 종목 조회 (시스템 시작 시 한 번만)
-        all_stocks = broker.get_all_listed_stocks()
+        # 전체 상장 종목 조회 (시스템 시작 시 한 번만, 복원한 경우 생략)
         global CANDIDATE_STOCK_CODES
-        CANDIDATE_STOCK_CODES = [stock['code'] for stock in all_stocks]
-        print(f"매수 후보 종목 {len(CANDIDATE_STOCK_CODES)}개 로드 완료")
+        if restored is not None and restored.candidate_codes:
+            CANDIDATE_STOCK_CODES = restored.candidate_codes
+        else:
+            all_stocks = broker.get_all_listed_stocks()
+            CANDIDATE_STOCK_CODES = [stock['code'] for stock in all_stocks]
+            # 섹터별 노출 한도 집계에 사용
+            order_manager.risk_engine.set_sectors({stock['code']: stock.get('sector') for stock in all_stocks})
+        logger.info("매수 후보 종목 %d개 로드 완료", len(CANDIDATE_STOCK_CODES))
+        if restored is not None and paced and scheduler.resume(restored.next_slot):
+            # 재시작 전에 마친 주기를 다시 실행하지 않고 예정된 다음 주기부터 이어서 실행합니다.
+            logger.info("중단 전 일정에 따라 %s에 다음 주기를 시작합니다.", scheduler.next_slot().strftime('%H:%M:%S'))
+            wait_for_next_cycle(order_manager, scheduler.seconds_until_next())
 
         # --- 메인 루프 ---
+        cycles = 0
         while True:
             # 실전투자 모드에서만 장 시간 확인
             if not broker.mock and not broker._is_market_open():
-                print(f"[{datetime.now()}] 장이 열리지 않았습니다. 다음 개장까지 대기합니다.")
-                # 실제 운영 시에는 다음 날 개장 시간까지 대기하는 로직이 필요합니다.
-                # 여기서는 테스트를 위해 1시간 대기 후 재시도합니다.
-                time.sleep(3600)
+                market_data.archive_minute_bars(flush=True)
+                wait_for_session(broker, pipeline, calendar, CANDIDATE_STOCK_CODES, checkpointer)
+                continue
+
+            if reloader is not None and (change := reloader.check()):
+                pipeline.apply_config(change)
+            profiler.begin_cycle()
+            timing, deadline = scheduler.begin_cycle()
+            logger.info("새로운 매매 주기를 시작합니다. (예정 시각 %s)", timing.scheduled_at.strftime('%H:%M:%S'))
+            try:
+                run_trading_cycle(broker, portfolio, order_manager, CANDIDATE_STOCK_CODES, pipeline, timing, deadline)
+            except MarketClosedError:
+                # 주기 중 장이 종료되면 다음 개장까지 대기합니다.
+                msg = "장이 종료되었습니다. 다음 개장까지 대기합니다."
+                logger.info(msg)
+                order_manager._send_telegram_message(msg)
+                continue
+            scheduler.end_cycle(timing)
+            if on_cycle is not None:
+                on_cycle(timing)
+            profiler.end_cycle(timing)
+            market_data.archive_minute_bars()
+            if checkpointer is not None:
+                checkpointer.save(pipeline, CANDIDATE_STOCK_CODES, scheduler.next_slot())
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                logger.info("매매 주기 %d회를 마쳐 자동매매 시스템을 종료합니다.", cycles)
+                break
+            if not paced:
+                order_manager.process_fills()
                 continue
 
-            print(f"\n[{datetime.now()}] 새로운 매매 주기를 시작합니다.")
-            
-            # 2. 포트폴리오 최신화 (실시간 계좌 잔고 반영)
-            portfolio.update_from_broker()
-
-            # 3. 보유 종목 매도 신호 확인
-            print("\n--- 보유 종목 매도 신호 확인 ---")
-            holdings_to_check = list(portfolio.holdings.keys())
-            for stock_code in holdings_to_check:
-                holding_details = portfolio.get_holding(stock_code)
-                if not holding_details or holding_details['quantity'] == 0:
-                    continue
-                
-                print(f"[{stock_code} ({holding_details['name']})] 확인 중...")
-                
-                # 일봉 데이터 가져오기 (최근 60일치로 지표 계산)
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - pd.Timedelta(days=60)).strftime('%Y%m%d')
-                df = broker.get_daily_price(stock_code, start_date=start_date, end_date=end_date)
-
-                if df is None or df.empty:
-                    print(f"[{stock_code}] 시세 데이터 조회에 실패했습니다.")
-                    continue
-                
-                # 데이터 전처리 (컬럼명 변경 및 타입 변환)
-                df.rename(columns={'stck_clpr': 'close', 'acml_vol': 'volume'}, inplace=True)
-                df['close'] = pd.to_numeric(df['close'])
-                df['volume'] = pd.to_numeric(df['volume'])
-                
-                df_with_indicators = add_all_indicators(df.copy())
-                
-                sell_signal, reason = check_sell_signal(df_with_indicators, holding_details['avg_price'])
-                if sell_signal:
-                    order_manager._send_telegram_message(f"[매도 신호] {stock_code}\n- 사유: {reason}")
-                    order_manager.execute_sell_order(stock_code)
-                else:
-                    print(f"[{stock_code}] 매도 신호 없음.")
-
-            # 4. 종목 스크리닝 (매 주기마다 실행하면 부하가 클 수 있으므로 필요시 주기 조정)
-            print("\n--- 종목 스크리닝 실행 ---")
-            # 전체 후보 종목을 배치로 나누어 스크리닝
-            batch_size = 20  # 한 번에 처리할 종목 수
-            screened_stocks = []
-            
-            for i in range(0, min(len(CANDIDATE_STOCK_CODES), 60), batch_size):  # 최대 60개 종목까지
-                batch = CANDIDATE_STOCK_CODES[i:i+batch_size]
-                print(f"배치 {i//batch_size + 1}: {len(batch)}개 종목 스크리닝 중...")
-                batch_screened = screen_stocks(batch, broker)
-                screened_stocks.extend(batch_screened)
-                
-                # API 호출 제한을 위한 대기
-                if i + batch_size < len(CANDIDATE_STOCK_CODES):
-                    time.sleep(2)  # 2초 대기
-            
-            print(f"스크리닝 결과: {len(screened_stocks)}개 종목 선정")
-            
-            # 5. 신규 종목 매수 신호 확인
-            print("\n--- 신규 매수 대상 종목 확인 ---")
-            # 스크리닝된 종목을 우선으로 하고, 없으면 상위 종목들 확인
-            if screened_stocks:
-                stocks_to_check = screened_stocks[:10]  # 스크리닝된 종목 중 최대 10개
-                print(f"스크리닝된 종목 우선 확인: {len(stocks_to_check)}개")
-            else:
-                stocks_to_check = CANDIDATE_STOCK_CODES[:10]  # 상위 10개 종목
-                print(f"스크리닝 결과가 없어 상위 종목 확인: {len(stocks_to_check)}개")
-            
-            for stock_code in stocks_to_check:
-                if stock_code in portfolio.holdings:
-                    print(f"[{stock_code}] 이미 보유 중인 종목이므로 건너뜁니다.")
-                    continue
-
-                print(f"[{stock_code}] 확인 중...")
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - pd.Timedelta(days=60)).strftime('%Y%m%d')
-                df = broker.get_daily_price(stock_code, start_date=start_date, end_date=end_date)
-
-                if df is None or df.empty:
-                    print(f"[{stock_code}] 시세 데이터 조회에 실패했습니다.")
-                    continue
-                
-                df.rename(columns={'stck_clpr': 'close', 'acml_vol': 'volume'}, inplace=True)
-                df['close'] = pd.to_numeric(df['close'])
-                df['volume'] = pd.to_numeric(df['volume'])
-
-                df_with_indicators = add_all_indicators(df.copy())
-                
-                buy_signal, reason = check_buy_signal(df_with_indicators)
-                if buy_signal:
-                    order_manager._send_telegram_message(f"[매수 신호] {stock_code}\n- 사유: {reason}")
-                    order_manager.execute_buy_order(stock_code)
-                else:
-                    print(f"[{stock_code}] 매수 신호 없음.")
-
-            # 6. 다음 주기까지 대기
-            print(f"\n[{datetime.now()}] 모든 작업 완료. {LOOP_INTERVAL_MINUTES}분 후 다음 주기를 시작합니다.")
-            time.sleep(LOOP_INTERVAL_SECONDS)
+            # 6. 다음 정시 경계까지 대기 (작업 시간과 관계없이 주기가 밀리지 않음)
+            wait_seconds = scheduler.seconds_until_next()
+            logger.info("모든 작업 완료. %s에 다음 주기를 시작합니다. (%.0f초 후)",
+                        scheduler.next_slot().strftime('%H:%M:%S'), wait_seconds)
+            wait_for_next_cycle(order_manager, wait_seconds)
 
     except MarketClosedError:
         msg = "장이 종료되어 자동매매 시스템을 중지합니다."
-        print(f"[{datetime.now()}] {msg}")
+        logger.info(msg)
         if 'order_manager' in locals() and order_manager.telegram_bot:
             order_manager._send_telegram_message(msg)
     except KeyboardInterrupt:
         msg = "사용자에 의해 자동매매 시스템이 중지되었습니다."
-        print(f"[{datetime.now()}] {msg}")
+        logger.info(msg)
         if 'order_manager' in locals() and order_manager.telegram_bot:
             order_manager._send_telegram_message(msg)
     except Exception as e:
         msg = f"자동매매 시스템에 심각한 오류가 발생하여 중지되었습니다.\n오류: {e}"
-        print(f"[{datetime.now()}] {msg}")
+        logger.exception(msg)
         if 'order_manager' in locals() and order_manager.telegram_bot:
             order_manager._send_telegram_message(msg)
+    finally:
+        if 'pipeline' in locals():
+            pipeline.close()
+        if 'order_manager' in locals():
+            order_manager.close()
+        if 'market_data' in locals():
+            market_data.archive_minute_bars(flush=True)
+        if 'profiler' in locals():
+            profiler.close()
+        if 'metrics_server' in locals():
+            metrics_server.shutdown()
 
 if __name__ == "__main__":
     run_trading_bot()
\ No newline at end of file
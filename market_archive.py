@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+체결(tick)/분봉(bar) 아카이브
+
+매매일의 시세를 종목별, 일자별 컬럼 파일로 보관하고 다시 재생(replay)합니다.
+
+    {root}/{YYYYMMDD}/{kind}/{종목코드}.dat   청크 데이터 (컬럼별 연속 블록)
+    {root}/{YYYYMMDD}/{kind}/{종목코드}.idx   청크 색인 (JSON Lines, 청크당 한 줄)
+
+- 시각과 가격 컬럼은 청크 첫 값 + int32 차분으로 저장하고(delta encoding), 차분이 int32 를 넘으면 int64 로 저장합니다.
+- compress 를 켜면 컬럼 블록을 zlib 으로 압축합니다.
+- 색인에는 청크별 시작/종료 시각이 있어 구간 조회 시 필요한 청크만 읽습니다.
+- 데이터 파일은 메모리 매핑으로 열어 읽기 버퍼 복사 없이 복원합니다. (차분 컬럼은 청크당 누적합 1회)
+- 시각은 minute_bars 와 같이 현지 벽시계 시각 기준 epoch 초입니다.
+"""
+
+import argparse
+import bisect
+import configparser
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    archive_params = config['archive']
+    ARCHIVE_ENABLED = archive_params.getboolean('enabled', False)   # 체결/분봉 아카이브 기록 여부
+    ARCHIVE_DIR = archive_params.get('dir', 'market_archive')
+    ARCHIVE_COMPRESS = archive_params.getboolean('compress', False)  # 컬럼 블록 zlib 압축
+    ARCHIVE_CHUNK_ROWS = archive_params.getint('chunk_rows', 4096)   # 청크당 행 수
+except KeyError:
+    ARCHIVE_ENABLED = False
+    ARCHIVE_DIR = 'market_archive'
+    ARCHIVE_COMPRESS = False
+    ARCHIVE_CHUNK_ROWS = 4096
+
+# 종류별 컬럼 (모두 정수로 저장: 시각 epoch 초, 가격 원, 거래량 주)
+KINDS = {
+    'tick': ('time', 'price', 'volume'),
+    'bar': ('time', 'open', 'high', 'low', 'close', 'volume'),
+}
+_DELTA_COLUMNS = {'time', 'price', 'open', 'high', 'low', 'close'}
+_SECONDS_PER_DAY = 86400
+
+logger = logging.getLogger(__name__)
+
+
+def _day_of(epoch: int) -> str:
+    """ 벽시계 기준 epoch 초의 일자 (YYYYMMDD) """
+    return str(np.datetime64(int(epoch) // _SECONDS_PER_DAY, 'D')).replace('-', '')
+
+
+def _read_index(path: str, repair: bool = False) -> list[dict]:
+    """
+    청크 색인을 읽습니다. 색인을 추가하는 도중 종료되어 잘린 마지막 줄은 건너뜁니다.
+    :param repair: True 이면 잘린 줄을 파일에서도 잘라내 다음 청크 색인이 새 줄에서 시작되도록 합니다. (기록기 재시작 시)
+    """
+    chunks, complete = [], 0
+    with open(f"{path}.idx", 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            complete += len(line)
+            if not line.strip():
+                continue
+            try:
+                chunks.append(json.loads(line))
+            except ValueError:
+                logger.warning("청크 색인의 손상된 줄을 건너뜁니다: %s.idx", path)
+    if repair and complete < os.path.getsize(f"{path}.idx"):
+        logger.warning("청크 색인의 잘린 마지막 줄을 제거합니다: %s.idx", path)
+        with open(f"{path}.idx", 'r+b') as f:
+            f.truncate(complete)
+    return chunks
+
+
+def _encode(values: np.ndarray, delta: bool) -> tuple[str, int, bytes]:
+    """ 컬럼 1개를 (인코딩, 기준값, 바이트)로 변환합니다. """
+    if delta:
+        deltas = np.diff(values, prepend=values[0])
+        if deltas.min() >= np.iinfo(np.int32).min and deltas.max() <= np.iinfo(np.int32).max:
+            return 'delta32', int(values[0]), deltas.astype(np.int32).tobytes()
+    return 'raw64', 0, values.astype(np.int64).tobytes()
+
+
+def _decode(encoding: str, base: int, data, rows: int) -> np.ndarray:
+    if encoding == 'raw64':
+        return np.frombuffer(data, dtype=np.int64, count=rows)
+    deltas = np.frombuffer(data, dtype=np.int32, count=rows)
+    out = np.cumsum(deltas, dtype=np.int64)
+    out += base
+    return out
+
+
+class _ChunkBuffer:
+    """ 종목 1개, 종류 1개의 기록 대기 행 (컬럼 x chunk_rows 고정 배열) """
+    def __init__(self, columns: int, chunk_rows: int):
+        self.values = np.zeros((columns, chunk_rows), dtype=np.int64)
+        self.count = 0
+        self.day = None
+        self.last_time = None
+
+
+class ArchiveWriter:
+    """
+    체결/분봉을 종목별 청크 파일로 기록합니다. 행은 버퍼에 모았다가 chunk_rows 개가 차면 (또는 flush 시) 한 청크로 씁니다.
+    같은 종목의 행은 시각 순으로 추가되어야 하며, 이미 기록한 시각보다 이전 행은 건너뜁니다. (스레드 안전)
+    """
+    def __init__(self, root: str = ARCHIVE_DIR, compress: bool = ARCHIVE_COMPRESS, chunk_rows: int = ARCHIVE_CHUNK_ROWS):
+        """
+        :param root: 아카이브 디렉터리
+        :param compress: True 이면 컬럼 블록을 zlib 으로 압축
+        :param chunk_rows: 청크당 최대 행 수
+        """
+        self.root = root
+        self.compress = compress
+        self.chunk_rows = chunk_rows
+        self._buffers: dict[tuple[str, str], _ChunkBuffer] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, day: str, kind: str, stock_code: str) -> str:
+        return os.path.join(self.root, day, kind, stock_code)
+
+    def _buffer(self, kind: str, stock_code: str) -> _ChunkBuffer:
+        buffer = self._buffers.get((kind, stock_code))
+        if buffer is None:
+            buffer = self._buffers[(kind, stock_code)] = _ChunkBuffer(len(KINDS[kind]), self.chunk_rows)
+        return buffer
+
+    def _write_chunk(self, kind: str, stock_code: str, buffer: _ChunkBuffer):
+        if not buffer.count:
+            return
+        rows = buffer.count
+        path = self._path(buffer.day, kind, stock_code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        columns, blocks = [], []
+        for name, values in zip(KINDS[kind], buffer.values[:, :rows]):
+            encoding, base, data = _encode(values, name in _DELTA_COLUMNS)
+            if self.compress:
+                data = zlib.compress(data, 1)
+            columns.append([encoding, base, len(data)])
+            blocks.append(data)
+
+        # 데이터를 먼저 쓰고 색인을 나중에 추가하므로, 색인은 항상 기록이 끝난 청크만 가리킵니다.
+        with open(f"{path}.dat", 'ab') as f:
+            offset = f.tell()
+            for data in blocks:
+                f.write(data)
+        entry = {'start': int(buffer.values[0, 0]), 'end': int(buffer.values[0, rows - 1]), 'rows': rows,
+                 'offset': offset, 'compressed': self.compress, 'columns': columns}
+        with open(f"{path}.idx", 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        buffer.count = 0
+
+    def _last_archived(self, kind: str, stock_code: str, day: str) -> int | None:
+        """ 해당 일자 파일에 기록된 마지막 시각 (없으면 None) """
+        try:
+            chunks = _read_index(self._path(day, kind, stock_code), repair=True)
+        except FileNotFoundError:
+            return None
+        return chunks[-1]['end'] if chunks else None
+
+    def append(self, kind: str, stock_code: str, values: np.ndarray):
+        """
+        여러 행을 한 번에 추가합니다.
+        :param kind: 'tick' 또는 'bar'
+        :param values: (컬럼 수, 행 수) 배열. 행 순서는 KINDS[kind] 와 같고 열은 시각 순이어야 합니다.
+        """
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.integer):
+            values = np.rint(values)
+        values = values.astype(np.int64, copy=False)
+        with self._lock:
+            buffer = self._buffer(kind, stock_code)
+            times = values[0]
+            if buffer.last_time is None and len(times):
+                # 재시작한 경우 이미 기록된 청크 이후부터 이어서 기록합니다.
+                buffer.last_time = self._last_archived(kind, stock_code, _day_of(times[0]))
+            if buffer.last_time is not None:
+                # 분봉은 같은 시각을 다시 기록하지 않고, 체결은 같은 초의 여러 건을 허용합니다.
+                side = 'right' if kind == 'bar' else 'left'
+                values = values[:, np.searchsorted(times, buffer.last_time, side=side):]
+                times = values[0]
+            position = 0
+            while position < len(times):
+                day = _day_of(times[position])
+                if buffer.day != day:
+                    self._write_chunk(kind, stock_code, buffer)
+                    buffer.day = day
+                # 같은 날, 청크에 남은 자리만큼 복사
+                day_end = np.searchsorted(times, (int(times[position]) // _SECONDS_PER_DAY + 1) * _SECONDS_PER_DAY)
+                take = int(min(day_end - position, self.chunk_rows - buffer.count))
+                buffer.values[:, buffer.count:buffer.count + take] = values[:, position:position + take]
+                buffer.count += take
+                position += take
+                if buffer.count == self.chunk_rows:
+                    self._write_chunk(kind, stock_code, buffer)
+            if len(times):
+                buffer.last_time = int(times[-1])
+
+    def append_tick(self, stock_code: str, epoch: int, price: float, volume: float):
+        """ 체결 1건을 추가합니다. (체결 수신 스레드에서 호출) """
+        self.append('tick', stock_code, np.array([[epoch], [price], [volume]]))
+
+    def flush(self):
+        """ 버퍼에 남은 행을 모두 청크로 기록합니다. """
+        with self._lock:
+            for (kind, stock_code), buffer in self._buffers.items():
+                self._write_chunk(kind, stock_code, buffer)
+
+    close = flush
+
+
+class ArchiveReader:
+    """
+    아카이브를 읽습니다. 데이터 파일은 메모리 매핑으로 열고, 색인으로 필요한 청크만 복원합니다.
+    """
+    def __init__(self, root: str = ARCHIVE_DIR):
+        """
+        :param root: 아카이브 디렉터리
+        """
+        self.root = root
+        self._index: dict[str, list[dict]] = {}
+        self._maps: dict[str, np.ndarray] = {}
+
+    def days(self) -> list[str]:
+        """ 기록된 일자 목록 (YYYYMMDD) """
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(day for day in os.listdir(self.root) if day.isdigit())
+
+    def symbols(self, day: str, kind: str = 'bar') -> list[str]:
+        """ 해당 일자에 기록된 종목 코드 목록 """
+        directory = os.path.join(self.root, day, kind)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.idx'))
+
+    def _chunks(self, path: str) -> list[dict]:
+        chunks = self._index.get(path)
+        if chunks is None:
+            chunks = self._index[path] = _read_index(path)
+        return chunks
+
+    def _map(self, path: str) -> np.ndarray:
+        data = self._maps.get(path)
+        if data is None:
+            data = self._maps[path] = np.memmap(f"{path}.dat", dtype=np.uint8, mode='r')
+        return data
+
+    def _decode_chunk(self, path: str, kind: str, chunk: dict) -> dict[str, np.ndarray]:
+        data = self._map(path)
+        offset = chunk['offset']
+        columns = {}
+        for name, (encoding, base, size) in zip(KINDS[kind], chunk['columns']):
+            block = data[offset:offset + size]
+            if chunk['compressed']:
+                block = zlib.decompress(block)
+            columns[name] = _decode(encoding, base, block, chunk['rows'])
+            offset += size
+        return columns
+
+    def iter_chunks(self, day: str, kind: str, stock_code: str, start: int | None = None, end: int | None = None):
+        """
+        [start, end] 구간과 겹치는 청크를 시각 순으로 복원해 { 컬럼: 배열 } 로 돌려줍니다. (구간 밖 행은 잘라냄)
+        :param start: 시작 시각 (epoch 초, 포함)
+        :param end: 종료 시각 (epoch 초, 포함)
+        """
+        path = os.path.join(self.root, day, kind, stock_code)
+        chunks = self._chunks(path)
+        first = 0 if start is None else bisect.bisect_left([chunk['end'] for chunk in chunks], start)
+        for chunk in chunks[first:]:
+            if end is not None and chunk['start'] > end:
+                break
+            columns = self._decode_chunk(path, kind, chunk)
+            times = columns['time']
+            lo = 0 if start is None else np.searchsorted(times, start, side='left')
+            hi = len(times) if end is None else np.searchsorted(times, end, side='right')
+            if lo or hi < len(times):
+                columns = {name: values[lo:hi] for name, values in columns.items()}
+            yield columns
+
+    def read(self, day: str, kind: str, stock_code: str, start: int | None = None, end: int | None = None) -> dict[str, np.ndarray]:
+        """ 종목 1개의 [start, end] 구간을 { 컬럼: 배열 } 로 읽습니다. """
+        parts = list(self.iter_chunks(day, kind, stock_code, start, end))
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return {name: np.empty(0, dtype=np.int64) for name in KINDS[kind]}
+        return {name: np.concatenate([part[name] for part in parts]) for name in KINDS[kind]}
+
+    def replay(self, day: str, kind: str = 'bar', stock_codes: list[str] | None = None,
+               step: int = 60, speed: float | None = None):
+        """
+        하루치 시세를 시각 순으로 재생합니다. step 초 구간마다 그 구간에 행이 있는 종목만 모아 돌려줍니다.
+        종목별로 청크 단위로만 복원하므로 전체 종목을 재생해도 메모리에는 종목당 청크 1개만 올라갑니다.
+        :param stock_codes: 재생할 종목 (None 이면 전체)
+        :param step: 구간 길이 (초)
+        :param speed: 실제 시간 대비 배속 (None 이면 대기 없이 최대 속도)
+        :return: (구간 시작 시각, { 종목코드: { 컬럼: 배열 } }) 를 차례로 내는 제너레이터
+        """
+        stock_codes = stock_codes if stock_codes is not None else self.symbols(day, kind)
+        streams = {}
+        heap = []  # (다음 행의 시각, 종목코드)
+        for stock_code in stock_codes:
+            chunks = self.iter_chunks(day, kind, stock_code)
+            current = next(chunks, None)
+            if current is not None and len(current['time']):
+                streams[stock_code] = [chunks, current, 0]
+                heap.append((int(current['time'][0]), stock_code))
+        heapq.heapify(heap)
+        if not heap:
+            return
+
+        first = heap[0][0] // step * step
+        started = time.monotonic()
+        while heap:
+            window_start = heap[0][0] // step * step
+            window_end = window_start + step
+            if speed:
+                delay = (window_start - first) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            batch = {}
+            while heap and heap[0][0] < window_end:
+                _, stock_code = heapq.heappop(heap)
+                stream = streams[stock_code]
+                parts = []
+                while True:
+                    chunks, current, cursor = stream
+                    times = current['time']
+                    stop = int(np.searchsorted(times, window_end, side='left'))
+                    parts.append({name: values[cursor:stop] for name, values in current.items()})
+                    if stop < len(times):
+                        stream[2] = stop
+                        heapq.heappush(heap, (int(times[stop]), stock_code))
+                        break
+                    current = next(chunks, None)
+                    if current is None or not len(current['time']):
+                        break
+                    stream[1], stream[2] = current, 0
+                batch[stock_code] = parts[0] if len(parts) == 1 else \
+                    {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+            yield window_start, batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="체결/분봉 아카이브 조회 및 재생")
+    parser.add_argument('--root', default=ARCHIVE_DIR, help="아카이브 디렉터리")
+    parser.add_argument('--day', default=None, help="재생할 일자 (YYYYMMDD, 생략하면 마지막 일자)")
+    parser.add_argument('--kind', default='bar', choices=sorted(KINDS), help="재생할 종류")
+    parser.add_argument('--step', type=int, default=60, help="재생 구간 길이 (초)")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.root)
+    days = reader.days()
+    if not days:
+        print(f"{args.root} 에 기록된 시세가 없습니다.")
+        return
+    day = args.day or days[-1]
+    symbols = reader.symbols(day, args.kind)
+
+    started = time.perf_counter()
+    windows = rows = 0
+    first = last = None
+    for window_start, batch in reader.replay(day, args.kind, symbols, step=args.step):
+        windows += 1
+        rows += sum(len(columns['time']) for columns in batch.values())
+        first = window_start if first is None else first
+        last = window_start + args.step
+    elapsed = time.perf_counter() - started
+    covered = (last - first) if first is not None else 0
+    print(f"{day} {args.kind}: {len(symbols)}개 종목, {rows:,}행, {windows}개 구간 재생 {elapsed:.2f}초"
+          f" (시장 시간 {covered / 3600:.1f}시간, 실시간 대비 {covered / elapsed if elapsed else 0:,.0f}배)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import configparser
+import json
+import logging
+import os
+from datetime import date, datetime, time as dtime, timedelta
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    market = config['market']
+    SESSION_OPEN = market.get('open_time', '09:00')      # 정규장 시작 시각 (HH:MM)
+    SESSION_CLOSE = market.get('close_time', '15:30')    # 정규장 종료 시각 (HH:MM)
+    WARMUP_MINUTES = market.getint('warmup_minutes', 15)  # 개장 몇 분 전에 준비 작업을 시작할지
+    CALENDAR_FILE = market.get('calendar_file', 'market_calendar.json')  # 휴장일 조회 결과 캐시 파일
+except KeyError:
+    SESSION_OPEN = '09:00'
+    SESSION_CLOSE = '15:30'
+    WARMUP_MINUTES = 15
+    CALENDAR_FILE = 'market_calendar.json'
+
+logger = logging.getLogger(__name__)
+
+# 다음 개장일을 찾을 때 확인할 최대 일수 (연휴가 길어도 이 안에는 개장일이 있음)
+_MAX_LOOKAHEAD_DAYS = 30
+
+
+def _parse_time(value: str) -> dtime:
+    hour, minute = value.split(':')
+    return dtime(int(hour), int(minute))
+
+
+class MarketCalendar:
+    """
+    KRX 개장일 달력.
+    - 개장 여부는 브로커의 휴장일 조회(get_market_holidays)로 확인하고, 결과를 파일에 캐시해 하루에 한 번 정도만 조회합니다.
+    - 조회를 지원하지 않는 브로커(모의투자 등)나 조회 실패 시에는 평일을 개장일로 간주합니다.
+    """
+    def __init__(self, broker=None, cache_file: str = CALENDAR_FILE,
+                 open_time: str = SESSION_OPEN, close_time: str = SESSION_CLOSE):
+        """
+        :param broker: get_market_holidays 를 제공하는 브로커 (None 이면 평일 기준)
+        :param cache_file: 휴장일 조회 결과 캐시 파일 (비우면 캐시하지 않음)
+        :param open_time: 정규장 시작 시각 (HH:MM)
+        :param close_time: 정규장 종료 시각 (HH:MM)
+        """
+        self.broker = broker
+        self.cache_file = cache_file
+        self.open_time = _parse_time(open_time)
+        self.close_time = _parse_time(close_time)
+        self._days: dict[str, bool] = {}   # { 'YYYYMMDD': 개장 여부 }
+        self._unavailable: set[str] = set()  # 조회에 실패한 기준일 (같은 날 다시 조회하지 않음)
+        self._load()
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._days = {day: bool(is_open) for day, is_open in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            logger.warning("개장일 캐시 로드 실패: %s", e)
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = f"{self.cache_file}.tmp.{os.getpid()}"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(dict(sorted(self._days.items())), f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logger.warning("개장일 캐시 저장 실패: %s", e)
+
+    def _fetch(self, key: str) -> bool:
+        """ 기준일부터의 개장 여부를 브로커에서 조회해 캐시에 더합니다. 조회했으면 True """
+        fetch = getattr(self.broker, 'get_market_holidays', None)
+        if fetch is None or key in self._unavailable:
+            return False
+        days = fetch(key)
+        if not days:
+            self._unavailable.add(key)
+            return False
+        self._days.update(days)
+        self._save()
+        logger.info("개장일 %d일치 조회 완료 (%s~)", len(days), min(days))
+        return True
+
+    def is_trading_day(self, day: date) -> bool:
+        """ 해당 날짜가 개장일인지 확인합니다. """
+        key = day.strftime('%Y%m%d')
+        if key not in self._days:
+            self._fetch(key)
+        if key in self._days:
+            return self._days[key]
+        return day.weekday() < 5  # 조회할 수 없으면 평일 기준
+
+    def session_open(self, day: date) -> datetime:
+        return datetime.combine(day, self.open_time)
+
+    def session_close(self, day: date) -> datetime:
+        return datetime.combine(day, self.close_time)
+
+    def is_open(self, now: datetime | None = None) -> bool:
+        """ 지금 정규장이 열려 있는지 확인합니다. """
+        now = now or datetime.now()
+        if not self.open_time <= now.time() <= self.close_time:
+            return False
+        return self.is_trading_day(now.date())
+
+    def next_open(self, now: datetime | None = None) -> datetime:
+        """
+        다음 정규장 시작 시각. 장 중이면 오늘 시작 시각을 돌려줍니다.
+        """
+        now = now or datetime.now()
+        day = now.date()
+        if now.time() > self.close_time:
+            day += timedelta(days=1)
+        for _ in range(_MAX_LOOKAHEAD_DAYS):
+            if self.is_trading_day(day):
+                return self.session_open(day)
+            day += timedelta(days=1)
+        raise RuntimeError(f"{_MAX_LOOKAHEAD_DAYS}일 안에 개장일을 찾지 못했습니다.")
@@ -0,0 +1,289 @@
+import asyncio
+import configparser
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from rate_limiter import RateLimiter
+from minute_bars import MinuteBarStore, _minute_of
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    DATA_RATE_LIMIT_PER_SECOND = trading_control.getfloat('data_rate_limit_per_second', 10)  # 시세 API 초당 호출 한도
+    BAR_LOOKBACK_DAYS = trading_control.getint('bar_lookback_days', 60)  # 일봉 조회 기간 (일)
+except KeyError:
+    DATA_RATE_LIMIT_PER_SECOND = 10
+    BAR_LOOKBACK_DAYS = 60
+
+logger = logging.getLogger(__name__)
+
+# 스냅샷에 아직 없는 항목 표시 (조회 실패로 저장된 None 과 구분)
+_MISSING = object()
+
+
+def normalize_daily_bars(df: pd.DataFrame | None) -> pd.DataFrame | None:
+    """ 브로커 일봉 응답을 'close', 'volume' 숫자 컬럼으로 정리합니다. 데이터가 없으면 None """
+    if df is None or df.empty:
+        return None
+    df = df.rename(columns={'stck_clpr': 'close', 'acml_vol': 'volume'})
+    df['close'] = pd.to_numeric(df['close'])
+    df['volume'] = pd.to_numeric(df['volume'])
+    return df
+
+
+@dataclass
+class MarketSnapshot:
+    """ 매매 주기 1회 동안 공유되는 시세 스냅샷 """
+    as_of: datetime                                # 스냅샷 기준 시각
+    bars: dict = field(default_factory=dict)       # { 종목코드: 일봉 DataFrame 또는 None(조회 실패) }
+    quotes: dict = field(default_factory=dict)     # { 종목코드: 현재가 또는 None(조회 실패) }
+    minutes: dict = field(default_factory=dict)    # { 종목코드: 반영한 분봉 수 } (분봉은 minute_bars 에 누적)
+
+
+class MarketDataService:
+    """
+    일봉/현재가 조회 창구. 매매 주기마다 스냅샷을 새로 시작하고, 주기 안에서는 한 종목을 한 번만 조회합니다.
+    - 조회 결과는 스냅샷에 보관되므로 매도 흐름, 스크리닝, 주문 접수가 같은 데이터를 봅니다.
+    - 같은 종목을 여러 스레드/단계가 동시에 요청하면 첫 요청만 브로커를 호출하고 나머지는 그 결과를 기다립니다. (single-flight)
+    - 오늘 일봉이 있으면 그 종가를 현재가로 사용하므로 주문 수량 계산을 위해 현재가를 다시 조회하지 않습니다.
+    - 돌려주는 DataFrame 은 스냅샷과 공유되므로 수정하려면 복사해서 사용합니다.
+    """
+    def __init__(self, broker, rate_per_second: float | None = None, lookback_days: int = BAR_LOOKBACK_DAYS,
+                 archive=None, rate_limiter: RateLimiter | None = None):
+        """
+        :param broker: KISBroker 인스턴스 (또는 같은 인터페이스의 브로커)
+        :param rate_per_second: 시세 API 초당 호출 한도 (기본값: DATA_RATE_LIMIT_PER_SECOND)
+        :param lookback_days: 일봉 조회 기간 (일)
+        :param archive: 체결/분봉을 기록할 ArchiveWriter (None 이면 기록하지 않음)
+        :param rate_limiter: 다른 프로세스와 함께 쓸 호출 빈도 제한기 (주어지면 rate_per_second 는 무시)
+        """
+        self.broker = broker
+        self.archive = archive
+        self.rate_limiter = rate_limiter or RateLimiter(rate_per_second or DATA_RATE_LIMIT_PER_SECOND)
+        self.lookback_days = lookback_days
+        self.stats = Counter()  # 조회/재사용/중복 제거 횟수
+        self._lock = threading.Lock()
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self.minute_bars = MinuteBarStore()  # 종목별 당일 분봉 (주기와 관계없이 누적)
+        self.snapshot = MarketSnapshot(as_of=datetime.now())
+        self._preloaded: tuple[dict, datetime] | None = None  # (체크포인트에서 복원한 일봉, 유효 기한)
+
+    def begin_cycle(self, as_of: datetime | None = None) -> MarketSnapshot:
+        """
+        새 스냅샷을 시작합니다. 이전 주기의 조회 결과는 더 이상 사용하지 않습니다.
+        체크포인트에서 복원한 일봉이 아직 유효하면 새 스냅샷에 미리 채웁니다.
+        """
+        as_of = as_of or datetime.now()
+        with self._lock:
+            previous = self.snapshot
+            self.snapshot = MarketSnapshot(as_of=as_of)
+            if self._preloaded is not None:
+                bars, valid_until = self._preloaded
+                if as_of < valid_until:
+                    self.snapshot.bars.update(bars)
+                else:
+                    self._preloaded = None
+        if previous.bars or previous.quotes:
+            logger.debug("시세 스냅샷 종료: 일봉 %d개, 현재가 %d개 (%s)", len(previous.bars), len(previous.quotes),
+                         dict(self.stats))
+        return self.snapshot
+
+    def cache_stats(self) -> dict[str, int]:
+        """ 조회/재사용/중복 제거 횟수 복사본 (예: {'bars_fetched': 30, 'bars_hit': 10, 'quotes_from_bars': 2}) """
+        with self._lock:
+            return dict(self.stats)
+
+    def _cached(self, kind: str, stock_code: str):
+        with self._lock:
+            return getattr(self.snapshot, kind).get(stock_code, _MISSING)
+
+    def has_bars(self, stock_code: str) -> bool:
+        """ 이번 주기 스냅샷에 일봉 조회 결과(실패 포함)가 있는지 확인합니다. """
+        return self._cached('bars', stock_code) is not _MISSING
+
+    def _claim(self, kind: str, stock_code: str) -> tuple[Future, dict | None]:
+        """
+        조회를 맡을 호출을 정합니다.
+        스냅샷에 있거나 같은 요청이 진행 중이면 (그 결과의 Future, None), 이 호출이 조회해야 하면 (새 Future, 결과를 저장할 스냅샷)
+        """
+        key = (kind, stock_code)
+        with self._lock:
+            cache = getattr(self.snapshot, kind)
+            if stock_code in cache:
+                self.stats[f'{kind}_hit'] += 1
+                flight = Future()
+                flight.set_result(cache[stock_code])
+                return flight, None
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.stats[f'{kind}_deduplicated'] += 1
+                return flight, None
+            flight = self._inflight[key] = Future()
+            return flight, cache
+
+    def _abandon(self, kind: str, stock_code: str, flight: Future, error: BaseException):
+        """ 조회를 맡은 호출이 실패하면 기다리던 호출에 예외를 전달합니다. (예외는 스냅샷에 저장하지 않음) """
+        with self._lock:
+            del self._inflight[(kind, stock_code)]
+        flight.set_exception(error)
+
+    def _fetch(self, kind: str, stock_code: str, flight: Future, cache: dict, loader):
+        """ 조회를 맡은 호출이 loader() 결과(실패로 인한 None 포함)를 요청을 시작한 시점의 스냅샷에 저장하고 돌려줍니다. """
+        try:
+            result = loader()
+        except BaseException as e:
+            self._abandon(kind, stock_code, flight, e)
+            raise
+        with self._lock:
+            cache[stock_code] = result
+            del self._inflight[(kind, stock_code)]
+            self.stats[f'{kind}_fetched'] += 1
+        flight.set_result(result)
+        return result
+
+    def _single_flight(self, kind: str, stock_code: str, loader):
+        """
+        스냅샷에 있으면 그대로, 같은 요청이 진행 중이면 그 결과를, 둘 다 아니면 loader() 를 호출해 돌려줍니다.
+        호출 한도 토큰은 실제로 브로커를 호출하는 경우에만 사용합니다.
+        """
+        flight, cache = self._claim(kind, stock_code)
+        if cache is None:
+            return flight.result()
+
+        def load():
+            self.rate_limiter.acquire()
+            return loader()
+        return self._fetch(kind, stock_code, flight, cache, load)
+
+    def _load_bars(self, stock_code: str, as_of: datetime) -> pd.DataFrame | None:
+        end_date = as_of.strftime('%Y%m%d')
+        start_date = (as_of - timedelta(days=self.lookback_days)).strftime('%Y%m%d')
+        df = normalize_daily_bars(self.broker.get_daily_price(stock_code, start_date=start_date, end_date=end_date))
+        if df is None:
+            logger.warning("[%s] 시세 데이터 조회에 실패했습니다.", stock_code)
+        return df
+
+    def get_bars(self, stock_code: str) -> pd.DataFrame | None:
+        """
+        최근 lookback_days 일의 일봉을 'close', 'volume' 숫자 컬럼으로 정리해 돌려줍니다. (스레드에서 호출 가능)
+        :return: 일봉 DataFrame 또는 조회 실패 시 None
+        """
+        as_of = self.snapshot.as_of
+        return self._single_flight('bars', stock_code, lambda: self._load_bars(stock_code, as_of))
+
+    async def get_bars_async(self, stock_code: str) -> pd.DataFrame | None:
+        """
+        get_bars 의 비동기 버전. 스냅샷에 있거나 같은 요청이 진행 중이면 토큰 없이 그 결과를 기다리고,
+        조회를 맡은 경우에만 호출 한도 토큰을 이벤트 루프를 막지 않고 기다립니다.
+        """
+        as_of = self.snapshot.as_of
+        flight, cache = self._claim('bars', stock_code)
+        if cache is None:
+            return await asyncio.wrap_future(flight)
+        try:
+            await self.rate_limiter.acquire_async()
+        except BaseException as e:
+            self._abandon('bars', stock_code, flight, e)
+            raise
+        return await asyncio.to_thread(self._fetch, 'bars', stock_code, flight, cache,
+                                       lambda: self._load_bars(stock_code, as_of))
+
+    def _bar_quote(self, stock_code: str):
+        """ 스냅샷에 오늘 일봉이 있으면 그 종가(= 현재가)를 돌려줍니다. """
+        df = self._cached('bars', stock_code)
+        if df is _MISSING or df is None or 'stck_bsop_date' not in df.columns:
+            return None
+        if df['stck_bsop_date'].iloc[-1] != self.snapshot.as_of.strftime('%Y%m%d'):
+            return None
+        return int(df['close'].iloc[-1])
+
+    def get_quote(self, stock_code: str) -> int | None:
+        """
+        현재가를 돌려줍니다. 이번 주기에 조회한 오늘 일봉이 있으면 그 종가를 사용합니다. (스레드에서 호출 가능)
+        :return: 현재가 또는 조회 실패 시 None
+        """
+        price = self._bar_quote(stock_code)
+        if price is not None:
+            with self._lock:
+                self.stats['quotes_from_bars'] += 1
+            return price
+        return self._single_flight('quotes', stock_code, lambda: self.broker.get_current_price(stock_code))
+
+    def preload_bars(self, bars: dict[str, pd.DataFrame], valid_until: datetime):
+        """
+        체크포인트에서 복원한 일봉을 valid_until 전에 시작하는 스냅샷에서 다시 조회하지 않고 사용하게 합니다.
+        :param bars: { 종목코드: 일봉 DataFrame }
+        :param valid_until: 이 시각 이후의 스냅샷에서는 사용하지 않음 (예: 장 시작 전 조회한 일봉은 개장 시각까지)
+        """
+        with self._lock:
+            self._preloaded = (bars, valid_until)
+            if self.snapshot.as_of < valid_until:
+                self.snapshot.bars.update(bars)
+
+    def seed_quotes(self, quotes: dict[str, int]):
+        """ 다른 프로세스가 이번 주기에 조회한 현재가를 스냅샷에 넣어 다시 조회하지 않게 합니다. """
+        with self._lock:
+            self.snapshot.quotes.update(quotes)
+
+    def _load_minutes(self, stock_code: str) -> int:
+        return self.minute_bars.ingest(stock_code, self.broker.get_minute_price(stock_code))
+
+    def get_minute_bars(self, stock_code: str, n: int | None = None) -> pd.DataFrame | None:
+        """
+        최근 분봉을 조회해 분봉 버퍼에 반영하고, 최근 n개 분봉을 'open', 'high', 'low', 'close', 'volume' 컬럼의
+        DataFrame(버퍼 뷰)으로 돌려줍니다. 주기마다 종목당 한 번만 조회합니다. (스레드에서 호출 가능)
+        실시간 체결을 받는 경우 minute_bars.on_tick 으로 같은 버퍼에 반영됩니다.
+        :param n: 돌려줄 최근 분봉 수 (None 이면 보관 중인 전체)
+        :return: 분봉 DataFrame 또는 분봉이 없으면 None
+        """
+        if hasattr(self.broker, 'get_minute_price'):  # 분봉 조회를 지원하지 않는 브로커는 실시간 체결만 반영
+            self._single_flight('minutes', stock_code, lambda: self._load_minutes(stock_code))
+        return self.minute_bars.frame(stock_code, n)
+
+    def on_tick(self, stock_code: str, timestamp: datetime, price: float, volume: float = 0):
+        """ 실시간 체결 1건을 분봉 버퍼에 반영하고, 아카이브가 있으면 기록합니다. (체결 수신 스레드에서 호출) """
+        self.minute_bars.on_tick(stock_code, timestamp, price, volume)
+        if self.archive is not None:
+            epoch = int(np.datetime64(timestamp.replace(microsecond=0), 's').astype(np.int64))
+            try:
+                self.archive.append_tick(stock_code, epoch, price, volume)
+            except Exception as e:
+                logger.warning("[%s] 체결 아카이브 기록 실패: %s", stock_code, e)
+
+    def archive_minute_bars(self, now: datetime | None = None, flush: bool = False) -> int:
+        """
+        완성된 분봉(현재 분 이전)을 아카이브에 기록합니다. 이미 기록한 분봉은 다시 쓰지 않습니다.
+        아카이브는 분석용 부가 기능이므로 기록 오류(디스크 부족, 손상된 색인 등)는 로그만 남기고 매매를 계속합니다.
+        :param flush: True 이면 버퍼에 남은 행도 모두 청크로 기록합니다. (장 종료 후)
+        :return: 기록 대상 종목 수
+        """
+        if self.archive is None:
+            return 0
+        current_minute = _minute_of(now or datetime.now())
+        archived = 0
+        try:
+            for stock_code in self.minute_bars.codes():
+                buffer = self.minute_bars.buffer(stock_code)
+                with self.minute_bars._lock:
+                    times = buffer.times()
+                    complete = int(np.searchsorted(times, current_minute, side='left'))
+                    if not complete:
+                        continue
+                    # 버퍼 뷰는 이후 분봉에 덮어써질 수 있으므로 잠금 안에서 기록 버퍼로 복사합니다.
+                    self.archive.append('bar', stock_code,
+                                        np.vstack([times[:complete], buffer.window()[:, :complete]]))
+                archived += 1
+            if flush:
+                self.archive.flush()
+        except Exception as e:
+            logger.warning("분봉 아카이브 기록 실패 (매매는 계속합니다): %s", e)
+        return archived
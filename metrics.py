@@ -0,0 +1,217 @@
+import bisect
+import configparser
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    metrics_params = config['metrics']
+    METRICS_ENABLED = metrics_params.getboolean('enabled', False)  # 지표 HTTP 엔드포인트 사용 여부
+    METRICS_HOST = metrics_params.get('host', '127.0.0.1')         # 외부에 열려면 0.0.0.0
+    METRICS_PORT = metrics_params.getint('port', 9108)
+except KeyError:
+    METRICS_ENABLED = False
+    METRICS_HOST = '127.0.0.1'
+    METRICS_PORT = 9108
+
+logger = logging.getLogger(__name__)
+
+# 지표 이름 접두어
+PREFIX = 'automata_'
+
+# 기본 히스토그램 구간 (초). API 응답 시간용과 주기 단계 소요 시간용
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """ 증가만 하는 값 (호출 수, 주문 수 등). 라벨 값은 labelnames 순서대로 위치 인자로 넘깁니다. """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                                 for labels, value in values]
+
+
+class Histogram(_Metric):
+    """ 구간별 관측 수와 합계 (응답 시간, 소요 시간 등). 관측은 O(log 구간 수)입니다. """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple, list] = {}  # { 라벨: [구간별 관측 수(누적 아님)..., +Inf 구간, 합계] }
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *labels) -> int:
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        lines = self._header()
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    조회 시점에만 계산하는 값 (대기열 길이, 캐시 적중률 등). 수집 요청이 없으면 아무 비용도 들지 않습니다.
+    func 는 라벨이 없으면 숫자를, 있으면 { 라벨 값 튜플: 숫자 } 를 돌려줍니다.
+    """
+    def __init__(self, name: str, documentation: str, func, labelnames: tuple = (), kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.func = func
+
+    def render(self) -> list[str]:
+        try:
+            values = self.func()
+        except Exception as e:
+            logger.debug("지표 %s 계산 실패: %s", self.name, e)
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return self._header() + [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                                 for labels, value in values.items() if value is not None]
+
+
+class MetricsRegistry:
+    """ 지표 모음. 같은 이름으로 다시 등록하면 이전 지표를 대체합니다. """
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._metrics.pop(PREFIX + name, None)
+
+    def render(self) -> str:
+        """ Prometheus 텍스트 형식으로 모든 지표를 출력합니다. """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple = (), registry: MetricsRegistry = REGISTRY) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS,
+              registry: MetricsRegistry = REGISTRY) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge_callback(name: str, documentation: str, func, labelnames: tuple = (), kind: str = 'gauge',
+                   registry: MetricsRegistry = REGISTRY) -> CallbackMetric:
+    """ 조회할 때 func() 로 계산하는 지표를 등록합니다. 누적 값이면 kind='counter' """
+    return registry.register(CallbackMetric(name, documentation, func, labelnames, kind))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("지표 요청: " + format, *args)
+
+
+def start_http_server(port: int = METRICS_PORT, host: str = METRICS_HOST,
+                      registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    /metrics 경로로 지표를 제공하는 HTTP 서버를 데몬 스레드에서 시작합니다.
+    :param port: 포트 (0 이면 빈 포트를 사용, 실제 포트는 server.server_port)
+    :return: 서버 (종료하려면 shutdown())
+    """
+    handler = type('MetricsHandler', (_Handler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info("지표 엔드포인트 시작: http://%s:%d/metrics", host, server.server_port)
+    return server
@@ -0,0 +1,205 @@
+import configparser
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    MINUTE_BAR_CAPACITY = trading_control.getint('minute_bar_capacity', 390)  # 종목당 보관할 분봉 수 (정규장 1일 = 390분)
+except KeyError:
+    MINUTE_BAR_CAPACITY = 390
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME = range(len(COLUMNS))
+
+
+def _minute_of(timestamp: datetime) -> int:
+    """ 분 단위로 내린 시각. 시간대 없이 현지 벽시계 시각을 epoch 초로 나타냅니다. (차트 조회 결과와 같은 기준) """
+    return int(np.datetime64(timestamp.replace(second=0, microsecond=0), 's').astype(np.int64))
+
+
+class MinuteBarBuffer:
+    """
+    종목 1개의 분봉 링 버퍼. 고정 크기 numpy 배열에 보관하며 분봉마다 객체를 만들지 않습니다.
+    - 각 분봉을 두 위치(i, i + capacity)에 함께 기록하므로, 최근 n개는 항상 연속된 구간이 되어 복사 없이 꺼낼 수 있습니다.
+    - 추가/갱신은 O(1)이고, 용량을 넘으면 가장 오래된 분봉부터 덮어씁니다.
+    - window/frame 이 돌려주는 배열은 버퍼의 뷰이므로, 이후 추가되는 분봉에 덮어써질 수 있습니다. 보관하려면 복사해서 사용합니다.
+    """
+    def __init__(self, capacity: int = MINUTE_BAR_CAPACITY):
+        """
+        :param capacity: 보관할 최대 분봉 수
+        """
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.int64)    # 분 시작 시각 (현지 시각 기준 epoch 초)
+        self._values = np.zeros((len(COLUMNS), 2 * capacity))   # open, high, low, close, volume
+        self._next = 0    # 다음 분봉을 쓸 위치 (0 ~ capacity-1)
+        self._count = 0   # 보관 중인 분봉 수
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_time(self) -> int | None:
+        """ 마지막 분봉의 시작 시각 (epoch 초) """
+        if not self._count:
+            return None
+        return int(self._times[self._last_slot() + self.capacity])
+
+    def _last_slot(self) -> int:
+        return (self._next - 1) % self.capacity
+
+    def _write(self, slot: int, minute: int, open_, high, low, close, volume):
+        for position in (slot, slot + self.capacity):
+            self._times[position] = minute
+            self._values[:, position] = (open_, high, low, close, volume)
+
+    def append(self, minute: int, open_: float, high: float, low: float, close: float, volume: float):
+        """
+        분봉을 추가합니다. 마지막 분봉과 같은 시각이면 새로 추가하지 않고 그 분봉을 갱신합니다. (형성 중인 분봉)
+        마지막 분봉보다 이전 시각의 분봉은 무시합니다.
+        :param minute: 분 시작 시각 (epoch 초)
+        """
+        last = self.last_time
+        if last is not None and minute < last:
+            return
+        if last is not None and minute == last:
+            self._write(self._last_slot(), minute, open_, high, low, close, volume)
+            return
+        self._write(self._next, minute, open_, high, low, close, volume)
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def on_tick(self, timestamp: datetime, price: float, volume: float = 0):
+        """
+        체결 1건을 해당 분의 분봉에 반영합니다. 새 분이면 분봉을 추가하고, 같은 분이면 고가/저가/종가/거래량을 갱신합니다.
+        :param timestamp: 체결 시각
+        :param price: 체결가
+        :param volume: 체결 수량
+        """
+        minute = _minute_of(timestamp)
+        last = self.last_time
+        if last is not None and minute < last:
+            return
+        if last == minute:
+            slot = self._last_slot()
+            bar = self._values[:, slot + self.capacity]
+            self._write(slot, minute, bar[_OPEN], max(bar[_HIGH], price), min(bar[_LOW], price),
+                        price, bar[_VOLUME] + volume)
+        else:
+            self.append(minute, price, price, price, price, volume)
+
+    def _bounds(self, n: int | None) -> tuple[int, int]:
+        n = self._count if n is None else min(n, self._count)
+        # 마지막 분봉의 뒤쪽 사본 위치까지. 그 앞 n개는 뒤쪽 사본(최근)과 앞쪽 사본(이전)이 이어진 구간입니다.
+        end = self.capacity + self._last_slot() + 1
+        return end - n, end
+
+    def times(self, n: int | None = None) -> np.ndarray:
+        """ 최근 n개(None 이면 전체) 분봉의 시작 시각 뷰 (epoch 초, 오래된 순) """
+        start, end = self._bounds(n)
+        return self._times[start:end]
+
+    def window(self, n: int | None = None) -> np.ndarray:
+        """ 최근 n개(None 이면 전체) 분봉의 (5, n) 뷰. 행 순서는 COLUMNS 와 같고 열은 오래된 순입니다. """
+        start, end = self._bounds(n)
+        return self._values[:, start:end]
+
+    def close(self, n: int | None = None) -> np.ndarray:
+        """ 최근 n개 분봉의 종가 뷰 """
+        return self.window(n)[_CLOSE]
+
+    def volume(self, n: int | None = None) -> np.ndarray:
+        """ 최근 n개 분봉의 거래량 뷰 """
+        return self.window(n)[_VOLUME]
+
+    def frame(self, n: int | None = None) -> pd.DataFrame:
+        """
+        최근 n개 분봉을 'open', 'high', 'low', 'close', 'volume' 컬럼의 DataFrame 으로 돌려줍니다.
+        데이터는 복사하지 않고 버퍼를 그대로 참조하므로 indicators 의 지표 함수에 바로 넘길 수 있습니다.
+        (지표 함수는 새 컬럼만 추가하므로 버퍼는 바뀌지 않습니다)
+        """
+        return pd.DataFrame(self.window(n).T, columns=list(COLUMNS), copy=False)
+
+
+class MinuteBarStore:
+    """
+    종목별 분봉 링 버퍼 모음. 차트 조회 결과(ingest)와 실시간 체결(on_tick)을 같은 버퍼에 반영합니다. (스레드 안전)
+    """
+    def __init__(self, capacity: int = MINUTE_BAR_CAPACITY):
+        """
+        :param capacity: 종목당 보관할 최대 분봉 수
+        """
+        self.capacity = capacity
+        self._buffers: dict[str, MinuteBarBuffer] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._buffers
+
+    def codes(self) -> list[str]:
+        """ 분봉 버퍼가 있는 종목 코드 목록 """
+        return list(self._buffers)
+
+    def buffer(self, stock_code: str) -> MinuteBarBuffer:
+        """ 종목의 분봉 버퍼 (없으면 생성) """
+        buffer = self._buffers.get(stock_code)
+        if buffer is None:
+            with self._lock:
+                buffer = self._buffers.setdefault(stock_code, MinuteBarBuffer(self.capacity))
+        return buffer
+
+    def ingest(self, stock_code: str, df: pd.DataFrame | None) -> int:
+        """
+        분봉 조회 결과(KIS 당일분봉조회 형식)를 버퍼에 반영합니다. 이미 있는 분봉보다 이전 것은 건너뜁니다.
+        :param df: 'stck_bsop_date', 'stck_cntg_hour', 'stck_oprc', 'stck_hgpr', 'stck_lwpr', 'stck_prpr', 'cntg_vol' 컬럼
+        :return: 반영한 분봉 수
+        """
+        if df is None or df.empty:
+            return 0
+        minutes = pd.to_datetime(df['stck_bsop_date'] + df['stck_cntg_hour'], format='%Y%m%d%H%M%S').to_numpy()
+        order = np.argsort(minutes, kind='stable')  # 응답은 최신 순이므로 오래된 순으로 정렬
+        epoch = minutes[order].astype('datetime64[s]').astype(np.int64)
+        values = np.column_stack([pd.to_numeric(df[column]).to_numpy(dtype=float)[order] for column in
+                                  ('stck_oprc', 'stck_hgpr', 'stck_lwpr', 'stck_prpr', 'cntg_vol')])
+        buffer = self.buffer(stock_code)
+        with self._lock:
+            before = buffer.last_time
+            for minute, row in zip(epoch.tolist(), values):
+                buffer.append(minute, *row)
+        return len(epoch) if before is None else int(np.count_nonzero(epoch >= before))
+
+    def on_tick(self, stock_code: str, timestamp: datetime, price: float, volume: float = 0):
+        """ 실시간 체결 1건을 반영합니다. (체결 수신 스레드에서 호출) """
+        buffer = self.buffer(stock_code)
+        with self._lock:
+            buffer.on_tick(timestamp, price, volume)
+
+    def export(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """ 종목별 (시작 시각, (5, n) 분봉 값) 복사본. 체크포인트 저장에 사용합니다. """
+        with self._lock:
+            return {stock_code: (buffer.times().copy(), buffer.window().copy())
+                    for stock_code, buffer in self._buffers.items() if len(buffer)}
+
+    def load(self, data: dict[str, tuple[np.ndarray, np.ndarray]]) -> int:
+        """
+        export() 결과를 버퍼에 다시 채웁니다. 이미 있는 분봉보다 이전 것은 건너뜁니다.
+        :return: 채운 종목 수
+        """
+        for stock_code, (times, values) in data.items():
+            buffer = self.buffer(stock_code)
+            with self._lock:
+                for minute, row in zip(times.tolist(), values.T):
+                    buffer.append(minute, *row)
+        return len(data)
+
+    def frame(self, stock_code: str, n: int | None = None) -> pd.DataFrame | None:
+        """ 종목의 최근 n개 분봉 DataFrame (버퍼 뷰). 분봉이 없으면 None """
+        buffer = self._buffers.get(stock_code)
+        if buffer is None or not len(buffer):
+            return None
+        return buffer.frame(n)
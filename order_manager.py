@@ -1,9 +1,18 @@
-import time
 import configparser
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from kis_broker import KISBroker, MarketClosedError
 from telegram_bot import TelegramBot
-from portfolio import Portfolio
+from portfolio import Portfolio, Holding
 from trading_controller import TradingController
+from order_tracker import OrderTracker, TrackedOrder
+from rate_limiter import RateLimiter
+from market_data import MarketDataService
+from risk_engine import RiskEngine
+import metrics
+import profiling
 
 # 설정 파일 로드
 config = configparser.ConfigParser()
@@ -15,180 +24,414 @@ try:
     TOTAL_INVESTMENT_PER_STOCK = order_params.getfloat('total_investment_per_stock', 100000) # 종목당 총 투자금액
     DCA_DIVISIONS = order_params.getint('dca_divisions', 3) # 분할매수 횟수
     USE_DCA = order_params.getboolean('use_dca', True) # DCA 사용 여부
+    ORDER_TIMEOUT_SECONDS = order_params.getfloat('order_timeout_seconds', 60) # 미체결 주문 취소까지의 시간
+    FILL_POLL_INTERVAL_SECONDS = order_params.getfloat('fill_poll_interval_seconds', 5) # 체결 확인 주기
+    ORDER_RATE_LIMIT_PER_SECOND = order_params.getfloat('order_rate_limit_per_second', 5) # 주문 API 초당 호출 한도
+    ORDER_CONCURRENCY = order_params.getint('order_concurrency', 4) # 동시 주문 접수 수
     
     # 텔레그램 설정
     telegram_params = config['telegram']
     TELEGRAM_TOKEN = telegram_params.get('token')
     TELEGRAM_CHAT_ID = telegram_params.get('chat_id')
+    TELEGRAM_QUEUE_SIZE = telegram_params.getint('queue_size', 100) # 알림 대기 큐 크기
+    TELEGRAM_RATE_PER_SECOND = telegram_params.getfloat('rate_limit_per_second', 1.0) # 초당 최대 전송 수
+    TELEGRAM_COALESCE_SECONDS = telegram_params.getfloat('coalesce_seconds', 2.0) # 알림 묶음 대기 시간
 
 except KeyError as e:
     print(f"order_manager.py: config.cfg 파일에서 [{e.args[0]}] 섹션을 찾을 수 없습니다. 기본값을 사용합니다.")
     TOTAL_INVESTMENT_PER_STOCK = 100000
     DCA_DIVISIONS = 3
     USE_DCA = True
+    ORDER_TIMEOUT_SECONDS = 60
+    FILL_POLL_INTERVAL_SECONDS = 5
+    ORDER_RATE_LIMIT_PER_SECOND = 5
+    ORDER_CONCURRENCY = 4
     TELEGRAM_TOKEN = None
     TELEGRAM_CHAT_ID = None
+    TELEGRAM_QUEUE_SIZE = 100
+    TELEGRAM_RATE_PER_SECOND = 1.0
+    TELEGRAM_COALESCE_SECONDS = 2.0
+
+logger = logging.getLogger(__name__)
+
+# 주문 의도 우선순위 (작을수록 먼저 접수)
+PRIORITY_STOP_LOSS = 0
+PRIORITY_SELL = 1
+PRIORITY_BUY = 2
+
+# outcome: blocked(매매 제어/체결 대기), no_cash, risk_limit(위험 한도), no_quote, zero_quantity, rejected(API 오류),
+#          market_closed, error, submitted(접수), filled, partial(잔량 취소), unfilled(미체결 취소)
+ORDERS = metrics.counter('orders_total', "주문 결과별 건수", ('side', 'outcome'))
+SIGNAL_TO_ORDER = metrics.histogram('signal_to_order_seconds', "신호 발생부터 주문 접수까지 걸린 시간 (초)", ('side',))
+
+@dataclass
+class OrderIntent:
+    """ 매매 주기 중 신호가 발생해 접수 대기 중인 주문 의도 """
+    stock_code: str
+    side: str          # 'buy' 또는 'sell'
+    reason: str = ''
+    priority: int = PRIORITY_BUY
+    created_at: float = field(default_factory=time.monotonic)  # 신호 발생 시각 (time.monotonic 기준)
 
 class OrderManager:
     """
     전략에 따라 주문을 실행하고 관리하며, 결과를 텔레그램으로 알립니다.
     """
-    def __init__(self, broker: KISBroker, portfolio: Portfolio):
+    def __init__(self, broker: KISBroker, portfolio: Portfolio, market_data: MarketDataService | None = None):
         self.broker = broker
         self.portfolio = portfolio
-        self.trading_controller = TradingController()  # 매매 제어 추가
+        self.market_data = market_data or MarketDataService(broker)  # 현재가 조회 (주기 스냅샷 공유)
+        self.state_store = portfolio.state_store  # 여러 봇 프로세스가 공유하는 상태 (없으면 None)
+        self.trading_controller = TradingController(self.state_store)  # 매매 제어 추가
+        self.order_tracker = OrderTracker(broker, timeout_seconds=ORDER_TIMEOUT_SECONDS)  # 체결 추적
+        self.order_rate_limiter = RateLimiter(ORDER_RATE_LIMIT_PER_SECOND)  # 주문 API 호출 빈도 제한
+        self.risk_engine = RiskEngine(portfolio)  # 종목/섹터/전체 노출 한도 확인
         if TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
-            self.telegram_bot = TelegramBot(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+            self.telegram_bot = TelegramBot(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID,
+                                            queue_size=TELEGRAM_QUEUE_SIZE,
+                                            rate_per_second=TELEGRAM_RATE_PER_SECOND,
+                                            coalesce_seconds=TELEGRAM_COALESCE_SECONDS)
         else:
             self.telegram_bot = None
 
     def _send_telegram_message(self, message: str):
-        """ 텔레그램 메시지를 전송합니다. """
-        print(f"[텔레그램] {message}")
+        """ 텔레그램 메시지 전송을 요청합니다. (백그라운드 전송, 호출자를 막지 않음) """
+        logger.info("[텔레그램] %s", message)
         if self.telegram_bot:
             try:
                 self.telegram_bot.send_message(message)
             except Exception as e:
-                print(f"텔레그램 메시지 전송 실패: {e}")
+                logger.error("텔레그램 메시지 전송 실패: %s", e)
+
+    def close(self):
+        """ 대기 중인 알림을 전송하고 알림 스레드를 종료합니다. """
+        if self.telegram_bot:
+            self.telegram_bot.close()
 
     def execute_buy_order(self, stock_code: str):
         """
         매수 주문을 실행합니다. DCA 설정에 따라 분할 또는 일괄 매수합니다.
         :param stock_code: 매수할 종목 코드
         """
-        # 1. 매매 제어 확인
+        if self._check_buy(stock_code):
+            self._submit_buy(stock_code)
+
+    def execute_sell_order(self, stock_code: str):
+        """
+        보유 주식 전량을 매도합니다.
+        :param stock_code: 매도할 종목 코드
+        """
+        holding = self._check_sell(stock_code)
+        if holding:
+            self._submit_sell(stock_code, holding)
+
+    def submit_orders(self, intents: list[OrderIntent]):
+        """
+        한 주기에 모인 주문 의도를 일괄 접수합니다.
+        손절매 → 매도 → 매수 순으로 처리하며, 같은 단계의 주문은 동시에 접수하되
+        주문 API 호출 빈도 제한(order_rate_limit_per_second)을 지킵니다.
+        :param intents: OrderIntent 리스트
+        """
+        if not intents:
+            return
+
+        # 1. 매매 제어 확인은 순서대로 수행 (일일 매매 한도를 동시 주문이 초과하지 않도록)
+        open_orders = (self.state_store.count_open_orders() if self.state_store
+                       else len(self.order_tracker.open_orders()))
+        remaining_slots = (self.trading_controller.max_daily_trades
+                           - self.trading_controller.get_daily_trade_count()
+                           - open_orders)
+        sells, buys = [], []
+        for intent in sorted(intents, key=lambda i: i.priority):
+            if intent.side == 'sell':
+                holding = self._check_sell(intent.stock_code)
+                if holding:
+                    sells.append((intent.stock_code, holding, intent.created_at))
+            elif remaining_slots - len(sells) - len(buys) <= 0:
+                logger.info("[%s] 이번 주기 매수 가능 횟수를 모두 사용하여 건너뜁니다.", intent.stock_code)
+                ORDERS.inc('buy', 'blocked')
+            elif self._check_buy(intent.stock_code):
+                buys.append(intent)
+
+        # 2. 매도 주문을 먼저 모두 접수한 뒤 매수 주문을 접수
+        logger.info("주문 일괄 접수: 매도 %d건, 매수 %d건", len(sells), len(buys))
+        with ThreadPoolExecutor(max_workers=ORDER_CONCURRENCY) as pool:
+            list(pool.map(lambda args: self._submit_sell(*args), sells))
+            list(pool.map(lambda intent: self._submit_buy(intent.stock_code, intent.created_at), buys))
+
+    def _has_open_order(self, stock_code: str, side: str | None = None) -> bool:
+        """ 이 프로세스 또는 (공유 저장소 사용 시) 다른 프로세스의 체결 대기 주문이 있는지 확인합니다. """
+        if self.order_tracker.has_open_order(stock_code, side):
+            return True
+        return bool(self.state_store) and self.state_store.has_open_order(stock_code, side)
+
+    def _track_order(self, order: TrackedOrder):
+        """ 접수된 주문을 체결 추적에 등록하고 공유 저장소에 기록합니다. """
+        self.order_tracker.add(order)
+        if self.state_store:
+            self.state_store.record_order(order.order_id, order.stock_code, order.side,
+                                          order.quantity, order.submitted_at)
+
+    def _check_buy(self, stock_code: str) -> bool:
+        """ 매수 전 확인 (체결 대기 주문, 매매 제어) """
+        if self._has_open_order(stock_code):
+            logger.info("[%s] 체결 대기 중인 주문이 있어 매수를 진행하지 않습니다.", stock_code)
+            ORDERS.inc('buy', 'blocked')
+            return False
+
         can_buy, reason = self.trading_controller.can_buy(stock_code)
         if not can_buy:
-            print(f"[{stock_code}] 매수 제한: {reason}")
+            logger.info("[%s] 매수 제한: %s", stock_code, reason)
             self._send_telegram_message(f"[매수 제한] {stock_code}\n- 사유: {reason}")
+            ORDERS.inc('buy', 'blocked')
+            return False
+        return True
+
+    def _check_sell(self, stock_code: str) -> Holding | None:
+        """ 매도 전 확인 (보유 수량, 체결 대기 주문, 매매 제어). 매도 가능하면 보유 정보를 반환합니다. """
+        holding = self.portfolio.get_holding(stock_code)
+        if not holding or holding.quantity == 0:
+            logger.info("[%s] 보유 수량이 없어 매도를 진행할 수 없습니다.", stock_code)
+            ORDERS.inc('sell', 'blocked')
+            return None
+
+        if self._has_open_order(stock_code, 'sell'):
+            logger.info("[%s] 체결 대기 중인 매도 주문이 있어 매도를 진행하지 않습니다.", stock_code)
+            ORDERS.inc('sell', 'blocked')
+            return None
+
+        can_sell, reason = self.trading_controller.can_sell(stock_code)
+        if not can_sell:
+            logger.info("[%s] 매도 제한: %s", stock_code, reason)
+            self._send_telegram_message(f"[매도 제한] {stock_code}\n- 사유: {reason}")
+            ORDERS.inc('sell', 'blocked')
+            return None
+        return holding
+
+    def _submit_buy(self, stock_code: str, signal_at: float | None = None):
+        """
+        현금을 예약하고 매수 주문을 접수한 뒤 체결 추적에 등록합니다. (스레드에서 호출 가능)
+        :param signal_at: 매수 신호 발생 시각 (time.monotonic 기준, 주어지면 접수까지 걸린 시간을 기록)
+        """
+        with profiling.span('order', stock_code):
+            self._place_buy(stock_code, signal_at)
+
+    def _place_buy(self, stock_code: str, signal_at: float | None = None):
+        # 1. 투자 금액 결정
+        if USE_DCA:
+            # DCA 방식: 분할 매수
+            investment_amount_per_buy = TOTAL_INVESTMENT_PER_STOCK / DCA_DIVISIONS
+            strategy_info = f"DCA {DCA_DIVISIONS}분할"
+        else:
+            # 일괄 매수
+            investment_amount_per_buy = TOTAL_INVESTMENT_PER_STOCK
+            strategy_info = "일괄 매수"
+
+        # 2. 현금 예약 (동시 매수 주문이 현금을 초과 사용하지 않도록 원자적으로 처리)
+        if not self.portfolio.reserve_cash(investment_amount_per_buy):
+            self._send_telegram_message(f"[매수 실패] {stock_code} - 현금 부족\n- 필요 금액: {investment_amount_per_buy:,.0f}원\n- 주문 가능 금액: {self.portfolio.available_cash():,.0f}원")
+            ORDERS.inc('buy', 'no_cash')
             return
-        
+        reserved = investment_amount_per_buy
+
+        # 3. 위험 한도 확인 및 노출 예약 (종목/섹터/전체 노출, 주문마다 O(1))
+        can_buy, reason = self.risk_engine.try_reserve(stock_code, investment_amount_per_buy)
+        if not can_buy:
+            self.portfolio.release_cash(reserved)
+            logger.info("[%s] 매수 제한: %s", stock_code, reason)
+            self._send_telegram_message(f"[매수 제한] {stock_code}\n- 사유: {reason}")
+            ORDERS.inc('buy', 'risk_limit')
+            return
+        risk_reserved = investment_amount_per_buy
+
         try:
-            # 2. 현재 가격 조회
-            current_price = self.broker.get_current_price(stock_code)
+            # 4. 현재 가격 조회 및 수량 계산
+            current_price = self.market_data.get_quote(stock_code)
             if not current_price:
-                print(f"[{stock_code}] 현재가 조회에 실패하여 매수를 진행할 수 없습니다.")
+                logger.warning("[%s] 현재가 조회에 실패하여 매수를 진행할 수 없습니다.", stock_code)
+                ORDERS.inc('buy', 'no_quote')
                 return
 
-            # 3. 투자 금액 및 수량 계산
-            if USE_DCA:
-                # DCA 방식: 분할 매수
-                investment_amount_per_buy = TOTAL_INVESTMENT_PER_STOCK / DCA_DIVISIONS
-                strategy_info = f"DCA {DCA_DIVISIONS}분할"
-            else:
-                # 일괄 매수
-                investment_amount_per_buy = TOTAL_INVESTMENT_PER_STOCK
-                strategy_info = "일괄 매수"
-            
             quantity_to_buy = int(investment_amount_per_buy // current_price)
-
             if quantity_to_buy == 0:
-                print(f"[{stock_code}] 주문 가능 수량이 0이므로 매수를 진행하지 않습니다.")
+                logger.info("[%s] 주문 가능 수량이 0이므로 매수를 진행하지 않습니다.", stock_code)
+                ORDERS.inc('buy', 'zero_quantity')
                 return
 
-            # 4. 현금 잔고 확인
-            if self.portfolio.cash < investment_amount_per_buy:
-                self._send_telegram_message(f"[매수 실패] {stock_code} - 현금 부족\n- 필요 금액: {investment_amount_per_buy:,.0f}원\n- 현재 잔고: {self.portfolio.cash:,.0f}원")
-                return
+            # 실제 주문 금액만 남기고 예약을 줄입니다.
+            order_amount = quantity_to_buy * current_price
+            self.portfolio.release_cash(reserved - order_amount)
+            reserved = order_amount
+            self.risk_engine.release(stock_code, risk_reserved - order_amount)
+            risk_reserved = order_amount
 
             # 5. 매수 주문 실행 (시장가)
+            self.order_rate_limiter.acquire()
             order_result = self.broker.buy(stock_code, quantity_to_buy)
             if not order_result or 'odno' not in order_result:
                 self._send_telegram_message(f"[매수 주문 실패] {stock_code} - API 오류")
+                ORDERS.inc('buy', 'rejected')
                 return
 
-            # 6. 주문 체결 확인 및 포트폴리오 업데이트
-            time.sleep(5) # 체결 대기
-            order_id = order_result['odno']
-            order_status = self.broker.get_order_status(order_id)
-
-            if order_status == '체결':
-                # 매매 기록 저장
-                self.trading_controller.record_buy(stock_code)
-                
-                # 포트폴리오 업데이트
-                self.portfolio.update_on_buy(stock_code, quantity_to_buy, current_price)
-                
-                # 알림 전송
-                daily_count = self.trading_controller.get_daily_trade_count()
-                self._send_telegram_message(
-                    f"[매수 체결] {stock_code}\n"
-                    f"- 수량: {quantity_to_buy}주\n"
-                    f"- 가격: {current_price:,.0f}원\n"
-                    f"- 전략: {strategy_info}\n"
-                    f"- 오늘 매매: {daily_count}회"
-                )
-            else:
-                self.broker.cancel_order(order_id) # 미체결 주문은 취소
-                self._send_telegram_message(f"[매수 미체결] {stock_code} - 주문이 체결되지 않아 취소되었습니다.")
+            # 6. 체결 추적 등록 (체결 확인은 process_fills 에서 비동기로 처리)
+            self._track_order(TrackedOrder(
+                order_id=order_result['odno'],
+                stock_code=stock_code,
+                side='buy',
+                quantity=quantity_to_buy,
+                reference_price=current_price,
+                info={'strategy': strategy_info, 'reserved': reserved, 'risk_reserved': risk_reserved},
+            ))
+            reserved = risk_reserved = 0  # 예약은 체결/취소 시 해제됩니다.
+            ORDERS.inc('buy', 'submitted')
+            if signal_at is not None:
+                SIGNAL_TO_ORDER.observe(time.monotonic() - signal_at, 'buy')
+            logger.info("[%s] 매수 주문 접수 (주문번호: %s, %d주)", stock_code, order_result['odno'], quantity_to_buy)
 
         except MarketClosedError:
-            print("장이 종료되어 매수 주문을 실행할 수 없습니다.")
+            logger.warning("장이 종료되어 매수 주문을 실행할 수 없습니다.")
+            ORDERS.inc('buy', 'market_closed')
         except Exception as e:
             self._send_telegram_message(f"[매수 오류] {stock_code} - {e}")
+            ORDERS.inc('buy', 'error')
+        finally:
+            if reserved:
+                self.portfolio.release_cash(reserved)
+            if risk_reserved:
+                self.risk_engine.release(stock_code, risk_reserved)
 
-    def execute_sell_order(self, stock_code: str):
+    def _submit_sell(self, stock_code: str, holding: Holding, signal_at: float | None = None):
         """
-        보유 주식 전량을 매도합니다.
-        :param stock_code: 매도할 종목 코드
+        보유 수량 전량의 매도 주문을 접수하고 체결 추적에 등록합니다. (스레드에서 호출 가능)
+        :param signal_at: 매도 신호 발생 시각 (time.monotonic 기준, 주어지면 접수까지 걸린 시간을 기록)
         """
-        holding = self.portfolio.get_holding(stock_code)
-        if not holding or holding['quantity'] == 0:
-            print(f"[{stock_code}] 보유 수량이 없어 매도를 진행할 수 없습니다.")
-            return
+        with profiling.span('order', stock_code):
+            self._place_sell(stock_code, holding, signal_at)
 
-        # 1. 매매 제어 확인
-        can_sell, reason = self.trading_controller.can_sell(stock_code)
-        if not can_sell:
-            print(f"[{stock_code}] 매도 제한: {reason}")
-            self._send_telegram_message(f"[매도 제한] {stock_code}\n- 사유: {reason}")
-            return
-
-        quantity_to_sell = holding['quantity']
+    def _place_sell(self, stock_code: str, holding: Holding, signal_at: float | None = None):
+        quantity_to_sell = holding.quantity
 
         try:
-            # 2. 현재 가격 조회
-            current_price = self.broker.get_current_price(stock_code)
+            # 1. 현재 가격 조회
+            current_price = self.market_data.get_quote(stock_code)
             if not current_price:
-                print(f"[{stock_code}] 현재가 조회에 실패하여 매도를 진행할 수 없습니다.")
+                logger.warning("[%s] 현재가 조회에 실패하여 매도를 진행할 수 없습니다.", stock_code)
+                ORDERS.inc('sell', 'no_quote')
                 return
 
-            # 3. 매도 주문 실행 (시장가)
+            # 2. 매도 주문 실행 (시장가)
+            self.order_rate_limiter.acquire()
             order_result = self.broker.sell(stock_code, quantity_to_sell)
             if not order_result or 'odno' not in order_result:
                 self._send_telegram_message(f"[매도 주문 실패] {stock_code} - API 오류")
+                ORDERS.inc('sell', 'rejected')
                 return
 
-            # 4. 주문 체결 확인 및 포트폴리오 업데이트
-            time.sleep(5) # 체결 대기
-            order_id = order_result['odno']
-            order_status = self.broker.get_order_status(order_id)
-
-            if order_status == '체결':
-                # 매매 기록 저장
-                self.trading_controller.record_sell(stock_code)
-                
-                # 포트폴리오 업데이트
-                self.portfolio.update_on_sell(stock_code, quantity_to_sell, current_price)
-                
-                # 수익률 계산
-                profit_loss = (current_price - holding['avg_price']) * quantity_to_sell
-                profit_rate = ((current_price / holding['avg_price']) - 1) * 100
-                
-                # 알림 전송
-                daily_count = self.trading_controller.get_daily_trade_count()
-                self._send_telegram_message(
-                    f"[매도 체결] {stock_code}\n"
-                    f"- 수량: {quantity_to_sell}주\n"
-                    f"- 가격: {current_price:,.0f}원\n"
-                    f"- 손익: {profit_loss:,.0f}원 ({profit_rate:+.2f}%)\n"
-                    f"- 오늘 매매: {daily_count}회"
-                )
-            else:
-                self.broker.cancel_order(order_id)
-                self._send_telegram_message(f"[매도 미체결] {stock_code} - 주문이 체결되지 않아 취소되었습니다.")
+            # 3. 체결 추적 등록 (체결 확인은 process_fills 에서 비동기로 처리)
+            self._track_order(TrackedOrder(
+                order_id=order_result['odno'],
+                stock_code=stock_code,
+                side='sell',
+                quantity=quantity_to_sell,
+                reference_price=current_price,
+                info={'avg_purchase_price': holding.avg_price},
+            ))
+            ORDERS.inc('sell', 'submitted')
+            if signal_at is not None:
+                SIGNAL_TO_ORDER.observe(time.monotonic() - signal_at, 'sell')
+            logger.info("[%s] 매도 주문 접수 (주문번호: %s, %d주)", stock_code, order_result['odno'], quantity_to_sell)
 
         except MarketClosedError:
-            print("장이 종료되어 매도 주문을 실행할 수 없습니다.")
+            logger.warning("장이 종료되어 매도 주문을 실행할 수 없습니다.")
+            ORDERS.inc('sell', 'market_closed')
         except Exception as e:
             self._send_telegram_message(f"[매도 오류] {stock_code} - {e}")
+            ORDERS.inc('sell', 'error')
+
+    def process_fills(self) -> int:
+        """
+        체결 대기 중인 주문들의 체결 현황을 한 번에 확인하고,
+        새로 체결된 수량만큼 포트폴리오와 매매 기록을 갱신합니다.
+        제한 시간 안에 체결되지 않은 잔량은 취소합니다.
+        :return: 처리한 체결 이벤트 수
+        """
+        try:
+            events = self.order_tracker.poll()
+        except MarketClosedError:
+            logger.warning("장이 종료되어 체결 내역을 확인할 수 없습니다.")
+            return 0
+
+        for event in events:
+            order = event.order
+            if event.quantity:
+                self._apply_fill(order, event.quantity, event.price)
+            if event.done:
+                self._finish_order(order, event.expired)
+            if self.state_store:
+                if not event.done:
+                    status = 'partial'
+                elif order.is_complete:
+                    status = 'filled'
+                else:
+                    status = 'expired' if event.expired else 'cancelled'
+                self.state_store.update_order(order.order_id, order.filled_quantity, order.avg_fill_price, status)
+        return len(events)
+
+    def _apply_fill(self, order: TrackedOrder, quantity: int, price: float):
+        """ 증분 체결분을 포트폴리오와 매매 기록에 반영합니다. """
+        first_fill = order.filled_quantity == quantity
+        if order.side == 'buy':
+            if first_fill:
+                self.trading_controller.record_buy(order.stock_code)
+            # 체결된 수량만큼 예약 현금을 해제하고 실제 현금에서 차감합니다.
+            release = min(order.info['reserved'], order.reference_price * quantity)
+            order.info['reserved'] -= release
+            self.portfolio.release_cash(release)
+            self.portfolio.update_on_buy(order.stock_code, quantity, price)
+            # 체결분은 평가 장부의 보유 노출로 옮겨졌으므로 체결 대기 노출에서 뺍니다.
+            risk_release = min(order.info['risk_reserved'], order.reference_price * quantity)
+            order.info['risk_reserved'] -= risk_release
+            self.risk_engine.release(order.stock_code, risk_release)
+        else:
+            if first_fill:
+                self.trading_controller.record_sell(order.stock_code)
+            self.portfolio.update_on_sell(order.stock_code, quantity, price)
+
+    def _finish_order(self, order: TrackedOrder, expired: bool):
+        """ 추적이 끝난 주문의 결과를 알리고, 만료된 잔량은 취소합니다. """
+        side_name = '매수' if order.side == 'buy' else '매도'
+        if expired:
+            self.broker.cancel_order(order.order_id)
+            # 취소 직전 체결분이 누락되었을 수 있으므로 다음 주기에 계좌와 대조합니다.
+            self.portfolio.request_sync(f"{order.stock_code} 미체결 잔량 취소")
+        if order.side == 'buy' and order.info['reserved']:
+            # 체결되지 않은 잔량의 예약 현금 해제
+            self.portfolio.release_cash(order.info['reserved'])
+            order.info['reserved'] = 0
+        if order.side == 'buy' and order.info['risk_reserved']:
+            self.risk_engine.release(order.stock_code, order.info['risk_reserved'])
+            order.info['risk_reserved'] = 0
+
+        ORDERS.inc(order.side, 'unfilled' if order.filled_quantity == 0 else
+                   'filled' if order.is_complete else 'partial')
+        if order.filled_quantity == 0:
+            self._send_telegram_message(f"[{side_name} 미체결] {order.stock_code} - 주문이 체결되지 않아 취소되었습니다.")
+            return
+
+        title = f"{side_name} 체결" if order.is_complete else f"{side_name} 부분체결"
+        daily_count = self.trading_controller.get_daily_trade_count()
+        lines = [
+            f"[{title}] {order.stock_code}",
+            f"- 수량: {order.filled_quantity}주" + ("" if order.is_complete else f" / {order.quantity}주 (잔량 취소)"),
+            f"- 가격: {order.avg_fill_price:,.0f}원",
+        ]
+        if order.side == 'buy':
+            lines.append(f"- 전략: {order.info.get('strategy', '')}")
+        else:
+            # 수익률 계산
+            avg_purchase_price = order.info['avg_purchase_price']
+            profit_loss = (order.avg_fill_price - avg_purchase_price) * order.filled_quantity
+            profit_rate = ((order.avg_fill_price / avg_purchase_price) - 1) * 100
+            lines.append(f"- 손익: {profit_loss:,.0f}원 ({profit_rate:+.2f}%)")
+        lines.append(f"- 오늘 매매: {daily_count}회")
+        self._send_telegram_message("\n".join(lines))
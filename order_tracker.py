@@ -0,0 +1,125 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TrackedOrder:
+    """ 접수된 주문 1건의 체결 추적 상태 """
+    order_id: str
+    stock_code: str
+    side: str                      # 'buy' 또는 'sell'
+    quantity: int
+    reference_price: float         # 주문 시점 현재가 (체결가를 알 수 없을 때 사용)
+    submitted_at: float = field(default_factory=time.time)
+    filled_quantity: int = 0
+    avg_fill_price: float = 0.0
+    info: dict = field(default_factory=dict)  # 알림용 부가 정보 (전략, 평균 매수가 등)
+
+    @property
+    def remaining(self) -> int:
+        return self.quantity - self.filled_quantity
+
+    @property
+    def is_complete(self) -> bool:
+        return self.filled_quantity >= self.quantity
+
+
+@dataclass
+class FillEvent:
+    """
+    poll() 이 반환하는 체결 이벤트.
+    quantity 는 이번 조회에서 새로 체결된 수량(증분)이고, done 은 주문 추적이 끝났는지 여부입니다.
+    """
+    order: TrackedOrder
+    quantity: int
+    price: float
+    done: bool
+    expired: bool = False
+
+
+class OrderTracker:
+    """
+    접수된 주문을 기록해 두고 체결 여부를 비동기적으로 확인합니다.
+    주문마다 대기하지 않고, 매 조회 시 열린 주문 전체를 한 번의 일별 체결 조회로 확인합니다.
+    """
+    def __init__(self, broker, timeout_seconds: float = 60):
+        """
+        :param broker: KISBroker 인스턴스 (get_order_executions 지원 시 일괄 조회)
+        :param timeout_seconds: 이 시간이 지나도록 전량 체결되지 않은 주문은 만료 처리
+        """
+        self.broker = broker
+        self.timeout_seconds = timeout_seconds
+        self._orders: dict[str, TrackedOrder] = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+    def add(self, order: TrackedOrder):
+        """ 접수된 주문을 추적 대상에 추가합니다. """
+        with self._lock:
+            self._orders[order.order_id] = order
+
+    def open_orders(self) -> list[TrackedOrder]:
+        with self._lock:
+            return list(self._orders.values())
+
+    def has_open_order(self, stock_code: str, side: str | None = None) -> bool:
+        """ 해당 종목(및 매수/매도 구분)의 미체결 주문이 있는지 확인합니다. """
+        with self._lock:
+            return any(o.stock_code == stock_code and (side is None or o.side == side)
+                       for o in self._orders.values())
+
+    def _fetch_executions(self, orders: dict[str, TrackedOrder]) -> dict:
+        """
+        열린 주문들의 체결 현황을 조회합니다.
+        브로커가 일괄 조회(get_order_executions)를 지원하면 한 번에, 아니면 주문별 상태로 확인합니다.
+        :return: { 주문번호: {'filled': 누적 체결 수량, 'avg_price': 평균 체결가, 'cancelled': 취소 여부} }
+        """
+        if hasattr(self.broker, 'get_order_executions'):
+            return self.broker.get_order_executions(list(orders)) or {}
+
+        executions = {}
+        for order_id, order in orders.items():
+            if self.broker.get_order_status(order_id) == '체결':
+                executions[order_id] = {'filled': order.quantity, 'avg_price': 0.0, 'cancelled': False}
+        return executions
+
+    def poll(self) -> list[FillEvent]:
+        """
+        열린 주문 전체의 체결 현황을 한 번에 조회하고 새로 체결된 내역을 이벤트로 반환합니다.
+        전량 체결, 취소, 만료된 주문은 추적 대상에서 제거됩니다.
+        조회 중에도 다른 스레드의 주문 추가(add)는 막히지 않습니다.
+        """
+        with self._poll_lock:
+            with self._lock:
+                snapshot = dict(self._orders)
+            if not snapshot:
+                return []
+            executions = self._fetch_executions(snapshot)
+
+            events = []
+            now = time.time()
+            with self._lock:
+                for order_id, order in snapshot.items():
+                    execution = executions.get(order_id)
+                    quantity, price = 0, 0.0
+                    cancelled = False
+                    if execution:
+                        filled = min(int(execution['filled']), order.quantity)
+                        cancelled = execution.get('cancelled', False)
+                        if filled > order.filled_quantity:
+                            quantity = filled - order.filled_quantity
+                            avg_price = float(execution.get('avg_price') or 0) or order.reference_price
+                            # 누적 평균 체결가에서 이번 증분 체결분의 가격을 역산합니다.
+                            prev_value = order.filled_quantity * order.avg_fill_price
+                            price = (filled * avg_price - prev_value) / quantity
+                            order.filled_quantity = filled
+                            order.avg_fill_price = avg_price
+
+                    expired = not order.is_complete and not cancelled and now - order.submitted_at > self.timeout_seconds
+                    done = order.is_complete or cancelled or expired
+                    if quantity or done:
+                        events.append(FillEvent(order, quantity, price, done, expired))
+                    if done:
+                        self._orders.pop(order_id, None)
+            return events
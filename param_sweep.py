@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+전략 파라미터 병렬 스윕(Parameter Sweep) 실행기
+
+strategy.py / indicators.py / stock_selector.py 의 모듈 상수(LOW_OFFSET, HIGH_OFFSET,
+RSI_BUY_THRESHOLD, EWO_*, 이동평균/MACD/볼린저 윈도우 등)를 격자(grid) 또는 무작위 샘플로
+바꿔 가며 과거 데이터에 대해 백테스트하고, 결과를 순위화합니다.
+
+- 가격 데이터는 종목 x 일자 형태의 패널(.npy)로 한 번만 저장하고, 각 워커 프로세스는
+  np.load(mmap_mode='r') 로 같은 파일을 메모리 매핑해 공유합니다. (DataFrame 피클링 없음)
+- 작업 단위는 파라미터 조합 1개이며, 워커는 자신의 프로세스 안에서만 모듈 상수를 교체합니다.
+- 워크포워드(walk-forward) 분할을 지원합니다.
+"""
+
+import argparse
+import configparser
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import stock_selector
+import strategy
+
+# 스윕 대상 파라미터를 보유한 모듈들 (상수 이름으로 대상 모듈을 찾습니다)
+PARAM_MODULES = (indicators, strategy, stock_selector)
+
+# [sweep] 섹션이 없을 때 사용하는 기본 탐색 공간
+DEFAULT_SEARCH_SPACE = {
+    'LOW_OFFSET': [0.96, 0.97, 0.98, 0.99],
+    'HIGH_OFFSET': [1.03, 1.05, 1.08],
+    'RSI_BUY_THRESHOLD': [40, 50, 60],
+    'EWO_BUY_THRESHOLD': [3, 5, 7],
+    'EWO_SELL_THRESHOLD': [-7, -5, -3],
+    'SHORT_MA_WINDOW': [5, 10],
+    'LONG_MA_WINDOW': [20, 35],
+}
+
+# 패널 파일 이름
+PANEL_CLOSE_FILE = 'close.npy'
+PANEL_VOLUME_FILE = 'volume.npy'
+PANEL_META_FILE = 'meta.json'
+
+# 워커 프로세스 전역 상태 (initializer 에서 설정)
+_panel_close = None
+_panel_volume = None
+_panel_codes = None
+
+
+# --- 가격 패널 ---
+
+def save_price_panel(path: str, codes: list[str], dates: list[str], close: np.ndarray, volume: np.ndarray):
+    """
+    종목 x 일자 가격 패널을 디렉터리에 저장합니다.
+    상장 기간이 짧은 종목은 앞부분을 NaN으로 채웁니다.
+    :param path: 저장할 디렉터리
+    :param codes: 종목 코드 리스트 (행 순서)
+    :param dates: 일자 리스트 (YYYYMMDD, 열 순서)
+    :param close: (종목 수, 일수) 종가 배열
+    :param volume: (종목 수, 일수) 거래량 배열
+    """
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, PANEL_CLOSE_FILE), np.ascontiguousarray(close, dtype=np.float64))
+    np.save(os.path.join(path, PANEL_VOLUME_FILE), np.ascontiguousarray(volume, dtype=np.float64))
+    with open(os.path.join(path, PANEL_META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'codes': list(codes), 'dates': list(dates)}, f, ensure_ascii=False)
+
+
+def load_price_panel(path: str, mmap: bool = True) -> tuple[list[str], list[str], np.ndarray, np.ndarray]:
+    """
+    저장된 가격 패널을 로드합니다.
+    :param path: 패널 디렉터리
+    :param mmap: True이면 읽기 전용 메모리 매핑으로 엽니다.
+    :return: (종목 코드, 일자, 종가 배열, 거래량 배열)
+    """
+    mode = 'r' if mmap else None
+    close = np.load(os.path.join(path, PANEL_CLOSE_FILE), mmap_mode=mode)
+    volume = np.load(os.path.join(path, PANEL_VOLUME_FILE), mmap_mode=mode)
+    with open(os.path.join(path, PANEL_META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    return meta['codes'], meta['dates'], close, volume
+
+
+def build_panel_from_broker(broker, codes: list[str], path: str, days: int = 365) -> int:
+    """
+    브로커에서 일봉을 받아 가격 패널을 만듭니다.
+    :param broker: KISBroker 인스턴스
+    :param codes: 수집할 종목 코드 리스트
+    :param path: 저장할 디렉터리
+    :param days: 조회 기간 (일)
+    :return: 패널에 포함된 종목 수
+    """
+    end_date = datetime.now().strftime('%Y%m%d')
+    start_date = (datetime.now() - timedelta(days=days)).strftime('%Y%m%d')
+
+    series = {}
+    for code in codes:
+        df = broker.get_daily_price(code, start_date=start_date, end_date=end_date)
+        if df is None or df.empty:
+            print(f"[{code}] 시세 데이터 조회에 실패하여 패널에서 제외합니다.")
+            continue
+        df = df.set_index('stck_bsop_date')
+        series[code] = (pd.to_numeric(df['stck_clpr']), pd.to_numeric(df['acml_vol']))
+
+    if not series:
+        print("패널을 구성할 시세 데이터가 없습니다.")
+        return 0
+
+    dates = sorted(set().union(*(close.index for close, _ in series.values())))
+    close = pd.DataFrame({code: c for code, (c, _) in series.items()}).reindex(dates)
+    volume = pd.DataFrame({code: v for code, (_, v) in series.items()}).reindex(dates)
+    save_price_panel(path, list(series), dates, close.to_numpy().T, volume.to_numpy().T)
+    print(f"가격 패널 저장 완료: {len(series)}개 종목 x {len(dates)}일 -> {path}")
+    return len(series)
+
+
+def generate_synthetic_panel(path: str, n_symbols: int, n_days: int, seed: int = 0):
+    """
+    기하 브라운 운동 기반의 합성 가격 패널을 생성합니다. (벤치마크/테스트용)
+    :param path: 저장할 디렉터리
+    :param n_symbols: 종목 수
+    :param n_days: 일수
+    :param seed: 난수 시드
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0002, 0.0005, size=(n_symbols, 1))
+    vol = rng.uniform(0.01, 0.03, size=(n_symbols, 1))
+    returns = rng.normal(0, 1, size=(n_symbols, n_days)) * vol + drift
+    start = rng.uniform(5000, 200000, size=(n_symbols, 1))
+    close = np.round(start * np.exp(np.cumsum(returns, axis=1)))
+    volume = np.round(rng.lognormal(11, 0.6, size=(n_symbols, n_days)))
+
+    codes = [f"{i:06d}" for i in range(n_symbols)]
+    base = datetime(2020, 1, 1)
+    dates = [(base + timedelta(days=d)).strftime('%Y%m%d') for d in range(n_days)]
+    save_price_panel(path, codes, dates, close, volume)
+
+
+# --- 탐색 공간 ---
+
+def apply_params(params: dict):
+    """
+    파라미터를 해당 모듈 상수에 적용합니다. (현재 프로세스에만 영향)
+    :param params: {'LOW_OFFSET': 0.97, 'SHORT_MA_WINDOW': 10, ...}
+    """
+    for name, value in params.items():
+        targets = [module for module in PARAM_MODULES if hasattr(module, name)]
+        if not targets:
+            raise KeyError(f"알 수 없는 전략 파라미터: {name}")
+        for module in targets:
+            setattr(module, name, value)
+
+
+def grid(space: dict) -> list[dict]:
+    """
+    탐색 공간의 모든 조합(격자)을 생성합니다.
+    :param space: {'파라미터': [후보값, ...]}
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def random_samples(space: dict, n: int, seed: int = 0) -> list[dict]:
+    """
+    탐색 공간에서 무작위 조합을 추출합니다.
+    리스트는 후보값 중 하나를, (low, high) 튜플은 구간에서 균등 추출합니다. (둘 다 int면 정수)
+    :param space: 탐색 공간
+    :param n: 샘플 수
+    :param seed: 난수 시드
+    """
+    rnd = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        params = {}
+        for name, choices in space.items():
+            if isinstance(choices, tuple):
+                low, high = choices
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = rnd.randint(low, high)
+                else:
+                    params[name] = round(rnd.uniform(low, high), 4)
+            else:
+                params[name] = rnd.choice(choices)
+        samples.append(params)
+    return samples
+
+
+def _parse_value(text: str):
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def load_search_space(config_path: str = 'config.cfg') -> dict:
+    """
+    config.cfg 의 [sweep] 섹션에서 탐색 공간을 읽습니다.
+    `low_offset = 0.96, 0.97, 0.98` 은 후보 리스트, `low_offset = 0.95~0.99` 는 구간을 의미합니다.
+    섹션이 없으면 DEFAULT_SEARCH_SPACE 를 사용합니다.
+    """
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    if 'sweep' not in config:
+        return dict(DEFAULT_SEARCH_SPACE)
+
+    space = {}
+    for key, raw in config['sweep'].items():
+        if '~' in raw:
+            low, high = raw.split('~', 1)
+            space[key.upper()] = (_parse_value(low), _parse_value(high))
+        else:
+            space[key.upper()] = [_parse_value(v) for v in raw.split(',') if v.strip()]
+    return space
+
+
+# --- 백테스트 ---
+
+def _signal_arrays(close: np.ndarray, volume: np.ndarray, require_screening: bool) -> np.ndarray:
+    """
+    한 종목의 일별 매수 신호 배열을 계산합니다.
+    지표는 indicators.add_all_indicators 를 그대로 사용하고, 조건식은 strategy.check_buy_signal 과
+    stock_selector.screen_stocks 의 판정을 일자별로 벡터화한 것입니다.
+    """
+    df = indicators.add_all_indicators(pd.DataFrame({'close': close, 'volume': volume}))
+    if not all(k in df.columns for k in ['short_ma', 'long_ma', 'rsi', 'ewo']):
+        return np.zeros(len(close), dtype=bool)
+
+    short_ma = df['short_ma'].to_numpy()
+    rsi = df['rsi'].to_numpy()
+    ewo = df['ewo'].to_numpy()
+
+    with np.errstate(invalid='ignore'):
+        condition1 = (close <= short_ma) & (ewo >= strategy.EWO_BUY_THRESHOLD) & (rsi <= strategy.RSI_BUY_THRESHOLD)
+        condition2 = (close < short_ma * strategy.LOW_OFFSET) & (ewo <= strategy.EWO_SELL_THRESHOLD)
+        buy = condition1 | condition2
+
+        if require_screening:
+            buy &= _screening_mask(df, close, volume)
+    return buy
+
+
+def _cross_up(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """ 전일 fast < slow 이고 당일 fast > slow 인 지점 """
+    result = np.zeros(len(fast), dtype=bool)
+    result[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+    return result
+
+
+def _screening_mask(df: pd.DataFrame, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """ screen_stocks 의 5개 조건 중 3개 이상 만족 여부를 일자별로 계산합니다. """
+    n = len(close)
+    zeros = np.zeros(n, dtype=bool)
+
+    golden = _cross_up(df['short_ma'].to_numpy(), df['long_ma'].to_numpy())
+    rsi = df['rsi'].to_numpy()
+    rsi_exit = _cross_up(rsi, np.full(n, stock_selector.RSI_THRESHOLD))
+
+    window = stock_selector.VOLUME_WINDOW
+    surge = zeros.copy()
+    if n >= window:
+        prev_mean = pd.Series(volume).shift(1).rolling(window - 1).mean().to_numpy()
+        surge = volume > prev_mean * stock_selector.VOLUME_SURGE_MULTIPLIER
+
+    breakout = close > df['bollinger_upper'].to_numpy() if 'bollinger_upper' in df.columns else zeros
+    macd_cross = _cross_up(df['macd'].to_numpy(), df['signal'].to_numpy()) if 'macd' in df.columns else zeros
+
+    count = golden.astype(int) + rsi_exit + surge + breakout + macd_cross
+    return count >= 3
+
+
+def _simulate(close: np.ndarray, buy: np.ndarray, start: int, end: int, fee_rate: float) -> list[float]:
+    """
+    [start, end) 구간에서 단일 포지션 매매를 시뮬레이션하고 거래별 수익률을 반환합니다.
+    매도는 strategy.check_sell_signal 과 같은 이익 실현/손절매 조건을 사용하며,
+    구간 끝까지 청산되지 않은 포지션은 마지막 종가로 평가합니다.
+    """
+    trades = []
+    entries = np.flatnonzero(buy[start:end]) + start
+    t = start
+    for entry in entries:
+        if entry < t:
+            continue
+        price = close[entry]
+        take_profit = price * strategy.HIGH_OFFSET
+        stop_loss = price * (1 + strategy.STOP_LOSS_PERCENT)
+        window = close[entry + 1:end]
+        hits = np.flatnonzero((window >= take_profit) | (window <= stop_loss))
+        exit_index = entry + 1 + hits[0] if len(hits) else end - 1
+        trades.append(close[exit_index] / price - 1 - 2 * fee_rate)
+        t = exit_index + 1
+    return trades
+
+
+def _summarize(trades: list[float]) -> dict:
+    """
+    거래별 수익률을 요약합니다.
+    실제 매매처럼 거래마다 같은 금액(TOTAL_INVESTMENT_PER_STOCK)을 투자한다고 보고,
+    total_return 은 거래 1회 투자금 대비 누적 손익(수익률의 합)입니다.
+    """
+    if not trades:
+        return {'trades': 0, 'total_return': 0.0, 'avg_return': 0.0, 'win_rate': 0.0}
+    arr = np.asarray(trades)
+    return {
+        'trades': int(len(arr)),
+        'total_return': float(arr.sum()),
+        'avg_return': float(arr.mean()),
+        'win_rate': float((arr > 0).mean()),
+    }
+
+
+def _init_worker(panel_path: str):
+    """ 워커 프로세스 초기화: 패널을 메모리 매핑합니다. """
+    global _panel_codes, _panel_close, _panel_volume
+    _panel_codes, _, _panel_close, _panel_volume = load_price_panel(panel_path, mmap=True)
+
+
+def _evaluate(task: tuple) -> dict:
+    """
+    파라미터 조합 1개를 모든 종목과 모든 평가 구간에 대해 백테스트합니다.
+    지표는 인과적(과거 데이터만 사용)이므로 종목별로 한 번만 계산하고 구간별로 잘라 씁니다.
+    """
+    params, windows, require_screening, fee_rate = task
+    apply_params(params)
+
+    window_trades = [[] for _ in windows]
+    for row in range(len(_panel_codes)):
+        close = np.asarray(_panel_close[row])
+        valid = np.flatnonzero(~np.isnan(close))
+        if len(valid) == 0:
+            continue
+        offset = valid[0]
+        close = close[offset:]
+        volume = np.nan_to_num(np.asarray(_panel_volume[row, offset:]))
+        buy = _signal_arrays(close, volume, require_screening)
+
+        for i, (start, end) in enumerate(windows):
+            start, end = max(start - offset, 0), end - offset
+            if end - start < 2:
+                continue
+            window_trades[i].extend(_simulate(close, buy, start, end, fee_rate))
+
+    return {'params': params, 'windows': [_summarize(trades) for trades in window_trades]}
+
+
+def walk_forward_windows(n_days: int, splits: int, train_ratio: float = 0.7, warmup: int = 60) -> list[tuple[int, int, int]]:
+    """
+    워크포워드 분할 구간을 생성합니다. (롤링 방식)
+    :param n_days: 전체 일수
+    :param splits: 분할 수
+    :param train_ratio: 각 분할에서 학습 구간 비율
+    :param warmup: 지표 계산을 위해 비워 둘 앞부분 일수
+    :return: [(학습 시작, 검증 시작, 검증 끝), ...]
+    """
+    usable = n_days - warmup
+    fold = usable // splits
+    if fold < 10:
+        raise ValueError(f"분할 수({splits})에 비해 데이터 기간({n_days}일)이 너무 짧습니다.")
+    result = []
+    for k in range(splits):
+        start = warmup + k * fold
+        end = start + fold if k < splits - 1 else n_days
+        split = start + int((end - start) * train_ratio)
+        result.append((start, split, end))
+    return result
+
+
+def run_sweep(panel_path: str, param_sets: list[dict], workers: int | None = None, splits: int = 0,
+              train_ratio: float = 0.7, warmup: int = 60, require_screening: bool = False,
+              fee_rate: float = 0.0, sort_key: str = 'total_return') -> dict:
+    """
+    파라미터 조합들을 프로세스 풀에서 병렬로 백테스트하고 순위를 매깁니다.
+    :param panel_path: 가격 패널 디렉터리
+    :param param_sets: 파라미터 조합 리스트
+    :param workers: 워커 프로세스 수 (None이면 CPU 수)
+    :param splits: 워크포워드 분할 수 (0이면 전체 기간 단일 평가)
+    :param train_ratio: 워크포워드 학습 구간 비율
+    :param warmup: 지표 계산용 선행 구간 일수
+    :param require_screening: True이면 스크리닝 조건(5개 중 3개)도 만족해야 매수
+    :param fee_rate: 편도 거래 비용 비율
+    :param sort_key: 순위 기준 ('total_return', 'avg_return', 'win_rate', 'trades')
+    :return: {'ranking': [...], 'walk_forward': [...]}
+    """
+    _, dates, close, _ = load_price_panel(panel_path, mmap=True)
+    n_days = close.shape[1]
+
+    if splits:
+        folds = walk_forward_windows(n_days, splits, train_ratio, warmup)
+        windows = []
+        for start, split, end in folds:
+            windows.extend([(start, split), (split, end)])
+    else:
+        folds = []
+        windows = [(warmup, n_days)]
+
+    tasks = [(params, windows, require_screening, fee_rate) for params in param_sets]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+
+    print(f"파라미터 스윕 시작: {len(tasks)}개 조합, 워커 {workers}개, 평가 구간 {len(windows)}개")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panel_path,)) as pool:
+        results = list(pool.map(_evaluate, tasks, chunksize=chunksize))
+
+    if not folds:
+        ranking = sorted(({'params': r['params'], **r['windows'][0]} for r in results),
+                         key=lambda row: row[sort_key], reverse=True)
+        return {'ranking': ranking, 'walk_forward': []}
+
+    # 워크포워드: 분할별로 학습 구간 최고 조합을 고르고 검증 구간 성과를 기록
+    walk_forward = []
+    for k, (start, split, end) in enumerate(folds):
+        best = max(results, key=lambda r: r['windows'][2 * k][sort_key])
+        walk_forward.append({
+            'fold': k + 1,
+            'train': (dates[start], dates[split - 1]),
+            'test': (dates[split], dates[end - 1]),
+            'params': best['params'],
+            'train_result': best['windows'][2 * k],
+            'test_result': best['windows'][2 * k + 1],
+        })
+
+    # 전체 순위는 모든 검증 구간을 합친 성과로 매깁니다.
+    ranking = []
+    for r in results:
+        tests = r['windows'][1::2]
+        trades = sum(t['trades'] for t in tests)
+        total = sum(t['total_return'] for t in tests)
+        wins = sum(t['win_rate'] * t['trades'] for t in tests)
+        ranking.append({
+            'params': r['params'],
+            'trades': trades,
+            'total_return': total,
+            'avg_return': total / trades if trades else 0.0,
+            'win_rate': wins / trades if trades else 0.0,
+        })
+    ranking.sort(key=lambda row: row[sort_key], reverse=True)
+    return {'ranking': ranking, 'walk_forward': walk_forward}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전략 파라미터 병렬 스윕")
+    parser.add_argument('--panel', required=True, help="가격 패널 디렉터리")
+    parser.add_argument('--build', action='store_true', help="KIS API로 패널을 새로 구성합니다.")
+    parser.add_argument('--synthetic', type=str, default=None, help="합성 패널 생성 (예: 500x750)")
+    parser.add_argument('--days', type=int, default=365, help="--build 시 조회 기간 (일)")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=200, help="random 모드 샘플 수")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--splits', type=int, default=0, help="워크포워드 분할 수")
+    parser.add_argument('--train-ratio', type=float, default=0.7)
+    parser.add_argument('--screening', action='store_true', help="스크리닝 조건을 매수 필터로 사용")
+    parser.add_argument('--fee', type=float, default=0.0, help="편도 거래 비용 비율")
+    parser.add_argument('--sort', default='total_return', choices=['total_return', 'avg_return', 'win_rate', 'trades'])
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--output', default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        n_symbols, n_days = (int(x) for x in args.synthetic.lower().split('x'))
+        generate_synthetic_panel(args.panel, n_symbols, n_days, seed=args.seed)
+    elif args.build:
+        from kis_broker import KISBroker
+        broker = KISBroker(mock=True, force_open=True)
+        codes = [stock['code'] for stock in broker.get_all_listed_stocks()]
+        build_panel_from_broker(broker, codes, args.panel, days=args.days)
+
+    space = load_search_space()
+    if args.mode == 'grid':
+        param_sets = grid({k: v for k, v in space.items() if isinstance(v, list)})
+    else:
+        param_sets = random_samples(space, args.samples, seed=args.seed)
+
+    result = run_sweep(args.panel, param_sets, workers=args.workers, splits=args.splits,
+                       train_ratio=args.train_ratio, require_screening=args.screening,
+                       fee_rate=args.fee, sort_key=args.sort)
+
+    print(f"\n--- 상위 {args.top}개 파라미터 조합 ({args.sort} 기준) ---")
+    for rank, row in enumerate(result['ranking'][:args.top], 1):
+        print(f"{rank:>3}. 수익률 {row['total_return']:+.2%} | 평균 {row['avg_return']:+.2%} | "
+              f"승률 {row['win_rate']:.0%} | 거래 {row['trades']}회 | {row['params']}")
+
+    for fold in result['walk_forward']:
+        print(f"\n[워크포워드 {fold['fold']}] 학습 {fold['train'][0]}~{fold['train'][1]} -> "
+              f"검증 {fold['test'][0]}~{fold['test'][1]}")
+        print(f"  파라미터: {fold['params']}")
+        print(f"  학습 수익률 {fold['train_result']['total_return']:+.2%}, "
+              f"검증 수익률 {fold['test_result']['total_return']:+.2%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
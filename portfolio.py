@@ -1,48 +1,129 @@
+import configparser
+import logging
+import threading
+import time
+from dataclasses import dataclass
 import pandas as pd
 from kis_broker import KISBroker
+from state_store import StateStore, open_state_store
+from valuation import ValuationBook
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    portfolio_params = config['portfolio']
+    FULL_SYNC_INTERVAL_MINUTES = portfolio_params.getfloat('full_sync_interval_minutes', 30)  # 계좌 잔고 전체 동기화 주기
+except KeyError:
+    FULL_SYNC_INTERVAL_MINUTES = 30
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class Holding:
+    """ 보유 종목 1개의 상태 (현재가와 평가금액은 Portfolio.valuation 에서 관리) """
+    name: str
+    quantity: int
+    avg_price: float
 
 class Portfolio:
     """
     포트폴리오 상태를 관리하는 클래스. (보유 현금, 주식, 평균 단가 등)
+    체결 시 로컬에서 갱신하고, 계좌 잔고 전체 조회는 일정 주기마다 또는 불일치가 감지되었을 때만 수행합니다.
     """
-    def __init__(self, broker: KISBroker):
+    def __init__(self, broker: KISBroker, state_store: StateStore | None = None,
+                 full_sync_interval_minutes: float = FULL_SYNC_INTERVAL_MINUTES):
         """
         포트폴리오 초기화.
         :param broker: KISBroker 인스턴스
+        :param state_store: 여러 봇 프로세스가 공유하는 상태 저장소. 주어지면 현금 예약을 프로세스 간에 공유합니다.
+                            None 이면 설정([state] backend)에 따릅니다.
+        :param full_sync_interval_minutes: 계좌 잔고 전체 동기화 주기 (분)
         """
         self.broker = broker
         self.cash = 0
-        self.holdings = {}  # { '종목코드': {'name': '종목명', 'quantity': 수량, 'avg_price': 평단, 'current_price': 현재가, 'eval_amount': 평가금액}, ... }
+        self.reserved_cash = 0  # 접수 후 체결 대기 중인 매수 주문에 예약된 현금
+        self._cash_lock = threading.Lock()
+        self.state_store = state_store or open_state_store()
+        if self.state_store:
+            # 이전 실행에서 남은 이 프로세스의 예약과, 비정상 종료된 프로세스가 남긴 오래된 주문 기록을 정리합니다.
+            self.state_store.clear_reservations()
+            expired = self.state_store.expire_stale_orders()
+            if expired:
+                logger.info("갱신되지 않은 주문 기록 %d건을 만료 처리했습니다.", expired)
+        self.holdings: dict[str, Holding] = {}  # { '종목코드': Holding }
+        self.valuation = ValuationBook()  # 보유 종목 실시간 평가 (현재가, 평가금액, 평가손익)
+        self.full_sync_interval_seconds = full_sync_interval_minutes * 60
+        self._last_full_sync = 0.0
+        self._sync_requested = True
         self.update_from_broker()
 
-    def update_from_broker(self):
+    def request_sync(self, reason: str = ''):
+        """ 로컬 상태와 계좌가 어긋났을 수 있을 때 다음 reconcile() 에서 전체 동기화를 하도록 표시합니다. """
+        if reason:
+            logger.info("포트폴리오 전체 동기화 예약: %s", reason)
+        self._sync_requested = True
+
+    def reconcile(self) -> bool:
+        """
+        매매 주기 시작 시 호출합니다.
+        동기화 주기가 지났거나 불일치가 감지된 경우에만 계좌 잔고를 조회해 변경된 종목만 반영합니다.
+        :return: 전체 동기화를 수행했는지 여부
+        """
+        due = time.monotonic() - self._last_full_sync >= self.full_sync_interval_seconds
+        if not (due or self._sync_requested):
+            return False
+        return self.update_from_broker()
+
+    def update_from_broker(self) -> bool:
         """
-        브로커 API를 통해 실제 계좌 잔고를 가져와 포트폴리오를 최신 상태로 업데이트합니다.
+        브로커 API를 통해 실제 계좌 잔고를 가져와 포트폴리오와 비교하고, 달라진 종목만 갱신합니다.
+        :return: 동기화 성공 여부
         """
         balance = self.broker.get_balance()
         if balance is None or 'output1' not in balance or 'output2' not in balance:
-            print("계좌 잔고를 가져오는 데 실패했습니다.")
-            return
+            logger.warning("계좌 잔고를 가져오는 데 실패했습니다.")
+            return False
 
-        # 주식 잔고 업데이트
-        stock_balance = balance['output1']
-        self.holdings = {}
-        for stock in stock_balance:
+        # 주식 잔고 비교 및 반영
+        changes = []
+        seen = set()
+        for stock in balance['output1']:
             code = stock['pdno']
-            self.holdings[code] = {
-                'name': stock['prdt_name'],
-                'quantity': int(stock['hldg_qty']),
-                'avg_price': float(stock['pchs_avg_pric']),
-                'current_price': float(stock['prpr']),
-                'eval_amount': int(stock['evlu_amt'])
-            }
-        
-        # 현금 잔고 업데이트
-        cash_balance = balance['output2']
-        self.cash = int(cash_balance['dnca_tot_amt'])
-        
-        print("포트폴리오가 계좌 실시간 잔고로 업데이트되었습니다.")
-        print(self)
+            quantity = int(stock['hldg_qty'])
+            if quantity == 0:
+                continue
+            seen.add(code)
+            avg_price = float(stock['pchs_avg_pric'])
+            holding = self.holdings.get(code)
+            if holding is None:
+                holding = self.holdings[code] = Holding(stock['prdt_name'], quantity, avg_price)
+                changes.append(f"  + {code} ({stock['prdt_name']}): {quantity}주 @ 평단 {avg_price:.0f}원")
+            elif holding.quantity != quantity or abs(holding.avg_price - avg_price) >= 0.01:
+                changes.append(f"  * {code} ({stock['prdt_name']}): {holding.quantity}주 → {quantity}주 @ 평단 {avg_price:.0f}원")
+                holding.quantity = quantity
+                holding.avg_price = avg_price
+            holding.name = stock['prdt_name']
+            self.valuation.set_position(code, quantity, avg_price, float(stock['prpr']))
+
+        for code in [code for code in self.holdings if code not in seen]:
+            changes.append(f"  - {code} ({self.holdings[code].name}): 계좌에 없음")
+            del self.holdings[code]
+            self.valuation.remove(code)
+
+        # 현금 잔고 반영
+        cash = int(balance['output2']['dnca_tot_amt'])
+        with self._cash_lock:
+            if cash != self.cash:
+                changes.append(f"  현금: {self.cash:,}원 → {cash:,}원")
+                self.cash = cash
+
+        self._last_full_sync = time.monotonic()
+        self._sync_requested = False
+        if changes:
+            logger.info("포트폴리오 동기화: 변경 사항\n%s", "\n".join(changes))
+        return True
 
     def update_on_buy(self, stock_code: str, quantity: int, price: float):
         """
@@ -51,27 +132,22 @@ class Portfolio:
         :param quantity: 매수한 수량
         :param price: 매수 체결 가격
         """
-        if stock_code in self.holdings:
+        holding = self.holdings.get(stock_code)
+        if holding:
             # 기존 보유 종목 추가 매수
-            existing_holding = self.holdings[stock_code]
-            total_quantity = existing_holding['quantity'] + quantity
-            total_value = (existing_holding['quantity'] * existing_holding['avg_price']) + (quantity * price)
-            new_avg_price = total_value / total_quantity
-            
-            existing_holding['quantity'] = total_quantity
-            existing_holding['avg_price'] = new_avg_price
+            total_quantity = holding.quantity + quantity
+            holding.avg_price = (holding.quantity * holding.avg_price + quantity * price) / total_quantity
+            holding.quantity = total_quantity
         else:
-            # 신규 종목 매수
-            self.holdings[stock_code] = {
-                'name': 'Unknown', # 종목명은 추후 업데이트 필요
-                'quantity': quantity,
-                'avg_price': price,
-            }
+            # 신규 종목 매수 (종목명은 다음 전체 동기화 때 채워집니다)
+            holding = self.holdings[stock_code] = Holding('Unknown', quantity, price)
+        self.valuation.set_position(stock_code, holding.quantity, holding.avg_price, price)
         
-        # 현금 차감
-        self.cash -= quantity * price
-        print(f"[매수] {stock_code} {quantity}주 @ {price}원. 포트폴리오 업데이트 완료.")
-        print(self)
+        # 현금 차감 (주문 접수 스레드의 현금 예약 확인과 겹치지 않도록 잠금 안에서)
+        with self._cash_lock:
+            self.cash -= quantity * price
+            cash = self.cash
+        logger.info("[매수] %s %d주 @ %s원 → 보유 %d주, 현금 %.0f원", stock_code, quantity, price, holding.quantity, cash)
 
     def update_on_sell(self, stock_code: str, quantity: int, price: float):
         """
@@ -80,26 +156,90 @@ class Portfolio:
         :param quantity: 매도한 수량
         :param price: 매도 체결 가격
         """
-        if stock_code not in self.holdings or self.holdings[stock_code]['quantity'] < quantity:
-            print(f"[오류] 매도 수량({quantity})이 보유 수량보다 많습니다.")
+        holding = self.holdings.get(stock_code)
+        if holding is None or holding.quantity < quantity:
+            logger.error("[%s] 매도 수량(%d)이 보유 수량보다 많습니다.", stock_code, quantity)
+            self.request_sync(f"{stock_code} 매도 체결 수량 불일치")
             return
 
         # 보유 수량 차감
-        self.holdings[stock_code]['quantity'] -= quantity
+        holding.quantity -= quantity
+        self.valuation.set_position(stock_code, holding.quantity, holding.avg_price, price)
         
         # 전량 매도 시 holdings에서 제거
-        if self.holdings[stock_code]['quantity'] == 0:
+        if holding.quantity == 0:
             del self.holdings[stock_code]
             
         # 현금 증가
-        self.cash += quantity * price
-        print(f"[매도] {stock_code} {quantity}주 @ {price}원. 포트폴리오 업데이트 완료.")
-        print(self)
+        with self._cash_lock:
+            self.cash += quantity * price
+            cash = self.cash
+        logger.info("[매도] %s %d주 @ %s원 → 보유 %d주, 현금 %.0f원", stock_code, quantity, price, holding.quantity, cash)
+
+    def available_cash(self) -> float:
+        """ 예약되지 않은 주문 가능 현금을 반환합니다. """
+        if self.state_store:
+            return self.cash - self.state_store.reserved_total()
+        with self._cash_lock:
+            return self.cash - self.reserved_cash
+
+    def reserve_cash(self, amount: float) -> bool:
+        """
+        매수 주문용 현금을 원자적으로 예약합니다.
+        동시에 여러 매수 주문이 접수되어도 예약 합계가 현금을 넘지 않습니다.
+        :param amount: 예약할 금액
+        :return: 예약 성공 여부
+        """
+        if self.state_store:
+            # 같은 계좌를 쓰는 모든 프로세스의 예약 합계 기준으로 확인합니다.
+            return self.state_store.reserve_cash(amount, self.cash)
+        with self._cash_lock:
+            if self.cash - self.reserved_cash < amount:
+                return False
+            self.reserved_cash += amount
+            return True
+
+    def release_cash(self, amount: float):
+        """ 예약된 현금을 해제합니다. (체결 반영 또는 주문 취소 시) """
+        if self.state_store:
+            self.state_store.release_cash(amount)
+            return
+        with self._cash_lock:
+            self.reserved_cash = max(0, self.reserved_cash - amount)
+
+    def mark_to_market(self, prices: dict[str, float]) -> int:
+        """
+        시세 묶음으로 보유 종목의 평가금액과 평가손익을 한 번에 갱신합니다. (API 호출 없음)
+        :param prices: { 종목코드: 현재가 }
+        :return: 갱신된 보유 종목 수
+        """
+        return self.valuation.update_prices(prices)
+
+    @property
+    def stock_value(self) -> float:
+        """ 보유 주식 평가금액 합계 """
+        return self.valuation.total_market_value
+
+    @property
+    def unrealized_pnl(self) -> float:
+        """ 보유 주식 평가손익 합계 """
+        return self.valuation.unrealized_pnl
+
+    @property
+    def total_value(self) -> float:
+        """ 총자산 (현금 + 주식 평가금액) """
+        return self.cash + self.valuation.total_market_value
+
+    def exposure(self) -> float:
+        """ 총자산 중 주식 평가금액 비중 """
+        return self.valuation.exposure(self.cash)
 
-    def get_holding(self, stock_code: str) -> dict | None:
+    def get_holding(self, stock_code: str) -> Holding | None:
         """ 특정 종목의 보유 정보를 반환합니다. """
         return self.holdings.get(stock_code)
 
     def __str__(self):
-        holdings_str = "\n".join([f"  - {code} ({details['name']}): {details['quantity']}주 @ 평단 {details['avg_price']:.0f}원" for code, details in self.holdings.items()])
-        return f"--- 포트폴리오 현황 ---\n현금: {self.cash:,}원\n보유 주식:\n{holdings_str}\n----------------------"
\ No newline at end of file
+        holdings_str = "\n".join([f"  - {code} ({holding.name}): {holding.quantity}주 @ 평단 {holding.avg_price:.0f}원" for code, holding in self.holdings.items()])
+        return (f"--- 포트폴리오 현황 ---\n현금: {self.cash:,}원\n보유 주식:\n{holdings_str}\n"
+                f"평가금액: {self.stock_value:,.0f}원 (평가손익 {self.unrealized_pnl:+,.0f}원, 주식 비중 {self.exposure():.1%})\n"
+                f"----------------------")
\ No newline at end of file
@@ -0,0 +1,321 @@
+import asyncio
+import configparser
+import contextlib
+import functools
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    profiling_params = config['profiling']
+    SPANS_ENABLED = profiling_params.getboolean('spans', False)        # 항상 구간 시간을 기록하고 주기마다 요약 로그 출력
+    PROFILE_CYCLES = profiling_params.getint('cycles', 3)               # 프로파일 캡처 1회에 기록할 주기 수
+    PROFILE_DIR = profiling_params.get('output_dir', 'profiles')        # 캡처 결과 저장 디렉터리
+    PROFILE_TRIGGER_FILE = profiling_params.get('trigger_file', 'profile.flag')  # 이 파일이 생기면 캡처 시작
+    SAMPLE_INTERVAL_MS = profiling_params.getfloat('sample_interval_ms', 5)      # 스택 샘플링 간격 (밀리초)
+except KeyError:
+    SPANS_ENABLED = False
+    PROFILE_CYCLES = 3
+    PROFILE_DIR = 'profiles'
+    PROFILE_TRIGGER_FILE = 'profile.flag'
+    SAMPLE_INTERVAL_MS = 5
+
+logger = logging.getLogger(__name__)
+
+# 캡처를 요청하는 시그널 (kill -USR1 <pid>). 지원하지 않는 OS 에서는 파일 플래그만 사용
+PROFILE_SIGNAL = getattr(signal, 'SIGUSR1', None)
+
+# 요약 로그에 출력할 구간/종목 수
+SUMMARY_TOP = 10
+
+# 종목별 시간으로 모을 구간 이름
+SYMBOL_CATEGORIES = ('fetch', 'compute', 'order')
+
+
+class SpanRecorder:
+    """
+    이름 붙은 구간(span)의 호출 수와 누적 시간을 모읍니다. (스레드 안전)
+    - 종목코드가 주어진 구간은 종목별 시간에도 더합니다.
+    - 캡처 중에는 구간마다 시작/종료 시각을 이벤트로 남겨 타임라인(Chrome trace)으로 저장합니다.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()  # 이벤트 시각 기준점
+        self.events: list[tuple] | None = None  # 캡처 중에만 리스트
+        self._totals: dict[str, list] = {}   # { 구간 이름: [호출 수, 누적 시간(초)] }
+        self._symbols: dict[str, dict[str, float]] = {}  # { 종목코드: { 구간 이름: 누적 시간(초) } }
+        self._lock = threading.Lock()
+
+    def record(self, name: str, symbol: str | None, started: float, elapsed: float, in_loop: bool = False):
+        with self._lock:
+            total = self._totals.get(name)
+            if total is None:
+                total = self._totals[name] = [0, 0.0]
+            total[0] += 1
+            total[1] += elapsed
+            if symbol is not None:
+                per_symbol = self._symbols.setdefault(symbol, {})
+                per_symbol[name] = per_symbol.get(name, 0.0) + elapsed
+            if self.events is not None:
+                self.events.append((name, symbol, started, elapsed, threading.get_ident(), in_loop))
+
+    def totals(self) -> dict[str, tuple[int, float]]:
+        """ 지금까지 모은 구간별 (호출 수, 누적 시간) 복사본 """
+        with self._lock:
+            return {name: (count, seconds) for name, (count, seconds) in self._totals.items()}
+
+    def reset(self) -> tuple[dict, dict]:
+        """ 모은 값을 돌려주고 비웁니다. :return: (구간별 [호출 수, 누적 시간], 종목별 구간 시간) """
+        with self._lock:
+            totals, symbols = self._totals, self._symbols
+            self._totals, self._symbols = {}, {}
+        return totals, symbols
+
+
+RECORDER = SpanRecorder()
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ('name', 'symbol', 'started', 'in_loop')
+
+    def __init__(self, name: str, symbol: str | None):
+        self.name = name
+        self.symbol = symbol
+
+    def __enter__(self):
+        # 코루틴 안의 구간은 다른 구간과 겹칠 수 있으므로 타임라인에서 비동기 이벤트로 표시합니다.
+        self.in_loop = RECORDER.events is not None and asyncio._get_running_loop() is not None
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        RECORDER.record(self.name, self.symbol, self.started, time.perf_counter() - self.started, self.in_loop)
+        return False
+
+
+def span(name: str, symbol: str | None = None):
+    """
+    구간 시간을 기록하는 컨텍스트 관리자. 기록이 꺼져 있으면 아무 일도 하지 않는 객체를 돌려줍니다.
+        with profiling.span('compute', stock_code):
+            ...
+    :param name: 구간 이름 (종목별 시간은 'fetch', 'compute', 'order')
+    :param symbol: 종목코드 (주어지면 종목별 시간에 더함)
+    """
+    if not RECORDER.enabled:
+        return _NULL_SPAN
+    return _Span(name, symbol)
+
+
+def profiled(name: str):
+    """ 함수 호출 전체를 구간으로 기록하는 데코레이터. 기록이 꺼져 있으면 함수를 그대로 호출합니다. """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return func(*args, **kwargs)
+            with _Span(name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}".replace(';', ':')
+
+
+class StackSampler:
+    """
+    일정 간격으로 모든 스레드의 호출 스택을 샘플링합니다. (sys._current_frames)
+    결과는 flamegraph.pl / speedscope 가 읽는 접힌 스택(folded) 형식으로 저장합니다.
+    """
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.counts: Counter = Counter()  # { "스레드;바깥 함수;...;안쪽 함수": 샘플 수 }
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)).replace(';', ':'))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+    def write_folded(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _trace_events(events: list[tuple], origin: float) -> list[dict]:
+    """ 구간 이벤트를 Chrome trace 형식(chrome://tracing, Perfetto)으로 바꿉니다. """
+    pid = os.getpid()
+    trace = []
+    for name, symbol, started, elapsed, thread_id, in_loop in events:
+        ts = (started - origin) * 1e6
+        args = {'symbol': symbol} if symbol else {}
+        if in_loop:
+            # 겹칠 수 있는 코루틴 구간은 종목(또는 구간 이름)별 트랙에 표시합니다.
+            common = {'name': name, 'cat': 'span', 'id': symbol or name, 'pid': pid, 'tid': thread_id}
+            trace.append({**common, 'ph': 'b', 'ts': ts, 'args': args})
+            trace.append({**common, 'ph': 'e', 'ts': ts + elapsed * 1e6})
+        else:
+            trace.append({'name': name, 'cat': 'span', 'ph': 'X', 'ts': ts, 'dur': elapsed * 1e6,
+                          'pid': pid, 'tid': thread_id, 'args': args})
+    return trace
+
+
+class ProfilingController:
+    """
+    설정/시그널/파일 플래그로 켜는 프로파일링.
+    - spans 설정을 켜면 주기마다 구간별 시간과 느린 종목을 요약해 로그로 남깁니다.
+    - 시그널(SIGUSR1) 또는 trigger_file 이 생기면 다음 주기부터 cycles 개 주기 동안 스택 샘플링과 구간 이벤트를 캡처해
+      output_dir 에 접힌 스택(.folded), 타임라인(.trace.json), 종목별 시간(.symbols.csv)을 저장합니다.
+      (trigger_file 에 숫자를 적으면 그 주기 수만큼 캡처)
+    - 주기 시작/종료는 메인 루프가 begin_cycle / end_cycle 로 알려 줍니다.
+    """
+    def __init__(self, spans: bool = SPANS_ENABLED, cycles: int = PROFILE_CYCLES, output_dir: str = PROFILE_DIR,
+                 trigger_file: str = PROFILE_TRIGGER_FILE, interval_ms: float = SAMPLE_INTERVAL_MS):
+        """
+        :param spans: 캡처 중이 아니어도 구간 시간을 기록할지 여부
+        :param cycles: 캡처 1회에 기록할 주기 수
+        :param output_dir: 캡처 결과 저장 디렉터리
+        :param trigger_file: 캡처 요청 파일 경로 (비우면 파일 플래그를 사용하지 않음)
+        :param interval_ms: 스택 샘플링 간격 (밀리초)
+        """
+        self.spans = spans
+        self.cycles = cycles
+        self.output_dir = output_dir
+        self.trigger_file = trigger_file
+        self.interval_ms = interval_ms
+        self._requested = 0  # 요청된 캡처 주기 수 (시그널 핸들러에서 설정)
+        self._remaining = 0  # 남은 캡처 주기 수
+        self._sampler: StackSampler | None = None
+        self._symbols: dict[str, dict[str, float]] = {}  # 캡처 중 종목별 누적 시간
+        RECORDER.enabled = spans
+
+    @property
+    def capturing(self) -> bool:
+        return self._sampler is not None
+
+    def install_signal_handler(self):
+        """ PROFILE_SIGNAL 을 받으면 캡처를 요청하도록 합니다. (메인 스레드에서 호출) """
+        if PROFILE_SIGNAL is None:
+            return
+        signal.signal(PROFILE_SIGNAL, lambda signum, frame: self.request())
+
+    def request(self, cycles: int | None = None):
+        """ 다음 주기부터 cycles 개 주기를 캡처하도록 요청합니다. """
+        self._requested = cycles or self.cycles
+
+    def _check_trigger_file(self):
+        if not self.trigger_file or not os.path.exists(self.trigger_file):
+            return
+        try:
+            with open(self.trigger_file, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            os.remove(self.trigger_file)
+        except OSError as e:
+            logger.warning("프로파일 요청 파일 처리 실패: %s", e)
+            return
+        self.request(int(content) if content.isdigit() else None)
+
+    def begin_cycle(self):
+        """ 주기 시작. 캡처 요청이 있으면 샘플링을 시작하고, 구간 기록을 새로 시작합니다. """
+        self._check_trigger_file()
+        if self._requested and not self.capturing:
+            self._remaining, self._requested = self._requested, 0
+            self._symbols = {}
+            RECORDER.events = []
+            RECORDER.enabled = True
+            self._sampler = StackSampler(self.interval_ms / 1000)
+            self._sampler.start()
+            logger.info("프로파일 캡처 시작: %d개 주기", self._remaining)
+        RECORDER.reset()
+
+    def end_cycle(self, timing=None):
+        """ 주기 종료. 구간 요약을 로그로 남기고, 캡처 중이면 남은 주기를 줄여 다 끝나면 결과를 저장합니다. """
+        if not RECORDER.enabled:
+            return
+        totals, symbols = RECORDER.reset()
+        self._log_summary(totals, symbols)
+        if not self.capturing:
+            return
+        for symbol, spans in symbols.items():
+            per_symbol = self._symbols.setdefault(symbol, {})
+            for name, seconds in spans.items():
+                per_symbol[name] = per_symbol.get(name, 0.0) + seconds
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._finish()
+
+    @staticmethod
+    def _log_summary(totals: dict, symbols: dict):
+        if not totals:
+            return
+        top = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:SUMMARY_TOP]
+        slowest = sorted(symbols.items(), key=lambda item: sum(item[1].values()), reverse=True)[:SUMMARY_TOP]
+        logger.info("구간별 소요: %s", ", ".join(f"{name} {count}회 {seconds:.3f}s" for name, (count, seconds) in top),
+                    extra={'spans': {name: {'count': count, 'seconds': seconds}
+                                     for name, (count, seconds) in totals.items()}})
+        if slowest:
+            logger.info("느린 종목: %s", ", ".join(
+                f"{symbol}({'/'.join(f'{spans.get(name, 0.0):.3f}' for name in SYMBOL_CATEGORIES)})"
+                for symbol, spans in slowest) + f" [{'/'.join(SYMBOL_CATEGORIES)} 초]")
+
+    def _finish(self):
+        sampler, self._sampler = self._sampler, None
+        events, RECORDER.events = RECORDER.events or [], None
+        RECORDER.enabled = self.spans
+        sampler.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        sampler.write_folded(f"{prefix}.folded")
+        with open(f"{prefix}.trace.json", 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': _trace_events(events, RECORDER.origin), 'displayTimeUnit': 'ms'}, f)
+        with open(f"{prefix}.symbols.csv", 'w', encoding='utf-8') as f:
+            f.write(f"symbol,{','.join(SYMBOL_CATEGORIES)},total\n")
+            rows = sorted(self._symbols.items(), key=lambda item: sum(item[1].values()), reverse=True)
+            for symbol, spans in rows:
+                values = [spans.get(name, 0.0) for name in SYMBOL_CATEGORIES]
+                f.write(f"{symbol},{','.join(f'{v:.6f}' for v in values)},{sum(spans.values()):.6f}\n")
+        logger.info("프로파일 저장: %s.{folded,trace.json,symbols.csv} (샘플 %d개, 구간 %d개)",
+                    prefix, sampler.samples, len(events))
+
+    def close(self):
+        """ 진행 중인 캡처가 있으면 지금까지의 결과를 저장합니다. """
+        if self.capturing:
+            self._finish()
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    토큰 버킷 방식의 호출 빈도 제한기 (스레드 안전)
+    초당 rate 개의 토큰이 채워지고, 최대 burst 개까지 모아 둘 수 있습니다.
+    """
+    def __init__(self, rate_per_second: float, burst: int | None = None):
+        """
+        :param rate_per_second: 초당 허용 호출 수
+        :param burst: 한 번에 몰아서 허용할 최대 호출 수 (기본값: rate_per_second 올림)
+        """
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second는 0보다 커야 합니다.")
+        self.rate = rate_per_second
+        self.capacity = burst if burst is not None else max(1, int(rate_per_second + 0.999))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0  # acquire 에서 토큰을 기다린 누적 시간 (한도에 얼마나 붙어 있는지 확인용)
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """ 토큰이 있으면 1개를 사용하고 True, 없으면 기다리지 않고 False를 반환합니다. """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self):
+        """ 토큰을 1개 얻을 때까지 대기합니다. """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """ acquire 의 비동기 버전. 토큰을 기다리는 동안 이벤트 루프를 막지 않습니다. """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+            await asyncio.sleep(wait)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    여러 프로세스가 함께 쓰는 토큰 버킷. 토큰 수와 갱신 시각을 공유 메모리에 두므로,
+    워커 프로세스에 넘기면 모든 프로세스의 호출 합계가 초당 rate 개를 넘지 않습니다.
+    (프로세스를 만들 때 인자로 넘겨야 하며, 시각은 모든 프로세스가 같은 time.monotonic 기준을 사용합니다)
+    """
+    def __init__(self, rate_per_second: float, burst: int | None = None, context=None):
+        """
+        :param rate_per_second: 초당 허용 호출 수 (모든 프로세스 합계)
+        :param burst: 한 번에 몰아서 허용할 최대 호출 수 (기본값: rate_per_second 올림)
+        :param context: multiprocessing 컨텍스트 (None 이면 기본 컨텍스트)
+        """
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second는 0보다 커야 합니다.")
+        import multiprocessing
+        context = context or multiprocessing
+        self.rate = rate_per_second
+        self.capacity = burst if burst is not None else max(1, int(rate_per_second + 0.999))
+        self._state = context.Array('d', [float(self.capacity), time.monotonic()])  # [토큰 수, 갱신 시각]
+        self._lock = self._state.get_lock()
+        self.waited_seconds = 0.0  # 이 프로세스에서 기다린 누적 시간
+
+    @property
+    def _tokens(self) -> float:
+        return self._state[0]
+
+    @_tokens.setter
+    def _tokens(self, value: float):
+        self._state[0] = value
+
+    @property
+    def _updated(self) -> float:
+        return self._state[1]
+
+    @_updated.setter
+    def _updated(self, value: float):
+        self._state[1] = value
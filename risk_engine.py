@@ -0,0 +1,133 @@
+import configparser
+import logging
+import threading
+
+import metrics
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    risk_params = config['risk']
+    MAX_POSITION_VALUE = risk_params.getfloat('max_position_value', 0)   # 종목당 최대 평가금액 (원, 0: 제한 없음)
+    MAX_POSITION_RATIO = risk_params.getfloat('max_position_ratio', 0.2)  # 종목당 총자산 대비 최대 비중 (0: 제한 없음)
+    MAX_SECTOR_RATIO = risk_params.getfloat('max_sector_ratio', 0.4)      # 섹터당 총자산 대비 최대 비중 (0: 제한 없음)
+    MAX_GROSS_RATIO = risk_params.getfloat('max_gross_ratio', 1.0)        # 주식 전체의 총자산 대비 최대 비중 (0: 제한 없음)
+except KeyError:
+    MAX_POSITION_VALUE = 0
+    MAX_POSITION_RATIO = 0.2
+    MAX_SECTOR_RATIO = 0.4
+    MAX_GROSS_RATIO = 1.0
+
+logger = logging.getLogger(__name__)
+
+RISK_REJECTIONS = metrics.counter('risk_rejections_total', "위험 한도로 거부한 매수 주문 수", ('limit',))
+
+
+class RiskEngine:
+    """
+    매수 주문 전 위험 한도 확인. 종목/섹터/계좌 단위 노출을 누적 합계로 관리하므로 주문 1건 확인이 O(1)입니다.
+    - 보유 노출: 포트폴리오 평가 장부(ValuationBook)의 종목별 평가금액, 섹터별 합계, 전체 합계를 그대로 사용합니다.
+      (체결, 잔고 동기화, 시세 반영 때 장부가 변경분만 갱신)
+    - 주문 노출: 접수 후 체결 대기 중인 매수 금액을 종목/섹터/전체로 누적하고, 체결되거나 취소되면 해제합니다.
+    - 노출 = 보유 평가금액 + 체결 대기 매수 금액, 한도는 총자산(현금 + 평가금액) 대비 비중 또는 금액입니다.
+    - 확인과 예약은 잠금 안에서 함께 처리되므로, 개장 직후 매수 주문이 동시에 접수되어도 한도를 넘지 않습니다.
+    - 매도는 노출을 줄이므로 확인하지 않습니다. 체결 대기 금액은 이 프로세스의 주문만 집계합니다.
+    """
+    def __init__(self, portfolio, max_position_value: float = MAX_POSITION_VALUE,
+                 max_position_ratio: float = MAX_POSITION_RATIO, max_sector_ratio: float = MAX_SECTOR_RATIO,
+                 max_gross_ratio: float = MAX_GROSS_RATIO):
+        """
+        :param portfolio: Portfolio 인스턴스 (현금, 평가 장부)
+        :param max_position_value: 종목당 최대 노출 금액 (원, 0 이면 제한 없음)
+        :param max_position_ratio: 종목당 총자산 대비 최대 노출 비중 (0 이면 제한 없음)
+        :param max_sector_ratio: 섹터당 총자산 대비 최대 노출 비중 (0 이면 제한 없음, 섹터를 모르는 종목은 제외)
+        :param max_gross_ratio: 주식 전체의 총자산 대비 최대 노출 비중 (0 이면 제한 없음)
+        """
+        self.portfolio = portfolio
+        self.valuation = portfolio.valuation
+        self.max_position_value = max_position_value
+        self.max_position_ratio = max_position_ratio
+        self.max_sector_ratio = max_sector_ratio
+        self.max_gross_ratio = max_gross_ratio
+        self._pending_symbol: dict[str, float] = {}  # { 종목코드: 체결 대기 매수 금액 }
+        self._pending_sector: dict[str, float] = {}  # { 섹터: 체결 대기 매수 금액 }
+        self._pending_total = 0.0
+        self._lock = threading.Lock()
+
+    def set_sectors(self, sectors: dict[str, str | None]):
+        """ 종목별 섹터를 등록합니다. (전체 상장 종목 조회 결과, 주문 접수 전에 한 번) """
+        with self._lock:
+            self.valuation.set_sectors(sectors)
+
+    def exposure(self, stock_code: str) -> tuple[float, float, float]:
+        """ (종목, 섹터, 전체) 노출 금액 = 보유 평가금액 + 체결 대기 매수 금액 """
+        sector = self.valuation.sectors.get(stock_code)
+        return (self.valuation.market_value_of(stock_code) + self._pending_symbol.get(stock_code, 0.0),
+                self.valuation.sector_market_value(sector) + self._pending_sector.get(sector, 0.0),
+                float(self.valuation.total_market_value) + self._pending_total)
+
+    def _violation(self, stock_code: str, amount: float) -> tuple[str, str] | None:
+        """ 주문 금액을 더했을 때 넘는 한도 (한도 이름, 사유). 넘지 않으면 None """
+        equity = self.portfolio.total_value
+        if equity <= 0:
+            return 'gross', "총자산이 없습니다."
+        symbol, sector_value, gross = self.exposure(stock_code)
+        if self.max_position_value and symbol + amount > self.max_position_value:
+            return 'position', f"종목 한도 초과 ({symbol + amount:,.0f}원 > {self.max_position_value:,.0f}원)"
+        if self.max_position_ratio and symbol + amount > equity * self.max_position_ratio:
+            return 'position', f"종목 비중 한도 초과 ({(symbol + amount) / equity:.1%} > {self.max_position_ratio:.0%})"
+        sector = self.valuation.sectors.get(stock_code)
+        if sector and self.max_sector_ratio and sector_value + amount > equity * self.max_sector_ratio:
+            return 'sector', (f"{sector} 섹터 비중 한도 초과 "
+                              f"({(sector_value + amount) / equity:.1%} > {self.max_sector_ratio:.0%})")
+        if self.max_gross_ratio and gross + amount > equity * self.max_gross_ratio:
+            return 'gross', f"주식 비중 한도 초과 ({(gross + amount) / equity:.1%} > {self.max_gross_ratio:.0%})"
+        return None
+
+    def _add(self, stock_code: str, amount: float):
+        sector = self.valuation.sectors.get(stock_code)
+        self._pending_symbol[stock_code] = self._pending_symbol.get(stock_code, 0.0) + amount
+        if sector:
+            self._pending_sector[sector] = self._pending_sector.get(sector, 0.0) + amount
+        self._pending_total += amount
+
+    def try_reserve(self, stock_code: str, amount: float) -> tuple[bool, str]:
+        """
+        매수 금액을 더해도 한도 안이면 체결 대기 노출로 예약합니다. (스레드에서 호출 가능)
+        :param amount: 매수 주문 금액
+        :return: (예약 여부, 사유)
+        """
+        with self._lock:
+            violation = self._violation(stock_code, amount)
+            if violation is None:
+                self._add(stock_code, amount)
+                return True, "한도 이내"
+        limit, reason = violation
+        RISK_REJECTIONS.inc(limit)
+        return False, reason
+
+    def reserve(self, stock_code: str, amount: float):
+        """ 한도 확인 없이 예약합니다. (이미 접수된 주문을 재시작 후 복원할 때) """
+        with self._lock:
+            self._add(stock_code, amount)
+
+    def release(self, stock_code: str, amount: float):
+        """ 예약을 해제합니다. (체결되어 보유 노출로 옮겨졌거나, 주문이 실패/취소된 금액) """
+        if not amount:
+            return
+        sector = self.valuation.sectors.get(stock_code)
+        with self._lock:
+            remaining = self._pending_symbol.get(stock_code, 0.0) - amount
+            if remaining > 0.5:
+                self._pending_symbol[stock_code] = remaining
+            else:
+                self._pending_symbol.pop(stock_code, None)
+            if sector:
+                remaining = self._pending_sector.get(sector, 0.0) - amount
+                if remaining > 0.5:
+                    self._pending_sector[sector] = remaining
+                else:
+                    self._pending_sector.pop(sector, None)
+            self._pending_total = max(0.0, self._pending_total - amount)
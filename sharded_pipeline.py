@@ -0,0 +1,365 @@
+import asyncio
+import configparser
+import functools
+import itertools
+import logging
+import multiprocessing
+import pickle
+import queue
+import time
+import zlib
+from datetime import datetime
+
+from indicators import add_all_indicators
+from strategy import check_buy_signal, check_sell_signal
+from stock_selector import screen_dataframe
+from kis_broker import KISBroker
+from market_data import MarketDataService
+from rate_limiter import SharedRateLimiter
+from order_manager import OrderIntent, PRIORITY_STOP_LOSS, PRIORITY_SELL, PRIORITY_BUY
+from trading_pipeline import (TradingPipeline, fetch_stage, PIPELINE_QUEUE_SIZE, MAX_SCREENING_STOCKS,
+                              MAX_BUY_CHECKS, _DONE)
+from cycle_scheduler import CycleTiming
+from config_reload import ConfigChange, apply_params
+from logging_setup import setup_logging
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    SHARD_WORKERS = trading_control.getint('shard_workers', 0)  # 시세 조회/신호 계산 워커 프로세스 수 (0, 1: 사용 안 함)
+except KeyError:
+    SHARD_WORKERS = 0
+
+logger = logging.getLogger(__name__)
+
+# 워커 응답을 기다리는 동안 워커 프로세스 생존을 확인하는 주기 (초)
+_POLL_SECONDS = 1.0
+
+
+def worker_broker_factory(broker):
+    """
+    워커 프로세스에서 같은 설정의 브로커를 만드는 함수. (프로세스 사이에 전달할 수 있도록 partial 로 만듭니다)
+    브로커에 worker_factory() 가 있으면 그 결과를 사용합니다.
+    """
+    if hasattr(broker, 'worker_factory'):
+        return broker.worker_factory()
+    from local_broker import LocalBroker
+    if isinstance(broker, LocalBroker):
+        return functools.partial(LocalBroker, broker.panel_path, latency_seconds=broker.latency_seconds)
+    return functools.partial(KISBroker, mock=broker.mock, force_open=broker.force_open)
+
+
+class _ShardWorker:
+    """ 워커 프로세스 1개가 맡은 종목의 시세 조회, 지표 계산, 신호 확인 """
+    def __init__(self, shard: int, market_data: MarketDataService):
+        self.shard = shard
+        self.market_data = market_data
+
+    def _quotes(self, stock_codes: list[str]) -> dict[str, int]:
+        """ 주문 수량 계산용 현재가 (주문 프로세스가 다시 조회하지 않도록 함께 보냅니다) """
+        quotes = {}
+        for stock_code in stock_codes:
+            price = self.market_data.get_quote(stock_code)
+            if price:
+                quotes[stock_code] = price
+        return quotes
+
+    async def _sell(self, holdings: list[tuple[str, float]]):
+        avg_prices = dict(holdings)
+        bars_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        fetcher = asyncio.create_task(fetch_stage(self.market_data, list(avg_prices), bars_queue))
+        intents, prices = [], {}
+        try:
+            while (item := await bars_queue.get()) is not _DONE:
+                stock_code, df = item
+                if df is None:
+                    continue
+                prices[stock_code] = float(df['close'].iloc[-1])
+                sell_signal, reason = check_sell_signal(add_all_indicators(df.copy()), avg_prices[stock_code])
+                if sell_signal:
+                    priority = PRIORITY_STOP_LOSS if reason.startswith("손절매") else PRIORITY_SELL
+                    intents.append((stock_code, reason, priority))
+        except BaseException:
+            fetcher.cancel()
+            raise
+        await fetcher
+        return intents, prices
+
+    async def _buy(self, screening: list[str], fallback: list[str], deadline: float | None):
+        fallback = set(fallback)
+        bars_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        fetcher = asyncio.create_task(fetch_stage(self.market_data, screening, bars_queue, deadline))
+        selected, checked = [], []
+        try:
+            while (item := await bars_queue.get()) is not _DONE:
+                stock_code, df = item
+                if df is None:
+                    continue
+                try:
+                    is_selected, df_with_indicators = screen_dataframe(stock_code, df)
+                    if is_selected:
+                        buy_signal, reason = check_buy_signal(df_with_indicators)
+                        selected.append((stock_code, buy_signal, reason))
+                    elif stock_code in fallback:
+                        # 전체 스크리닝 결과가 없을 때 확인할 상위 종목은 선정 여부와 관계없이 신호를 확인해 둡니다.
+                        if df_with_indicators is None:
+                            df_with_indicators = add_all_indicators(df.copy())
+                        buy_signal, reason = check_buy_signal(df_with_indicators)
+                        checked.append((stock_code, buy_signal, reason))
+                except Exception as e:
+                    logger.warning("%s 종목 처리 중 오류 발생: %s", stock_code, e)
+        except BaseException:
+            fetcher.cancel()
+            raise
+        unfetched = await fetcher
+        return selected, checked, unfetched
+
+    async def run(self, results, cycle_id: int, holdings: list[tuple[str, float]], screening: list[str],
+                  fallback: list[str], budget: float | None):
+        """ 주기 1회. 매도 결과를 먼저 보내고, 스크리닝/매수 결과를 이어서 보냅니다. """
+        self.market_data.begin_cycle()
+        deadline = None if budget is None else time.monotonic() + budget
+
+        async def sell_part():
+            intents, prices = await self._sell(holdings)
+            quotes = await asyncio.to_thread(self._quotes, [code for code, _, _ in intents])
+            results.put(('sell', self.shard, cycle_id, intents, prices, quotes))
+
+        async def buy_part():
+            selected, checked, unfetched = await self._buy(screening, fallback, deadline)
+            signaled = [code for code, buy_signal, _ in selected + checked if buy_signal]
+            quotes = await asyncio.to_thread(self._quotes, signaled)
+            results.put(('buy', self.shard, cycle_id, selected, checked, unfetched, quotes))
+
+        await asyncio.gather(sell_part(), buy_part())
+
+
+def _worker_main(shard: int, broker_factory, rate_limiter, requests, results):
+    """
+    워커 프로세스 진입점. 요청 대기열에서 주기 요청을 받아 처리하고, None 을 받으면 종료합니다.
+    ('config', 파라미터) 요청을 받으면 다음 주기 전에 전략/지표 파라미터를 적용합니다.
+    """
+    setup_logging()
+    worker = None
+    while (request := requests.get()) is not None:
+        if request[0] == 'config':
+            apply_params(request[1])
+            continue
+        cycle_id = request[0]
+        try:
+            if worker is None:
+                # 브로커는 첫 요청 때 만듭니다. (접근토큰은 토큰 파일 잠금으로 주문 프로세스와 공유)
+                worker = _ShardWorker(shard, MarketDataService(broker_factory(), rate_limiter=rate_limiter))
+            asyncio.run(worker.run(results, *request))
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(repr(e))
+            results.put(('error', shard, cycle_id, e))
+
+
+class ShardedPipeline(TradingPipeline):
+    """
+    종목을 여러 워커 프로세스에 나눠 시세 조회, 지표 계산, 신호 확인을 병렬로 실행하는 매매 주기.
+
+        주문 프로세스(코디네이터): 포트폴리오 최신화 → 종목 분배 → 주문 의도 수집 → 주문 접수
+        워커 프로세스 N개:        맡은 종목의 시세 조회 → 지표 계산 → 매도/매수 신호 (종목코드, 사유 등만 전송)
+
+    - 종목은 코드 해시로 고정 배정되므로 같은 종목은 항상 같은 워커가 맡습니다.
+    - OrderManager, Portfolio, TradingController 는 주문 프로세스에만 있으며, 매수 가능 여부는 분배 전에 걸러냅니다.
+    - 시세 API 호출 한도는 모든 프로세스가 공유 메모리 토큰 버킷(SharedRateLimiter)으로 나눠 쓰고,
+      접근토큰은 토큰 파일 잠금으로 공유합니다.
+    - 매도 주문은 워커별 매도 결과가 도착하는 대로 접수하고, 매수 주문은 모든 매도 결과를 접수한 뒤
+      후보 순서대로 최대 MAX_BUY_CHECKS 개 선정 종목에서 접수합니다.
+    """
+    def __init__(self, broker, portfolio, order_manager, workers: int = SHARD_WORKERS, broker_factory=None,
+                 market_data=None):
+        """
+        :param broker: 주문 프로세스의 브로커
+        :param portfolio: Portfolio 인스턴스
+        :param order_manager: OrderManager 인스턴스
+        :param workers: 워커 프로세스 수
+        :param broker_factory: 워커에서 브로커를 만드는 함수 (None 이면 broker 와 같은 설정으로 생성)
+        :param market_data: 주문 프로세스의 MarketDataService (None 이면 order_manager 의 것을 사용)
+        """
+        super().__init__(broker, portfolio, order_manager, market_data)
+        self.workers = max(1, workers)
+        context = multiprocessing.get_context('spawn')
+        rate_limiter = SharedRateLimiter(self.market_data.rate_limiter.rate, context=context)
+        self.market_data.rate_limiter = rate_limiter  # 주문 프로세스의 현재가 조회도 같은 한도를 사용
+        broker_factory = broker_factory or worker_broker_factory(broker)
+
+        self._results = context.Queue()
+        self._requests = [context.Queue() for _ in range(self.workers)]
+        self._processes = [
+            context.Process(target=_worker_main, name=f"shard-{shard}", daemon=True,
+                            args=(shard, broker_factory, rate_limiter, self._requests[shard], self._results))
+            for shard in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self._cycle_ids = itertools.count(1)
+        logger.info("시세 조회/신호 계산 워커 %d개를 시작했습니다.", self.workers)
+
+    def _shard_of(self, stock_code: str) -> int:
+        return zlib.crc32(stock_code.encode()) % self.workers
+
+    def _dispatch(self, holdings: list[tuple[str, float]], screening: list[str], fallback: list[str],
+                  budget: float | None) -> int:
+        """ 종목을 워커별로 나눠 주기 요청을 보냅니다. :return: 주기 번호 """
+        cycle_id = next(self._cycle_ids)
+        parts = [([], [], []) for _ in range(self.workers)]
+        for stock_code, avg_price in holdings:
+            parts[self._shard_of(stock_code)][0].append((stock_code, avg_price))
+        for stock_code in screening:
+            parts[self._shard_of(stock_code)][1].append(stock_code)
+        for stock_code in fallback:
+            parts[self._shard_of(stock_code)][2].append(stock_code)
+        for shard, (shard_holdings, shard_screening, shard_fallback) in enumerate(parts):
+            self._requests[shard].put((cycle_id, shard_holdings, shard_screening, shard_fallback, budget))
+        return cycle_id
+
+    def _receive(self, cycle_id: int):
+        """ 이번 주기의 워커 응답을 하나 받습니다. 지난 주기의 늦은 응답은 버립니다. """
+        while True:
+            try:
+                message = self._results.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                dead = [process.name for process in self._processes if not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f"워커 프로세스가 종료되었습니다: {', '.join(dead)}")
+                continue
+            if message[2] == cycle_id:
+                return message
+
+    def _collect(self, cycle_id: int, screening: list[str], fallback: list[str], submit: bool = True) -> dict:
+        """
+        워커 응답을 모두 받을 때까지 기다리며 주문을 접수합니다. (스레드에서 호출)
+        :param submit: False 이면 주문 없이 결과만 모읍니다. (장 시작 전 준비 작업)
+        :return: {'prices', 'selected', 'unfetched'}
+        """
+        pending = {(shard, kind) for shard in range(self.workers) for kind in ('sell', 'buy')}
+        prices, selected, checked, unfetched = {}, [], [], []
+        errors = []
+        while pending:
+            message = self._receive(cycle_id)
+            kind, shard = message[0], message[1]
+            if kind == 'error':
+                errors.append(message[3])
+                pending -= {(shard, 'sell'), (shard, 'buy')}
+                continue
+            pending.discard((shard, kind))
+            if kind == 'sell':
+                intents, shard_prices, quotes = message[3:]
+                prices.update(shard_prices)
+                self.market_data.seed_quotes(quotes)
+                if submit and intents:
+                    for stock_code, reason, _ in intents:
+                        self.order_manager._send_telegram_message(f"[매도 신호] {stock_code}\n- 사유: {reason}")
+                    self.order_manager.submit_orders([OrderIntent(code, 'sell', reason, priority)
+                                                      for code, reason, priority in intents])
+            else:
+                shard_selected, shard_checked, shard_unfetched, quotes = message[3:]
+                selected += shard_selected
+                checked += shard_checked
+                unfetched += shard_unfetched
+                self.market_data.seed_quotes(quotes)
+        if errors:
+            raise errors[0]
+
+        # 후보 순서대로 정렬해 단일 프로세스 실행과 같은 종목을 고릅니다.
+        order = {stock_code: index for index, stock_code in enumerate(screening)}
+        selected.sort(key=lambda item: order[item[0]])
+        unfetched.sort(key=lambda item: order[item])
+        if submit:
+            selected = selected[:MAX_BUY_CHECKS]  # 주기당 매수 신호 확인 최대 종목 수
+            candidates = selected
+            if not selected and not unfetched:
+                # 스크리닝 결과가 없으면 상위 종목들 확인
+                fallback_order = {stock_code: index for index, stock_code in enumerate(fallback)}
+                candidates = sorted((item for item in checked if item[0] in fallback_order),
+                                    key=lambda item: fallback_order[item[0]])
+                logger.info("스크리닝 결과가 없어 상위 종목 확인: %d개", len(fallback))
+            buys = []
+            for stock_code, buy_signal, reason in candidates:
+                if buy_signal:
+                    self.order_manager._send_telegram_message(f"[매수 신호] {stock_code}\n- 사유: {reason}")
+                    buys.append(OrderIntent(stock_code, 'buy', reason, PRIORITY_BUY))
+                else:
+                    logger.debug("[%s] 매수 신호 없음.", stock_code)
+            if buys:
+                self.order_manager.submit_orders(buys)
+        return {'prices': prices, 'selected': [stock_code for stock_code, _, _ in selected], 'unfetched': unfetched}
+
+    async def run(self, candidate_codes: list[str], timing: CycleTiming | None = None,
+                  deadline: float | None = None) -> CycleTiming:
+        """
+        매매 주기 1회를 워커 프로세스에 나눠 실행합니다. (인자와 반환값은 TradingPipeline.run 과 같음)
+        """
+        timing = timing or CycleTiming(scheduled_at=datetime.now())
+        self.market_data.begin_cycle()
+
+        await self._timed(timing, 'reconcile', asyncio.to_thread(self._reconcile))
+
+        holdings_to_check = list(self.portfolio.holdings.keys())
+        sell_mask = self.trading_controller.eligible(holdings_to_check, 'sell')
+        holdings = [(code, self.portfolio.holdings[code].avg_price)
+                    for code, ok in zip(holdings_to_check, sell_mask) if ok]
+        skipped = self._skip_screening(timing, deadline)
+        screening = [] if skipped else self._screening_codes(candidate_codes)
+        fallback = [] if skipped else self._buyable(candidate_codes[:MAX_BUY_CHECKS])
+        budget = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        started = time.monotonic()
+        cycle_id = self._dispatch(holdings, screening, fallback, budget)
+        result = await self._timed(timing, 'signals',
+                                   asyncio.to_thread(self._collect, cycle_id, screening, fallback))
+        logger.info("스크리닝 결과: %d개 종목 선정 (워커 %d개)", len(result['selected']), self.workers)
+
+        self._deferred_codes = result['unfetched']
+        if result['unfetched']:
+            logger.warning("마감 시간에 도달하여 %d개 종목의 스크리닝을 다음 주기로 미룹니다.", len(result['unfetched']))
+            timing.skipped.append('screening(partial)')
+        if not skipped:
+            self._update_screening_estimate(time.monotonic() - started)
+
+        await self._mark_holdings(result['prices'])
+
+        await self._timed(timing, 'fills', asyncio.to_thread(self.order_manager.process_fills))
+        return timing
+
+    async def warm_up(self, candidate_codes: list[str]) -> list[str]:
+        """ 장 시작 전 준비 작업을 워커 프로세스에 나눠 실행합니다. (TradingPipeline.warm_up 과 같음) """
+        logger.info("--- 장 시작 전 준비 작업 ---")
+        started = time.monotonic()
+        self.market_data.begin_cycle()
+        await asyncio.to_thread(self._reconcile)
+
+        screening = self._buyable(candidate_codes[:MAX_SCREENING_STOCKS])
+        cycle_id = self._dispatch([], screening, [], None)
+        result = await asyncio.to_thread(self._collect, cycle_id, screening, [], False)
+
+        self._prescreened = result['selected']
+        self.screening_estimate = time.monotonic() - started
+        logger.info("준비 작업 완료: %d개 종목 조회, %d개 종목 선정 (%.1f초)",
+                    len(screening), len(self._prescreened), self.screening_estimate)
+        return self._prescreened
+
+    def apply_config(self, change: ConfigChange):
+        """ 이 프로세스와 모든 워커 프로세스에 바뀐 파라미터를 적용합니다. (워커는 다음 주기 요청 전에 적용) """
+        super().apply_config(change)
+        for requests in self._requests:
+            requests.put(('config', change.params))
+
+    def close(self):
+        """ 워커 프로세스를 종료합니다. """
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
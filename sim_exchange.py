@@ -0,0 +1,414 @@
+import itertools
+import math
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime
+
+import numpy as np
+import pandas as pd
+
+from local_broker import LocalBroker
+
+# 분봉 조회 1회에 돌려주는 분봉 수 (KIS 당일분봉조회와 같음)
+MINUTE_PRICE_ROWS = 30
+
+
+def _epoch(moment: datetime) -> int:
+    """ 현지 벽시계 시각을 epoch 초로 나타냅니다. (minute_bars, market_archive 와 같은 기준) """
+    return int(np.datetime64(moment.replace(microsecond=0), 's').astype(np.int64))
+
+
+def _moment(epoch: float) -> datetime:
+    """ _epoch 의 역변환 """
+    return pd.Timestamp(int(epoch), unit='s').to_pydatetime()
+
+
+class TickTape:
+    """
+    하루치 체결 테이프. 종목마다 시각 순의 (시각, 체결가, 체결량) 배열을 보관합니다.
+    합성(synthetic) 또는 아카이브 재생(from_archive)으로 만듭니다.
+    """
+    def __init__(self, day: str, ticks: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]):
+        """
+        :param day: 매매일 (YYYYMMDD)
+        :param ticks: { 종목코드: (시각 epoch 초, 체결가, 체결량) } 각 배열은 시각 순
+        """
+        self.day = day
+        self._ticks = ticks
+        starts = [times[0] for times, _, _ in ticks.values() if len(times)]
+        ends = [times[-1] for times, _, _ in ticks.values() if len(times)]
+        self.start = int(min(starts)) if starts else 0
+        self.end = int(max(ends)) if ends else 0
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._ticks
+
+    def codes(self) -> list[str]:
+        return list(self._ticks)
+
+    def ticks(self, stock_code: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ 종목의 (시각, 체결가, 체결량) 배열 """
+        return self._ticks[stock_code]
+
+    @classmethod
+    def synthetic(cls, start_prices: dict[str, float], day: date | None = None, seed: int = 0,
+                  ticks_per_minute: int = 4, volatility: float = 0.0008, mean_volume: float = 200,
+                  open_time: str = '09:00', close_time: str = '15:30') -> 'TickTape':
+        """
+        종목별 기하 브라운 운동으로 정규장 하루치 체결을 만듭니다. 같은 시드면 항상 같은 테이프가 만들어집니다.
+        :param start_prices: { 종목코드: 시작 가격 (보통 전일 종가) }
+        :param day: 매매일 (None 이면 오늘)
+        :param ticks_per_minute: 분당 체결 수 (모든 종목이 같은 시각에 체결)
+        :param volatility: 체결 1건당 수익률 표준편차
+        :param mean_volume: 체결 1건당 평균 체결량 (주)
+        """
+        day = day or date.today()
+        opening = datetime.combine(day, dtime.fromisoformat(open_time))
+        closing = datetime.combine(day, dtime.fromisoformat(close_time))
+        minutes = int((closing - opening).total_seconds() // 60)
+        n_ticks = minutes * ticks_per_minute
+        times = _epoch(opening) + (np.arange(n_ticks) * 60 // ticks_per_minute).astype(np.int64)
+
+        codes = list(start_prices)
+        rng = np.random.default_rng(seed)
+        returns = rng.normal(0, volatility, size=(len(codes), n_ticks))
+        start = np.array([start_prices[code] for code in codes], dtype=float).reshape(-1, 1)
+        prices = np.maximum(1, np.round(start * np.exp(np.cumsum(returns, axis=1))))
+        volumes = rng.poisson(mean_volume, size=(len(codes), n_ticks)).astype(float)
+        # 시각 배열은 모든 종목이 공유하고, 가격/체결량은 종목별 행 뷰로 보관합니다.
+        return cls(day.strftime('%Y%m%d'), {code: (times, prices[i], volumes[i]) for i, code in enumerate(codes)})
+
+    @classmethod
+    def from_archive(cls, reader, day: str, stock_codes: list[str] | None = None) -> 'TickTape':
+        """
+        아카이브(market_archive)의 하루치 체결을 읽습니다. 체결 기록이 없는 종목은 분봉을 체결 4건
+        (시가 → 고가 → 저가 → 종가, 거래량 4등분)으로 펼쳐 사용합니다.
+        :param reader: ArchiveReader 인스턴스
+        :param day: 매매일 (YYYYMMDD)
+        :param stock_codes: 읽을 종목 (None 이면 기록된 전체)
+        """
+        tick_codes = set(reader.symbols(day, 'tick'))
+        stock_codes = stock_codes if stock_codes is not None else sorted(tick_codes | set(reader.symbols(day, 'bar')))
+        ticks = {}
+        for stock_code in stock_codes:
+            if stock_code in tick_codes:
+                columns = reader.read(day, 'tick', stock_code)
+                ticks[stock_code] = (columns['time'].astype(np.int64), columns['price'].astype(float),
+                                     columns['volume'].astype(float))
+                continue
+            columns = reader.read(day, 'bar', stock_code)
+            if not len(columns['time']):
+                continue
+            offsets = np.array([0, 15, 30, 45], dtype=np.int64)
+            times = (columns['time'].astype(np.int64)[:, None] + offsets).ravel()
+            prices = np.column_stack([columns[name] for name in ('open', 'high', 'low', 'close')]).astype(float).ravel()
+            volumes = np.repeat(columns['volume'].astype(float) / 4, 4)
+            ticks[stock_code] = (times, prices, volumes)
+        return cls(day, ticks)
+
+
+@dataclass
+class _SimOrder:
+    """ 모의 거래소에 접수된 주문 1건 """
+    order_id: str
+    stock_code: str
+    side: str            # 'buy' 또는 'sell'
+    quantity: int
+    limit: float         # 지정가 (0 이면 시장가)
+    active_at: float     # 거래소 도착 시각 (접수 시각 + 지연, epoch 초)
+    seq: int             # 도착 순서 (같은 가격이면 먼저 도착한 주문 우선)
+    filled: int = 0
+    value: float = 0.0   # 체결 금액 합계
+    cancelled: bool = False
+
+    @property
+    def remaining(self) -> int:
+        return 0 if self.cancelled else self.quantity - self.filled
+
+    def priority(self) -> tuple:
+        """ 가격-시간 우선순위 (작을수록 먼저). 시장가가 가장 먼저, 매수는 높은 가격, 매도는 낮은 가격 우선 """
+        if not self.limit:
+            price_rank = -math.inf
+        else:
+            price_rank = -self.limit if self.side == 'buy' else self.limit
+        return price_rank, self.active_at, self.seq
+
+
+class SimulatedExchange(LocalBroker):
+    """
+    체결 테이프에 주문을 매칭하는 결정적(deterministic) 모의 거래소. KISBroker 와 같은 인터페이스를 제공합니다.
+    - 일봉/종목 목록은 가격 패널(LocalBroker)에서, 당일 현재가/분봉/체결은 체결 테이프에서 만듭니다.
+    - 주문은 order_latency(+ 지터) 뒤에 거래소에 도착하고, 이후의 체결마다 가격-시간 우선순위로 체결량을 나눠 받습니다.
+      체결 1건의 체결량 중 participation 비율까지만 받을 수 있으므로 큰 주문은 여러 체결에 걸쳐 부분 체결됩니다.
+    - 거부(reject_rate)와 지연 지터는 (시드, 종목, 매수/매도, 종목별 주문 순번)으로 정해지므로
+      여러 스레드가 동시에 주문해도 같은 시드면 같은 결과가 나옵니다.
+    - 시각은 advance / advance_to 로 직접 진행하고(기본), speed 를 주면 실제 경과 시간 x speed 로 진행합니다.
+      시간을 직접 진행하면 정규장 하루를 몇 초 안에 재생할 수 있습니다.
+    """
+    def __init__(self, panel_path: str, tape: TickTape | None = None, cash: int = 10_000_000, seed: int = 0,
+                 order_latency: float = 0.05, latency_jitter: float = 0.0, reject_rate: float = 0.0,
+                 participation: float = 1.0, speed: float | None = None, latency_seconds: float = 0.0):
+        """
+        :param panel_path: 가격 패널 디렉터리 (일봉, 종목 목록)
+        :param tape: 체결 테이프 (None 이면 패널 마지막 종가에서 시작하는 오늘 합성 테이프)
+        :param cash: 초기 예수금
+        :param seed: 합성 테이프와 거부/지터 결정에 쓰는 시드
+        :param order_latency: 주문 접수부터 거래소 도착까지의 지연 (초, 모의 시각 기준)
+        :param latency_jitter: 지연에 더할 최대 지터 (초)
+        :param reject_rate: 주문 거부 확률 (0~1)
+        :param participation: 체결 1건의 체결량 중 받을 수 있는 비율 (0~1)
+        :param speed: 주어지면 실제 경과 시간 x speed 로 모의 시각을 진행
+        :param latency_seconds: API 호출마다 실제로 대기할 시간 (초)
+        """
+        super().__init__(panel_path, cash=cash, latency_seconds=latency_seconds)
+        if tape is None:
+            start_prices = {code: price for code in self.codes if (price := LocalBroker._last_close(self, code))}
+            tape = TickTape.synthetic(start_prices, seed=seed)
+        self.tape = tape
+        self.seed = seed
+        self.order_latency = order_latency
+        self.latency_jitter = latency_jitter
+        self.reject_rate = reject_rate
+        self.participation = participation
+        self.speed = speed
+        self.now = float(tape.start)  # 모의 시각 (epoch 초)
+        self._speed_origin = (time.monotonic(), self.now)
+
+        self._sim_orders: dict[str, _SimOrder] = {}
+        self._books: dict[str, list[_SimOrder]] = {}  # { 종목코드: 미체결 주문 } (가격-시간 우선순위 순)
+        self._next_tick: dict[str, int] = {}          # { 종목코드: 다음에 매칭할 체결 위치 }
+        self._order_counts = Counter()                # { (종목코드, 매수/매도): 주문 수 } 결정적 난수용
+        self._seq = itertools.count()
+        self.stats = Counter()  # orders, rejected(_invalid/_random/_cash/_position), fills, filled_quantity, cancelled
+
+    # --- 모의 시각 ---
+
+    def advance(self, seconds: float):
+        """ 모의 시각을 seconds 초 진행하고 그동안의 체결을 매칭합니다. """
+        self.advance_to(self.now + seconds)
+
+    def advance_to(self, moment: float | datetime):
+        """ 모의 시각을 moment(epoch 초 또는 datetime)까지 진행하고 그동안의 체결을 매칭합니다. """
+        target = _epoch(moment) if isinstance(moment, datetime) else float(moment)
+        with self._lock:
+            self.now = max(self.now, target)
+            self._match_all()
+
+    def clock(self) -> datetime:
+        """ 현재 모의 시각 """
+        return _moment(self.now)
+
+    def _call(self, name: str):
+        super()._call(name)
+        if self.speed:
+            started, origin = self._speed_origin
+            self.advance_to(origin + (time.monotonic() - started) * self.speed)
+
+    def _is_market_open(self):
+        return self.tape.start <= self.now <= self.tape.end
+
+    # --- 매칭 ---
+
+    def _uniform(self, stock_code: str, side: str, n: int, salt: str) -> float:
+        """ (시드, 종목, 매수/매도, 주문 순번)으로 정해지는 [0, 1) 값 """
+        return zlib.crc32(f"{self.seed}:{stock_code}:{side}:{n}:{salt}".encode()) / 2 ** 32
+
+    def _match_all(self):
+        for stock_code in [code for code, book in self._books.items() if book]:
+            self._match(stock_code)
+
+    def _match(self, stock_code: str):
+        """ 종목의 미체결 주문을 지금까지의 체결에 매칭합니다. (잠금 안에서 호출) """
+        times, prices, volumes = self.tape.ticks(stock_code)
+        start = self._next_tick.get(stock_code, 0)
+        end = int(np.searchsorted(times, self.now, side='right'))
+        book = self._books[stock_code]
+        first_active = min(order.active_at for order in book)
+        for i in range(start, end):
+            tick_time = times[i]
+            if tick_time < first_active:
+                continue
+            price = float(prices[i])
+            available = {'buy': math.floor(volumes[i] * self.participation),
+                         'sell': math.floor(volumes[i] * self.participation)}
+            for order in book:
+                if order.active_at > tick_time or not available[order.side]:
+                    continue
+                if order.limit and (price > order.limit if order.side == 'buy' else price < order.limit):
+                    continue
+                quantity = min(order.remaining, available[order.side])
+                available[order.side] -= quantity
+                self._fill(order, quantity, price)
+            book[:] = [order for order in book if order.remaining]
+            if not book:
+                break
+        self._next_tick[stock_code] = end
+
+    def _fill(self, order: _SimOrder, quantity: int, price: float):
+        order.filled += quantity
+        order.value += quantity * price
+        self.stats['fills'] += 1
+        self.stats['filled_quantity'] += quantity
+        if order.side == 'buy':
+            pos = self.positions.setdefault(order.stock_code, {'quantity': 0, 'avg_price': 0.0})
+            total = pos['quantity'] + quantity
+            pos['avg_price'] = (pos['quantity'] * pos['avg_price'] + quantity * price) / total
+            pos['quantity'] = total
+            self.cash -= quantity * price
+        else:
+            pos = self.positions[order.stock_code]
+            pos['quantity'] -= quantity
+            if pos['quantity'] == 0:
+                del self.positions[order.stock_code]
+            self.cash += quantity * price
+
+    def _tick_price(self, stock_code: str) -> float | None:
+        """ 지금까지의 마지막 체결가 (장 시작 전이면 None) """
+        if stock_code not in self.tape:
+            return None
+        times, prices, _ = self.tape.ticks(stock_code)
+        index = int(np.searchsorted(times, self.now, side='right'))
+        return float(prices[index - 1]) if index else None
+
+    def _last_close(self, stock_code) -> float | None:
+        price = self._tick_price(stock_code)
+        return price if price is not None else super()._last_close(stock_code)
+
+    # --- 주문 ---
+
+    def _submit(self, stock_code: str, side: str, quantity: int, price: float):
+        quantity = int(quantity)
+        reference = self._last_close(stock_code)
+        with self._lock:
+            n = self._order_counts[(stock_code, side)]
+            self._order_counts[(stock_code, side)] += 1
+            self.stats['orders'] += 1
+            if quantity <= 0 or reference is None or stock_code not in self.tape:
+                return self._reject('invalid')
+            if self._uniform(stock_code, side, n, 'reject') < self.reject_rate:
+                return self._reject('random')
+            self._match_all()  # 잔고 확인 전에 지금까지의 체결을 반영
+            open_orders = [order for book in self._books.values() for order in book if order.side == side]
+            if side == 'buy':
+                committed = sum(order.remaining * (order.limit or reference) for order in open_orders)
+                if quantity * (price or reference) > self.cash - committed:
+                    return self._reject('cash')
+            else:
+                held = self.positions.get(stock_code, {}).get('quantity', 0)
+                selling = sum(order.remaining for order in open_orders if order.stock_code == stock_code)
+                if quantity > held - selling:
+                    return self._reject('position')
+
+            order_id = f"{next(self._order_ids):010d}"
+            jitter = self._uniform(stock_code, side, n, 'latency') * self.latency_jitter
+            order = _SimOrder(order_id, stock_code, side, quantity, float(price),
+                              active_at=self.now + self.order_latency + jitter, seq=next(self._seq))
+            self._sim_orders[order_id] = order
+            book = self._books.setdefault(stock_code, [])
+            if not book:
+                # 빈 호가에 들어온 주문은 지금 이후의 체결부터 매칭합니다.
+                times, _, _ = self.tape.ticks(stock_code)
+                self._next_tick[stock_code] = int(np.searchsorted(times, self.now, side='right'))
+            book.append(order)
+            book.sort(key=_SimOrder.priority)
+            return {"odno": order_id, "ord_tmd": _moment(self.now).strftime('%H%M%S')}
+
+    def _reject(self, reason: str):
+        """ 주문 거부. KISBroker 와 같이 None 을 돌려줍니다. """
+        self.stats['rejected'] += 1
+        self.stats[f'rejected_{reason}'] += 1
+        return None
+
+    def buy(self, stock_code, quantity, price=0):
+        self._call('buy')
+        return self._submit(stock_code, 'buy', quantity, price)
+
+    def sell(self, stock_code, quantity, price=0):
+        self._call('sell')
+        return self._submit(stock_code, 'sell', quantity, price)
+
+    def cancel_order(self, order_id):
+        self._call('cancel_order')
+        with self._lock:
+            self._match_all()  # 취소 전까지의 체결은 유효
+            order = self._sim_orders.get(order_id)
+            if order is None or not order.remaining:
+                return None
+            order.cancelled = True
+            self._books[order.stock_code].remove(order)
+            self.stats['cancelled'] += 1
+            return {"odno": order_id}
+
+    def get_order_executions(self, order_ids):
+        self._call('get_order_executions')
+        with self._lock:
+            self._match_all()
+            executions = {}
+            for order_id in order_ids:
+                order = self._sim_orders.get(order_id)
+                if order is not None:
+                    executions[order_id] = {'filled': order.filled, 'cancelled': order.cancelled,
+                                            'avg_price': order.value / order.filled if order.filled else 0.0}
+            return executions
+
+    def get_order_status(self, order_id):
+        self._call('get_order_status')
+        with self._lock:
+            self._match_all()
+            order = self._sim_orders.get(order_id)
+        if order is None:
+            return None
+        if order.filled >= order.quantity:
+            return "체결"
+        return "취소" if order.cancelled else "미체결"
+
+    # --- 시세 ---
+
+    def get_daily_price(self, stock_code, start_date, end_date):
+        df = super().get_daily_price(stock_code, start_date, end_date)
+        price = self._tick_price(stock_code)
+        if price is None or not start_date <= self.tape.day <= end_date:
+            return df
+        # 당일 일봉의 종가/거래량은 지금까지의 체결로 채웁니다.
+        times, _, volumes = self.tape.ticks(stock_code)
+        volume = volumes[:int(np.searchsorted(times, self.now, side='right'))].sum()
+        today = {'stck_bsop_date': self.tape.day, 'stck_clpr': str(int(price)), 'acml_vol': str(int(volume))}
+        if df is None:
+            return pd.DataFrame([today])
+        if df['stck_bsop_date'].iloc[-1] == self.tape.day:
+            df = df.iloc[:-1]
+        elif df['stck_bsop_date'].iloc[-1] > self.tape.day:
+            return df
+        return pd.concat([df, pd.DataFrame([today])], ignore_index=True)
+
+    def get_minute_price(self, stock_code, end_time=None):
+        """ 지금(또는 end_time HHMMSS)까지의 체결로 만든 최근 분봉 (KIS 당일분봉조회 형식, 최신 순) """
+        self._call('get_minute_price')
+        if stock_code not in self.tape:
+            return None
+        times, prices, volumes = self.tape.ticks(stock_code)
+        until = self.now
+        if end_time:
+            until = min(until, _epoch(datetime.strptime(self.tape.day + end_time, '%Y%m%d%H%M%S')))
+        end = int(np.searchsorted(times, until, side='right'))
+        if not end:
+            return None
+        minutes = times[:end] // 60
+        # 최근 MINUTE_PRICE_ROWS 분의 체결만 모읍니다.
+        start = int(np.searchsorted(minutes, minutes[end - 1] - MINUTE_PRICE_ROWS + 1, side='left'))
+        minutes, prices, volumes = minutes[start:end], prices[start:end], volumes[start:end]
+        first = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+        last = np.r_[first[1:], len(minutes)] - 1
+        stamps = pd.to_datetime(minutes[first] * 60, unit='s')
+        df = pd.DataFrame({
+            'stck_bsop_date': stamps.strftime('%Y%m%d'),
+            'stck_cntg_hour': stamps.strftime('%H%M%S'),
+            'stck_oprc': prices[first].astype(np.int64).astype(str),
+            'stck_hgpr': np.maximum.reduceat(prices, first).astype(np.int64).astype(str),
+            'stck_lwpr': np.minimum.reduceat(prices, first).astype(np.int64).astype(str),
+            'stck_prpr': prices[last].astype(np.int64).astype(str),
+            'cntg_vol': np.add.reduceat(volumes, first).astype(np.int64).astype(str),
+        })
+        return df.iloc[::-1].reset_index(drop=True)
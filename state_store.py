@@ -0,0 +1,328 @@
+import configparser
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    state_params = config['state']
+    STATE_BACKEND = state_params.get('backend', 'file')  # 'file'(단일 프로세스) 또는 'sqlite'(다중 프로세스 공유)
+    STATE_DB_FILE = state_params.get('db_file', 'bot_state.db')
+    STATE_OWNER = state_params.get('owner', '')  # 이 봇 프로세스의 이름 (비우면 호스트명:PID)
+    RESERVATION_TTL_SECONDS = state_params.getfloat('reservation_ttl_seconds', 300)  # 갱신되지 않은 현금 예약의 유효 시간
+    ORDER_TTL_SECONDS = state_params.getfloat('order_ttl_seconds', 600)  # 갱신되지 않은 체결 대기 주문 기록의 유효 시간
+    STATE_BUSY_TIMEOUT_SECONDS = state_params.getfloat('busy_timeout_seconds', 5)
+except KeyError:
+    STATE_BACKEND = 'file'
+    STATE_DB_FILE = 'bot_state.db'
+    STATE_OWNER = ''
+    RESERVATION_TTL_SECONDS = 300
+    ORDER_TTL_SECONDS = 600
+    STATE_BUSY_TIMEOUT_SECONDS = 5
+
+# 체결 대기 중으로 보는 주문 상태
+OPEN_ORDER_STATUSES = ('submitted', 'partial')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trade_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    code TEXT,
+    time TEXT,
+    cutoff TEXT
+);
+CREATE TABLE IF NOT EXISTS last_trades (
+    stock_code TEXT NOT NULL,
+    side TEXT NOT NULL,
+    traded_at TEXT NOT NULL,
+    PRIMARY KEY (stock_code, side)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS purchase_dates (
+    stock_code TEXT PRIMARY KEY,
+    purchased_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS daily_trades (
+    trade_date TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cash_reservations (
+    owner TEXT PRIMARY KEY,
+    amount REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    filled_quantity INTEGER NOT NULL DEFAULT 0,
+    avg_price REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status, stock_code, side);
+"""
+
+
+class StateStore:
+    """
+    여러 봇 프로세스가 같은 계좌를 함께 운용할 때 쓰는 공유 상태 저장소 (SQLite, WAL 모드).
+
+    - 쿨다운(종목별 마지막 매매 시각), 일별 매매 횟수, 매수 날짜, 현금 예약, 주문 기록을 보관합니다.
+    - 모든 변경은 행 단위 upsert 이며, 매매 이벤트는 증가하는 id 로 trade_events 에도 남겨
+      각 프로세스가 events_since() 로 다른 프로세스의 매매를 따라잡을 수 있습니다.
+    - WAL 모드이므로 읽기는 쓰기를 막지 않고, 쓰기 트랜잭션은 짧게 유지됩니다.
+    연결은 스레드마다 하나씩 만들어 재사용합니다.
+    """
+    def __init__(self, db_file: str = STATE_DB_FILE, owner: str = STATE_OWNER,
+                 reservation_ttl_seconds: float = RESERVATION_TTL_SECONDS, order_ttl_seconds: float = ORDER_TTL_SECONDS,
+                 busy_timeout_seconds: float = STATE_BUSY_TIMEOUT_SECONDS):
+        """
+        :param db_file: SQLite 데이터베이스 파일 경로
+        :param owner: 이 프로세스의 이름 (현금 예약과 주문 기록의 소유자)
+        :param reservation_ttl_seconds: 이 시간 동안 갱신되지 않은 현금 예약은 종료된 프로세스의 것으로 보고 무시
+        :param order_ttl_seconds: 이 시간 동안 갱신되지 않은 체결 대기 주문 기록은 종료된 프로세스의 것으로 보고 무시
+        :param busy_timeout_seconds: 다른 프로세스가 쓰는 중일 때 대기할 최대 시간
+        """
+        self.db_file = db_file
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.reservation_ttl_seconds = reservation_ttl_seconds
+        self.order_ttl_seconds = order_ttl_seconds
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """ 현재 스레드의 연결을 반환합니다. (없으면 생성) """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: 트랜잭션은 _transaction() 에서 명시적으로 시작합니다.
+            conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout_seconds, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """
+        쓰기 트랜잭션. BEGIN IMMEDIATE 로 시작하여 확인 후 갱신(check-then-write) 사이에
+        다른 프로세스가 끼어들지 못하게 합니다.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        """ 현재 스레드의 연결을 닫습니다. """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # --- 매매 기록 (쿨다운, 일별 매매 횟수, 매수 날짜) ---
+
+    def record_trade(self, event: dict) -> int:
+        """
+        매매 이벤트를 기록하고 쿨다운/매수 날짜/일별 횟수를 갱신합니다.
+        :param event: {'op': 'buy' | 'sell', 'code': 종목코드, 'time': ISO 시각}
+        :return: 이벤트 id
+        """
+        op, code, time_str = event['op'], event['code'], event['time']
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT INTO trade_events (op, code, time) VALUES (?, ?, ?)", (op, code, time_str))
+            conn.execute(
+                "INSERT INTO last_trades (stock_code, side, traded_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (stock_code, side) DO UPDATE SET traded_at = excluded.traded_at",
+                (code, op, time_str))
+            if op == 'buy':
+                conn.execute(
+                    "INSERT INTO purchase_dates (stock_code, purchased_at) VALUES (?, ?) "
+                    "ON CONFLICT (stock_code) DO UPDATE SET purchased_at = excluded.purchased_at",
+                    (code, time_str))
+            else:
+                conn.execute("DELETE FROM purchase_dates WHERE stock_code = ?", (code,))
+            conn.execute(
+                "INSERT INTO daily_trades (trade_date, count) VALUES (?, 1) "
+                "ON CONFLICT (trade_date) DO UPDATE SET count = count + 1",
+                (time_str[:10],))
+            return cursor.lastrowid
+
+    def cleanup_daily_trades(self, cutoff: str) -> int:
+        """
+        cutoff 날짜 이전의 일별 매매 횟수와 매매 이벤트를 삭제합니다.
+        :return: 정리 이벤트 id
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM daily_trades WHERE trade_date < ?", (cutoff,))
+            conn.execute("DELETE FROM trade_events WHERE time < ?", (cutoff,))
+            cursor = conn.execute("INSERT INTO trade_events (op, cutoff) VALUES ('cleanup', ?)", (cutoff,))
+            return cursor.lastrowid
+
+    def load_trade_history(self) -> tuple[dict, int]:
+        """
+        현재 매매 기록 전체를 TradingController 의 trade_history 형식으로 읽습니다.
+        :return: (trade_history, 마지막 이벤트 id)
+        """
+        conn = self._connect()
+        conn.execute("BEGIN")  # 여러 테이블을 같은 시점으로 읽기
+        try:
+            history = {'last_buy_times': {}, 'last_sell_times': {}, 'daily_trade_count': {}, 'purchase_dates': {}}
+            for code, side, traded_at in conn.execute("SELECT stock_code, side, traded_at FROM last_trades"):
+                history['last_buy_times' if side == 'buy' else 'last_sell_times'][code] = traded_at
+            history['purchase_dates'] = dict(conn.execute("SELECT stock_code, purchased_at FROM purchase_dates"))
+            history['daily_trade_count'] = dict(conn.execute("SELECT trade_date, count FROM daily_trades"))
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trade_events").fetchone()[0]
+        finally:
+            conn.execute("COMMIT")
+        return history, last_id
+
+    def events_since(self, last_id: int) -> list[dict]:
+        """ last_id 이후에 기록된 매매 이벤트를 순서대로 반환합니다. (기본키 범위 조회) """
+        rows = self._connect().execute(
+            "SELECT id, op, code, time, cutoff FROM trade_events WHERE id > ? ORDER BY id", (last_id,))
+        events = []
+        for event_id, op, code, time_str, cutoff in rows:
+            event = {'seq': event_id, 'op': op}
+            if op == 'cleanup':
+                event['cutoff'] = cutoff
+            else:
+                event['code'] = code
+                event['time'] = time_str
+            events.append(event)
+        return events
+
+    def daily_trade_count(self, trade_date: str) -> int:
+        row = self._connect().execute("SELECT count FROM daily_trades WHERE trade_date = ?", (trade_date,)).fetchone()
+        return row[0] if row else 0
+
+    # --- 현금 예약 ---
+
+    def reserved_total(self) -> float:
+        """ 모든 프로세스의 유효한 현금 예약 합계 """
+        cutoff = time.time() - self.reservation_ttl_seconds
+        row = self._connect().execute(
+            "SELECT COALESCE(SUM(amount), 0) FROM cash_reservations WHERE updated_at >= ?", (cutoff,)).fetchone()
+        return row[0]
+
+    def reserve_cash(self, amount: float, cash: float) -> bool:
+        """
+        모든 프로세스의 예약 합계가 cash 를 넘지 않는 경우에만 예약을 추가합니다.
+        :param amount: 예약할 금액
+        :param cash: 계좌 현금 (브로커 잔고 기준)
+        :return: 예약 성공 여부
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            reserved = conn.execute(
+                "SELECT COALESCE(SUM(amount), 0) FROM cash_reservations WHERE updated_at >= ?",
+                (now - self.reservation_ttl_seconds,)).fetchone()[0]
+            if cash - reserved < amount:
+                return False
+            conn.execute(
+                "INSERT INTO cash_reservations (owner, amount, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (owner) DO UPDATE SET amount = amount + excluded.amount, updated_at = excluded.updated_at",
+                (self.owner, amount, now))
+            return True
+
+    def release_cash(self, amount: float):
+        """ 이 프로세스의 현금 예약을 amount 만큼 해제합니다. """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE cash_reservations SET amount = MAX(0, amount - ?), updated_at = ? WHERE owner = ?",
+                (amount, time.time(), self.owner))
+
+    def clear_reservations(self):
+        """ 이 프로세스의 현금 예약을 모두 지웁니다. (시작 시 이전 실행의 잔여 예약 정리) """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM cash_reservations WHERE owner = ?", (self.owner,))
+
+    # --- 주문 기록 ---
+
+    def record_order(self, order_id: str, stock_code: str, side: str, quantity: int, submitted_at: float):
+        """
+        접수된 주문을 기록합니다.
+        주문번호는 매매일이 바뀌거나 프로세스가 재시작되면 다시 쓰일 수 있으므로, 같은 번호의 이전 행은 새 주문으로 덮어씁니다.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO orders (order_id, owner, stock_code, side, quantity, status, submitted_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 'submitted', ?, ?) "
+                "ON CONFLICT (order_id) DO UPDATE SET owner = excluded.owner, stock_code = excluded.stock_code, "
+                "side = excluded.side, quantity = excluded.quantity, filled_quantity = 0, avg_price = 0, "
+                "status = 'submitted', submitted_at = excluded.submitted_at, updated_at = excluded.updated_at",
+                (order_id, self.owner, stock_code, side, quantity, submitted_at, time.time()))
+
+    def update_order(self, order_id: str, filled_quantity: int, avg_price: float, status: str):
+        """
+        주문의 체결 현황을 갱신합니다.
+        :param status: 'partial', 'filled', 'cancelled', 'expired' 중 하나
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE orders SET filled_quantity = ?, avg_price = ?, status = ?, updated_at = ? WHERE order_id = ?",
+                (filled_quantity, avg_price, status, time.time(), order_id))
+
+    def expire_stale_orders(self) -> int:
+        """
+        order_ttl_seconds 동안 갱신되지 않은 체결 대기 주문을 'expired' 로 표시합니다.
+        (시작 시 호출하여 비정상 종료된 프로세스가 남긴 주문 기록 정리)
+        :return: 만료 처리한 주문 수
+        """
+        placeholders = ','.join('?' * len(OPEN_ORDER_STATUSES))
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE orders SET status = 'expired', updated_at = ? "
+                f"WHERE status IN ({placeholders}) AND updated_at < ?",
+                (now, *OPEN_ORDER_STATUSES, now - self.order_ttl_seconds))
+            return cursor.rowcount
+
+    def count_open_orders(self) -> int:
+        """ 모든 프로세스의 유효한 체결 대기 주문 수 """
+        placeholders = ','.join('?' * len(OPEN_ORDER_STATUSES))
+        row = self._connect().execute(
+            f"SELECT COUNT(*) FROM orders WHERE status IN ({placeholders}) AND updated_at >= ?",
+            (*OPEN_ORDER_STATUSES, time.time() - self.order_ttl_seconds)).fetchone()
+        return row[0]
+
+    def has_open_order(self, stock_code: str, side: str | None = None) -> bool:
+        """ 어느 프로세스든 해당 종목(및 매수/매도 구분)의 유효한 체결 대기 주문이 있는지 확인합니다. """
+        placeholders = ','.join('?' * len(OPEN_ORDER_STATUSES))
+        query = f"SELECT 1 FROM orders WHERE status IN ({placeholders}) AND updated_at >= ? AND stock_code = ?"
+        params = [*OPEN_ORDER_STATUSES, time.time() - self.order_ttl_seconds, stock_code]
+        if side is not None:
+            query += " AND side = ?"
+            params.append(side)
+        return self._connect().execute(query + " LIMIT 1", params).fetchone() is not None
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def open_state_store() -> StateStore | None:
+    """
+    설정([state] backend)이 'sqlite' 이면 프로세스 공용 StateStore 를 반환하고, 아니면 None 을 반환합니다.
+    None 이면 각 모듈은 기존처럼 파일/메모리 상태를 사용합니다.
+    """
+    global _shared_store
+    if STATE_BACKEND != 'sqlite':
+        return None
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = StateStore()
+        return _shared_store
@@ -1,4 +1,5 @@
 import configparser
+import logging
 import pandas as pd
 import indicators  # 새로 만든 indicators 모듈을 임포트
 
@@ -19,6 +20,13 @@ except KeyError:
     VOLUME_WINDOW = 20
     VOLUME_SURGE_MULTIPLIER = 2.0
 
+logger = logging.getLogger(__name__)
+
+def _log_condition(df: pd.DataFrame, message: str):
+    """ 조건 충족 로그 (DEBUG 레벨이 꺼져 있으면 종목 코드 조회와 포맷팅을 하지 않습니다) """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[%s] %s", df.iloc[-1].get('code', 'N/A'), message)
+
 # KIS API 브로커 인스턴스 생성
 # broker = KisBroker()
 
@@ -41,7 +49,7 @@ def check_golden_cross(df: pd.DataFrame) -> bool:
     today = df_valid.iloc[-1]
 
     if yesterday['short_ma'] < yesterday['long_ma'] and today['short_ma'] > today['long_ma']:
-        print(f"[{df.iloc[-1].get('code', 'N/A')}] 골든크로스 발생!")
+        _log_condition(df, "골든크로스 발생!")
         return True
     return False
 
@@ -62,7 +70,7 @@ def check_rsi_oversold_exit(df: pd.DataFrame) -> bool:
     today_rsi = df_valid['rsi'].iloc[-1]
 
     if yesterday_rsi < RSI_THRESHOLD and today_rsi > RSI_THRESHOLD:
-        print(f"[{df.iloc[-1].get('code', 'N/A')}] RSI 과매도 탈출!")
+        _log_condition(df, "RSI 과매도 탈출!")
         return True
     return False
 
@@ -80,7 +88,7 @@ def check_volume_surge(df: pd.DataFrame) -> bool:
     latest_volume = df['volume'].iloc[-1]
 
     if latest_volume > avg_volume * VOLUME_SURGE_MULTIPLIER:
-        print(f"[{df.iloc[-1].get('code', 'N/A')}] 거래량 급증!")
+        _log_condition(df, "거래량 급증!")
         return True
     return False
 
@@ -99,7 +107,7 @@ def check_bollinger_breakout(df: pd.DataFrame) -> bool:
 
     latest = df_valid.iloc[-1]
     if latest['close'] > latest['bollinger_upper']:
-        print(f"[{df.iloc[-1].get('code', 'N/A')}] 볼린저 밴드 상단 돌파!")
+        _log_condition(df, "볼린저 밴드 상단 돌파!")
         return True
     return False
 
@@ -120,35 +128,66 @@ def check_macd_signal_cross(df: pd.DataFrame) -> bool:
     today = df_valid.iloc[-1]
 
     if yesterday['macd'] < yesterday['signal'] and today['macd'] > today['signal']:
-        print(f"[{df.iloc[-1].get('code', 'N/A')}] MACD 골든크로스 발생!")
+        _log_condition(df, "MACD 골든크로스 발생!")
         return True
     return False
 
-def screen_stocks(stock_codes: list[str], broker=None) -> list[str]:
+def screen_dataframe(code: str, df: pd.DataFrame) -> tuple[bool, pd.DataFrame | None]:
+    """
+    이미 조회한 일봉 데이터 1종목에 선정 기준을 적용합니다.
+    :param code: 종목 코드 (로그용)
+    :param df: 'close', 'volume' 컬럼을 가진 일봉 데이터
+    :return: (선정 여부, 지표가 추가된 데이터프레임 - 데이터가 부족하면 None)
+    """
+    # 데이터가 충분하지 않으면 건너뛰기
+    if len(df) < 20:
+        return False, None
+
+    # 1. 기술적 지표 계산
+    df_with_indicators = indicators.add_all_indicators(df.copy())
+
+    # 2. 스크리닝 조건 확인 (조건을 완화하여 실제 선정 가능하도록)
+    is_golden_cross = check_golden_cross(df_with_indicators)
+    is_rsi_exit = check_rsi_oversold_exit(df_with_indicators)
+    is_volume_surged = check_volume_surge(df_with_indicators)
+    is_bollinger_breakout = check_bollinger_breakout(df_with_indicators)
+    is_macd_cross = check_macd_signal_cross(df_with_indicators)
+
+    # 조건을 완화: 5개 조건 중 3개 이상 만족하면 선정
+    conditions_met = sum([is_golden_cross, is_rsi_exit, is_volume_surged, 
+                        is_bollinger_breakout, is_macd_cross])
+    
+    if conditions_met >= 3:
+        logger.info(">>> 선정 종목: %s (조건 %d/5개 만족)", code, conditions_met)
+        return True, df_with_indicators
+    return False, df_with_indicators
+
+def screen_stocks(stock_codes: list[str], broker=None, trading_controller=None, market_data=None) -> list[str]:
     """
     주어진 종목 코드 리스트에 대해 모든 선정 기준을 적용하여 대상 종목을 필터링합니다.
     :param stock_codes: 검사할 전체 종목 코드 리스트
     :param broker: KISBroker 인스턴스 (실제 데이터 조회용)
+    :param trading_controller: TradingController 인스턴스. 주어지면 매수 불가(쿨다운, 일일 한도) 종목은
+                               데이터 조회 전에 제외합니다.
+    :param market_data: 시세 조회에 쓸 MarketDataService (None 이고 broker 가 있으면 새로 생성)
     :return: 모든 조건을 만족하는 선정된 종목 코드 리스트
     """
+    if trading_controller is not None:
+        mask = trading_controller.eligible(stock_codes, 'buy')
+        stock_codes = [code for code, ok in zip(stock_codes, mask) if ok]
+    if market_data is None and broker:
+        from market_data import MarketDataService
+        market_data = MarketDataService(broker)
+
     selected_stocks = []
     for code in stock_codes:
         try:
             # 1. 데이터 가져오기
-            if broker:
+            if market_data:
                 # 실제 데이터 사용
-                from datetime import datetime, timedelta
-                end_date = datetime.now().strftime('%Y%m%d')
-                start_date = (datetime.now() - timedelta(days=60)).strftime('%Y%m%d')
-                df = broker.get_daily_price(code, start_date=start_date, end_date=end_date)
-                
-                if df is None or df.empty:
+                df = market_data.get_bars(code)
+                if df is None:
                     continue
-                    
-                # 컬럼명 통일
-                df.rename(columns={'stck_clpr': 'close', 'acml_vol': 'volume'}, inplace=True)
-                df['close'] = pd.to_numeric(df['close'])
-                df['volume'] = pd.to_numeric(df['volume'])
             else:
                 # 테스트용 샘플 데이터
                 df = pd.DataFrame({
@@ -157,30 +196,12 @@ def screen_stocks(stock_codes: list[str], broker=None) -> list[str]:
                     'volume': [10000 * (1.5 if i > 38 else 1) for i in range(40)]
                 })
 
-            # 데이터가 충분하지 않으면 건너뛰기
-            if len(df) < 20:
-                continue
-
-            # 2. 기술적 지표 계산
-            df_with_indicators = indicators.add_all_indicators(df.copy())
-
-            # 3. 스크리닝 조건 확인 (조건을 완화하여 실제 선정 가능하도록)
-            is_golden_cross = check_golden_cross(df_with_indicators)
-            is_rsi_exit = check_rsi_oversold_exit(df_with_indicators)
-            is_volume_surged = check_volume_surge(df_with_indicators)
-            is_bollinger_breakout = check_bollinger_breakout(df_with_indicators)
-            is_macd_cross = check_macd_signal_cross(df_with_indicators)
-
-            # 조건을 완화: 5개 조건 중 3개 이상 만족하면 선정
-            conditions_met = sum([is_golden_cross, is_rsi_exit, is_volume_surged, 
-                                is_bollinger_breakout, is_macd_cross])
-            
-            if conditions_met >= 3:
-                print(f"\n>>> 선정 종목: {code} (조건 {conditions_met}/5개 만족)\n")
+            selected, _ = screen_dataframe(code, df)
+            if selected:
                 selected_stocks.append(code)
 
         except Exception as e:
-            print(f"{code} 종목 처리 중 오류 발생: {e}")
+            logger.warning("%s 종목 처리 중 오류 발생: %s", code, e)
             continue
             
     return selected_stocks
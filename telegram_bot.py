@@ -1,17 +1,141 @@
 import asyncio
+import logging
+import queue
+import threading
+import time
 import telegram
 
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# 텔레그램 메시지 최대 길이
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n"
+
 class TelegramBot:
-    def __init__(self, token, chat_id):
+    """
+    텔레그램 알림 전송기.
+    send_message 는 메시지를 큐에 넣고 즉시 반환하며, 백그라운드 스레드가 하나의 이벤트 루프와
+    하나의 봇 연결을 유지하면서 전송합니다. 짧은 시간에 몰린 메시지는 하나의 요약 메시지로 합칩니다.
+    """
+    def __init__(self, token, chat_id, queue_size=100, rate_per_second=1.0, coalesce_seconds=2.0):
+        """
+        :param token: 봇 토큰
+        :param chat_id: 채팅 ID
+        :param queue_size: 대기 큐 최대 길이 (가득 차면 가장 오래된 메시지를 버립니다)
+        :param rate_per_second: 초당 최대 전송 수 (텔레그램 채팅당 제한 준수)
+        :param coalesce_seconds: 첫 메시지 이후 이 시간 동안 들어온 메시지를 합쳐서 전송
+        """
         self.bot = telegram.Bot(token=token)
         self.chat_id = chat_id
+        self.coalesce_seconds = coalesce_seconds
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._rate_limiter = RateLimiter(rate_per_second, burst=1)
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+        self._thread.start()
 
     def send_message(self, message):
-        """동기 방식으로 메시지를 전송합니다."""
+        """메시지를 전송 큐에 넣습니다. 호출한 스레드를 막지 않습니다."""
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                # 가장 오래된 메시지를 버리고 최신 메시지를 우선합니다.
+                try:
+                    self._queue.get_nowait()
+                    self.dropped_count += 1
+                except queue.Empty:
+                    pass
+
+    def close(self, timeout=10.0):
+        """대기 중인 메시지를 최대 timeout 초 동안 전송한 뒤 전송 스레드를 종료합니다."""
         try:
-            asyncio.run(self._send_message_async(message))
+            self._queue.put(self._stop, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _collect_batch(self, first) -> tuple[list[str], bool]:
+        """첫 메시지 이후 coalesce_seconds 동안 들어온 메시지를 모읍니다."""
+        batch = [first]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
+            if item is self._stop:
+                return batch, True
+            batch.append(item)
+
+    @staticmethod
+    def _build_digests(batch: list[str]) -> list[str]:
+        """메시지들을 텔레그램 길이 제한 안에서 최소 개수의 요약 메시지로 합칩니다."""
+        digests = []
+        current = ""
+        for message in batch:
+            message = message[:MAX_MESSAGE_LENGTH]
+            candidate = f"{current}{DIGEST_SEPARATOR}{message}" if current else message
+            if len(candidate) > MAX_MESSAGE_LENGTH:
+                digests.append(current)
+                current = message
+            else:
+                current = candidate
+        if current:
+            digests.append(current)
+        return digests
+
+    def _run(self):
+        """전송 스레드: 전용 이벤트 루프에서 봇 연결을 한 번만 열고 계속 재사용합니다."""
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.bot.initialize())
         except Exception as e:
-            print(f"텔레그램 메시지 전송 실패: {e}")
+            logger.warning("텔레그램 봇 초기화 실패: %s", e)
+
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is self._stop:
+                break
+            batch, stopping = self._collect_batch(first)
+            for digest in self._build_digests(batch):
+                self._deliver(loop, digest)
+
+        try:
+            loop.run_until_complete(self.bot.shutdown())
+        except Exception:
+            pass
+        loop.close()
+
+    def _deliver(self, loop, message, max_retries=3):
+        """빈도 제한을 지키며 전송하고, 텔레그램이 대기를 요구하면(RetryAfter) 기다렸다가 재시도합니다."""
+        for _ in range(max_retries):
+            self._rate_limiter.acquire()
+            try:
+                loop.run_until_complete(self._send_message_async(message))
+                self.sent_count += 1
+                return
+            except telegram.error.RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+                time.sleep(retry_after)
+            except telegram.error.NetworkError as e:
+                logger.warning("텔레그램 메시지 전송 실패 (재시도): %s", e)
+                time.sleep(1)
+            except Exception as e:
+                logger.warning("텔레그램 메시지 전송 실패: %s", e)
+                break
+        self.failed_count += 1
 
     async def _send_message_async(self, message):
         """비동기 방식으로 메시지를 전송합니다."""
@@ -23,3 +147,4 @@ if __name__ == '__main__':
     # You can get the chat ID by sending a message to your bot and then visiting https://api.telegram.org/bot<YOUR_TOKEN>/getUpdates
     bot = TelegramBot(token='YOUR_TELEGRAM_BOT_TOKEN', chat_id='YOUR_CHAT_ID')
     bot.send_message("Hello, this is a test message from your bot!")
+    bot.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+실행 상태 체크포인트(Checkpointer) 테스트
+모의 거래소로 준비 작업과 주문을 진행한 뒤 저장하고, 새로 만든 구성 요소에 복원해 이어서 실행되는지 확인합니다.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from checkpoint import (Checkpointer, CheckpointError, RuntimeState, broker_identity, read_checkpoint,
+                        stale_reason, write_checkpoint)
+from param_sweep import generate_synthetic_panel
+from portfolio import Portfolio
+from sim_exchange import SimulatedExchange
+
+
+class SimpleBroker:
+    mock = True
+
+
+def _components(exchange):
+    from portfolio import Portfolio
+    from order_manager import OrderManager
+    from trading_pipeline import TradingPipeline
+
+    portfolio = Portfolio(exchange)
+    manager = OrderManager(exchange, portfolio)
+    return portfolio, manager, TradingPipeline(exchange, portfolio, manager)
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """ 매매 기록, 체크포인트, 합성 시세 파일을 테스트마다 임시 디렉터리에 만들고, 끝나면 원래 디렉터리로 돌아옵니다. """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_file_format():
+    """저장/읽기 왕복, 손상 파일 거부, 유효성 검사 확인"""
+    print("--- 파일 형식 테스트 ---")
+    broker = SimpleBroker()
+    state = RuntimeState(saved_at=time.time(), session_date=datetime.now().strftime('%Y%m%d'),
+                         broker=broker_identity(broker), params={}, candidate_codes=['005930', '000660'])
+    size = write_checkpoint(state, 'state.bin')
+    print(f"저장 크기: {size}바이트")
+    assert read_checkpoint('state.bin') == state
+    assert read_checkpoint('missing.bin') is None
+
+    with open('state.bin', 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    try:
+        read_checkpoint('state.bin')
+        raise AssertionError("손상된 파일은 거부해야 합니다.")
+    except CheckpointError as e:
+        print(f"손상 파일 거부: {e}")
+
+    assert stale_reason(state, broker) is None
+    tomorrow = datetime.now() + timedelta(days=1)
+    assert stale_reason(state, broker, now=tomorrow) is not None
+    assert stale_reason(state, broker, now=datetime.now() + timedelta(minutes=31), max_age_minutes=30) is not None
+    broker.mock = False
+    assert stale_reason(state, broker) is not None
+    print("✅ 파일 형식 테스트 통과")
+
+
+def test_restore_after_restart():
+    """준비 작업 결과, 체결 대기 주문, 분봉을 복원하고 일봉을 다시 조회하지 않는지 확인"""
+    print("\n--- 재시작 복원 테스트 ---")
+    generate_synthetic_panel('panel', n_symbols=100, n_days=30, seed=1)
+    exchange = SimulatedExchange('panel', seed=3, participation=0.005)
+    exchange.advance(60 * 30)
+    codes = sorted(exchange.codes, key=exchange.get_current_price)
+
+    portfolio, manager, pipeline = _components(exchange)
+    asyncio.run(pipeline.warm_up(codes))
+    for code in codes[:3]:
+        manager.execute_buy_order(code)
+    pipeline.market_data.on_tick(codes[0], datetime.now(), 1000, 10)
+    open_orders = {o.order_id: o.filled_quantity for o in manager.order_tracker.open_orders()}
+    assert open_orders, "체결 대기 주문이 있어야 합니다."
+
+    checkpointer = Checkpointer('bot_checkpoint.bin')
+    next_slot = datetime.now() + timedelta(minutes=5)
+    checkpointer.save(pipeline, codes, next_slot, bars_valid_until=datetime.now() + timedelta(hours=1))
+
+    # 재시작: 브로커(거래소)만 그대로 두고 나머지는 새로 만듭니다.
+    portfolio, manager, pipeline = _components(exchange)
+    started = time.perf_counter()
+    state = checkpointer.restore(pipeline)
+    print(f"복원 {time.perf_counter() - started:.3f}초: 후보 {len(state.candidate_codes)}종목, "
+          f"주문 {len(state.open_orders)}건, 일봉 {len(state.bars)}종목")
+    assert state.candidate_codes == codes and state.next_slot == next_slot
+    assert {o.order_id: o.filled_quantity for o in manager.order_tracker.open_orders()} == open_orders
+    assert portfolio.reserved_cash > 0, "복원한 매수 주문의 현금을 다시 예약해야 합니다."
+    assert len(pipeline.market_data.minute_bars.frame(codes[0])) == 1
+
+    asyncio.run(pipeline.warm_up(codes))
+    stats = pipeline.market_data.cache_stats()
+    print(f"복원 후 준비 작업 조회: {stats}")
+    assert stats.get('bars_fetched', 0) == 0, "유효 기한 안에서는 일봉을 다시 조회하지 않아야 합니다."
+
+    for _ in range(20):
+        exchange.advance(30)
+        manager.process_fills()
+    print(f"체결 후 보유 종목: {sorted(portfolio.holdings)}")
+    assert not manager.order_tracker.open_orders() and portfolio.holdings
+    print("✅ 재시작 복원 테스트 통과")
+
+
+def test_fills_while_stopped():
+    """중단된 동안의 체결을 포트폴리오와 매매 횟수에 두 번 반영하지 않는지 확인"""
+    print("\n--- 중단 중 체결 복원 테스트 ---")
+    generate_synthetic_panel('panel', n_symbols=100, n_days=30, seed=1)
+    exchange = SimulatedExchange('panel', seed=3, participation=0.005)
+    exchange.advance(60 * 30)
+    codes = sorted(exchange.codes, key=exchange.get_current_price)
+
+    portfolio, manager, pipeline = _components(exchange)
+    for code in codes[:4]:
+        manager.execute_buy_order(code)
+    exchange.advance(30)
+    manager.process_fills()  # 중단 전에 일부 체결을 반영
+    saved_orders = {o.order_id: o.filled_quantity for o in manager.order_tracker.open_orders()}
+    Checkpointer('bot_checkpoint.bin').save(pipeline, codes)
+
+    # 중단: 프로세스가 없는 동안에도 거래소에서는 체결이 계속됩니다.
+    exchange.advance(60 * 3)
+    executions = exchange.get_order_executions(list(saved_orders))
+    filled_while_stopped = sum(executions[order_id]['filled'] - filled for order_id, filled in saved_orders.items())
+    print(f"중단 전 체결: {saved_orders}, 중단 중 체결: {filled_while_stopped}주")
+    assert filled_while_stopped > 0, "중단된 동안 체결이 있어야 합니다."
+
+    portfolio, manager, pipeline = _components(exchange)
+    state = Checkpointer('bot_checkpoint.bin').restore(pipeline)
+    restored = {o.order_id: o.filled_quantity for o in manager.order_tracker.open_orders()}
+    assert restored == {order_id: executions[order_id]['filled'] for order_id in restored}
+    assert len(state.open_orders) == len(restored)
+    assert not portfolio._sync_requested, "체결 내역과 맞췄으므로 전체 동기화가 필요 없어야 합니다."
+
+    for _ in range(20):
+        exchange.advance(30)
+        manager.process_fills()
+    assert not manager.order_tracker.open_orders()
+    account = Portfolio(exchange)
+    print(f"복원 후 현금 {portfolio.cash:,.0f}원 / 계좌 {account.cash:,.0f}원, 보유 {portfolio.holdings}")
+    assert portfolio.cash == account.cash
+    assert {code: h.quantity for code, h in portfolio.holdings.items()} == \
+           {code: h.quantity for code, h in account.holdings.items()}
+    filled_orders = sum(1 for e in exchange.get_order_executions(list(saved_orders)).values() if e['filled'])
+    assert manager.trading_controller.get_daily_trade_count() == filled_orders, "체결된 주문마다 매매 1회로 기록해야 합니다."
+    assert portfolio.reserved_cash == 0
+    print("✅ 중단 중 체결 복원 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("체크포인트 테스트를 시작합니다.\n")
+    test_file_format()
+    test_restore_after_restart()
+    test_fills_while_stopped()
+    print("\n모든 테스트가 완료되었습니다.")
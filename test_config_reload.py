@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+설정 다시 읽기(ConfigReloader) 테스트
+임시 디렉터리의 config.cfg 를 고쳐 가며 바뀐 파라미터만 감지/적용되는지 확인합니다.
+"""
+
+import itertools
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import indicators
+import stock_selector
+import strategy
+from config_reload import ConfigReloader, apply_params, read_params
+from trading_pipeline import TradingPipeline
+
+MODULES = {'indicators': indicators, 'strategy': strategy, 'stock_selector': stock_selector}
+
+_writes = itertools.count(1)
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+    """
+    임시 디렉터리의 config.cfg 경로. 모듈은 현재 디렉터리의 config.cfg 를 읽으므로 테스트 동안만 그곳으로 옮깁니다.
+    (테스트가 끝나면 원래 디렉터리로 돌아오며, 저장소의 config.cfg 는 건드리지 않습니다.)
+    """
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'config.cfg')
+
+
+def _write_config(path: str, values: dict):
+    """ [strategy] 섹션을 쓰고, 바로 다시 읽을 수 있도록 수정 시각을 과거로 돌립니다. """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[strategy]\n")
+        for name, value in values.items():
+            f.write(f"{name.lower()} = {value}\n")
+    past = time.time() - 60 - next(_writes)  # 쓸 때마다 수정 시각이 달라지도록
+    os.utime(path, (past, past))
+
+
+def _live_values() -> dict:
+    """ 다시 읽을 수 있는 파라미터의 현재 값 """
+    return {name: getattr(MODULES[module_name], name)
+            for module_name, values in read_params().items() for name in values}
+
+
+def test_detect_and_apply(config_path):
+    """바뀐 파라미터만 감지하고, 영향받는 지표/판단 단계를 계산하는지 확인"""
+    print("--- 변경 감지/적용 테스트 ---")
+    live = _live_values()
+    reloader = ConfigReloader(config_path)
+    _write_config(config_path, live)
+    assert reloader.check() is None, "값이 같으면 변경이 없어야 합니다."
+
+    edited = dict(live, RSI_BUY_THRESHOLD=live['RSI_BUY_THRESHOLD'] - 10, LONG_MA_WINDOW=live['LONG_MA_WINDOW'] + 10)
+    _write_config(config_path, edited)
+    change = reloader.check()
+    print(f"변경: {change.params}")
+    print(f"재계산 지표: {sorted(change.indicators)}, 영향 단계: {sorted(change.consumers)}")
+    assert change.params == {'indicators': {'LONG_MA_WINDOW': edited['LONG_MA_WINDOW']},
+                             'strategy': {'RSI_BUY_THRESHOLD': edited['RSI_BUY_THRESHOLD']}}
+    assert change.indicators == {'long_ma', 'ewo'}
+    assert change.consumers == {'screening', 'buy_signal'}
+    assert strategy.RSI_BUY_THRESHOLD == live['RSI_BUY_THRESHOLD'], "check() 는 모듈을 바꾸지 않아야 합니다."
+
+    try:
+        apply_params(change.params)
+        assert strategy.RSI_BUY_THRESHOLD == edited['RSI_BUY_THRESHOLD']
+        assert indicators.LONG_MA_WINDOW == edited['LONG_MA_WINDOW']
+    finally:
+        apply_params({'indicators': {'LONG_MA_WINDOW': live['LONG_MA_WINDOW']},
+                      'strategy': {'RSI_BUY_THRESHOLD': live['RSI_BUY_THRESHOLD']}})
+    print("✅ 변경 감지/적용 테스트 통과")
+
+
+def test_invalid_value_keeps_config(config_path):
+    """잘못된 값이 있으면 아무 것도 바꾸지 않는지 확인"""
+    print("\n--- 잘못된 설정 테스트 ---")
+    live = _live_values()
+    reloader = ConfigReloader(config_path)
+    _write_config(config_path, dict(live, RSI_BUY_THRESHOLD='abc', HIGH_OFFSET=live['HIGH_OFFSET'] + 0.01))
+    assert reloader.check() is None
+    assert strategy.HIGH_OFFSET == live['HIGH_OFFSET']
+    print("✅ 잘못된 설정 테스트 통과")
+
+
+def test_pipeline_invalidation(config_path):
+    """스크리닝 기준이 바뀔 때만 장 시작 전 선정 목록을 버리는지 확인"""
+    print("\n--- 선택적 무효화 테스트 ---")
+    live = _live_values()
+    manager = SimpleNamespace(trading_controller=None, market_data=None)
+    pipeline = TradingPipeline(None, None, manager)
+    reloader = ConfigReloader(config_path)
+
+    try:
+        pipeline._prescreened = ['005930', '000660']
+        _write_config(config_path, dict(live, HIGH_OFFSET=live['HIGH_OFFSET'] + 0.01))
+        change = reloader.check()
+        pipeline.apply_config(change)
+        print(f"매도 기준 변경 {change.consumers} → 선정 목록 {pipeline._prescreened}")
+        assert pipeline._prescreened == ['005930', '000660']
+
+        _write_config(config_path, dict(live, VOLUME_WINDOW=live['VOLUME_WINDOW'] + 5))
+        change = reloader.check()
+        pipeline.apply_config(change)
+        print(f"스크리닝 기준 변경 {change.consumers} → 선정 목록 {pipeline._prescreened}")
+        assert pipeline._prescreened == []
+        assert stock_selector.VOLUME_WINDOW == live['VOLUME_WINDOW'] + 5
+    finally:
+        apply_params({'strategy': {'HIGH_OFFSET': live['HIGH_OFFSET']},
+                      'stock_selector': {'VOLUME_WINDOW': live['VOLUME_WINDOW']}})
+    print("✅ 선택적 무효화 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("설정 다시 읽기 테스트를 시작합니다.\n")
+    raise SystemExit(pytest.main([__file__, '-s', '-q']))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+체결/분봉 아카이브(ArchiveWriter/ArchiveReader) 테스트
+임시 디렉터리에 청크 경계를 넘는 시세를 기록하고 다시 읽어 값이 그대로 복원되는지 확인합니다.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from market_archive import ArchiveReader, ArchiveWriter
+from market_data import MarketDataService
+
+DAY = '20261019'
+OPEN = int(np.datetime64('2026-10-19T09:00:00', 's').astype(np.int64))
+
+
+def _ticks(rows: int, seed: int = 0) -> np.ndarray:
+    """ (시각, 체결가, 체결량) 행렬. 같은 초에 여러 건이 있도록 시각은 2건마다 1초씩 증가 """
+    rng = np.random.default_rng(seed)
+    times = OPEN + np.arange(rows) // 2
+    prices = 70_000 + np.cumsum(rng.integers(-100, 101, rows))
+    volumes = rng.integers(1, 500, rows)
+    return np.vstack([times, prices, volumes]).astype(np.int64)
+
+
+def _bars(rows: int) -> np.ndarray:
+    """ (시각, 시가, 고가, 저가, 종가, 거래량) 행렬 (1분 간격) """
+    times = OPEN + np.arange(rows) * 60
+    close = 50_000 + np.arange(rows) * 10
+    return np.vstack([times, close - 5, close + 20, close - 20, close, np.full(rows, 1000)]).astype(np.int64)
+
+
+def _index(root: str, kind: str, stock_code: str) -> list[dict]:
+    with open(os.path.join(root, DAY, kind, f"{stock_code}.idx"), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_roundtrip_across_chunks():
+    """압축 여부와 관계없이 청크 경계를 넘는 체결이 그대로 복원되고, 구간 조회는 필요한 청크만 읽는지 확인"""
+    print("--- 청크 왕복 테스트 ---")
+    ticks = _ticks(350)
+    for compress in (False, True):
+        with tempfile.TemporaryDirectory() as root:
+            writer = ArchiveWriter(root, compress=compress, chunk_rows=100)
+            writer.append('tick', '005930', ticks[:, :130])
+            for column in range(130, 350):
+                writer.append_tick('005930', *ticks[:, column])
+            writer.close()
+
+            chunks = _index(root, 'tick', '005930')
+            print(f"압축 {compress}: 청크 {[chunk['rows'] for chunk in chunks]}")
+            assert [chunk['rows'] for chunk in chunks] == [100, 100, 100, 50]
+            assert all(chunk['compressed'] == compress for chunk in chunks)
+            assert {column[0] for chunk in chunks for column in chunk['columns']} == {'delta32', 'raw64'}
+
+            reader = ArchiveReader(root)
+            assert reader.days() == [DAY] and reader.symbols(DAY, 'tick') == ['005930']
+            restored = reader.read(DAY, 'tick', '005930')
+            for row, name in enumerate(('time', 'price', 'volume')):
+                assert np.array_equal(restored[name], ticks[row]), f"{name} 컬럼이 달라졌습니다."
+
+            # 두 번째 청크 중간부터 세 번째 청크 중간까지: 두 청크만 복원
+            start, end = int(ticks[0, 150]), int(ticks[0, 260])
+            parts = list(reader.iter_chunks(DAY, 'tick', '005930', start, end))
+            assert len(parts) == 2
+            window = reader.read(DAY, 'tick', '005930', start, end)
+            mask = (ticks[0] >= start) & (ticks[0] <= end)
+            assert np.array_equal(window['price'], ticks[1, mask])
+            assert len(reader.read(DAY, 'tick', '005930', OPEN - 100, OPEN - 1)['time']) == 0
+    print("✅ 청크 왕복 테스트 통과")
+
+
+def test_delta_overflow_falls_back_to_raw64():
+    """차분이 int32 범위를 넘는 컬럼은 raw64 로 저장되고 값이 그대로 복원되는지 확인"""
+    print("\n--- int32 초과 차분 테스트 ---")
+    ticks = _ticks(20)
+    ticks[1, 10:] += 2 ** 31 + 5  # 한 청크 안에서 가격 차분이 int32 최대값을 넘음
+    with tempfile.TemporaryDirectory() as root:
+        writer = ArchiveWriter(root, chunk_rows=100)
+        writer.append('tick', '000660', ticks)
+        writer.flush()
+
+        encodings = dict(zip(('time', 'price', 'volume'), (c[0] for c in _index(root, 'tick', '000660')[0]['columns'])))
+        print(f"컬럼 인코딩: {encodings}")
+        assert encodings == {'time': 'delta32', 'price': 'raw64', 'volume': 'raw64'}
+        restored = ArchiveReader(root).read(DAY, 'tick', '000660')
+        assert np.array_equal(restored['price'], ticks[1])
+        assert np.array_equal(restored['time'], ticks[0])
+    print("✅ int32 초과 차분 테스트 통과")
+
+
+def test_resume_after_restart():
+    """재시작한 기록기가 이미 기록된 분봉 이후부터만 이어서 기록하는지 확인"""
+    print("\n--- 재시작 이어 기록 테스트 ---")
+    bars = _bars(250)
+    with tempfile.TemporaryDirectory() as root:
+        first = ArchiveWriter(root, compress=True, chunk_rows=64)
+        first.append('bar', '035420', bars[:, :150])
+        first.close()
+
+        # 재시작: 새 기록기가 처음부터 다시 받은 분봉을 추가해도 중복되지 않아야 합니다.
+        restarted = ArchiveWriter(root, compress=True, chunk_rows=64)
+        restarted.append('bar', '035420', bars[:, :200])
+        restarted.append('bar', '035420', bars[:, 180:])
+        restarted.close()
+
+        restored = ArchiveReader(root).read(DAY, 'bar', '035420')
+        print(f"복원 행 수: {len(restored['time'])} (기록 {bars.shape[1]}행)")
+        for row, name in enumerate(('time', 'open', 'high', 'low', 'close', 'volume')):
+            assert np.array_equal(restored[name], bars[row]), f"{name} 컬럼이 달라졌습니다."
+        assert sum(chunk['rows'] for chunk in _index(root, 'bar', '035420')) == bars.shape[1]
+    print("✅ 재시작 이어 기록 테스트 통과")
+
+
+def test_torn_index_line():
+    """색인 추가 도중 종료되어 잘린 마지막 줄은 읽을 때 건너뛰고, 재시작한 기록기는 그 청크부터 다시 기록하는지 확인"""
+    print("\n--- 잘린 색인 줄 테스트 ---")
+    bars = _bars(200)
+    with tempfile.TemporaryDirectory() as root:
+        first = ArchiveWriter(root, chunk_rows=64)
+        first.append('bar', '005380', bars[:, :150])
+        first.close()
+        with open(os.path.join(root, DAY, 'bar', '005380.idx'), 'a', encoding='utf-8') as f:
+            f.write('{"start": 1, "end": ')
+
+        restored = ArchiveReader(root).read(DAY, 'bar', '005380')
+        assert np.array_equal(restored['close'], bars[4, :150])
+
+        restarted = ArchiveWriter(root, chunk_rows=64)
+        restarted.append('bar', '005380', bars)
+        restarted.close()
+        restored = ArchiveReader(root).read(DAY, 'bar', '005380')
+        print(f"복원 행 수: {len(restored['time'])} (기록 {bars.shape[1]}행)")
+        for row, name in enumerate(('time', 'open', 'high', 'low', 'close', 'volume')):
+            assert np.array_equal(restored[name], bars[row]), f"{name} 컬럼이 달라졌습니다."
+        assert sum(chunk['rows'] for chunk in _index(root, 'bar', '005380')) == bars.shape[1]
+    print("✅ 잘린 색인 줄 테스트 통과")
+
+
+class _FailingArchive:
+    """ 모든 기록에서 디스크 오류를 내는 아카이브 """
+    def append(self, *args):
+        raise OSError("No space left on device")
+
+    append_tick = append
+
+    def flush(self):
+        raise OSError("No space left on device")
+
+
+def test_archive_errors_do_not_stop_trading():
+    """아카이브 기록이 실패해도 체결 반영과 분봉 기록 호출이 예외 없이 끝나는지 확인"""
+    print("\n--- 아카이브 오류 격리 테스트 ---")
+    market_data = MarketDataService(broker=None, archive=_FailingArchive())
+    start = datetime(2026, 10, 19, 9, 0, 10)
+    for minute in range(3):
+        market_data.on_tick('005930', start.replace(minute=minute), 70_000 + minute, 10)
+    assert len(market_data.minute_bars.buffer('005930').times()) == 3
+    assert market_data.archive_minute_bars(now=datetime(2026, 10, 19, 9, 5)) == 0
+    assert market_data.archive_minute_bars(flush=True) == 0
+    print("✅ 아카이브 오류 격리 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("시세 아카이브 테스트를 시작합니다.\n")
+    test_roundtrip_across_chunks()
+    test_delta_overflow_falls_back_to_raw64()
+    test_resume_after_restart()
+    test_torn_index_line()
+    test_archive_errors_do_not_stop_trading()
+    print("\n모든 테스트가 완료되었습니다.")
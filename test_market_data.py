@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+시세 조회 서비스(MarketDataService) 테스트
+호출 횟수를 세는 가짜 브로커로 동시 요청 중복 제거, 조회 실패 캐시, 주기별 스냅샷, 호출 한도 토큰 사용을 확인합니다.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from market_data import MarketDataService
+from rate_limiter import RateLimiter
+
+AS_OF = datetime(2026, 10, 19, 10, 0)
+
+
+class FakeBroker:
+    """ 스레드에서 호출되는 브로커. 호출 횟수를 세고, release 가 설정될 때까지 응답을 붙잡아 둘 수 있습니다. """
+    def __init__(self, failing: set[str] = frozenset()):
+        self.failing = failing
+        self.calls = {'get_daily_price': 0, 'get_current_price': 0}
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+        self.release.wait(5)
+
+    def get_daily_price(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame | None:
+        self._count('get_daily_price')
+        if stock_code in self.failing:
+            return None
+        return pd.DataFrame({'stck_bsop_date': ['20261016', end_date], 'stck_clpr': ['70000', '71000'],
+                             'acml_vol': ['1000', '1200']})
+
+    def get_current_price(self, stock_code: str) -> int | None:
+        self._count('get_current_price')
+        return None if stock_code in self.failing else 70_500
+
+
+class CountingRateLimiter(RateLimiter):
+    """ 사용한 토큰 수를 세는 호출 빈도 제한기 """
+    def __init__(self):
+        super().__init__(1000)
+        self.tokens_used = 0
+
+    def acquire(self):
+        super().acquire()
+        self.tokens_used += 1
+
+    async def acquire_async(self):
+        await super().acquire_async()
+        self.tokens_used += 1
+
+
+def _service(broker: FakeBroker) -> tuple[MarketDataService, CountingRateLimiter]:
+    limiter = CountingRateLimiter()
+    market_data = MarketDataService(broker, rate_limiter=limiter)
+    market_data.begin_cycle(AS_OF)
+    return market_data, limiter
+
+
+def _wait_for_followers(market_data: MarketDataService, kind: str, followers: int):
+    """ 나머지 요청이 모두 진행 중인 조회에 합류할 때까지 기다립니다. """
+    deadline = time.monotonic() + 5
+    while market_data.cache_stats().get(f'{kind}_deduplicated', 0) < followers:
+        assert time.monotonic() < deadline, "중복 요청이 진행 중인 조회에 합류하지 않았습니다."
+        time.sleep(0.001)
+
+
+def test_concurrent_requests_call_broker_once():
+    """여러 스레드와 비동기 작업이 같은 종목을 동시에 요청해도 브로커와 호출 한도 토큰을 한 번만 쓰는지 확인"""
+    print("--- 동시 요청 중복 제거 테스트 ---")
+    broker = FakeBroker()
+    market_data, limiter = _service(broker)
+    broker.release.clear()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(market_data.get_bars, '005930') for _ in range(8)]
+        _wait_for_followers(market_data, 'bars', 7)
+        broker.release.set()
+        results = [future.result() for future in futures]
+    assert all(df is results[0] for df in results)
+    assert broker.calls['get_daily_price'] == 1 and limiter.tokens_used == 1
+
+    async def fetch_all():
+        broker.release.clear()
+        tasks = [asyncio.create_task(market_data.get_bars_async('000660')) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while market_data.cache_stats().get('bars_deduplicated', 0) < 14:
+            assert time.monotonic() < deadline, "중복 요청이 진행 중인 조회에 합류하지 않았습니다."
+            await asyncio.sleep(0.001)
+        broker.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(fetch_all())
+    assert all(df is results[0] for df in results) and int(results[0]['close'].iloc[-1]) == 71_000
+    # 스냅샷에 있는 종목은 토큰 없이 바로 돌려줍니다.
+    asyncio.run(market_data.get_bars_async('000660'))
+    print(f"조회 통계: {market_data.cache_stats()}, 사용한 토큰: {limiter.tokens_used}")
+    assert broker.calls['get_daily_price'] == 2 and limiter.tokens_used == 2
+    print("✅ 동시 요청 중복 제거 테스트 통과")
+
+
+def test_failures_cached_per_snapshot():
+    """조회 실패(None)는 같은 주기에서 다시 조회하지 않고, 다음 주기에는 다시 조회하는지 확인"""
+    print("\n--- 조회 실패 캐시 테스트 ---")
+    broker = FakeBroker(failing={'999999'})
+    market_data, limiter = _service(broker)
+    for _ in range(3):
+        assert market_data.get_bars('999999') is None
+        assert market_data.get_quote('999999') is None
+        assert asyncio.run(market_data.get_bars_async('999999')) is None
+    assert market_data.has_bars('999999')
+    assert broker.calls == {'get_daily_price': 1, 'get_current_price': 1} and limiter.tokens_used == 2
+
+    market_data.begin_cycle(datetime(2026, 10, 19, 10, 1))
+    assert not market_data.has_bars('999999')
+    assert market_data.get_bars('999999') is None
+    assert broker.calls['get_daily_price'] == 2
+    print("✅ 조회 실패 캐시 테스트 통과")
+
+
+def test_begin_cycle_starts_fresh_snapshot():
+    """새 주기에는 이전 스냅샷의 일봉/현재가를 쓰지 않고, 오늘 일봉이 있으면 현재가를 따로 조회하지 않는지 확인"""
+    print("\n--- 주기별 스냅샷 테스트 ---")
+    broker = FakeBroker()
+    market_data, _ = _service(broker)
+    first = market_data.get_bars('005930')
+    assert market_data.get_quote('005930') == 71_000  # 오늘 일봉의 종가
+    assert market_data.get_quote('035420') == 70_500
+    assert broker.calls == {'get_daily_price': 1, 'get_current_price': 1}
+
+    snapshot = market_data.begin_cycle(datetime(2026, 10, 19, 10, 1))
+    assert not snapshot.bars and not snapshot.quotes
+    second = market_data.get_bars('005930')
+    market_data.get_quote('035420')
+    assert second is not first
+    assert broker.calls == {'get_daily_price': 2, 'get_current_price': 2}
+    print(f"조회 통계: {market_data.cache_stats()}")
+    print("✅ 주기별 스냅샷 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("시세 조회 서비스 테스트를 시작합니다.\n")
+    test_concurrent_requests_call_broker_once()
+    test_failures_cached_per_snapshot()
+    test_begin_cycle_starts_fresh_snapshot()
+    print("\n모든 테스트가 완료되었습니다.")
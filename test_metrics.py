@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+지표(metrics) 테스트
+Prometheus 텍스트 형식 출력과 /metrics HTTP 엔드포인트를 확인합니다.
+"""
+
+import urllib.request
+
+import metrics
+
+
+def test_render():
+    """카운터/히스토그램/콜백 지표가 라벨별로 올바르게 출력되는지 확인"""
+    print("--- 지표 출력 테스트 ---")
+    registry = metrics.MetricsRegistry()
+    requests = metrics.counter('test_requests_total', "호출 수", ('endpoint', 'status'), registry=registry)
+    latency = metrics.histogram('test_seconds', "응답 시간", ('endpoint',), buckets=(0.1, 1.0), registry=registry)
+    metrics.gauge_callback('test_depth', "대기열 길이", lambda: {('telegram',): 3}, ('queue',), registry=registry)
+    metrics.gauge_callback('test_broken', "계산 실패", lambda: 1 / 0, registry=registry)
+
+    requests.inc('/price', '200')
+    requests.inc('/price', '200')
+    requests.inc('/price', '500')
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(seconds, '/price')
+
+    text = registry.render()
+    print(text)
+    assert '# TYPE automata_test_requests_total counter' in text
+    assert 'automata_test_requests_total{endpoint="/price",status="200"} 2' in text
+    assert 'automata_test_seconds_bucket{endpoint="/price",le="0.1"} 2' in text
+    assert 'automata_test_seconds_bucket{endpoint="/price",le="1.0"} 3' in text
+    assert 'automata_test_seconds_bucket{endpoint="/price",le="+Inf"} 4' in text
+    assert 'automata_test_seconds_count{endpoint="/price"} 4' in text
+    assert 'automata_test_seconds_sum{endpoint="/price"} 3.65' in text
+    assert 'automata_test_depth{queue="telegram"} 3' in text
+    assert 'automata_test_broken' not in text  # 계산에 실패한 지표는 건너뜀
+    print("[성공] 지표 출력 형식 확인\n")
+
+
+def test_http_endpoint():
+    """HTTP 서버가 /metrics 로 지표를 제공하는지 확인"""
+    print("--- 지표 엔드포인트 테스트 ---")
+    registry = metrics.MetricsRegistry()
+    metrics.counter('test_cycles_total', "주기 수", registry=registry).inc()
+    server = metrics.start_http_server(port=0, host='127.0.0.1', registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            body = response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+    print(body)
+    assert 'automata_test_cycles_total 1' in body
+    print("[성공] /metrics 응답 확인\n")
+
+
+if __name__ == '__main__':
+    test_render()
+    test_http_endpoint()
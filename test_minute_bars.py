@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+분봉 링 버퍼(MinuteBarBuffer) 테스트
+용량을 넘겨 분봉을 추가해도 최근 구간이 복사 없이 올바른 순서로 조회되는지, 체결/조회 결과가 분봉에 반영되는지 확인합니다.
+"""
+
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from indicators import add_all_indicators
+from minute_bars import MinuteBarBuffer, MinuteBarStore
+
+
+def test_ring_buffer_window():
+    """용량을 여러 바퀴 넘겨도 최근 n개가 단순 구현(deque)과 같고, 뷰가 버퍼를 공유하는지 확인"""
+    print("--- 분봉 링 버퍼 테스트 ---")
+    buffer = MinuteBarBuffer(capacity=50)
+    reference = deque(maxlen=50)
+    for i in range(173):
+        minute = 60 * i
+        buffer.append(minute, i, i + 1, i - 1, i + 0.5, 10 * i)
+        reference.append((minute, i + 0.5))
+        for n in (1, 7, 50, None):
+            expected = list(reference)[-(n or 50):]
+            assert buffer.times(n).tolist() == [m for m, _ in expected]
+            assert buffer.close(n).tolist() == [c for _, c in expected]
+
+    frame = buffer.frame(20)
+    assert np.shares_memory(frame['close'].to_numpy(), buffer.window())
+    assert len(add_all_indicators(frame)) == 20
+    assert buffer.close(20).tolist() == frame['close'].tolist()
+    print(f"[성공] 분봉 {len(buffer)}개 보관, 최근 구간이 복사 없이 조회됨\n")
+
+
+def test_ticks_and_ingest():
+    """같은 분의 체결이 한 분봉으로 합쳐지고, 차트 조회 결과(최신 순)가 오래된 순으로 반영되는지 확인"""
+    print("--- 체결/분봉 조회 반영 테스트 ---")
+    store = MinuteBarStore(capacity=10)
+    chart = pd.DataFrame({
+        'stck_bsop_date': ['20261019'] * 3,
+        'stck_cntg_hour': ['090200', '090100', '090000'],
+        'stck_oprc': ['100', '101', '99'],
+        'stck_hgpr': ['103', '102', '101'],
+        'stck_lwpr': ['99', '100', '98'],
+        'stck_prpr': ['102', '100', '101'],
+        'cntg_vol': ['30', '20', '10'],
+    })
+    assert store.ingest('005930', chart) == 3
+    assert store.frame('005930')['close'].tolist() == [101, 100, 102]
+
+    store.on_tick('005930', datetime(2026, 10, 19, 9, 2, 30), 105, 5)
+    store.on_tick('005930', datetime(2026, 10, 19, 9, 2, 40), 97, 5)
+    store.on_tick('005930', datetime(2026, 10, 19, 9, 3, 1), 98, 1)
+    store.on_tick('005930', datetime(2026, 10, 19, 9, 1, 0), 50, 1)  # 지난 분봉은 무시
+    frame = store.frame('005930')
+    print(frame)
+    assert len(frame) == 4
+    assert frame.iloc[2].tolist() == [100, 105, 97, 97, 40]
+    assert frame.iloc[3].tolist() == [98, 98, 98, 98, 1]
+    assert store.ingest('005930', chart) == 0  # 마지막 분봉보다 이전 것은 건너뜀
+    assert len(store.frame('005930')) == 4
+    print("[성공] 체결과 분봉 조회 결과가 같은 버퍼에 반영됨\n")
+
+
+if __name__ == '__main__':
+    test_ring_buffer_window()
+    test_ticks_and_ingest()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+주문 체결 추적(OrderTracker) 테스트
+네트워크 없이 실행되며, 부분 체결과 미체결 만료 처리를 확인합니다.
+"""
+
+from order_tracker import OrderTracker, TrackedOrder
+
+
+class FakeExecutionBroker:
+    """ 체결 현황을 테스트에서 직접 지정하는 브로커 """
+    def __init__(self):
+        self.executions = {}
+        self.calls = 0
+
+    def get_order_executions(self, order_ids):
+        self.calls += 1
+        return {order_id: self.executions[order_id] for order_id in order_ids if order_id in self.executions}
+
+
+def test_partial_fills():
+    """부분 체결이 증분 수량과 가격으로 보고되는지 확인"""
+    print("--- 부분 체결 테스트 ---")
+    broker = FakeExecutionBroker()
+    tracker = OrderTracker(broker, timeout_seconds=60)
+    tracker.add(TrackedOrder('A1', '005930', 'buy', 10, reference_price=70000))
+    tracker.add(TrackedOrder('A2', '000660', 'buy', 5, reference_price=120000))
+
+    broker.executions['A1'] = {'filled': 4, 'avg_price': 70000, 'cancelled': False}
+    events = tracker.poll()
+    print(f"1차 조회: {[(e.order.order_id, e.quantity, e.price, e.done) for e in events]}")
+    assert broker.calls == 1
+    assert len(events) == 1 and events[0].quantity == 4 and not events[0].done
+
+    broker.executions['A1'] = {'filled': 10, 'avg_price': 70600, 'cancelled': False}
+    broker.executions['A2'] = {'filled': 5, 'avg_price': 119000, 'cancelled': False}
+    events = tracker.poll()
+    print(f"2차 조회: {[(e.order.order_id, e.quantity, round(e.price), e.done) for e in events]}")
+    assert broker.calls == 2, "열린 주문은 한 번의 조회로 확인해야 합니다."
+    fill = next(e for e in events if e.order.order_id == 'A1')
+    assert fill.quantity == 6 and fill.done and round(fill.price) == 71000
+    assert not tracker.open_orders()
+    print("[성공] 부분 체결 및 일괄 조회 확인\n")
+
+
+def test_expired_order():
+    """제한 시간 내 체결되지 않은 주문이 만료되는지 확인"""
+    print("--- 미체결 만료 테스트 ---")
+    broker = FakeExecutionBroker()
+    tracker = OrderTracker(broker, timeout_seconds=0)
+    tracker.add(TrackedOrder('B1', '035720', 'sell', 3, reference_price=50000, submitted_at=0))
+
+    events = tracker.poll()
+    print(f"조회 결과: {[(e.order.order_id, e.quantity, e.done, e.expired) for e in events]}")
+    assert len(events) == 1 and events[0].expired and events[0].quantity == 0
+    assert not tracker.has_open_order('035720')
+    print("[성공] 미체결 주문 만료 확인\n")
+
+
+if __name__ == '__main__':
+    test_partial_fills()
+    test_expired_order()
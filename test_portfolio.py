@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+포트폴리오 계좌 동기화(Portfolio.reconcile) 테스트
+네트워크 없이 LocalBroker 계좌를 바꿔 가며, 변경분만 반영한 결과가 잔고를 처음부터 다시 읽은 결과와 같은지 확인합니다.
+"""
+
+import os
+import tempfile
+
+from local_broker import LocalBroker
+from param_sweep import generate_synthetic_panel
+from portfolio import Portfolio
+
+
+def _state(portfolio: Portfolio) -> tuple:
+    """ 비교용 포트폴리오 상태 (현금, 보유 종목, 평가 장부) """
+    holdings = {code: (h.name, h.quantity, round(h.avg_price, 4)) for code, h in portfolio.holdings.items()}
+    valuation = {code: portfolio.valuation.position(code) for code in portfolio.holdings}
+    return (portfolio.cash, holdings, valuation, round(portfolio.valuation.total_market_value, 4),
+            round(portfolio.valuation.total_cost, 4))
+
+
+def test_incremental_sync_matches_rebuild():
+    """추가/제거/수량 변경된 종목과 현금이 전체 재구성과 같게 반영되는지 확인"""
+    print("--- 변경분 동기화 테스트 ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        panel = os.path.join(tmp, 'panel')
+        generate_synthetic_panel(panel, n_symbols=20, n_days=30, seed=2)
+        broker = LocalBroker(panel, cash=50_000_000)
+        a, b, c, d, e = broker.codes[:5]
+        for code, quantity in ((a, 10), (b, 20), (c, 30)):
+            broker.buy(code, quantity)
+
+        portfolio = Portfolio(broker)
+        assert _state(portfolio) == _state(Portfolio(broker))
+
+        # 동기화 주기 전에는 잔고를 조회하지 않습니다.
+        calls = broker.call_counts['get_balance']
+        assert portfolio.reconcile() is False
+        assert broker.call_counts['get_balance'] == calls
+
+        # 봇 밖에서 계좌가 바뀜: 신규 종목 추가, 전량 매도, 추가 매수(평단 변경), 일부 매도, 입금
+        broker.buy(d, 5)
+        broker.sell(a, 10)
+        broker.buy(b, 7)
+        broker.sell(c, 12)
+        broker.cash += 1_000_000
+        # 로컬 상태도 계좌와 어긋나 있음: 계좌에 없는 종목의 잘못된 체결 반영
+        portfolio.update_on_buy(e, 3, 1_000)
+
+        portfolio.request_sync("테스트")
+        assert portfolio.reconcile() is True
+        rebuilt = Portfolio(broker)
+        print(f"동기화 후: {portfolio}")
+        assert _state(portfolio) == _state(rebuilt)
+        assert set(portfolio.holdings) == {b, c, d}
+        assert e not in portfolio.valuation and a not in portfolio.valuation
+
+        # 바뀐 것이 없으면 같은 상태를 유지합니다.
+        portfolio.request_sync()
+        assert portfolio.reconcile() is True
+        assert _state(portfolio) == _state(rebuilt)
+    print("✅ 변경분 동기화 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("포트폴리오 동기화 테스트를 시작합니다.\n")
+    test_incremental_sync_matches_rebuild()
+    print("\n모든 테스트가 완료되었습니다.")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+매수 전 위험 한도(RiskEngine) 테스트
+네트워크 없이 실행되며, 종목/섹터/전체 노출 한도와 체결·취소 시 누적 합계 갱신을 확인합니다.
+"""
+
+import time
+
+from portfolio import Portfolio
+from risk_engine import RiskEngine
+
+SECTORS = {'005930': 'IT', '000660': 'IT', '035420': 'IT', '105560': '금융', '005380': '자동차'}
+
+
+class FakeBalanceBroker:
+    """ 고정된 계좌 잔고를 돌려주는 브로커 (현금 600만원 + 삼성전자 180만원 + SK하이닉스 220만원) """
+    def get_balance(self):
+        return {
+            'output1': [
+                {'pdno': '005930', 'prdt_name': '삼성전자', 'hldg_qty': '30', 'pchs_avg_pric': '60000', 'prpr': '60000'},
+                {'pdno': '000660', 'prdt_name': 'SK하이닉스', 'hldg_qty': '20', 'pchs_avg_pric': '110000',
+                 'prpr': '110000'},
+            ],
+            'output2': {'dnca_tot_amt': '6000000'},
+        }
+
+
+def _engine(**limits) -> RiskEngine:
+    engine = RiskEngine(Portfolio(FakeBalanceBroker()), **limits)
+    engine.set_sectors(SECTORS)
+    return engine
+
+
+def test_limits():
+    """종목/섹터/전체 한도를 넘는 매수만 거부하는지 확인 (총자산 1,000만원)"""
+    print("--- 한도 확인 테스트 ---")
+    engine = _engine(max_position_value=0, max_position_ratio=0.2, max_sector_ratio=0.5, max_gross_ratio=0.6)
+    print(f"노출(삼성전자): {engine.exposure('005930')}")
+    assert engine.exposure('005930') == (1_800_000, 4_000_000, 4_000_000)
+
+    ok, reason = engine.try_reserve('005930', 300_000)
+    print(f"삼성전자 30만원: {ok} ({reason})")
+    assert not ok and '종목 비중' in reason
+    ok, reason = engine.try_reserve('035420', 1_500_000)
+    print(f"NAVER 150만원: {ok} ({reason})")
+    assert not ok and 'IT 섹터' in reason
+    assert engine.try_reserve('035420', 900_000)[0]
+    ok, reason = engine.try_reserve('035420', 200_000)
+    assert not ok and 'IT 섹터' in reason, "체결 대기 금액도 섹터 노출에 포함되어야 합니다."
+    ok, reason = engine.try_reserve('105560', 1_500_000)
+    print(f"KB금융 150만원: {ok} ({reason})")
+    assert not ok and '주식 비중' in reason
+    assert engine.try_reserve('105560', 1_000_000)[0]
+    print(f"노출(KB금융): {engine.exposure('105560')}")
+    assert engine.exposure('105560') == (1_000_000, 1_000_000, 5_900_000)
+    print("✅ 한도 확인 테스트 통과")
+
+
+def test_fills_and_prices():
+    """체결/취소/시세 변동이 누적 합계에 반영되는지 확인"""
+    print("\n--- 누적 합계 갱신 테스트 ---")
+    engine = _engine(max_sector_ratio=0.5, max_position_ratio=0, max_gross_ratio=0)
+    portfolio = engine.portfolio
+    assert engine.try_reserve('035420', 900_000)[0]
+
+    # 절반 체결: 체결 대기 노출이 보유 노출로 옮겨짐
+    portfolio.update_on_buy('035420', 2, 225_000)
+    engine.release('035420', 450_000)
+    print(f"절반 체결 후 IT 섹터 노출: {engine.exposure('035420')[1]:,.0f}원")
+    assert engine.exposure('035420')[:2] == (900_000, 4_900_000)
+
+    # 잔량 취소: 체결 대기 노출 해제
+    engine.release('035420', 450_000)
+    assert engine.exposure('035420')[:2] == (450_000, 4_450_000)
+
+    # 시세 하락은 벡터 갱신으로 섹터 합계에 반영
+    portfolio.mark_to_market({'005930': 50_000, '000660': 100_000})
+    print(f"시세 반영 후 IT 섹터 노출: {engine.exposure('005930')[1]:,.0f}원")
+    assert engine.exposure('005930')[1] == 30 * 50_000 + 20 * 100_000 + 450_000
+    assert engine.try_reserve('005930', 500_000)[0]
+
+    # 전량 매도: 섹터 합계에서 제거
+    portfolio.update_on_sell('000660', 20, 100_000)
+    assert engine.exposure('000660')[:2] == (0, 1_500_000 + 500_000 + 450_000)
+    print("✅ 누적 합계 갱신 테스트 통과")
+
+
+def test_check_cost():
+    """주문 1건 확인 비용이 보유 종목 수와 관계없이 일정한지 확인"""
+    print("\n--- 확인 비용 테스트 ---")
+    engine = _engine(max_position_ratio=0.2, max_sector_ratio=0.5, max_gross_ratio=1.0)
+    timings = []
+    for holdings in (2, 2000):
+        for i in range(holdings - 2):
+            engine.portfolio.valuation.set_position(f'9{i:05d}', 1, 1, 1)
+        started = time.perf_counter()
+        for _ in range(5000):
+            engine.try_reserve('035420', 100)
+            engine.release('035420', 100)
+        timings.append((time.perf_counter() - started) / 5000)
+        print(f"보유 {holdings}종목: 확인+해제 1건 {timings[-1] * 1e6:.1f}µs")
+    assert timings[1] < timings[0] * 5
+    print("✅ 확인 비용 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("위험 한도 테스트를 시작합니다.\n")
+    test_limits()
+    test_fills_and_prices()
+    test_check_cost()
+    print("\n모든 테스트가 완료되었습니다.")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+모의 거래소(SimulatedExchange) 테스트
+네트워크 없이 실행되며, 부분 체결, 주문 거부, 시드 재현성과 OrderManager 체결 처리를 확인합니다.
+"""
+
+import functools
+import os
+import tempfile
+
+from param_sweep import generate_synthetic_panel
+from sim_exchange import SimulatedExchange
+
+
+@functools.cache
+def _panel() -> str:
+    """ 합성 일봉 패널 (테스트 전체에서 한 번만 생성) """
+    path = os.path.join(tempfile.mkdtemp(), 'panel')
+    generate_synthetic_panel(path, n_symbols=200, n_days=30, seed=1)
+    return path
+
+
+def _exchange(**kwargs) -> SimulatedExchange:
+    exchange = SimulatedExchange(_panel(), seed=3, **kwargs)
+    exchange.advance(60 * 30)  # 09:30
+    return exchange
+
+
+def test_partial_fills():
+    """체결 가능 비율이 낮으면 주문이 여러 번에 나누어 체결되는지 확인"""
+    print("--- 부분 체결 테스트 ---")
+    exchange = _exchange(participation=0.005)
+    code = exchange.codes[0]
+    quantity = int(2_000_000 // exchange.get_current_price(code))
+    order_id = exchange.buy(code, quantity)['odno']
+
+    history = []
+    for _ in range(60):
+        exchange.advance(60)
+        history.append(exchange.get_order_executions([order_id])[order_id]['filled'])
+        if history[-1] == quantity:
+            break
+    print(f"분당 누적 체결 수량: {history[:8]}... / 주문 {quantity}주, 체결 {exchange.stats['fills']}회")
+    assert 0 < history[0] < quantity, "첫 1분에 일부만 체결되어야 합니다."
+    assert history[-1] == quantity
+    assert exchange.positions[code]['quantity'] == quantity
+    print("✅ 부분 체결 테스트 통과")
+
+
+def test_rejections():
+    """현금/보유 수량 부족과 무작위 거부 확인"""
+    print("\n--- 주문 거부 테스트 ---")
+    exchange = _exchange(cash=1_000_000)
+    code = exchange.codes[0]
+    assert exchange.buy(code, 10_000) is None
+    assert exchange.sell(code, 1) is None
+    print(f"거부: {dict(exchange.stats)}")
+    assert exchange.stats['rejected_cash'] == 1 and exchange.stats['rejected_position'] == 1
+
+    exchange = _exchange(reject_rate=0.5)
+    results = [exchange.buy(code, 1) for _ in range(40)]
+    rejected = results.count(None)
+    print(f"무작위 거부: 40건 중 {rejected}건")
+    assert 5 < rejected < 35
+    print("✅ 주문 거부 테스트 통과")
+
+
+def _run_day() -> tuple:
+    from portfolio import Portfolio
+    from order_manager import OrderManager
+
+    os.chdir(tempfile.mkdtemp())  # 실행마다 매매 기록(쿨다운)을 새로 시작
+    exchange = _exchange(participation=0.005, order_latency=0.5, latency_jitter=1.0, reject_rate=0.1)
+    portfolio = Portfolio(exchange)
+    manager = OrderManager(exchange, portfolio)
+    # 종목당 투자금액으로 여러 주를 살 수 있는 저가 종목
+    for code in sorted(exchange.codes, key=exchange.get_current_price)[:8]:
+        manager.execute_buy_order(code)
+    for _ in range(20):
+        exchange.advance(30)
+        manager.process_fills()
+    holdings = {code: (h.quantity, round(h.avg_price, 2)) for code, h in portfolio.holdings.items()}
+    return holdings, dict(exchange.stats), exchange.cash
+
+
+def test_order_manager_deterministic():
+    """OrderManager 로 주문을 내고 체결 처리한 결과가 계좌와 일치하고, 같은 시드로 똑같이 재현되는지 확인"""
+    print("\n--- OrderManager 연동 / 재현성 테스트 ---")
+    first = _run_day()
+    second = _run_day()
+    holdings, stats, cash = first
+    print(f"보유 종목: {holdings}")
+    print(f"거래소 통계: {stats}, 남은 현금: {cash:,.0f}원")
+    assert holdings and stats['fills'] > len(holdings)
+    assert first == second, "같은 시드에서는 결과가 같아야 합니다."
+    print("✅ OrderManager 연동 / 재현성 테스트 통과")
+
+
+def test_pipeline_marks_all_holdings(tmp_path, monkeypatch):
+    """매도 확인에서 빠진 보유 종목(최소 보유 기간)도 매 주기 현재가로 평가되는지 확인"""
+    print("\n--- 보유 종목 평가 테스트 ---")
+    import asyncio
+    from portfolio import Portfolio
+    from order_manager import OrderManager
+    from trading_pipeline import TradingPipeline
+
+    monkeypatch.chdir(tmp_path)  # 매매 기록(쿨다운)을 새로 시작
+    exchange = _exchange(participation=0.05)
+    portfolio = Portfolio(exchange)
+    manager = OrderManager(exchange, portfolio)
+    for code in sorted(exchange.codes, key=exchange.get_current_price)[:4]:
+        manager.execute_buy_order(code)
+    for _ in range(10):
+        exchange.advance(30)
+        manager.process_fills()
+    assert portfolio.holdings
+    assert not any(manager.trading_controller.eligible(list(portfolio.holdings), 'sell')), \
+        "방금 산 종목은 매도 대상이 아니어야 합니다."
+
+    exchange.advance(60 * 60)  # 시세 변동
+    pipeline = TradingPipeline(exchange, portfolio, manager)
+    pipeline.market_data.begin_cycle()
+    asyncio.run(pipeline._sell_flow())
+    marked = {code: portfolio.valuation.position(code)['price'] for code in portfolio.holdings}
+    current = {code: exchange.get_current_price(code) for code in portfolio.holdings}
+    print(f"평가 가격: {marked}, 현재가: {current}")
+    assert marked == current
+    assert portfolio.stock_value == sum(h.quantity * current[code] for code, h in portfolio.holdings.items())
+    print("✅ 보유 종목 평가 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("모의 거래소 테스트를 시작합니다.\n")
+    test_partial_fills()
+    test_rejections()
+    test_order_manager_deterministic()
+    print("\n모든 테스트가 완료되었습니다.")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+공유 상태 저장소(StateStore) 테스트
+임시 SQLite 파일에 두 프로세스 역할의 저장소를 열어 현금 예약 한도와 매매 기록 공유를 확인합니다.
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from state_store import StateStore
+from trading_controller import TradingController
+
+
+def test_shared_cash_reservation():
+    """여러 소유자의 동시 예약 합계가 현금을 넘지 않는지 확인"""
+    print("--- 공유 현금 예약 테스트 ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'state.db')
+        workers = [StateStore(db_file, owner=f"worker-{i}") for i in range(4)]
+
+        # 현금 100만원에 대해 4개 프로세스가 10만원씩 동시에 20번 예약 시도
+        def reserve(store):
+            return sum(store.reserve_cash(100_000, 1_000_000) for _ in range(20))
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            succeeded = sum(pool.map(reserve, workers))
+        print(f"예약 성공: {succeeded}건, 예약 합계: {workers[0].reserved_total():,.0f}원")
+        assert succeeded == 10
+        assert workers[0].reserved_total() == 1_000_000
+
+        for store in workers:
+            store.clear_reservations()
+        assert workers[0].reserved_total() == 0
+        assert workers[0].reserve_cash(100_000, 1_000_000)
+        print("[성공] 예약 합계가 현금 한도를 넘지 않음\n")
+
+
+def test_shared_trade_history():
+    """한 프로세스의 매매 기록이 다른 프로세스의 쿨다운과 일일 매매 횟수에 반영되는지 확인"""
+    print("--- 매매 기록 공유 테스트 ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'state.db')
+        first = TradingController(StateStore(db_file, owner='first'))
+        second = TradingController(StateStore(db_file, owner='second'))
+
+        first.record_buy('005930')
+        can_buy, reason = second.can_buy('005930')
+        print(f"다른 프로세스의 매수 가능 여부: {can_buy}, 사유: {reason}")
+        assert not can_buy
+        assert second.get_daily_trade_count() == 1
+        assert second.eligible(['005930', '000660'], 'buy') == [False, True]
+
+        second.record_sell('000660')
+        assert first.get_daily_trade_count() == 2
+
+        # 재시작한 프로세스도 저장소에서 같은 상태를 읽어야 합니다.
+        restarted = TradingController(StateStore(db_file, owner='first'))
+        assert restarted.trade_history['purchase_dates'].keys() == {'005930'}
+        assert restarted.get_daily_trade_count() == 2
+        print("[성공] 매매 기록이 프로세스 간에 공유됨\n")
+
+
+def test_stale_orders_expire():
+    """종료된 프로세스가 남긴 체결 대기 주문 기록이 TTL 이 지나면 무시되고 시작 시 만료 처리되는지 확인"""
+    print("--- 오래된 주문 기록 만료 테스트 ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'state.db')
+        crashed = StateStore(db_file, owner='crashed', order_ttl_seconds=60)
+        crashed.record_order('1', '005930', 'buy', 10, time.time() - 120)
+        crashed.record_order('2', '000660', 'buy', 10, time.time())
+        # 비정상 종료: 마지막 갱신 시각을 TTL 이전으로 돌립니다.
+        crashed._connect().execute("UPDATE orders SET updated_at = ? WHERE order_id = '1'", (time.time() - 120,))
+
+        restarted = StateStore(db_file, owner='restarted', order_ttl_seconds=60)
+        print(f"유효한 체결 대기 주문: {restarted.count_open_orders()}건")
+        assert restarted.count_open_orders() == 1
+        assert not restarted.has_open_order('005930')
+        assert restarted.has_open_order('000660', 'buy')
+
+        assert restarted.expire_stale_orders() == 1
+        assert restarted.expire_stale_orders() == 0
+        status = restarted._connect().execute("SELECT status FROM orders WHERE order_id = '1'").fetchone()[0]
+        assert status == 'expired'
+        print("[성공] 오래된 주문 기록이 무시되고 만료 처리됨\n")
+
+
+def test_reused_order_id():
+    """다시 쓰인 주문번호로 기록한 새 주문이 이전 주문의 상태를 물려받지 않는지 확인"""
+    print("--- 주문번호 재사용 테스트 ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = StateStore(os.path.join(tmp, 'state.db'), owner='first')
+        store.record_order('1', '005930', 'buy', 10, time.time())
+        store.update_order('1', 10, 60_000, 'filled')
+        assert store.count_open_orders() == 0
+
+        restarted = StateStore(os.path.join(tmp, 'state.db'), owner='second')
+        restarted.record_order('1', '000660', 'sell', 5, time.time())
+        print(f"체결 대기 주문: {restarted.count_open_orders()}건")
+        assert restarted.count_open_orders() == 1
+        assert restarted.has_open_order('000660', 'sell')
+        assert not restarted.has_open_order('005930')
+        row = restarted._connect().execute(
+            "SELECT owner, filled_quantity, avg_price FROM orders WHERE order_id = '1'").fetchone()
+        assert row == ('second', 0, 0)
+        print("[성공] 새 주문이 이전 주문 기록을 대체함\n")
+
+
+if __name__ == '__main__':
+    test_shared_cash_reservation()
+    test_shared_trade_history()
+    test_stale_orders_expire()
+    test_reused_order_id()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+텔레그램 알림 전송기(TelegramBot) 테스트
+네트워크 없이 가짜 봇으로 바꿔 큐가 가득 찼을 때 오래된 메시지 버림, 요약 메시지 길이 분할, RetryAfter 대기 후 재시도를 확인합니다.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+import telegram
+
+import telegram_bot
+from telegram_bot import MAX_MESSAGE_LENGTH, DIGEST_SEPARATOR, TelegramBot
+
+
+class FakeBot:
+    """ 전송한 메시지를 기록하는 가짜 봇. 전송을 붙잡아 두거나 처음 몇 번은 RetryAfter 를 낼 수 있습니다. """
+    retry_after_failures = 0
+    retry_after = timedelta(seconds=0.3)
+
+    def __init__(self, token):
+        self.sent = []
+        self.attempt_times = []
+        self.sending = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def send_message(self, chat_id, text):
+        self.attempt_times.append(time.monotonic())
+        self.sending.set()
+        await asyncio.to_thread(self.release.wait, 5)
+        if len(self.attempt_times) <= self.retry_after_failures:
+            raise telegram.error.RetryAfter(self.retry_after)
+        self.sent.append(text)
+
+
+def _bot(monkeypatch, **kwargs) -> TelegramBot:
+    monkeypatch.setattr(telegram_bot.telegram, 'Bot', FakeBot)
+    kwargs.setdefault('rate_per_second', 1000)
+    kwargs.setdefault('coalesce_seconds', 0)
+    return TelegramBot(token='TOKEN', chat_id='CHAT_ID', **kwargs)
+
+
+def test_queue_overflow_drops_oldest(monkeypatch):
+    """전송이 밀려 큐가 가득 차면 가장 오래된 메시지를 버리고 최신 메시지를 전송하는지 확인"""
+    print("--- 큐 초과 테스트 ---")
+    bot = _bot(monkeypatch, queue_size=3)
+    bot.bot.release.clear()
+    bot.send_message("m0")
+    assert bot.bot.sending.wait(5), "첫 메시지 전송이 시작되지 않았습니다."
+    for i in range(1, 7):
+        bot.send_message(f"m{i}")
+    assert bot.dropped_count == 3
+    bot.bot.release.set()
+    bot.close()
+    print(f"전송: {bot.bot.sent}, 버림: {bot.dropped_count}")
+    assert bot.bot.sent == ["m0", "m4", "m5", "m6"]
+    assert bot.sent_count == 4 and bot.failed_count == 0
+    print("✅ 큐 초과 테스트 통과")
+
+
+def test_digest_split():
+    """요약 메시지가 4096자를 넘지 않도록 나뉘고, 너무 긴 메시지는 잘리는지 확인"""
+    print("\n--- 요약 메시지 분할 테스트 ---")
+    batch = [str(i) * 2000 for i in range(5)] + ["x" * 5000, "끝"]
+    digests = TelegramBot._build_digests(batch)
+    print(f"요약 메시지 길이: {[len(digest) for digest in digests]}")
+    assert all(len(digest) <= MAX_MESSAGE_LENGTH for digest in digests)
+    assert digests == [DIGEST_SEPARATOR.join(batch[0:2]), DIGEST_SEPARATOR.join(batch[2:4]), batch[4],
+                       "x" * MAX_MESSAGE_LENGTH, "끝"]
+    # 한도에 딱 맞는 요약은 나누지 않습니다.
+    exact = ["a" * 2047, "b" * 2047]
+    assert TelegramBot._build_digests(exact) == [DIGEST_SEPARATOR.join(exact)]
+    print("✅ 요약 메시지 분할 테스트 통과")
+
+
+def test_coalesced_batch_is_split(monkeypatch):
+    """짧은 시간에 몰린 메시지가 길이 제한 안의 요약 메시지로 합쳐져 전송되는지 확인"""
+    print("\n--- 요약 전송 테스트 ---")
+    bot = _bot(monkeypatch, coalesce_seconds=0.5)
+    batch = [str(i) * 2000 for i in range(5)]
+    for message in batch:
+        bot.send_message(message)
+    bot.close()
+    assert bot.bot.sent == TelegramBot._build_digests(batch)
+    assert bot.sent_count == 3
+    print("✅ 요약 전송 테스트 통과")
+
+
+def test_retry_after_backoff(monkeypatch):
+    """RetryAfter 를 받으면 요구한 시간만큼 기다린 뒤 재시도하고, 재시도 횟수를 넘기면 실패로 세는지 확인"""
+    print("\n--- RetryAfter 재시도 테스트 ---")
+    monkeypatch.setattr(FakeBot, 'retry_after_failures', 2)
+    bot = _bot(monkeypatch)
+    bot.send_message("한도 초과 후 전송")
+    bot.close()
+    attempts = bot.bot.attempt_times
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    print(f"재시도 간격: {[round(gap, 2) for gap in gaps]}")
+    assert bot.bot.sent == ["한도 초과 후 전송"] and bot.sent_count == 1 and bot.failed_count == 0
+    assert len(attempts) == 3 and all(gap >= 0.3 for gap in gaps)
+
+    monkeypatch.setattr(FakeBot, 'retry_after_failures', 10)
+    bot = _bot(monkeypatch)
+    bot.send_message("계속 거절됨")
+    bot.close()
+    assert bot.bot.sent == [] and len(bot.bot.attempt_times) == 3
+    assert bot.sent_count == 0 and bot.failed_count == 1
+    print("✅ RetryAfter 재시도 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("텔레그램 알림 전송기 테스트를 시작합니다.\n")
+    raise SystemExit(pytest.main([__file__, '-s', '-q']))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+매매 기록 저널(TradeJournal) 테스트
+임시 디렉터리의 스냅샷/저널 파일로 재시작 시 복원 결과와 중복 반영 방지를 확인합니다.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from trade_journal import TradeJournal
+from trading_controller import TradingController
+
+
+def _default() -> dict:
+    return {'last_buy_times': {}, 'last_sell_times': {}, 'daily_trade_count': {}, 'purchase_dates': {}}
+
+
+def _events() -> list[dict]:
+    events = []
+    for i in range(30):
+        op = 'buy' if i % 3 else 'sell'
+        events.append({'op': op, 'code': f"{i % 7:06d}", 'time': f"2026-10-{1 + i % 5:02d}T09:{i:02d}:00"})
+    events.append({'op': 'cleanup', 'cutoff': '2026-10-03'})
+    return events
+
+
+def test_replay_after_crash_before_truncate():
+    """스냅샷 저장 후 저널을 비우기 전에 종료되어 seq 가 겹쳐도 같은 기록으로 복원되는지 확인"""
+    print("--- 압축 중 종료 후 재생 테스트 ---")
+    apply_event = TradingController._apply_event
+    events = _events()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_file = os.path.join(tmp, 'trade_log.json')
+        journal_file = os.path.join(tmp, 'trade_log.jsonl')
+        journal = TradeJournal(snapshot_file, journal_file, compact_every=10_000)
+        expected = journal.load(_default(), apply_event)
+        for event in events[:20]:
+            apply_event(expected, event)
+            journal.append(event, expected)
+
+        # 스냅샷은 저장되었지만 저널은 비워지지 않은 상태를 만듭니다.
+        shutil.copy(journal_file, f"{journal_file}.bak")
+        journal.compact(expected)
+        journal.close()
+        shutil.copy(f"{journal_file}.bak", journal_file)
+
+        # 재시작 후 나머지 이벤트를 기록하면 저널에 스냅샷 이전 seq 와 이후 seq 가 섞입니다.
+        journal = TradeJournal(snapshot_file, journal_file, compact_every=10_000)
+        restored = journal.load(_default(), apply_event)
+        print(f"재시작 직후 일별 매매 횟수: {restored['daily_trade_count']}")
+        assert restored == expected, "스냅샷에 반영된 이벤트는 다시 적용되지 않아야 합니다."
+        for event in events[20:]:
+            apply_event(expected, event)
+            apply_event(restored, event)
+            journal.append(event, restored)
+        journal.close()
+
+        reloaded = TradeJournal(snapshot_file, journal_file).load(_default(), apply_event)
+        rebuilt = _default()
+        for event in events:
+            apply_event(rebuilt, event)
+        print(f"다시 읽은 일별 매매 횟수: {reloaded['daily_trade_count']}")
+        assert reloaded == expected == rebuilt
+    print("✅ 압축 중 종료 후 재생 테스트 통과")
+
+
+def test_truncated_last_line():
+    """기록 도중 잘린 마지막 줄은 무시하고 나머지를 복원하는지 확인"""
+    print("\n--- 잘린 저널 줄 테스트 ---")
+    apply_event = TradingController._apply_event
+    events = _events()[:5]
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_file = os.path.join(tmp, 'trade_log.json')
+        journal_file = os.path.join(tmp, 'trade_log.jsonl')
+        journal = TradeJournal(snapshot_file, journal_file)
+        for event in events:
+            journal.append(event)
+        journal.close()
+        with open(journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 6, "op": "bu')
+
+        journal = TradeJournal(snapshot_file, journal_file)
+        restored = journal.load(_default(), apply_event)
+        expected = _default()
+        for event in events:
+            apply_event(expected, event)
+        assert restored == expected
+
+        # 복구 후 추가한 이벤트는 잘린 줄에 이어 붙지 않고 다음 재시작 때 그대로 재생되어야 합니다.
+        new_event = {'op': 'buy', 'code': '999999', 'time': '2026-10-05T10:00:00'}
+        apply_event(expected, new_event)
+        journal.append(new_event, restored)
+        journal.close()
+        reloaded = TradeJournal(snapshot_file, journal_file).load(_default(), apply_event)
+        print(f"복구 후 추가한 매수 기록: {reloaded['last_buy_times'].get('999999')}")
+        assert reloaded == expected
+        with open(journal_file, 'r', encoding='utf-8') as f:
+            seqs = [json.loads(line)['seq'] for line in f]
+        assert seqs == [1, 2, 3, 4, 5, 6], "seq 가 다시 쓰이지 않아야 합니다."
+    print("✅ 잘린 저널 줄 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("매매 기록 저널 테스트를 시작합니다.\n")
+    test_replay_after_crash_before_truncate()
+    test_truncated_last_line()
+    print("\n모든 테스트가 완료되었습니다.")
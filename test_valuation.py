@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+보유 종목 평가 장부(ValuationBook) 테스트
+매수/매도/전량 매도/시세 반영을 무작위로 섞어 적용하면서, 누적 합계가 종목별 값을 그대로 더한 결과와 같은지 확인합니다.
+"""
+
+import math
+import random
+
+from valuation import ValuationBook
+
+SECTORS = ['IT', '금융', '자동차', '화학', '바이오', '철강', '유통', '건설', '통신', '운송']
+
+
+def _assert_matches(book: ValuationBook, positions: dict, sectors: dict):
+    """ 장부의 누적 합계를 보유 종목별 값의 단순 합과 비교합니다. """
+    market_value = sum(q * price for q, _, price in positions.values())
+    cost = sum(q * avg for q, avg, _ in positions.values())
+    assert len(book) == len(positions)
+    assert math.isclose(book.total_market_value, market_value, rel_tol=1e-9, abs_tol=1e-3)
+    assert math.isclose(book.total_cost, cost, rel_tol=1e-9, abs_tol=1e-3)
+    assert math.isclose(book.unrealized_pnl, market_value - cost, rel_tol=1e-9, abs_tol=1e-3)
+    for sector in set(sectors.values()) | {None}:
+        expected = sum(q * price for code, (q, _, price) in positions.items() if sectors.get(code) == sector)
+        assert math.isclose(book.sector_market_value(sector), expected, rel_tol=1e-9, abs_tol=1e-3), sector
+    for code, (quantity, avg, price) in positions.items():
+        assert book.market_value_of(code) == quantity * price
+        assert math.isclose(book.position(code)['unrealized_pnl'], quantity * (price - avg), abs_tol=1e-3)
+
+
+def test_incremental_totals():
+    """매수/매도/전량 매도/시세 묶음 반영 후 합계와 섹터 합계가 단순 합과 같은지 확인"""
+    print("--- 누적 합계 테스트 ---")
+    rng = random.Random(7)
+    codes = [f"{i:06d}" for i in range(40)]
+    sectors = {code: rng.choice(SECTORS) for code in codes[:30]}  # 나머지 10종목은 미분류
+    book = ValuationBook(capacity=4)  # 슬롯 확장과 빈 슬롯 재사용도 함께 확인
+    book.set_sectors(sectors)
+    positions = {}  # { 종목코드: (수량, 평균 단가, 최근 가격) }
+
+    for step in range(2000):
+        code = rng.choice(codes)
+        action = rng.random()
+        if action < 0.4:
+            quantity, price = rng.randint(1, 50), rng.randint(1_000, 100_000)
+            held, avg, _ = positions.get(code, (0, 0.0, 0))
+            avg = (held * avg + quantity * price) / (held + quantity)
+            positions[code] = (held + quantity, avg, price)
+            book.set_position(code, held + quantity, avg, price)
+        elif action < 0.6 and code in positions:
+            held, avg, _ = positions[code]
+            quantity, price = rng.randint(1, held), rng.randint(1_000, 100_000)
+            if quantity == held:
+                del positions[code]
+            else:
+                positions[code] = (held - quantity, avg, price)
+            book.set_position(code, held - quantity, avg, price)
+        elif action < 0.7 and code in positions:
+            del positions[code]
+            book.remove(code)
+        else:
+            # 같은 섹터의 여러 종목이 한 묶음에 들어와 np.add.at 으로 합산됩니다.
+            prices = {c: rng.randint(1_000, 100_000) for c in rng.sample(codes, 15)}
+            prices[codes[-1]] = 0  # 가격이 없는 시세는 무시
+            updated = book.update_prices(prices)
+            assert updated == sum(1 for c, price in prices.items() if c in positions and price)
+            for c, price in prices.items():
+                if c in positions and price:
+                    quantity, avg, _ = positions[c]
+                    positions[c] = (quantity, avg, price)
+        if step % 50 == 0:
+            _assert_matches(book, positions, sectors)
+    _assert_matches(book, positions, sectors)
+    print(f"보유 {len(book)}종목, 평가금액 {book.total_market_value:,.0f}원, 평가손익 {book.unrealized_pnl:,.0f}원")
+    print("✅ 누적 합계 테스트 통과")
+
+
+def test_sectors_after_positions():
+    """보유 후에 섹터를 등록해도 섹터 합계를 다시 계산하고, 모두 매도하면 0으로 돌아가는지 확인"""
+    print("\n--- 섹터 재계산 테스트 ---")
+    book = ValuationBook()
+    book.set_position('005930', 10, 60_000, 61_000)
+    book.set_position('000660', 5, 110_000, 120_000)
+    book.set_position('105560', 7, 50_000)
+    assert book.sector_market_value(None) == 10 * 61_000 + 5 * 120_000 + 7 * 50_000
+
+    book.set_sectors({'005930': 'IT', '000660': 'IT', '105560': '금융', '035420': None})
+    assert book.sector_market_value('IT') == 10 * 61_000 + 5 * 120_000
+    assert book.sector_market_value('금융') == 7 * 50_000
+    assert book.sector_market_value(None) == 0
+    assert book.sector_market_value('없는 섹터') == 0
+
+    book.update_prices({'005930': 60_000, '000660': 100_000, '035420': 200_000})
+    assert book.sector_market_value('IT') == 10 * 60_000 + 5 * 100_000
+    for code in ('005930', '000660', '105560'):
+        book.set_position(code, 0, 0)
+    assert len(book) == 0 and book.total_market_value == 0 and book.total_cost == 0
+    assert book.sector_market_value('IT') == 0 and book.sector_market_value('금융') == 0
+    print("✅ 섹터 재계산 테스트 통과")
+
+
+if __name__ == "__main__":
+    print("평가 장부 테스트를 시작합니다.\n")
+    test_incremental_totals()
+    test_sectors_after_positions()
+    print("\n모든 테스트가 완료되었습니다.")
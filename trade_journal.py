@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TradeJournal:
+    """
+    매매 기록용 추가 전용(append-only) 저널.
+
+    - 매매가 발생할 때마다 이벤트 한 줄(JSON Lines)만 추가하므로 기록 비용이 누적 기록량과 무관합니다.
+    - 주기적으로 전체 상태를 스냅샷 파일(기존 trade_log.json 형식)에 원자적으로 저장하고 저널을 비웁니다.
+    - 시작 시 스냅샷을 읽은 뒤 스냅샷 이후의 저널 이벤트만 재생합니다.
+
+    이벤트에는 일련번호(seq)가 붙고 스냅샷에는 마지막으로 반영된 번호가 저장되므로,
+    스냅샷 저장 직후 저널을 비우기 전에 종료되더라도 이벤트가 두 번 반영되지 않습니다.
+    """
+    SEQ_KEY = '_journal_seq'
+
+    def __init__(self, snapshot_file: str, journal_file: str, compact_every: int = 1000):
+        """
+        :param snapshot_file: 스냅샷 파일 경로 (예: trade_log.json)
+        :param journal_file: 저널 파일 경로 (예: trade_log.jsonl)
+        :param compact_every: 저널 이벤트가 이 개수에 도달하면 스냅샷을 만들고 저널을 비웁니다.
+        """
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_every = compact_every
+        self._seq = 0
+        self._pending = 0  # 마지막 스냅샷 이후 저널에 쌓인 이벤트 수
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self, default_state: dict, apply_event) -> dict:
+        """
+        스냅샷과 저널을 읽어 현재 상태를 복원합니다.
+        :param default_state: 스냅샷이 없을 때의 초기 상태
+        :param apply_event: (state, event) 를 받아 state 를 갱신하는 함수
+        :return: 복원된 상태
+        """
+        state = default_state
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("매매 기록 스냅샷 로드 실패: %s", e)
+        snapshot_seq = state.pop(self.SEQ_KEY, 0)
+        self._seq = snapshot_seq
+
+        if os.path.exists(self.journal_file):
+            complete = 0  # 줄바꿈까지 온전히 기록된 부분의 길이 (바이트)
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # 기록 도중 종료되어 잘린 마지막 줄
+                    complete += len(line)
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    seq = event.get('seq', 0)
+                    if seq <= snapshot_seq:
+                        continue
+                    apply_event(state, event)
+                    self._seq = max(self._seq, seq)
+                    self._pending += 1
+            if complete < os.path.getsize(self.journal_file):
+                # 잘린 줄을 지워 다음 이벤트가 새 줄에서 시작되도록 합니다.
+                logger.warning("매매 기록 저널의 잘린 마지막 줄을 제거합니다: %s", self.journal_file)
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(complete)
+        return state
+
+    def append(self, event: dict, state: dict | None = None):
+        """
+        이벤트를 저널 끝에 한 줄 추가합니다.
+        :param event: 기록할 이벤트 (seq 는 자동으로 부여)
+        :param state: 이벤트가 반영된 현재 상태. 주어지면 필요 시 스냅샷(압축)을 수행합니다.
+        """
+        with self._lock:
+            self._seq += 1
+            event = {'seq': self._seq, **event}
+            if self._file is None:
+                self._file = open(self.journal_file, 'a', encoding='utf-8')
+            self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self._file.flush()
+            self._pending += 1
+            if state is not None and self._pending >= self.compact_every:
+                self._compact(state)
+
+    def compact(self, state: dict):
+        """ 현재 상태를 스냅샷으로 저장하고 저널을 비웁니다. """
+        with self._lock:
+            self._compact(state)
+
+    def _compact(self, state: dict):
+        tmp_file = f"{self.snapshot_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({**state, self.SEQ_KEY: self._seq}, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+        except OSError as e:
+            logger.warning("매매 기록 스냅샷 저장 실패: %s", e)
+            return
+
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_file, 'w', encoding='utf-8')
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
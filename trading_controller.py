@@ -1,13 +1,23 @@
 import configparser
+import heapq
+import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, Optional
-import json
-import os
+
+from trade_journal import TradeJournal
+from state_store import StateStore, open_state_store
+
+logger = logging.getLogger(__name__)
 
 class TradingController:
     """매매 빈도와 쿨다운을 관리하는 클래스"""
     
-    def __init__(self):
+    def __init__(self, state_store: Optional[StateStore] = None):
+        """
+        :param state_store: 여러 봇 프로세스가 공유하는 상태 저장소.
+                            None 이면 설정([state] backend)에 따르며, 공유 저장소가 없으면 파일 저널을 사용합니다.
+        """
         # 설정 로드
         config = configparser.ConfigParser()
         config.read('config.cfg')
@@ -18,155 +28,262 @@ class TradingController:
             self.sell_cooldown_minutes = trading_control.getint('sell_cooldown_minutes', 15)
             self.max_daily_trades = trading_control.getint('max_daily_trades', 10)
             self.min_holding_days = trading_control.getint('min_holding_days', 3)
+            journal_compact_every = trading_control.getint('journal_compact_every', 1000)
         except KeyError:
             # 기본값 설정
             self.buy_cooldown_minutes = 30
             self.sell_cooldown_minutes = 15
             self.max_daily_trades = 10
             self.min_holding_days = 3
+            journal_compact_every = 1000
         
-        # 매매 기록 파일
+        # 매매 기록 파일 (스냅샷 + 추가 전용 저널)
         self.trade_log_file = 'trade_log.json'
+        self.trade_journal_file = 'trade_log.jsonl'
+        self.journal = TradeJournal(self.trade_log_file, self.trade_journal_file,
+                                    compact_every=journal_compact_every)
+        self.state_store = state_store or open_state_store()
+        self._event_seq = 0  # 공유 저장소에서 마지막으로 반영한 이벤트 id
+        # 매매 기록과 만료 시각 인덱스는 이벤트 루프(eligible)와 주문 접수 스레드(can_buy/can_sell, 기록)가 함께 씁니다.
+        self._lock = threading.RLock()
         self.trade_history = self._load_trade_history()
+        self._build_index()
     
     def _load_trade_history(self) -> Dict:
-        """매매 기록을 파일에서 로드"""
-        if os.path.exists(self.trade_log_file):
-            try:
-                with open(self.trade_log_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {
+        """매매 기록을 공유 저장소 또는 스냅샷과 저널에서 로드"""
+        if self.state_store:
+            history, self._event_seq = self.state_store.load_trade_history()
+            return history
+        
+        default = {
             'last_buy_times': {},      # 종목별 마지막 매수 시간
             'last_sell_times': {},     # 종목별 마지막 매도 시간
             'daily_trade_count': {},   # 날짜별 매매 횟수
             'purchase_dates': {}       # 종목별 매수 날짜
         }
-    
-    def _save_trade_history(self):
-        """매매 기록을 파일에 저장"""
         try:
-            with open(self.trade_log_file, 'w', encoding='utf-8') as f:
-                json.dump(self.trade_history, f, ensure_ascii=False, indent=2)
+            history = self.journal.load(default, self._apply_event)
         except Exception as e:
-            print(f"매매 기록 저장 실패: {e}")
+            logger.error("매매 기록 로드 실패: %s", e)
+            return default
+        for key, value in default.items():
+            history.setdefault(key, value)
+        return history
+    
+    @staticmethod
+    def _apply_event(history: Dict, event: Dict):
+        """저널 이벤트 하나를 매매 기록에 반영"""
+        op = event['op']
+        if op in ('buy', 'sell'):
+            stock_code = event['code']
+            time_str = event['time']
+            today = time_str[:10]
+            if op == 'buy':
+                history['last_buy_times'][stock_code] = time_str
+                history['purchase_dates'][stock_code] = time_str
+            else:
+                history['last_sell_times'][stock_code] = time_str
+                history['purchase_dates'].pop(stock_code, None)
+            history['daily_trade_count'][today] = history['daily_trade_count'].get(today, 0) + 1
+        elif op == 'cleanup':
+            cutoff_str = event['cutoff']
+            for date in [d for d in history['daily_trade_count'] if d < cutoff_str]:
+                del history['daily_trade_count'][date]
+    
+    def _record_event(self, event: Dict):
+        """이벤트를 메모리와 인덱스에 반영하고 저널(또는 공유 저장소)에 기록"""
+        with self._lock:
+            if self.state_store:
+                # 공유 저장소에 먼저 기록한 뒤, 다른 프로세스의 이벤트와 함께 순서대로 반영합니다.
+                if event['op'] == 'cleanup':
+                    self.state_store.cleanup_daily_trades(event['cutoff'])
+                else:
+                    self.state_store.record_trade(event)
+                self.sync()
+                return
+            
+            self._apply_and_index(event)
+            try:
+                self.journal.append(event, self.trade_history)
+            except Exception as e:
+                logger.error("매매 기록 저장 실패: %s", e)
+    
+    def _apply_and_index(self, event: Dict):
+        """이벤트를 매매 기록과 만료 시각 인덱스에 반영"""
+        self._apply_event(self.trade_history, event)
+        if event['op'] in ('buy', 'sell'):
+            trade_time = datetime.fromisoformat(event['time'])
+            self._index_trade(event['op'], event['code'], trade_time)
+            self._index_holding(event['code'], trade_time if event['op'] == 'buy' else None)
+    
+    def sync(self):
+        """
+        공유 저장소에 다른 프로세스가 기록한 이벤트를 따라잡습니다.
+        마지막으로 반영한 이벤트 id 이후의 행만 읽으므로 변경이 없으면 빈 조회 한 번입니다.
+        """
+        if not self.state_store:
+            return
+        with self._lock:
+            for event in self.state_store.events_since(self._event_seq):
+                self._apply_and_index(event)
+                self._event_seq = event['seq']
+    
+    def _build_index(self):
+        """
+        매매 기록에서 파싱된 만료 시각 인덱스를 만듭니다.
+        - 종목별 쿨다운/최소 보유 기간 만료 시각을 dict 로 보관 (조회 O(1))
+        - 만료 시각의 최소 힙으로 지난 항목을 한꺼번에 정리
+        """
+        self._cooldown_until = {'buy': {}, 'sell': {}}  # side -> {종목코드: 쿨다운 만료 시각}
+        self._holding_until = {}                         # 종목코드 -> 최소 보유 기간 만료 시각
+        self._expiry_heap = []                           # (만료 시각, 구분, 종목코드)
+        for stock_code, time_str in self.trade_history['last_buy_times'].items():
+            self._index_trade('buy', stock_code, datetime.fromisoformat(time_str))
+        for stock_code, time_str in self.trade_history['last_sell_times'].items():
+            self._index_trade('sell', stock_code, datetime.fromisoformat(time_str))
+        for stock_code, time_str in self.trade_history['purchase_dates'].items():
+            self._index_holding(stock_code, datetime.fromisoformat(time_str))
+    
+    def _index_trade(self, side: str, stock_code: str, trade_time: datetime):
+        """매매 시각을 쿨다운 인덱스에 반영"""
+        minutes = self.buy_cooldown_minutes if side == 'buy' else self.sell_cooldown_minutes
+        until = trade_time + timedelta(minutes=minutes)
+        self._cooldown_until[side][stock_code] = until
+        heapq.heappush(self._expiry_heap, (until, side, stock_code))
+    
+    def _index_holding(self, stock_code: str, purchase_time: datetime | None):
+        """매수 시각을 최소 보유 기간 인덱스에 반영 (None이면 제거)"""
+        if purchase_time is None:
+            self._holding_until.pop(stock_code, None)
+            return
+        until = purchase_time + timedelta(days=self.min_holding_days)
+        self._holding_until[stock_code] = until
+        heapq.heappush(self._expiry_heap, (until, 'hold', stock_code))
+    
+    def _expire(self, now: datetime):
+        """만료 시각이 지난 인덱스 항목을 힙에서 꺼내 정리"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            until, kind, stock_code = heapq.heappop(heap)
+            index = self._holding_until if kind == 'hold' else self._cooldown_until[kind]
+            # 이후 매매로 만료 시각이 갱신된 항목은 남겨 둡니다.
+            if index.get(stock_code) == until:
+                del index[stock_code]
+    
+    def _daily_limit_reason(self, now: datetime) -> Optional[str]:
+        daily_count = self.trade_history['daily_trade_count'].get(now.strftime('%Y-%m-%d'), 0)
+        if daily_count >= self.max_daily_trades:
+            return f"일일 매매 한도 초과 ({daily_count}/{self.max_daily_trades})"
+        return None
+    
+    def eligible(self, stock_codes: list[str], side: str) -> list[bool]:
+        """
+        여러 종목의 매수/매도 가능 여부를 한 번에 확인합니다.
+        데이터 조회나 지표 계산 전에 쿨다운 중이거나 일일 한도에 걸린 종목을 걸러내는 용도입니다.
+        :param stock_codes: 종목 코드 리스트
+        :param side: 'buy' 또는 'sell'
+        :return: stock_codes 와 같은 순서의 가능 여부 리스트
+        """
+        with self._lock:
+            self.sync()
+            now = datetime.now()
+            if self._daily_limit_reason(now):
+                return [False] * len(stock_codes)
+            self._expire(now)
+            cooldown = self._cooldown_until[side]
+            if side == 'buy':
+                return [code not in cooldown for code in stock_codes]
+            holding = self._holding_until
+            return [code not in cooldown and code not in holding for code in stock_codes]
     
     def can_buy(self, stock_code: str) -> tuple[bool, str]:
         """매수 가능 여부 확인"""
-        now = datetime.now()
-        today = now.strftime('%Y-%m-%d')
+        with self._lock:
+            self.sync()
+            now = datetime.now()
         
-        # 1. 일일 매매 한도 확인
-        daily_count = self.trade_history['daily_trade_count'].get(today, 0)
-        if daily_count >= self.max_daily_trades:
-            return False, f"일일 매매 한도 초과 ({daily_count}/{self.max_daily_trades})"
+            # 1. 일일 매매 한도 확인
+            reason = self._daily_limit_reason(now)
+            if reason:
+                return False, reason
         
-        # 2. 매수 쿨다운 확인
-        last_buy_time_str = self.trade_history['last_buy_times'].get(stock_code)
-        if last_buy_time_str:
-            last_buy_time = datetime.fromisoformat(last_buy_time_str)
-            cooldown_end = last_buy_time + timedelta(minutes=self.buy_cooldown_minutes)
-            if now < cooldown_end:
+            # 2. 매수 쿨다운 확인
+            self._expire(now)
+            cooldown_end = self._cooldown_until['buy'].get(stock_code)
+            if cooldown_end:
                 remaining = int((cooldown_end - now).total_seconds() / 60)
                 return False, f"매수 쿨다운 중 (남은 시간: {remaining}분)"
         
-        return True, "매수 가능"
+            return True, "매수 가능"
     
     def can_sell(self, stock_code: str, purchase_date: Optional[str] = None) -> tuple[bool, str]:
         """매도 가능 여부 확인"""
-        now = datetime.now()
-        today = now.strftime('%Y-%m-%d')
+        with self._lock:
+            self.sync()
+            now = datetime.now()
         
-        # 1. 일일 매매 한도 확인
-        daily_count = self.trade_history['daily_trade_count'].get(today, 0)
-        if daily_count >= self.max_daily_trades:
-            return False, f"일일 매매 한도 초과 ({daily_count}/{self.max_daily_trades})"
+            # 1. 일일 매매 한도 확인
+            reason = self._daily_limit_reason(now)
+            if reason:
+                return False, reason
         
-        # 2. 매도 쿨다운 확인
-        last_sell_time_str = self.trade_history['last_sell_times'].get(stock_code)
-        if last_sell_time_str:
-            last_sell_time = datetime.fromisoformat(last_sell_time_str)
-            cooldown_end = last_sell_time + timedelta(minutes=self.sell_cooldown_minutes)
-            if now < cooldown_end:
+            # 2. 매도 쿨다운 확인
+            self._expire(now)
+            cooldown_end = self._cooldown_until['sell'].get(stock_code)
+            if cooldown_end:
                 remaining = int((cooldown_end - now).total_seconds() / 60)
                 return False, f"매도 쿨다운 중 (남은 시간: {remaining}분)"
         
-        # 3. 최소 보유 기간 확인
-        if purchase_date:
-            purchase_dt = datetime.fromisoformat(purchase_date)
-        else:
-            # 기록에서 매수 날짜 찾기
-            purchase_date_str = self.trade_history['purchase_dates'].get(stock_code)
-            if purchase_date_str:
-                purchase_dt = datetime.fromisoformat(purchase_date_str)
+            # 3. 최소 보유 기간 확인
+            if purchase_date:
+                holding_end = datetime.fromisoformat(purchase_date) + timedelta(days=self.min_holding_days)
             else:
-                # 매수 날짜를 찾을 수 없으면 매도 허용
-                return True, "매도 가능"
+                # 기록에서 매수 날짜 찾기 (없으면 매도 허용)
+                holding_end = self._holding_until.get(stock_code)
         
-        days_held = (now - purchase_dt).days
-        if days_held < self.min_holding_days:
-            remaining_days = self.min_holding_days - days_held
-            return False, f"최소 보유 기간 미달 (남은 기간: {remaining_days}일)"
+            if holding_end and now < holding_end:
+                days_held = (now - (holding_end - timedelta(days=self.min_holding_days))).days
+                remaining_days = self.min_holding_days - days_held
+                return False, f"최소 보유 기간 미달 (남은 기간: {remaining_days}일)"
         
-        return True, "매도 가능"
+            return True, "매도 가능"
     
     def record_buy(self, stock_code: str):
         """매수 기록"""
         now = datetime.now()
-        today = now.strftime('%Y-%m-%d')
         
-        # 매수 시간 기록
-        self.trade_history['last_buy_times'][stock_code] = now.isoformat()
-        
-        # 매수 날짜 기록
-        self.trade_history['purchase_dates'][stock_code] = now.isoformat()
-        
-        # 일일 매매 횟수 증가
-        self.trade_history['daily_trade_count'][today] = \
-            self.trade_history['daily_trade_count'].get(today, 0) + 1
-        
-        self._save_trade_history()
-        print(f"[매수 기록] {stock_code} - {now.strftime('%Y-%m-%d %H:%M:%S')}")
+        # 매수 시간/매수 날짜 기록 및 일일 매매 횟수 증가
+        self._record_event({'op': 'buy', 'code': stock_code, 'time': now.isoformat()})
+        logger.info("[매수 기록] %s - %s", stock_code, now)
     
     def record_sell(self, stock_code: str):
         """매도 기록"""
         now = datetime.now()
-        today = now.strftime('%Y-%m-%d')
-        
-        # 매도 시간 기록
-        self.trade_history['last_sell_times'][stock_code] = now.isoformat()
         
-        # 매수 날짜 기록 삭제 (더 이상 보유하지 않음)
-        if stock_code in self.trade_history['purchase_dates']:
-            del self.trade_history['purchase_dates'][stock_code]
-        
-        # 일일 매매 횟수 증가
-        self.trade_history['daily_trade_count'][today] = \
-            self.trade_history['daily_trade_count'].get(today, 0) + 1
-        
-        self._save_trade_history()
-        print(f"[매도 기록] {stock_code} - {now.strftime('%Y-%m-%d %H:%M:%S')}")
+        # 매도 시간 기록, 매수 날짜 기록 삭제 및 일일 매매 횟수 증가
+        self._record_event({'op': 'sell', 'code': stock_code, 'time': now.isoformat()})
+        logger.info("[매도 기록] %s - %s", stock_code, now)
     
     def get_daily_trade_count(self) -> int:
         """오늘의 매매 횟수 반환"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        return self.trade_history['daily_trade_count'].get(today, 0)
+        with self._lock:
+            self.sync()
+            today = datetime.now().strftime('%Y-%m-%d')
+            return self.trade_history['daily_trade_count'].get(today, 0)
     
     def cleanup_old_records(self, days_to_keep: int = 30):
-        """오래된 기록 정리"""
+        """오래된 기록 정리 후 스냅샷 저장"""
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         cutoff_str = cutoff_date.strftime('%Y-%m-%d')
         
         # 오래된 일일 매매 기록 삭제
-        dates_to_remove = [date for date in self.trade_history['daily_trade_count'].keys() 
-                          if date < cutoff_str]
-        for date in dates_to_remove:
-            del self.trade_history['daily_trade_count'][date]
-        
-        self._save_trade_history()
-        if dates_to_remove:
-            print(f"오래된 매매 기록 {len(dates_to_remove)}개 정리 완료")
+        with self._lock:
+            removed = sum(1 for date in self.trade_history['daily_trade_count'] if date < cutoff_str)
+            self._record_event({'op': 'cleanup', 'cutoff': cutoff_str})
+            if not self.state_store:
+                self.journal.compact(self.trade_history)
+        if removed:
+            logger.info("오래된 매매 기록 %d개 정리 완료", removed)
 
 if __name__ == '__main__':
     # 테스트
@@ -0,0 +1,397 @@
+import asyncio
+import configparser
+import logging
+import time
+from datetime import datetime
+import pandas as pd
+
+from indicators import add_all_indicators
+from strategy import check_buy_signal, check_sell_signal
+from stock_selector import screen_dataframe
+from order_manager import OrderIntent, PRIORITY_STOP_LOSS, PRIORITY_SELL, PRIORITY_BUY
+from cycle_scheduler import CycleTiming
+from config_reload import ConfigChange, apply_params
+import profiling
+
+# 설정 파일 로드
+config = configparser.ConfigParser()
+config.read('config.cfg')
+
+try:
+    trading_control = config['trading_control']
+    MAX_SCREENING_STOCKS = trading_control.getint('max_screening_stocks', 60)  # 최대 스크리닝 종목 수
+    MAX_BUY_CHECKS = trading_control.getint('max_buy_checks', 10)  # 주기당 매수 신호를 확인할 최대 종목 수
+    FETCH_CONCURRENCY = trading_control.getint('fetch_concurrency', 4)  # 동시에 진행할 시세 조회 수
+    PIPELINE_QUEUE_SIZE = trading_control.getint('pipeline_queue_size', 8)  # 단계 사이 대기열 크기
+except KeyError:
+    MAX_SCREENING_STOCKS = 60
+    MAX_BUY_CHECKS = 10
+    FETCH_CONCURRENCY = 4
+    PIPELINE_QUEUE_SIZE = 8
+
+logger = logging.getLogger(__name__)
+
+# 단계 종료 표시, 마감으로 조회하지 않은 종목 표시
+_DONE = object()
+_SKIPPED = object()
+
+
+async def fetch_stage(market_data, stock_codes: list[str], out_queue: asyncio.Queue, deadline: float | None = None):
+    """
+    시세 조회 단계. 최대 FETCH_CONCURRENCY 개를 동시에 조회해 (종목코드, 데이터)를 out_queue 에 넣고, 끝나면 _DONE 을 넣습니다.
+    조회 순서는 입력 순서를 유지합니다.
+    :param market_data: MarketDataService 인스턴스
+    :param deadline: 주어지면 이 시각(time.monotonic 기준) 이후에는 새 조회를 시작하지 않습니다.
+    :return: 마감으로 조회하지 못한 종목 코드 리스트
+    """
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    unfetched = []
+
+    async def fetch(stock_code):
+        async with semaphore:
+            if deadline is not None and time.monotonic() >= deadline:
+                return _SKIPPED
+            with profiling.span('fetch', stock_code):
+                return await market_data.get_bars_async(stock_code)
+
+    async def forward(stock_code, task):
+        df = await task
+        if df is _SKIPPED:
+            unfetched.append(stock_code)
+        else:
+            await out_queue.put((stock_code, df))
+
+    # 동시에 떠 있는 조회 작업도 대기열 크기 + 동시 조회 수로 제한합니다.
+    window = max(1, FETCH_CONCURRENCY + out_queue.maxsize)
+    pending = []
+    try:
+        for index, stock_code in enumerate(stock_codes):
+            if deadline is not None and time.monotonic() >= deadline:
+                unfetched.extend(stock_codes[index:])
+                break
+            pending.append((stock_code, asyncio.create_task(fetch(stock_code))))
+            if len(pending) >= window:
+                await forward(*pending.pop(0))
+        while pending:
+            await forward(*pending.pop(0))
+    except asyncio.CancelledError:
+        for _, task in pending:
+            task.cancel()
+        raise
+    except Exception:
+        # 조회 오류(장 종료 등)는 다음 단계를 끝낸 뒤 호출자에게 전달됩니다.
+        for _, task in pending:
+            task.cancel()
+        await out_queue.put(_DONE)
+        raise
+    await out_queue.put(_DONE)
+    return unfetched
+
+
+class TradingPipeline:
+    """
+    매매 주기를 단계별 파이프라인으로 실행합니다.
+
+        시세 조회 → 지표 계산/신호 확인 → 주문 접수
+
+    단계 사이는 크기가 제한된 asyncio 대기열로 연결됩니다.
+    - 시세 조회는 스레드에서 동시에 진행되므로, 다음 종목을 조회하는 동안 앞 종목의 지표 계산과 주문 접수가 진행됩니다.
+    - 뒤 단계가 밀리면 대기열이 차서 조회가 멈추고(backpressure), 조회는 토큰 버킷으로 초당 호출 한도를 지킵니다.
+    - 보유 종목 매도 흐름과 스크리닝/매수 흐름은 함께 진행되며, 매수 주문은 매도 주문 접수가 끝난 뒤에 접수합니다.
+    """
+    def __init__(self, broker, portfolio, order_manager, market_data=None):
+        """
+        :param broker: KISBroker 인스턴스 (또는 같은 인터페이스의 브로커)
+        :param portfolio: Portfolio 인스턴스
+        :param order_manager: OrderManager 인스턴스
+        :param market_data: 시세 조회에 쓸 MarketDataService (None 이면 order_manager 의 것을 함께 사용)
+        """
+        self.broker = broker
+        self.portfolio = portfolio
+        self.order_manager = order_manager
+        self.trading_controller = order_manager.trading_controller
+        self.market_data = market_data or order_manager.market_data
+        self.screening_estimate = 0.0  # 최근 스크리닝/매수 흐름 소요 시간 (지수 평균, 초)
+        self._deferred_codes: list[str] = []  # 마감으로 조회하지 못해 다음 주기에 먼저 확인할 종목
+        self._prescreened: list[str] = []  # 장 시작 전 준비 작업에서 선정되어 첫 주기에 먼저 확인할 종목
+
+    async def _fetch_stage(self, stock_codes: list[str], out_queue: asyncio.Queue, deadline: float | None = None):
+        return await fetch_stage(self.market_data, stock_codes, out_queue, deadline)
+
+    async def _order_stage(self, in_queue: asyncio.Queue, wait_for: asyncio.Future | None = None):
+        """
+        주문 접수 단계. 대기열에 쌓인 주문 의도를 모아 한 번에 submit_orders 로 넘깁니다.
+        (같은 묶음 안에서는 손절매 → 매도 → 매수 우선순위가 지켜집니다)
+        :param wait_for: 주어지면 이 작업이 끝난 뒤부터 접수합니다. (매수는 매도 접수 이후)
+        """
+        if wait_for is not None:
+            await asyncio.shield(wait_for)
+        finished = False
+        while not finished:
+            batch = []
+            item = await in_queue.get()
+            while True:
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+                if in_queue.empty():
+                    break
+                item = in_queue.get_nowait()
+            if batch:
+                await asyncio.to_thread(self.order_manager.submit_orders, batch)
+
+    async def _sell_flow(self):
+        """ 보유 종목 시세 조회 → 매도 신호 확인 → 매도 주문 접수 """
+        logger.info("--- 보유 종목 매도 신호 확인 ---")
+        holdings_to_check = list(self.portfolio.holdings.keys())
+        # 쿨다운/최소 보유 기간/일일 한도로 매도할 수 없는 종목은 시세 조회 전에 제외합니다.
+        sell_mask = self.trading_controller.eligible(holdings_to_check, 'sell')
+        holdings_to_check = [code for code, ok in zip(holdings_to_check, sell_mask) if ok]
+
+        bars_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        order_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        fetcher = asyncio.create_task(self._fetch_stage(holdings_to_check, bars_queue))
+        submitter = asyncio.create_task(self._order_stage(order_queue))
+
+        latest_prices = {}
+        try:
+            while (item := await bars_queue.get()) is not _DONE:
+                stock_code, df = item
+                holding = self.portfolio.get_holding(stock_code)
+                if df is None or not holding or holding.quantity == 0:
+                    continue
+                latest_prices[stock_code] = float(df['close'].iloc[-1])
+                with profiling.span('compute', stock_code):
+                    df_with_indicators = add_all_indicators(df.copy())
+                    sell_signal, reason = check_sell_signal(df_with_indicators, holding.avg_price)
+                if sell_signal:
+                    self.order_manager._send_telegram_message(f"[매도 신호] {stock_code}\n- 사유: {reason}")
+                    priority = PRIORITY_STOP_LOSS if reason.startswith("손절매") else PRIORITY_SELL
+                    await order_queue.put(OrderIntent(stock_code, 'sell', reason, priority))
+                else:
+                    logger.debug("[%s] 매도 신호 없음.", stock_code)
+        except BaseException:
+            fetcher.cancel()
+            submitter.cancel()
+            raise
+        await order_queue.put(_DONE)
+        await fetcher
+        await submitter
+
+        await self._mark_holdings(latest_prices)
+
+    async def _mark_holdings(self, prices: dict[str, float]):
+        """
+        보유 종목 전체의 평가금액/평가손익을 한 번에 갱신합니다.
+        쿨다운이나 최소 보유 기간으로 매도 확인에서 빠진 종목은 이번 주기의 현재가를 조회해 함께 반영합니다.
+        :param prices: 매도 확인 중에 조회한 { 종목코드: 현재가 }
+        """
+        missing = [code for code in self.portfolio.holdings if code not in prices]
+        if missing:
+            quotes = await asyncio.gather(*(asyncio.to_thread(self.market_data.get_quote, code) for code in missing),
+                                          return_exceptions=True)
+            prices = {**prices, **{code: price for code, price in zip(missing, quotes)
+                                   if isinstance(price, (int, float)) and price}}
+        self.portfolio.mark_to_market(prices)
+        logger.info("평가금액: %.0f원, 평가손익: %+.0f원", self.portfolio.stock_value, self.portfolio.unrealized_pnl)
+
+    async def _check_buy(self, stock_code: str, df_with_indicators: pd.DataFrame, order_queue: asyncio.Queue):
+        with profiling.span('compute', stock_code):
+            buy_signal, reason = check_buy_signal(df_with_indicators)
+        if buy_signal:
+            self.order_manager._send_telegram_message(f"[매수 신호] {stock_code}\n- 사유: {reason}")
+            await order_queue.put(OrderIntent(stock_code, 'buy', reason, PRIORITY_BUY))
+        else:
+            logger.debug("[%s] 매수 신호 없음.", stock_code)
+
+    def _buyable(self, stock_codes: list[str]) -> list[str]:
+        """ 보유 중이거나 매수 제한(쿨다운, 일일 한도)에 걸린 종목을 제외합니다. """
+        mask = self.trading_controller.eligible(stock_codes, 'buy')
+        return [code for code, ok in zip(stock_codes, mask) if ok and code not in self.portfolio.holdings]
+
+    async def _buy_flow(self, candidate_codes: list[str], sells_done: asyncio.Future,
+                        timing: CycleTiming, deadline: float | None):
+        """
+        후보 종목 시세 조회 → 스크리닝 → 매수 신호 확인 → 매수 주문 접수
+        마감 시각 안에 끝나지 않을 것으로 보이면 건너뛰고, 진행 중 마감에 도달하면 남은 종목의 조회를 중단합니다.
+        """
+        if self._skip_screening(timing, deadline):
+            return
+
+        logger.info("--- 종목 스크리닝 실행 ---")
+        started = time.monotonic()
+        screening_codes = self._screening_codes(candidate_codes)
+
+        bars_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        order_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        fetcher = asyncio.create_task(self._fetch_stage(screening_codes, bars_queue, deadline))
+        submitter = asyncio.create_task(self._order_stage(order_queue, wait_for=sells_done))
+
+        screened = 0
+        try:
+            while (item := await bars_queue.get()) is not _DONE:
+                stock_code, df = item
+                if df is None:
+                    continue
+                try:
+                    with profiling.span('compute', stock_code):
+                        selected, df_with_indicators = screen_dataframe(stock_code, df)
+                except Exception as e:
+                    logger.warning("%s 종목 처리 중 오류 발생: %s", stock_code, e)
+                    continue
+                # 스크리닝된 종목은 이미 계산한 지표로 바로 매수 신호를 확인합니다. (최대 MAX_BUY_CHECKS 개)
+                if selected and screened < MAX_BUY_CHECKS:
+                    screened += 1
+                    await self._check_buy(stock_code, df_with_indicators, order_queue)
+            logger.info("스크리닝 결과: %d개 종목 선정", screened)
+            unfetched = await fetcher
+            self._deferred_codes = unfetched
+            if unfetched:
+                logger.warning("마감 시간에 도달하여 %d개 종목의 스크리닝을 다음 주기로 미룹니다.", len(unfetched))
+                timing.skipped.append('screening(partial)')
+
+            if not screened and not unfetched:
+                # 스크리닝 결과가 없으면 상위 종목들 확인
+                fallback_codes = self._buyable(candidate_codes[:MAX_BUY_CHECKS])
+                logger.info("스크리닝 결과가 없어 상위 종목 확인: %d개", len(fallback_codes))
+                fallback_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+                fallback_fetcher = asyncio.create_task(self._fetch_stage(fallback_codes, fallback_queue))
+                try:
+                    while (item := await fallback_queue.get()) is not _DONE:
+                        stock_code, df = item
+                        if df is not None:
+                            with profiling.span('compute', stock_code):
+                                df_with_indicators = add_all_indicators(df.copy())
+                            await self._check_buy(stock_code, df_with_indicators, order_queue)
+                except BaseException:
+                    fallback_fetcher.cancel()
+                    raise
+                await fallback_fetcher
+        except BaseException:
+            fetcher.cancel()
+            submitter.cancel()
+            raise
+        await order_queue.put(_DONE)
+        await submitter
+
+        self._update_screening_estimate(time.monotonic() - started)
+
+    def _skip_screening(self, timing: CycleTiming, deadline: float | None) -> bool:
+        """ 마감 시각 안에 스크리닝을 끝내기 어려워 보이면 건너뜀을 기록하고 True 를 돌려줍니다. """
+        if deadline is None or time.monotonic() + self.screening_estimate <= deadline:
+            return False
+        logger.warning("마감 시간 내 완료가 어려워 이번 주기의 스크리닝을 건너뜁니다. (예상 %.1f초)", self.screening_estimate)
+        timing.skipped.append('screening')
+        # 건너뛴 주기에는 소요 시간이 갱신되지 않으므로 예상치를 줄여 다음 주기에 다시 시도하게 합니다.
+        self.screening_estimate *= 0.5
+        return True
+
+    def _screening_codes(self, candidate_codes: list[str]) -> list[str]:
+        """ 이번 주기에 스크리닝할 종목 (지난 주기에 미룬 종목, 장 시작 전에 선정된 종목 우선, 매수 불가 종목 제외) """
+        screening_codes = candidate_codes[:MAX_SCREENING_STOCKS]
+        first_codes = list(dict.fromkeys(self._deferred_codes + self._prescreened))
+        self._prescreened = []
+        if first_codes:
+            first = set(first_codes) & set(screening_codes)
+            screening_codes = [c for c in first_codes if c in first] + \
+                              [c for c in screening_codes if c not in first]
+        return self._buyable(screening_codes)
+
+    def _update_screening_estimate(self, elapsed: float):
+        self.screening_estimate = elapsed if not self.screening_estimate else 0.7 * self.screening_estimate + 0.3 * elapsed
+
+    @staticmethod
+    async def _timed(timing: CycleTiming, name: str, awaitable):
+        started = time.monotonic()
+        try:
+            with profiling.span(f'stage.{name}'):
+                return await awaitable
+        finally:
+            timing.stages[name] = time.monotonic() - started
+
+    async def run(self, candidate_codes: list[str], timing: CycleTiming | None = None,
+                  deadline: float | None = None) -> CycleTiming:
+        """
+        매매 주기 1회를 실행합니다.
+        :param candidate_codes: 매수 후보 종목 코드 리스트
+        :param timing: 단계별 소요 시간을 기록할 CycleTiming (None 이면 새로 생성)
+        :param deadline: 작업 마감 시각 (time.monotonic 기준). 매도 확인은 항상 수행하고, 스크리닝/매수는 마감에 맞춰 줄입니다.
+        :return: 단계별 소요 시간이 기록된 CycleTiming
+        """
+        timing = timing or CycleTiming(scheduled_at=datetime.now())
+        # 이번 주기의 시세 스냅샷 시작 (주기 안에서는 종목마다 한 번만 조회)
+        self.market_data.begin_cycle()
+
+        # 직전 주기 주문의 체결 반영 후 포트폴리오 최신화
+        await self._timed(timing, 'reconcile', asyncio.to_thread(self._reconcile))
+
+        sells_done = asyncio.create_task(self._timed(timing, 'sell', self._sell_flow()))
+        buys_done = asyncio.create_task(self._timed(timing, 'screening_buy',
+                                                    self._buy_flow(candidate_codes, sells_done, timing, deadline)))
+        await asyncio.gather(sells_done, buys_done)
+
+        # 이번 주기에 접수된 주문 중 이미 체결된 것은 바로 반영합니다.
+        await self._timed(timing, 'fills', asyncio.to_thread(self.order_manager.process_fills))
+        return timing
+
+    async def warm_up(self, candidate_codes: list[str]) -> list[str]:
+        """
+        장 시작 전 준비 작업. 잔고를 동기화하고 후보 종목의 일봉을 미리 조회해 지표 계산과 스크리닝을 실행합니다.
+        - 선정된 종목은 첫 주기에서 먼저 매수 신호를 확인합니다.
+        - 소요 시간으로 스크리닝 예상 시간을 채워 두므로, 첫 주기부터 마감 시간 판단이 평소와 같게 동작합니다.
+        :param candidate_codes: 매수 후보 종목 코드 리스트
+        :return: 스크리닝으로 선정된 종목 코드 리스트
+        """
+        logger.info("--- 장 시작 전 준비 작업 ---")
+        started = time.monotonic()
+        self.market_data.begin_cycle()
+        await asyncio.to_thread(self._reconcile)
+
+        screening_codes = self._buyable(candidate_codes[:MAX_SCREENING_STOCKS])
+        bars_queue = asyncio.Queue(PIPELINE_QUEUE_SIZE)
+        fetcher = asyncio.create_task(self._fetch_stage(screening_codes, bars_queue))
+        selected_codes = []
+        try:
+            while (item := await bars_queue.get()) is not _DONE:
+                stock_code, df = item
+                if df is None:
+                    continue
+                try:
+                    with profiling.span('compute', stock_code):
+                        selected, _ = screen_dataframe(stock_code, df)
+                except Exception as e:
+                    logger.warning("%s 종목 처리 중 오류 발생: %s", stock_code, e)
+                    continue
+                if selected:
+                    selected_codes.append(stock_code)
+        except BaseException:
+            fetcher.cancel()
+            raise
+        await fetcher
+
+        self._prescreened = selected_codes
+        self.screening_estimate = time.monotonic() - started
+        logger.info("준비 작업 완료: %d개 종목 조회, %d개 종목 선정 (%.1f초)",
+                    len(screening_codes), len(selected_codes), self.screening_estimate)
+        return selected_codes
+
+    def apply_config(self, change: ConfigChange):
+        """
+        다시 읽은 전략/지표 파라미터를 적용합니다. 매매 주기 사이에 호출합니다.
+        시세 스냅샷, 분봉 버퍼, 마감으로 미룬 종목은 그대로 두고, 바뀐 파라미터로 결과가 달라지는 것만 버립니다.
+        (지표와 신호는 주기마다 일봉에서 다시 계산하므로, 주기를 넘겨 남는 결과는 장 시작 전 스크리닝 선정 목록뿐입니다)
+        """
+        apply_params(change.params)
+        if 'screening' in change.consumers and self._prescreened:
+            logger.info("스크리닝 기준이 바뀌어 장 시작 전 선정 종목 %d개를 우선 확인 대상에서 제외합니다.",
+                        len(self._prescreened))
+            self._prescreened = []
+
+    def close(self):
+        """ 파이프라인이 사용한 자원을 정리합니다. (워커 프로세스를 쓰는 ShardedPipeline 에서 재정의) """
+        pass
+
+    def _reconcile(self):
+        self.order_manager.process_fills()
+        self.portfolio.reconcile()
@@ -0,0 +1,172 @@
+import numpy as np
+
+
+class ValuationBook:
+    """
+    보유 종목의 실시간 평가(mark-to-market) 장부.
+
+    종목별 수량, 평균 단가, 최근 가격, 평가금액, 매입금액을 numpy 배열에 슬롯 단위로 보관합니다.
+    - 시세 묶음(update_prices)은 해당 슬롯들을 한 번의 벡터 연산으로 갱신합니다.
+    - 포트폴리오 합계(평가금액, 매입금액, 평가손익)와 섹터별 평가금액은 변경분만큼 누적 갱신되므로 조회가 O(1)입니다.
+    """
+    def __init__(self, capacity: int = 64):
+        """
+        :param capacity: 초기 슬롯 수 (부족하면 두 배씩 늘어납니다)
+        """
+        self._slots: dict[str, int] = {}
+        self._free: list[int] = []
+        self.quantity = np.zeros(capacity)
+        self.avg_price = np.zeros(capacity)
+        self.last_price = np.zeros(capacity)
+        self.market_value = np.zeros(capacity)
+        self.cost = np.zeros(capacity)
+        self._size = 0  # 한 번이라도 사용된 슬롯 수
+        self.total_market_value = 0.0
+        self.total_cost = 0.0
+        self.sectors: dict[str, str] = {}  # { 종목코드: 섹터 } (set_sectors)
+        self._sector_ids: dict[str | None, int] = {None: 0}  # 섹터 번호 (0: 미분류)
+        self.slot_sector = np.zeros(capacity, dtype=np.intp)
+        self.sector_value = np.zeros(8)  # 섹터 번호별 평가금액 합계
+
+    def __contains__(self, stock_code: str) -> bool:
+        return stock_code in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _grow(self):
+        capacity = len(self.quantity) * 2
+        for name in ('quantity', 'avg_price', 'last_price', 'market_value', 'cost'):
+            array = np.zeros(capacity)
+            array[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, array)
+        slot_sector = np.zeros(capacity, dtype=np.intp)
+        slot_sector[:self._size] = self.slot_sector[:self._size]
+        self.slot_sector = slot_sector
+
+    def _sector_id(self, sector: str | None) -> int:
+        sector_id = self._sector_ids.get(sector)
+        if sector_id is None:
+            sector_id = self._sector_ids[sector] = len(self._sector_ids)
+            if sector_id == len(self.sector_value):
+                self.sector_value = np.concatenate([self.sector_value, np.zeros(len(self.sector_value))])
+        return sector_id
+
+    def set_sectors(self, sectors: dict[str, str | None]):
+        """
+        종목별 섹터를 등록하고, 보유 중인 종목의 섹터 합계를 다시 계산합니다. (종목 목록을 읽을 때 한 번)
+        :param sectors: { 종목코드: 섹터 } (섹터를 모르면 None)
+        """
+        self.sectors.update({code: sector for code, sector in sectors.items() if sector})
+        for code, slot in self._slots.items():
+            self.slot_sector[slot] = self._sector_id(self.sectors.get(code))
+        self.sector_value[:] = 0.0
+        slots = np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))
+        np.add.at(self.sector_value, self.slot_sector[slots], self.market_value[slots])
+
+    def sector_market_value(self, sector: str | None) -> float:
+        """ 섹터의 평가금액 합계 (None 이면 미분류 종목) """
+        sector_id = self._sector_ids.get(sector)
+        return float(self.sector_value[sector_id]) if sector_id is not None else 0.0
+
+    def market_value_of(self, stock_code: str) -> float:
+        """ 종목의 평가금액 (보유하지 않으면 0) """
+        slot = self._slots.get(stock_code)
+        return float(self.market_value[slot]) if slot is not None else 0.0
+
+    def _slot(self, stock_code: str) -> int:
+        slot = self._slots.get(stock_code)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                if self._size == len(self.quantity):
+                    self._grow()
+                slot = self._size
+                self._size += 1
+            self._slots[stock_code] = slot
+            self.slot_sector[slot] = self._sector_id(self.sectors.get(stock_code))
+        return slot
+
+    def set_position(self, stock_code: str, quantity: float, avg_price: float, price: float | None = None):
+        """
+        종목의 수량과 평균 단가를 설정합니다. (체결 반영, 잔고 동기화 시)
+        :param price: 최근 가격. 없으면 기존 가격(처음이면 평균 단가)을 사용합니다.
+        """
+        if quantity <= 0:
+            self.remove(stock_code)
+            return
+        slot = self._slot(stock_code)
+        if price is None:
+            price = self.last_price[slot] or avg_price
+        market_value = quantity * price
+        cost = quantity * avg_price
+        self.total_market_value += market_value - self.market_value[slot]
+        self.total_cost += cost - self.cost[slot]
+        self.sector_value[self.slot_sector[slot]] += market_value - self.market_value[slot]
+        self.quantity[slot] = quantity
+        self.avg_price[slot] = avg_price
+        self.last_price[slot] = price
+        self.market_value[slot] = market_value
+        self.cost[slot] = cost
+
+    def remove(self, stock_code: str):
+        """ 전량 매도된 종목의 슬롯을 비웁니다. """
+        slot = self._slots.pop(stock_code, None)
+        if slot is None:
+            return
+        self.total_market_value -= self.market_value[slot]
+        self.total_cost -= self.cost[slot]
+        self.sector_value[self.slot_sector[slot]] -= self.market_value[slot]
+        for array in (self.quantity, self.avg_price, self.last_price, self.market_value, self.cost):
+            array[slot] = 0.0
+        self._free.append(slot)
+        if not self._slots:
+            # 누적 오차 제거
+            self.total_market_value = 0.0
+            self.total_cost = 0.0
+            self.sector_value[:] = 0.0
+
+    def update_prices(self, prices: dict[str, float]) -> int:
+        """
+        시세 묶음을 반영합니다. 보유 중인 종목만 골라 한 번의 벡터 연산으로 평가금액을 갱신합니다.
+        :param prices: { 종목코드: 가격 }
+        :return: 갱신된 종목 수
+        """
+        pairs = [(self._slots[code], price) for code, price in prices.items()
+                 if code in self._slots and price]
+        if not pairs:
+            return 0
+        slots = np.fromiter((slot for slot, _ in pairs), dtype=np.intp, count=len(pairs))
+        new_prices = np.fromiter((price for _, price in pairs), dtype=float, count=len(pairs))
+        new_values = self.quantity[slots] * new_prices
+        deltas = new_values - self.market_value[slots]
+        self.total_market_value += float(deltas.sum())
+        np.add.at(self.sector_value, self.slot_sector[slots], deltas)
+        self.last_price[slots] = new_prices
+        self.market_value[slots] = new_values
+        return len(pairs)
+
+    @property
+    def unrealized_pnl(self) -> float:
+        """ 전체 평가손익 """
+        return self.total_market_value - self.total_cost
+
+    def exposure(self, cash: float) -> float:
+        """ 총자산(현금 + 평가금액) 중 주식 평가금액 비중 """
+        total = cash + self.total_market_value
+        return self.total_market_value / total if total > 0 else 0.0
+
+    def position(self, stock_code: str) -> dict | None:
+        """ 종목 1개의 평가 내역 """
+        slot = self._slots.get(stock_code)
+        if slot is None:
+            return None
+        market_value = self.market_value[slot]
+        cost = self.cost[slot]
+        return {
+            'price': float(self.last_price[slot]),
+            'market_value': float(market_value),
+            'unrealized_pnl': float(market_value - cost),
+            'return_rate': float(market_value / cost - 1) if cost else 0.0,
+        }